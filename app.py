@@ -8,706 +8,306 @@ Questa applicazione analizza i file di log SVXLink per determinare:
 - Statistiche dettagliate delle trasmissioni
 """
 
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify
+from flask import Blueprint, Flask, Response, current_app, render_template, request, flash, redirect, url_for, jsonify, make_response, stream_with_context
 from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import functools
+import hashlib
+import hmac
 from datetime import datetime, timedelta, date
-import re
-from collections import defaultdict
 import tempfile
+import threading
 
-# Import per database e statistiche - importazione differita per evitare cicli
+# Analizzatore dei log (modulo senza dipendenze web), riesportato per compatibilità
+from log_analyzer import (ANALYZER_VERSION, DISCONNECTED_AFTER, MIN_QSO_SECONDS, TX_NOISE_SECONDS,
+                          SVXLinkLogAnalyzer, analyze_log_content)
+from columns import columns_dir, reaggregate, site_columns_dir
+from live_feed import TooManyClients, get_live_feed
+from export import EXPORT_DATASETS, EXPORT_END, EXPORT_FORMATS, EXPORT_START, export_filename, gzip_chunks, iter_export
+from sites import DEFAULT_SITE, is_valid_site
+
+# Import per database e statistiche
 try:
-    from database import DatabaseManager
-    # LogProcessor sarà importato dopo la definizione della classe SVXLinkLogAnalyzer
+    from database import DASHBOARD_SECTIONS, DatabaseManager
     DB_AVAILABLE = True
 except ImportError:
     print("⚠️ Database modules non disponibili. Funzionalità statistiche limitate.")
     DB_AVAILABLE = False
 
-app = Flask(__name__)
-app.secret_key = 'svxlink_analyzer_secret_key_2024'
-app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-
-# Configurazione per reverse proxy Apache con HTTPS
-app.config['APPLICATION_ROOT'] = '/websvxlinkstat'
-app.config['PREFERRED_URL_SCHEME'] = 'https'
-app.config['SERVER_NAME'] = None  # Lascia che Flask si adatti all'host
-
-# Configura ProxyFix per gestire headers del reverse proxy
-app.wsgi_app = ProxyFix(
-    app.wsgi_app, 
-    x_for=1, 
-    x_proto=1, 
-    x_host=1, 
-    x_prefix=1
-)
-
-# Le inizializzazioni di log_processor e scheduler saranno fatte dopo 
-# la definizione della classe SVXLinkLogAnalyzer per evitare importazioni circolari
-
-# Inizializza variabili globali
+# Le route sono registrate su un blueprint: l'applicazione viene creata da create_app()
+bp = Blueprint('main', __name__)
+
+# Inizializza variabili globali (risorse del processo, create da init_resources)
 db_manager = None
 log_processor = None  
 scheduler = None
-
-class SVXLinkLogAnalyzer:
-    def __init__(self):
-        self.transmissions = []
-        self.carriers_opened = 0
-        self.total_transmission_time = timedelta()
-        self.stats = defaultdict(int)
-        # Nuove statistiche avanzate
-        self.ctcss_tones = defaultdict(int)  # Subtoni rilevati per frequenza
-        self.talk_groups = defaultdict(int)  # TG aperti con conteggio
-        self.qso_sessions = []  # QSO completi identificati
-        self.active_tg = None  # TG attualmente attivo
-        self.qso_start = None  # Inizio QSO corrente
-        # Tracciamento disconnessioni
-        self.disconnections = []  # Periodi di disconnessione
-        self.current_disconnection = None  # Disconnessione attualmente in corso
-        
-    def parse_log_file(self, file_path):
-        """Analizza il file di log SVXLink"""
-        self.transmissions = []
-        self.carriers_opened = 0
-        self.total_transmission_time = timedelta()
-        self.stats = defaultdict(int)
-        # Reset delle nuove statistiche
-        self.ctcss_tones = defaultdict(int)
-        self.talk_groups = defaultdict(int)
-        self.qso_sessions = []
-        self.active_tg = None
-        self.qso_start = None
-        # Reset disconnessioni
-        self.disconnections = []
-        self.current_disconnection = None
-        
-        tx_sessions = []  # Per tracciare le sessioni ON/OFF
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-                
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # Parse del timestamp e del messaggio
-                # Supporta sia "Oct 21" che "Nov  1" (con spazio extra per giorni a cifra singola)
-                match = re.match(r'^(\w{3} \w{3} \s*\d{1,2} \d{2}:\d{2}:\d{2} \d{4}): (.+)$', line)
-                if not match:
-                    continue
-                    
-                timestamp_str, message = match.groups()
-                # Normalizza gli spazi extra nel timestamp prima del parsing
-                timestamp_str = re.sub(r'\s+', ' ', timestamp_str.strip())
-                timestamp = datetime.strptime(timestamp_str, '%a %b %d %H:%M:%S %Y')
-                
-                # === ANALISI SUBTONI CTCSS ===
-                ctcss_match = re.search(r'(\d+\.?\d*) Hz CTCSS tone detected', message)
-                if ctcss_match:
-                    tone_freq = float(ctcss_match.group(1))
-                    self.ctcss_tones[tone_freq] += 1
-                    self.stats['ctcss_detections'] += 1
-                    
-                    # Possibile inizio QSO se c'è un subtono
-                    if self.qso_start is None:
-                        self.qso_start = timestamp
-                
-                # === ANALISI TALK GROUPS ===
-                tg_match = re.search(r'Selecting TG #(\d+)', message)
-                if tg_match:
-                    tg_number = int(tg_match.group(1))
-                    
-                    # Se TG #0, potrebbe essere fine QSO
-                    if tg_number == 0:
-                        if self.active_tg is not None and self.qso_start is not None:
-                            # Registra QSO completo
-                            qso_duration = timestamp - self.qso_start
-                            self.qso_sessions.append({
-                                'start': self.qso_start,
-                                'end': timestamp,
-                                'duration': qso_duration,
-                                'tg': self.active_tg,
-                                'duration_seconds': qso_duration.total_seconds()
-                            })
-                        self.active_tg = None
-                        self.qso_start = None
-                    else:
-                        # TG diverso da 0 - possibile inizio/cambio QSO
-                        self.talk_groups[tg_number] += 1
-                        self.active_tg = tg_number
-                        
-                        # Se non abbiamo un inizio QSO, lo impostiamo ora
-                        if self.qso_start is None:
-                            self.qso_start = timestamp
-                
-                # Cerca eventi di trasmissione
-                if "Turning the transmitter ON" in message:
-                    # Nuova trasmissione inizia
-                    tx_sessions.append({
-                        'start': timestamp,
-                        'end': None,
-                        'message': message
-                    })
-                    self.carriers_opened += 1
-                    self.stats['transmitter_on'] += 1
-                    
-                elif "Turning the transmitter OFF" in message:
-                    # Trasmissione termina
-                    if tx_sessions and tx_sessions[-1]['end'] is None:
-                        tx_sessions[-1]['end'] = timestamp
-                        
-                        # Calcola durata
-                        duration = timestamp - tx_sessions[-1]['start']
-                        self.total_transmission_time += duration
-                        
-                        self.transmissions.append({
-                            'start': tx_sessions[-1]['start'],
-                            'end': timestamp,
-                            'duration': duration,
-                            'duration_seconds': duration.total_seconds()
-                        })
-                        
-                    self.stats['transmitter_off'] += 1
-                
-                # Altri eventi interessanti
-                elif "squelch is OPEN" in message:
-                    self.stats['squelch_open'] += 1
-                elif "squelch is CLOSED" in message:
-                    self.stats['squelch_closed'] += 1
-                elif "Talker start" in message:
-                    self.stats['talker_start'] += 1
-                elif "Talker stop" in message:
-                    self.stats['talker_stop'] += 1
-                elif "Node joined" in message or "Node left" in message:
-                    # Eventi di nodi - chiudono eventuali disconnessioni in corso
-                    if self.current_disconnection:
-                        self.current_disconnection['end'] = timestamp
-                        self.current_disconnection['duration'] = (timestamp - self.current_disconnection['start']).total_seconds()
-                        self.disconnections.append(self.current_disconnection)
-                        self.current_disconnection = None
-                    
-                    if "Node joined" in message:
-                        self.stats['nodes_joined'] += 1
-                    else:
-                        self.stats['nodes_left'] += 1
-                elif "identification" in message.lower():
-                    self.stats['identifications'] += 1
-                
-                # === TRACCIAMENTO DISCONNESSIONI ===
-                if "ReflectorLogic: Disconnected from" in message and "Connection timed out" in message:
-                    if self.current_disconnection is None:
-                        # Inizio nuovo periodo di disconnessione
-                        self.current_disconnection = {
-                            'start': timestamp,
-                            'end': None,
-                            'count': 1,
-                            'last_disconnection': timestamp
-                        }
-                    else:
-                        # Incrementa il contatore di disconnessioni dello stesso periodo
-                        self.current_disconnection['count'] += 1
-                        self.current_disconnection['last_disconnection'] = timestamp
-                    self.stats['disconnections'] += 1
-            
-            # Gestione disconnessioni ancora in corso alla fine del log
-            if self.current_disconnection:
-                # Chiudi il periodo con l'ultima disconnessione rilevata
-                self.current_disconnection['end'] = self.current_disconnection['last_disconnection']
-                self.current_disconnection['duration'] = (
-                    self.current_disconnection['last_disconnection'] - 
-                    self.current_disconnection['start']
-                ).total_seconds()
-                # Se la disconnessione arriva fino alle 23:50 o oltre, stato disconnesso
-                end_time = self.current_disconnection['last_disconnection']
-                if end_time.hour == 23 and end_time.minute >= 50:
-                    self.current_disconnection['status'] = 'disconnected'
-                else:
-                    self.current_disconnection['status'] = 'resolved'
-                self.disconnections.append(self.current_disconnection)
-                self.current_disconnection = None
-                    
-        except Exception as e:
-            raise Exception(f"Errore durante l'analisi del file: {str(e)}")
-    
-    def get_statistics(self):
-        """Restituisce le statistiche calcolate"""
-        total_seconds = self.total_transmission_time.total_seconds()
-        
-        # Calcola statistiche di durata
-        durations = [t['duration_seconds'] for t in self.transmissions]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        min_duration = min(durations) if durations else 0
-        max_duration = max(durations) if durations else 0
-        
-        # Calcola statistiche QSO
-        qso_durations = [q['duration_seconds'] for q in self.qso_sessions]
-        qso_total_time = sum(qso_durations)
-        qso_avg_duration = sum(qso_durations) / len(qso_durations) if qso_durations else 0
-        qso_min_duration = min(qso_durations) if qso_durations else 0
-        qso_max_duration = max(qso_durations) if qso_durations else 0
-        
-        # Prepara i subtoni per il display (ordinati per frequenza di utilizzo)
-        sorted_ctcss = sorted(self.ctcss_tones.items(), key=lambda x: x[1], reverse=True)
-        
-        # Prepara i TG per il display (ordinati per frequenza di utilizzo)
-        sorted_tg = sorted(self.talk_groups.items(), key=lambda x: x[1], reverse=True)
-        
-        # Calcola durate per Talk Group
-        tg_durations = {}
-        for qso_session in self.qso_sessions:
-            tg = qso_session['tg']
-            if tg not in tg_durations:
-                tg_durations[tg] = {
-                    'total_seconds': 0,
-                    'qso_count': 0,
-                    'avg_duration': 0
-                }
-            tg_durations[tg]['total_seconds'] += qso_session['duration_seconds']
-            tg_durations[tg]['qso_count'] += 1
-        
-        # Calcola durate medie per TG
-        for tg in tg_durations:
-            avg_seconds = tg_durations[tg]['total_seconds'] / tg_durations[tg]['qso_count']
-            tg_durations[tg]['avg_duration'] = avg_seconds
-            tg_durations[tg]['formatted_total'] = f"{int(tg_durations[tg]['total_seconds'] // 60)}m {int(tg_durations[tg]['total_seconds'] % 60)}s"
-            tg_durations[tg]['formatted_avg'] = f"{int(avg_seconds // 60)}m {int(avg_seconds % 60)}s"
-        
-        # Ordina TG per durata totale (decrescente)
-        sorted_tg_by_duration = sorted(tg_durations.items(), key=lambda x: x[1]['total_seconds'], reverse=True)
-        
-        return {
-            'total_transmission_time': {
-                'hours': int(total_seconds // 3600),
-                'minutes': int((total_seconds % 3600) // 60),
-                'seconds': int(total_seconds % 60),
-                'total_seconds': total_seconds
-            },
-            'carriers_opened': self.carriers_opened,
-            'total_transmissions': len(self.transmissions),
-            'average_duration': {
-                'seconds': avg_duration,
-                'formatted': f"{int(avg_duration // 60)}m {int(avg_duration % 60)}s"
-            },
-            'min_duration': {
-                'seconds': min_duration,
-                'formatted': f"{int(min_duration // 60)}m {int(min_duration % 60)}s"
-            },
-            'max_duration': {
-                'seconds': max_duration,
-                'formatted': f"{int(max_duration // 60)}m {int(max_duration % 60)}s"
-            },
-            # === NUOVE STATISTICHE AVANZATE ===
-            'ctcss_tones': {
-                'total_detections': sum(self.ctcss_tones.values()),
-                'unique_tones': len(self.ctcss_tones),
-                'tones_detail': sorted_ctcss[:10]  # Top 10 subtoni più usati
-            },
-            'talk_groups': {
-                'total_selections': sum(self.talk_groups.values()),
-                'unique_tgs': len(self.talk_groups),
-                'tgs_detail': sorted_tg[:10],  # Top 10 TG più usati
-                'tg_durations': sorted_tg_by_duration  # TG ordinati per durata totale
-            },
-            'qso_analysis': {
-                'total_qso': len(self.qso_sessions),
-                'qso_time': {
-                    'hours': int(qso_total_time // 3600),
-                    'minutes': int((qso_total_time % 3600) // 60),
-                    'seconds': int(qso_total_time % 60),
-                    'total_seconds': qso_total_time
-                },
-                'qso_avg_duration': {
-                    'seconds': qso_avg_duration,
-                    'formatted': f"{int(qso_avg_duration // 60)}m {int(qso_avg_duration % 60)}s"
-                },
-                'qso_min_duration': {
-                    'seconds': qso_min_duration,
-                    'formatted': f"{int(qso_min_duration // 60)}m {int(qso_min_duration % 60)}s"
-                },
-                'qso_max_duration': {
-                    'seconds': qso_max_duration,
-                    'formatted': f"{int(qso_max_duration // 60)}m {int(qso_max_duration % 60)}s"
-                },
-                'qso_sessions': self.qso_sessions[:20]  # Prime 20 QSO per performance
-            },
-            'disconnections': {
-                'total_periods': len(self.disconnections),
-                'total_disconnections': sum(d['count'] for d in self.disconnections),
-                'periods': [
-                    {
-                        'start': d['start'].strftime('%Y-%m-%d %H:%M:%S'),
-                        'end': d['end'].strftime('%Y-%m-%d %H:%M:%S') if d.get('end') else 'In corso',
-                        'duration': d.get('duration'),
-                        'duration_formatted': f"{int(d['duration'] // 60)}m {int(d['duration'] % 60)}s" if d.get('duration') else 'In corso',
-                        'count': d['count'],
-                        'status': d.get('status', 'resolved')
-                    }
-                    for d in self.disconnections
-                ]
-            },
-            'events': dict(self.stats),
-            'transmissions': self.transmissions[:50]  # Mostra solo le prime 50 per performance
-        }
-    
-    def analyze_log(self, content):
-        """Analizza il contenuto del log (compatibilità con log_processor.py)"""
-        # Reset delle statistiche
-        self.transmissions = []
-        self.carriers_opened = 0
-        self.total_transmission_time = timedelta()
-        self.stats = defaultdict(int)
-        self.ctcss_tones = defaultdict(int)
-        self.talk_groups = defaultdict(int)
-        self.qso_sessions = []
-        self.active_tg = None
-        self.qso_start = None
-        # Reset disconnessioni
-        self.disconnections = []
-        self.current_disconnection = None
-        
-        tx_sessions = []  # Per tracciare le sessioni ON/OFF
-        
-        try:
-            lines = content.strip().split('\n')
-                
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # Parse del timestamp e del messaggio
-                # Supporta sia "Oct 21" che "Nov  1" (con spazio extra per giorni a cifra singola)
-                match = re.match(r'^(\w{3} \w{3} \s*\d{1,2} \d{2}:\d{2}:\d{2} \d{4}): (.+)$', line)
-                if not match:
-                    continue
-                    
-                timestamp_str, message = match.groups()
-                # Normalizza gli spazi extra nel timestamp prima del parsing
-                timestamp_str = re.sub(r'\s+', ' ', timestamp_str.strip())
-                timestamp = datetime.strptime(timestamp_str, '%a %b %d %H:%M:%S %Y')
-                
-                # === ANALISI SUBTONI CTCSS ===
-                ctcss_match = re.search(r'(\d+\.?\d*) Hz CTCSS tone detected', message)
-                if ctcss_match:
-                    tone_freq = float(ctcss_match.group(1))
-                    self.ctcss_tones[tone_freq] += 1
-                    self.stats['ctcss_detections'] += 1
-                
-                # === ANALISI TALK GROUPS ===
-                tg_match = re.search(r'Selecting TG #(\d+)', message)
-                if tg_match:
-                    tg_id = int(tg_match.group(1))
-                    if tg_id != 0:  # Solo per TG diversi da 0
-                        self.talk_groups[tg_id] += 1
-                        self.stats['tg_selections'] += 1
-                
-                # === IDENTIFICAZIONE QSO ===
-                # QSO più restrittivo: solo con sequenza CTCSS -> TG selection -> TG #0
-                
-                # Gestione Talk Groups per QSO
-                if tg_match:
-                    tg_id = int(tg_match.group(1))
-                    
-                    if tg_id == 0:
-                        # TG #0 = fine QSO (solo se abbiamo un TG attivo)
-                        if self.active_tg is not None and self.qso_start is not None:
-                            duration = (timestamp - self.qso_start).total_seconds()
-                            
-                            if duration >= 3:  # QSO valido solo se >= 3 secondi (più restrittivo)
-                                self.qso_sessions.append({
-                                    'tg': self.active_tg,
-                                    'start_time': self.qso_start,
-                                    'end_time': timestamp,
-                                    'duration_seconds': duration
-                                })
-                                self.stats['valid_qso'] += 1
-                        
-                        self.qso_start = None
-                        self.active_tg = None
-                    else:
-                        # TG diverso da 0 = possibile inizio QSO
-                        # Ma inizia QSO solo se c'è stato un CTCSS prima
-                        if self.qso_start is None:
-                            # Cerca CTCSS recente (negli ultimi 5 secondi)
-                            # Per ora impostiamo start al momento del TG selection
-                            self.qso_start = timestamp
-                        
-                        self.active_tg = tg_id
-                
-                # CTCSS non inizia più automaticamente i QSO
-                # Serve solo come prerequisito per i TG
-                
-                # === ANALISI TRASMISSIONE ===
-                if 'Turning the transmitter ON' in message:
-                    tx_sessions.append({
-                        'start_time': timestamp,
-                        'start_line': line
-                    })
-                    self.stats['tx_on'] += 1
-                
-                elif 'Turning the transmitter OFF' in message and tx_sessions:
-                    last_session = tx_sessions[-1]
-                    if 'end_time' not in last_session:
-                        duration = timestamp - last_session['start_time']
-                        duration_seconds = duration.total_seconds()
-                        
-                        if duration_seconds >= 0.1:  # Filtro rumore
-                            self.transmissions.append({
-                                'start_time': last_session['start_time'],
-                                'end_time': timestamp,
-                                'duration': duration,
-                                'duration_seconds': duration_seconds,
-                                'start_line': last_session['start_line'],
-                                'end_line': line
-                            })
-                            self.total_transmission_time += duration
-                        
-                        last_session['end_time'] = timestamp
-                        self.stats['tx_off'] += 1
-                
-                # === CONTEGGIO PORTANTI ===
-                if 'The squelch is OPEN' in message:
-                    self.carriers_opened += 1
-                    self.stats['squelch_open'] += 1
-                elif 'The squelch is CLOSED' in message:
-                    self.stats['squelch_closed'] += 1
-                
-                # === TRACCIAMENTO EVENTI NODI E DISCONNESSIONI ===
-                if "Node joined" in message or "Node left" in message:
-                    # Eventi di nodi - chiudono eventuali disconnessioni in corso
-                    if self.current_disconnection:
-                        self.current_disconnection['end'] = timestamp
-                        self.current_disconnection['duration'] = (timestamp - self.current_disconnection['start']).total_seconds()
-                        self.disconnections.append(self.current_disconnection)
-                        self.current_disconnection = None
-                    
-                    if "Node joined" in message:
-                        self.stats['nodes_joined'] += 1
-                    else:
-                        self.stats['nodes_left'] += 1
-                
-                # === TRACCIAMENTO DISCONNESSIONI ===
-                if "ReflectorLogic: Disconnected from" in message and "Connection timed out" in message:
-                    if self.current_disconnection is None:
-                        # Inizio nuovo periodo di disconnessione
-                        self.current_disconnection = {
-                            'start': timestamp,
-                            'end': None,
-                            'count': 1,
-                            'last_disconnection': timestamp
-                        }
-                    else:
-                        # Incrementa il contatore di disconnessioni dello stesso periodo
-                        self.current_disconnection['count'] += 1
-                        self.current_disconnection['last_disconnection'] = timestamp
-                    self.stats['disconnections'] += 1
-            
-            # Gestione disconnessioni ancora in corso alla fine del log
-            if self.current_disconnection:
-                # Chiudi il periodo con l'ultima disconnessione rilevata
-                self.current_disconnection['end'] = self.current_disconnection['last_disconnection']
-                self.current_disconnection['duration'] = (
-                    self.current_disconnection['last_disconnection'] - 
-                    self.current_disconnection['start']
-                ).total_seconds()
-                # Se la disconnessione arriva fino alle 23:50 o oltre, stato disconnesso
-                end_time = self.current_disconnection['last_disconnection']
-                if end_time.hour == 23 and end_time.minute >= 50:
-                    self.current_disconnection['status'] = 'disconnected'
-                else:
-                    self.current_disconnection['status'] = 'resolved'
-                self.disconnections.append(self.current_disconnection)
-                self.current_disconnection = None
-                
-        except Exception as e:
-            print(f"Errore durante l'analisi: {e}")
-            
-        # Statistiche finali - converti timedelta in secondi
-        total_seconds = self.total_transmission_time.total_seconds()
-        
-        # Calcola statistiche durata trasmissioni
-        durations = [t['duration_seconds'] for t in self.transmissions]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        min_duration = min(durations) if durations else 0
-        max_duration = max(durations) if durations else 0
-        
-        # Calcola statistiche QSO
-        qso_durations = [q['duration_seconds'] for q in self.qso_sessions]
-        qso_total_time = sum(qso_durations)
-        
-        # Prepara i subtoni per il display con formato compatibile (ordinati per frequenza)
-        total_ctcss_detections = sum(self.ctcss_tones.values())
-        sorted_ctcss = []
-        for freq, count in sorted(self.ctcss_tones.items(), key=lambda x: x[1], reverse=True):
-            percentage = (count / total_ctcss_detections * 100) if total_ctcss_detections > 0 else 0
-            sorted_ctcss.append((freq, {'count': count, 'percentage': round(percentage, 2)}))
-        
-        # Prepara i TG per il display con formato compatibile (ordinati per frequenza)
-        total_tg_selections = sum(self.talk_groups.values())
-        sorted_tg = []
-        for tg_id, count in sorted(self.talk_groups.items(), key=lambda x: x[1], reverse=True):
-            percentage = (count / total_tg_selections * 100) if total_tg_selections > 0 else 0
-            sorted_tg.append((tg_id, {'count': count, 'percentage': round(percentage, 2)}))
-        
-        # Calcola durate per TG basandosi sui QSO
-        tg_durations = {}
-        for qso in self.qso_sessions:
-            tg = qso.get('tg', 0)
-            if tg not in tg_durations:
-                tg_durations[tg] = {
-                    'total_seconds': 0,
-                    'qso_count': 0,
-                    'avg_duration': 0
-                }
-            tg_durations[tg]['total_seconds'] += qso['duration_seconds']
-            tg_durations[tg]['qso_count'] += 1
-        
-        # Calcola durate medie per TG
-        for tg in tg_durations:
-            avg_seconds = tg_durations[tg]['total_seconds'] / tg_durations[tg]['qso_count']
-            tg_durations[tg]['avg_duration'] = avg_seconds
-        
-        # Ordina TG per durata totale (decrescente)
-        sorted_tg_by_duration = sorted(tg_durations.items(), key=lambda x: x[1]['total_seconds'], reverse=True)
-        
-        # Formato compatibile con log_processor.py
-        return {
-            'basic': {
-                'total_transmissions': len(self.transmissions),
-                'total_transmission_time': total_seconds,
-                'avg_transmission_time': avg_duration,
-                'max_transmission_time': max_duration,
-                'min_transmission_time': min_duration,
-                'carriers_opened': self.carriers_opened
-            },
-            'ctcss': {
-                'total_detections': sum(self.ctcss_tones.values()),
-                'unique_tones': len(self.ctcss_tones),
-                'ctcss_list': sorted_ctcss
-            },
-            'talk_groups': {
-                'total_selections': sum(self.talk_groups.values()),
-                'unique_tgs': len(self.talk_groups),
-                'tg_list': sorted_tg,
-                'tg_durations': sorted_tg_by_duration
-            },
-            'qso': {
-                'total_qso': len(self.qso_sessions),
-                'total_qso_time': qso_total_time,
-                'qso_sessions': self.qso_sessions
-            },
-            'disconnections': {
-                'total_periods': len(self.disconnections),
-                'total_disconnections': sum(d['count'] for d in self.disconnections),
-                'periods': [
-                    {
-                        'start': d['start'],
-                        'end': d.get('end'),
-                        'duration': d.get('duration'),
-                        'duration_formatted': f"{int(d['duration'] // 60)}m {int(d['duration'] % 60)}s" if d.get('duration') else 'In corso',
-                        'count': d['count'],
-                        'status': d.get('status', 'resolved')
-                    }
-                    for d in self.disconnections
-                ]
-            },
-            'events': dict(self.stats)
-        }
+_resources_pid = None
+_log_processor_error = None
+_resources_lock = threading.RLock()
 
 # =============================================================================
-# FUNZIONI HELPER PER ANALISI LOG
+# INIZIALIZZAZIONE RISORSE DEL PROCESSO
 # =============================================================================
 
-def analyze_log_content(content):
-    """Funzione helper per analizzare il contenuto di un log"""
-    analyzer = SVXLinkLogAnalyzer()
-    return analyzer.analyze_log(content)
-
-# =============================================================================
-# INIZIALIZZAZIONE MODULI DOPO LA DEFINIZIONE DELLA CLASSE
-# =============================================================================
+def init_resources():
+    """Prepara le risorse del processo corrente.
 
-# Ora possiamo importare e inizializzare i moduli che dipendono da SVXLinkLogAnalyzer
-if DB_AVAILABLE:
+    Database e log processor vengono creati al primo utilizzo
+    (get_db_manager, get_log_processor): qui parte solo l'elezione del leader
+    dello scheduler, che nel processo leader avvia watcher e ingest all'avvio
+    quando il server è in ascolto (mark_server_ready).
+    Non viene chiamata all'import del modulo: la chiamano `python app.py` e,
+    nei server preforking, ogni worker dopo il fork (hook post_fork di
+    gunicorn.conf.py), perché connessioni e thread non sopravvivono al fork.
+    Così test e strumenti che importano l'app non avviano lo scheduler.
+    Chiamate successive nello stesso processo non hanno effetto.
+    """
+    global scheduler, job_manager, push_ingest, _resources_pid
+    if _resources_pid == os.getpid():
+        return
+    _resources_pid = os.getpid()
+    job_manager = None
+    push_ingest = None
+    
+    if not DB_AVAILABLE:
+        return
+    
+    # Prova ad importare scheduler (opzionale per processamento automatico)
     try:
-        # Prova ad inizializzare il DatabaseManager
-        db_manager = DatabaseManager()
-        print("✅ Database Manager inizializzato")
-        
-        # Prova ad importare e inizializzare log processor (opzionale per statistiche automatiche)
-        try:
-            from log_processor import LogProcessor
-            log_processor = LogProcessor()
-            print("✅ Log Processor inizializzato")
-        except Exception as lp_error:
-            print(f"⚠️ Log Processor non disponibile: {lp_error}")
-            log_processor = None
-        
-        # Prova ad importare scheduler (opzionale per processamento automatico)
-        try:
-            from scheduler import init_scheduler, get_scheduler
-            scheduler = init_scheduler()
-            print("✅ Scheduler inizializzato")
-        except Exception as scheduler_error:
-            print(f"⚠️ Scheduler non disponibile: {scheduler_error}")
-            scheduler = None
-        
-        print("✅ Database inizializzato - funzionalità base disponibili")
-        
-    except Exception as e:
-        print(f"⚠️ Errore inizializzazione database: {e}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        DB_AVAILABLE = False
-        db_manager = None
-        log_processor = None
+        from scheduler import init_scheduler
+        scheduler = init_scheduler(get_log_processor)
+        print("✅ Scheduler inizializzato")
+    except Exception as scheduler_error:
+        print(f"⚠️ Scheduler non disponibile: {scheduler_error}")
         scheduler = None
 
+def mark_server_ready():
+    """Segnala che il server è in ascolto (hook post_worker_init di gunicorn, app.run con python app.py)"""
+    if scheduler is not None:
+        scheduler.mark_server_ready()
+
+def get_db_manager():
+    """Restituisce il DatabaseManager del processo, creato al primo utilizzo"""
+    global db_manager, DB_AVAILABLE
+    if db_manager is None and DB_AVAILABLE:
+        with _resources_lock:
+            if db_manager is None and DB_AVAILABLE:
+                try:
+                    db_manager = DatabaseManager()
+                    print("✅ Database Manager inizializzato")
+                except Exception as e:
+                    print(f"⚠️ Errore inizializzazione database: {e}")
+                    import traceback
+                    print(f"Traceback: {traceback.format_exc()}")
+                    DB_AVAILABLE = False
+    return db_manager
+
+def get_log_processor():
+    """Restituisce il log processor del processo, creato al primo utilizzo"""
+    global log_processor, _log_processor_error
+    if log_processor is None and _log_processor_error is None and get_db_manager() is not None:
+        with _resources_lock:
+            if log_processor is None and _log_processor_error is None:
+                # Opzionale per statistiche automatiche; condivide il DatabaseManager dell'app
+                try:
+                    from log_processor import LogProcessor
+                    log_processor = LogProcessor(db_manager=db_manager)
+                    print("✅ Log Processor inizializzato")
+                except Exception as lp_error:
+                    print(f"⚠️ Log Processor non disponibile: {lp_error}")
+                    _log_processor_error = lp_error
+    return log_processor
+
 # Imposta funzioni per verificare la disponibilità dei moduli
 def is_database_available():
     """Verifica se il database è disponibile e funzionante"""
-    global db_manager, DB_AVAILABLE
-    if not DB_AVAILABLE or db_manager is None:
-        return False
-    try:
-        # Test semplice per verificare che il database funzioni
-        db_manager.get_date_range_stats()
-        return True
-    except Exception as e:
-        print(f"⚠️ Database non funzionante: {e}")
+    if not DB_AVAILABLE or get_db_manager() is None:
         return False
+    # Stato in cache aggiornato dalle query reali e da una probe periodica in background
+    return db_manager.health.is_available()
+
+# Righe serializzate per ogni chunk delle risposte in streaming
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 500))
+
+def site_argument():
+    """Parametro ?site= delle API statistiche: None = tutti i siti, ValueError se non valido"""
+    site = request.args.get('site') or None
+    if site is not None and not is_valid_site(site):
+        raise ValueError(f"Sito non valido: {site}")
+    return site
+
+def wants_ndjson():
+    """Verifica se il client ha richiesto il formato NDJSON (?format=ndjson o header Accept)"""
+    requested_format = request.args.get('format', '').lower()
+    if requested_format:
+        return requested_format == 'ndjson'
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+def stream_rows_response(head, rows, tail=None):
+    """Costruisce una risposta in streaming per una lista di righe del database.
+
+    In formato JSON produce lo stesso oggetto delle API non in streaming: prima le
+    chiavi di `head`, poi l'array `data` scritto a blocchi, infine le chiavi
+    restituite da `tail()`, calcolate dopo aver consumato tutte le righe.
+    In formato NDJSON produce una riga JSON per ogni record.
+    """
+    dumps = current_app.json.dumps
+
+    def generate_ndjson():
+        chunk = []
+        for row in rows:
+            chunk.append(dumps(row))
+            if len(chunk) >= STREAM_BATCH_SIZE:
+                yield '\n'.join(chunk) + '\n'
+                chunk = []
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+
+    def generate_json():
+        # Apre l'oggetto con le chiavi di testa e l'array dei dati
+        yield dumps(head)[:-1] + ', "data": ['
+        chunk = []
+        first = True
+        for row in rows:
+            chunk.append(dumps(row))
+            if len(chunk) >= STREAM_BATCH_SIZE:
+                yield ('' if first else ', ') + ', '.join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield ('' if first else ', ') + ', '.join(chunk)
+        trailer = tail() if tail else {}
+        yield ']' + (', ' + dumps(trailer)[1:] if trailer else '}')
+
+    if wants_ndjson():
+        return Response(stream_with_context(generate_ndjson()), mimetype='application/x-ndjson')
+    return Response(stream_with_context(generate_json()), mimetype='application/json')
+
+# Secondi per cui client e reverse proxy possono riusare una risposta statistica
+STATISTICS_CACHE_MAX_AGE = int(os.environ.get('STATISTICS_CACHE_MAX_AGE', 30))
+
+def conditional_statistics(view):
+    """Aggiunge ETag, Last-Modified e Cache-Control alle API statistiche.
+
+    L'ETag deriva dalla versione dei dati (firma del file database, nessuna
+    query) e dai parametri della richiesta. Se il client invia un If-None-Match
+    ancora valido risponde 304 senza eseguire la view. If-Modified-Since viene
+    ignorato: la sola data di scrittura non distingue parametri diversi né i
+    range di default, che cambiano a mezzanotte anche senza nuovi dati.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if get_db_manager() is None:
+            return view(*args, **kwargs)
+
+        version = db_manager.get_data_version()
+        # La data odierna entra nella chiave perché i range di default dipendono da oggi
+        etag_source = '|'.join([
+            version['token'],
+            request.path,
+            request.query_string.decode('utf-8', 'replace'),
+            request.headers.get('Accept', ''),
+            date.today().isoformat()
+        ])
+        etag = hashlib.sha1(etag_source.encode('utf-8')).hexdigest()
+        last_modified = version['last_modified']
+
+        if request.if_none_match and request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = STATISTICS_CACHE_MAX_AGE
+        response.vary.add('Accept')
+        return response
+    return wrapper
 
 def is_log_processor_available():
     """Verifica se il log processor è disponibile"""
-    global log_processor
-    return log_processor is not None
+    return get_log_processor() is not None
 
 def is_scheduler_available():
     """Verifica se lo scheduler è disponibile"""
     global scheduler  
     return scheduler is not None
 
-@app.route('/')
+job_manager = None
+
+def get_job_manager():
+    """Restituisce il gestore dei job, creato alla prima richiesta (stato condiviso tra i worker)"""
+    global job_manager
+    if job_manager is None:
+        from jobs import JobManager, job_workers_from_env, jobs_db_path
+        from log_processor import LogProcessor
+        data_dir = str(get_log_processor().data_dir)
+        db_path = get_db_manager().db_path
+        finalizers = {}
+        if is_scheduler_available():
+            # force-process esegue anche la pulizia, come il job giornaliero dello scheduler
+            finalizers['force-process'] = lambda result: scheduler.run_maintenance(result)
+        job_manager = JobManager(lambda: LogProcessor(data_dir=data_dir, db_path=db_path),
+                                 jobs_db_path(db_path),
+                                 max_workers=job_workers_from_env(),
+                                 finalizers=finalizers)
+    return job_manager
+
+push_ingest = None
+
+def get_push_ingest():
+    """Restituisce il ricevitore dell'ingest in push, creato alla prima richiesta"""
+    global push_ingest
+    if push_ingest is None:
+        with _resources_lock:
+            if push_ingest is None:
+                from ingest import PushIngest
+                push_ingest = PushIngest(get_log_processor())
+    return push_ingest
+
+def submit_processing_job(kind):
+    """Accoda un job di processamento e risponde 202 con il suo id"""
+    job, created = get_job_manager().submit(
+        kind, log_processor.get_unprocessed_files, log_processor.extract_date_from_filename
+    )
+    status_url = url_for('main.api_job_status', job_id=job.id)
+    response = jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'coalesced': not created,
+        'status_url': status_url,
+        'message': 'Processamento avviato in background' if created else 'Processamento già in coda o in corso'
+    })
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+@bp.route('/')
 def index():
     """Pagina principale con form di upload"""
     return render_template('index.html')
 
-@app.route('/health')
+@bp.route('/health')
 def health():
     """Health check endpoint per monitoring"""
     from datetime import datetime
+    # Aggiorna lo stato in cache (la probe parte in background solo se scaduta)
+    is_database_available()
+    database_status = db_manager.health.get_status() if db_manager is not None else {'available': False}
     return {
-        'status': 'healthy',
+        'status': 'healthy' if database_status['available'] is not False else 'degraded',
         'service': 'SVXLink Log Analyzer',
         'version': '1.0.0',
         'timestamp': datetime.now().isoformat(),
+        'database': database_status,
         'reverse_proxy': {
-            'application_root': app.config.get('APPLICATION_ROOT'),
+            'application_root': current_app.config.get('APPLICATION_ROOT'),
             'url_scheme': request.scheme,
             'host': request.host,
             'path': request.path,
@@ -716,7 +316,7 @@ def health():
         }
     }
 
-@app.route('/upload', methods=['POST'])
+@bp.route('/upload', methods=['POST'])
 def upload_file():
     """Gestisce l'upload e l'analisi del file"""
     if 'file' not in request.files:
@@ -731,7 +331,7 @@ def upload_file():
     if file:
         # Salva il file temporaneamente
         filename = f"svxlink_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
         try:
@@ -750,9 +350,9 @@ def upload_file():
             if os.path.exists(filepath):
                 os.remove(filepath)
             flash(f'Errore durante l\'analisi del file: {str(e)}')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
 
-@app.route('/api/analyze', methods=['POST'])
+@bp.route('/api/analyze', methods=['POST'])
 def api_analyze():
     """API endpoint per analisi programmatica"""
     if 'file' not in request.files:
@@ -764,7 +364,7 @@ def api_analyze():
     
     # Salva il file temporaneamente
     filename = f"svxlink_log_api_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
     file.save(filepath)
     
     try:
@@ -792,28 +392,29 @@ def api_analyze():
 # ROUTE PER STATISTICHE STORICHE
 # =============================================================================
 
-@app.route('/statistics')
+@bp.route('/statistics')
 def statistics():
     """Pagina principale delle statistiche storiche"""
     if not is_database_available():
         flash('Database non disponibile. Funzionalità statistiche non attive.', 'warning')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     try:
         # Ottieni range di date disponibili
         date_range = db_manager.get_date_range_stats()
         
         # Ottieni riepilogo processamento
-        processing_summary = log_processor.get_processing_summary()
+        processing_summary = get_log_processor().get_processing_summary()
         
         return render_template('statistics.html', 
                              date_range=date_range,
                              processing_summary=processing_summary)
     except Exception as e:
         flash(f'Errore caricamento statistiche: {str(e)}', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
-@app.route('/api/statistics/daily')
+@bp.route('/api/statistics/daily')
+@conditional_statistics
 def api_daily_statistics():
     """API per statistiche giornaliere"""
     if not is_database_available():
@@ -835,23 +436,34 @@ def api_daily_statistics():
         except ValueError:
             return jsonify({'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
         
-        # Recupera statistiche
-        daily_stats = db_manager.get_daily_stats(start_date, end_date)
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'success': True,
-            'period': {'start': start_date, 'end': end_date},
-            'total_days': len(daily_stats),
-            'data': daily_stats
-        })
+        # Recupera statistiche in streaming (memoria costante anche su range lunghi)
+        daily_rows = db_manager.iter_daily_stats(start_date, end_date, STREAM_BATCH_SIZE, site)
+        counter = {'total_days': 0}
+
+        def counted_rows():
+            for row in daily_rows:
+                counter['total_days'] += 1
+                yield row
+
+        return stream_rows_response(
+            {'success': True, 'period': {'start': start_date, 'end': end_date}, 'site': site},
+            counted_rows(),
+            lambda: counter
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/monthly')
+@bp.route('/api/statistics/monthly')
+@conditional_statistics
 def api_monthly_statistics():
     """API per statistiche mensili"""
-    if not DB_AVAILABLE:
+    if not DB_AVAILABLE or get_db_manager() is None:
         return jsonify({'error': 'Database non disponibile'}), 503
     
     try:
@@ -865,22 +477,29 @@ def api_monthly_statistics():
         if not (2020 <= year <= 2030):
             return jsonify({'error': 'Anno non valido'}), 400
         
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Recupera statistiche aggregate mensili
-        monthly_stats = db_manager.get_monthly_aggregated_stats(year, month)
+        monthly_stats = db_manager.get_monthly_aggregated_stats(year, month, site)
         
         return jsonify({
             'success': True,
             'period': {'year': year, 'month': month},
+            'site': site,
             'data': monthly_stats
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/yearly')
+@bp.route('/api/statistics/yearly')
+@conditional_statistics
 def api_yearly_statistics():
     """API per statistiche annuali"""
-    if not DB_AVAILABLE:
+    if not DB_AVAILABLE or get_db_manager() is None:
         return jsonify({'error': 'Database non disponibile'}), 503
     
     try:
@@ -890,19 +509,26 @@ def api_yearly_statistics():
         if not (2020 <= year <= 2030):
             return jsonify({'error': 'Anno non valido'}), 400
         
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Recupera statistiche aggregate annuali
-        yearly_stats = db_manager.get_yearly_aggregated_stats(year)
+        yearly_stats = db_manager.get_yearly_aggregated_stats(year, site)
         
         return jsonify({
             'success': True,
             'period': {'year': year},
+            'site': site,
             'data': yearly_stats
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/ctcss')
+@bp.route('/api/statistics/ctcss')
+@conditional_statistics
 def api_ctcss_statistics():
     """API per statistiche CTCSS"""
     if not is_database_available():
@@ -917,12 +543,18 @@ def api_ctcss_statistics():
             end_date = date.today().isoformat()
             start_date = (date.today() - timedelta(days=30)).isoformat()
         
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Recupera statistiche CTCSS
-        ctcss_stats = db_manager.get_ctcss_stats(start_date, end_date)
+        ctcss_stats = db_manager.get_ctcss_stats(start_date, end_date, site)
         
         return jsonify({
             'success': True,
             'period': {'start': start_date, 'end': end_date},
+            'site': site,
             'total_tones': len(ctcss_stats),
             'data': ctcss_stats
         })
@@ -930,7 +562,8 @@ def api_ctcss_statistics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/talkgroups')
+@bp.route('/api/statistics/talkgroups')
+@conditional_statistics
 def api_talkgroups_statistics():
     """API per statistiche Talk Groups"""
     if not is_database_available():
@@ -945,12 +578,18 @@ def api_talkgroups_statistics():
             end_date = date.today().isoformat()
             start_date = (date.today() - timedelta(days=30)).isoformat()
         
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Recupera statistiche TG
-        tg_stats = db_manager.get_tg_stats(start_date, end_date)
+        tg_stats = db_manager.get_tg_stats(start_date, end_date, site)
         
         return jsonify({
             'success': True,
             'period': {'start': start_date, 'end': end_date},
+            'site': site,
             'total_tgs': len(tg_stats),
             'data': tg_stats
         })
@@ -958,7 +597,30 @@ def api_talkgroups_statistics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/disconnections')
+class DisconnectionSummary:
+    """Riepilogo dei periodi di disconnessione, calcolato riga per riga"""
+
+    def __init__(self):
+        self.total_periods = 0
+        self.total_disconnections = 0
+        self.has_resolved = False
+
+    def add(self, row):
+        self.total_periods += 1
+        self.total_disconnections += row.get('disconnection_count') or 0
+        if row.get('status') == 'resolved' and row.get('duration'):
+            self.has_resolved = True
+
+    def to_dict(self):
+        # Le durate sono nei dettagli: se ci sono solo periodi ongoing, mostra "In corso"
+        return {
+            'total_periods': self.total_periods,
+            'total_disconnections': self.total_disconnections,
+            'total_duration_formatted': "Vedi dettagli" if self.has_resolved else "In corso"
+        }
+
+@bp.route('/api/statistics/disconnections')
+@conditional_statistics
 def api_disconnections_statistics():
     """API per statistiche disconnessioni ReflectorLogic"""
     if not is_database_available():
@@ -980,72 +642,176 @@ def api_disconnections_statistics():
         except ValueError:
             return jsonify({'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
         
-        # Recupera statistiche disconnessioni
-        disconnections = db_manager.get_disconnections(start_date, end_date)
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Calcola statistiche aggregate
-        total_periods = len(disconnections)
-        total_disconnections = sum(d.get('disconnection_count', 0) for d in disconnections)
+        # Recupera statistiche disconnessioni in streaming
+        disconnection_rows = db_manager.iter_disconnections(start_date, end_date, STREAM_BATCH_SIZE, site)
+
+        # Statistiche aggregate calcolate durante lo streaming
+        summary = DisconnectionSummary()
+
+        def summarized_rows():
+            for row in disconnection_rows:
+                summary.add(row)
+                yield row
+
+        return stream_rows_response(
+            {'success': True, 'period': {'start': start_date, 'end': end_date}, 'site': site},
+            summarized_rows(),
+            lambda: {'summary': summary.to_dict()}
+        )
         
-        # Calcola durata totale (le durate sono già formattate come stringa nel DB)
-        total_duration_formatted = "In corso"
-        if disconnections:
-            # Se ci sono solo periodi ongoing, mostra "In corso"
-            has_resolved = any(d.get('status') == 'resolved' and d.get('duration') for d in disconnections)
-            if has_resolved:
-                total_duration_formatted = "Vedi dettagli"
-            elif all(d.get('status') == 'ongoing' for d in disconnections):
-                total_duration_formatted = "In corso"
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/statistics/dashboard')
+@conditional_statistics
+def api_dashboard_statistics():
+    """API con i dati di tutti i widget della dashboard in una sola richiesta.
+
+    ?sections= sceglie le sezioni (default: tutte, vedi DASHBOARD_SECTIONS);
+    ogni sezione ha la stessa forma della risposta dell'API dedicata.
+    """
+    if not is_database_available():
+        return jsonify({'error': 'Database non disponibile'}), 503
+    
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        
+        # Default: ultimi 30 giorni
+        if not start_date or not end_date:
+            end_date = date.today().isoformat()
+            start_date = (date.today() - timedelta(days=30)).isoformat()
+        
+        # Valida date
+        try:
+            datetime.strptime(start_date, '%Y-%m-%d')
+            datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
+        
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        requested = request.args.get('sections')
+        sections = [name.strip() for name in requested.split(',') if name.strip()] if requested else []
+        unknown = [name for name in sections if name not in DASHBOARD_SECTIONS]
+        if unknown:
+            return jsonify({'error': f"Sezioni non valide: {', '.join(unknown)}. "
+                                     f"Disponibili: {', '.join(DASHBOARD_SECTIONS)}"}), 400
+        # Ordine e duplicati normalizzati: una sola voce in cache per lo stesso insieme di sezioni
+        sections = tuple(name for name in DASHBOARD_SECTIONS if not sections or name in sections)
+        
+        results = db_manager.get_dashboard(start_date, end_date, sections, site)
+        if not results:
+            return jsonify({'error': 'Errore nel recupero dei dati della dashboard'}), 500
+        
+        response = {}
+        if 'daily' in results:
+            response['daily'] = {'total_days': len(results['daily']), 'data': results['daily']}
+        if 'ctcss' in results:
+            response['ctcss'] = {'total_tones': len(results['ctcss']), 'data': results['ctcss']}
+        if 'talkgroups' in results:
+            response['talkgroups'] = {'total_tgs': len(results['talkgroups']), 'data': results['talkgroups']}
+        if 'disconnections' in results:
+            summary = DisconnectionSummary()
+            for row in results['disconnections']:
+                summary.add(row)
+            response['disconnections'] = {'summary': summary.to_dict(), 'data': results['disconnections']}
         
         return jsonify({
             'success': True,
             'period': {'start': start_date, 'end': end_date},
-            'summary': {
-                'total_periods': total_periods,
-                'total_disconnections': total_disconnections,
-                'total_duration_formatted': total_duration_formatted
-            },
-            'data': disconnections
+            'site': site,
+            'sections': response
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/process')
-def api_process_logs():
-    """API per processare nuovi file log"""
+@bp.route('/api/statistics/totals')
+@conditional_statistics
+def api_totals_statistics():
+    """API con i totali di un periodo qualsiasi (complessivi e per sito), dai totali cumulativi"""
     if not is_database_available():
         return jsonify({'error': 'Database non disponibile'}), 503
     
-    if not is_log_processor_available():
-        return jsonify({'error': 'Log processor non disponibile - funzionalità automatiche disabilitate'}), 503
-    
     try:
-        # Processa file non elaborati
-        result = log_processor.process_all_files()
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        
+        # Default: ultimi 30 giorni
+        if not start_date or not end_date:
+            end_date = date.today().isoformat()
+            start_date = (date.today() - timedelta(days=30)).isoformat()
+        
+        # Valida date
+        try:
+            datetime.strptime(start_date, '%Y-%m-%d')
+            datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
+        
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        totals = db_manager.get_range_totals(start_date, end_date, site)
+        if not totals:
+            return jsonify({'error': 'Errore nel recupero dei totali del periodo'}), 500
         
         return jsonify({
             'success': True,
-            'processed': result['processed'],
-            'errors': result['errors'],
-            'message': f"Processati {result['processed']} file, {result['errors']} errori"
+            'period': {'start': start_date, 'end': end_date},
+            'site': site,
+            'totals': totals['totals'],
+            'sites': totals['sites']
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/dates')
+@bp.route('/api/statistics/process', methods=['GET', 'POST'])
+def api_process_logs():
+    """API per processare nuovi file log (in background, restituisce l'id del job)"""
+    if not is_database_available():
+        return jsonify({'error': 'Database non disponibile'}), 503
+    
+    if not is_log_processor_available():
+        return jsonify({'error': 'Log processor non disponibile - funzionalità automatiche disabilitate'}), 503
+    
+    try:
+        return submit_processing_job('process')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/statistics/dates')
+@conditional_statistics
 def api_available_dates():
     """API per ottenere date disponibili"""
-    if not DB_AVAILABLE:
+    if not DB_AVAILABLE or get_db_manager() is None:
         return jsonify({'error': 'Database non disponibile'}), 503
     
     try:
-        dates = db_manager.get_available_dates()
+        try:
+            site = site_argument()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        dates = db_manager.get_available_dates(site)
         date_range = db_manager.get_date_range_stats()
         
         return jsonify({
             'success': True,
+            'site': site,
             'available_dates': dates,
             'date_range': date_range,
             'total_days': len(dates)
@@ -1054,7 +820,242 @@ def api_available_dates():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/scheduler')
+@bp.route('/api/statistics/sites')
+@conditional_statistics
+def api_sites_statistics():
+    """API per il confronto tra siti (ripetitori): totali per sito nel periodo"""
+    if not is_database_available():
+        return jsonify({'error': 'Database non disponibile'}), 503
+    
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        
+        # Default: ultimi 30 giorni
+        if not start_date or not end_date:
+            end_date = date.today().isoformat()
+            start_date = (date.today() - timedelta(days=30)).isoformat()
+        
+        try:
+            datetime.strptime(start_date, '%Y-%m-%d')
+            datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
+        
+        comparison = db_manager.get_site_comparison(start_date, end_date)
+        
+        return jsonify({
+            'success': True,
+            'period': {'start': start_date, 'end': end_date},
+            'sites': db_manager.get_sites(),
+            'total_sites': len(comparison),
+            'data': comparison
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/statistics/reaggregate')
+@conditional_statistics
+def api_reaggregate():
+    """API per ricalcolare TX, QSO e disconnessioni di un periodo con soglie personalizzate.
+
+    Usa gli eventi salvati nella cache a colonne, senza rileggere i log:
+    ?min_qso_seconds=3&tx_noise_seconds=0.1&disconnected_after=23:50[&site=SITO]
+    """
+    if not DB_AVAILABLE or get_db_manager() is None:
+        return jsonify({'error': 'Database non disponibile'}), 503
+
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+
+        # Default: ultimi 30 giorni
+        if not start_date or not end_date:
+            end_date = date.today().isoformat()
+            start_date = (date.today() - timedelta(days=30)).isoformat()
+
+        try:
+            datetime.strptime(start_date, '%Y-%m-%d')
+            datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
+
+        try:
+            min_qso_seconds = float(request.args.get('min_qso_seconds', MIN_QSO_SECONDS))
+            tx_noise_seconds = float(request.args.get('tx_noise_seconds', TX_NOISE_SECONDS))
+            if min_qso_seconds < 0 or tx_noise_seconds < 0:
+                raise ValueError
+        except ValueError:
+            return jsonify({'error': 'Soglie non valide: min_qso_seconds e tx_noise_seconds devono essere numeri >= 0'}), 400
+
+        try:
+            disconnected_after = DISCONNECTED_AFTER
+            if request.args.get('disconnected_after'):
+                disconnected_after = datetime.strptime(request.args['disconnected_after'], '%H:%M').time()
+        except ValueError:
+            return jsonify({'error': 'Formato orario non valido per disconnected_after. Usa HH:MM'}), 400
+
+        # Le colonne sono salvate per sito: senza ?site= quelle del sito di default
+        try:
+            site = site_argument() or DEFAULT_SITE
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        result = reaggregate(site_columns_dir(columns_dir(db_manager.db_path), site), start_date, end_date,
+                             min_qso_seconds, tx_noise_seconds, disconnected_after)
+        # Giorni con statistiche salvate ma senza colonne (es. importati prima della cache)
+        reaggregated = {day['date'] for day in result['days']}
+        missing_days = sorted(day for day in db_manager.get_available_dates(site)
+                              if start_date <= day <= end_date and day not in reaggregated)
+
+        return jsonify({
+            'success': True,
+            'period': {'start': start_date, 'end': end_date},
+            'site': site,
+            **result,
+            'missing_days': missing_days
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/export')
+def api_export_index():
+    """API per elencare dataset e formati dell'export"""
+    return jsonify({
+        'success': True,
+        'datasets': list(EXPORT_DATASETS),
+        'formats': list(EXPORT_FORMATS)
+    })
+
+@bp.route('/api/export/<dataset>')
+@conditional_statistics
+def api_export(dataset):
+    """API per l'export massivo di un dataset (CSV o NDJSON in streaming, gzip opzionale)"""
+    if not DB_AVAILABLE or get_db_manager() is None:
+        return jsonify({'error': 'Database non disponibile'}), 503
+    
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': f'Dataset non valido. Disponibili: {", ".join(EXPORT_DATASETS)}'}), 404
+    
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Formato non valido. Disponibili: {", ".join(EXPORT_FORMATS)}'}), 400
+    
+    try:
+        # Default: tutti i dati
+        start_date = request.args.get('start_date') or EXPORT_START
+        end_date = request.args.get('end_date') or EXPORT_END
+        
+        # Valida date
+        try:
+            datetime.strptime(start_date, '%Y-%m-%d')
+            datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Formato data non valido. Usa YYYY-MM-DD'}), 400
+        
+        # Righe lette a blocchi con query brevi: memoria costante e nessun lock lungo sul database
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        chunks = iter_export(db_manager, dataset, start_date, end_date, export_format, STREAM_BATCH_SIZE)
+        response = Response(stream_with_context(gzip_chunks(chunks) if compress else chunks),
+                            mimetype='application/gzip' if compress else EXPORT_FORMATS[export_format])
+        filename = export_filename(dataset, start_date, end_date, export_format, compress)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Token dei ripetitori per l'ingest in push (Authorization: Bearer <token>); vuoto = disattivato
+INGEST_TOKEN = os.environ.get('INGEST_TOKEN', '')
+
+def ingest_authorized():
+    """Verifica il token Bearer della richiesta di ingest in push"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), INGEST_TOKEN.encode())
+
+@bp.route('/api/ingest/lines', methods=['GET', 'POST'])
+def api_ingest_lines():
+    """API per l'ingest in push delle righe di log dai ripetitori remoti.
+
+    POST: blocchi di righe (text/plain con ?site=&sequence=, oppure NDJSON con
+    un blocco per riga), compressi con Content-Encoding gzip o deflate; la
+    risposta conferma la sequenza salvata per sito (409 se un blocco non
+    segue l'ultima sequenza confermata). GET: ultima sequenza
+    confermata per sito, da cui riprende un mittente riavviato.
+    """
+    if not INGEST_TOKEN:
+        return jsonify({'error': 'Ingest in push disattivato (INGEST_TOKEN non impostato)'}), 404
+    if not ingest_authorized():
+        response = jsonify({'error': 'Token mancante o non valido'})
+        response.status_code = 401
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response
+    if not is_database_available() or not is_log_processor_available():
+        return jsonify({'error': 'Database non disponibile'}), 503
+    
+    from ingest import PayloadTooLarge, decode_body, parse_batches
+    try:
+        receiver = get_push_ingest()
+        if request.method == 'GET':
+            return jsonify({'success': True, 'sequences': receiver.committed_sequences()})
+        
+        body = decode_body(request.get_data(cache=False), request.headers.get('Content-Encoding'))
+        batches = parse_batches(body, request.mimetype, request.args.get('site'), request.args.get('sequence'))
+        receiver.submit(batches)
+    except PayloadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except TimeoutError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    failed = [batch for batch in batches if batch.status == 'failed']
+    rejected = [batch for batch in batches if batch.status == 'out_of_order']
+    committed = {}
+    for batch in batches:
+        committed[batch.site_id] = max(committed.get(batch.site_id, 0), batch.committed_sequence)
+    status = 500 if failed else 409 if rejected else 200
+    return jsonify({
+        'success': status == 200,
+        'committed': committed,
+        'batches': [batch.to_dict() for batch in batches]
+    }), status
+
+@bp.route('/api/stream')
+def api_stream():
+    """Stream Server-Sent Events degli aggiornamenti in tempo reale per la dashboard.
+
+    Eventi: tx (trasmettitore acceso/spento), tg (cambio di TG), disconnection
+    (inizio/fine), counters (contatori del giorno salvati), resync (aggiornamenti
+    persi: ricaricare le statistiche). ?site= limita lo stream a un sito.
+    """
+    try:
+        site = site_argument()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not is_log_processor_available():
+        return jsonify({'error': 'Log processor non disponibile'}), 503
+    
+    feed = get_live_feed(get_log_processor().data_dir)
+    try:
+        client = feed.subscribe(site)
+    except TooManyClients as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    response = Response(feed.stream(client), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Niente buffering nei reverse proxy (nginx)
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route('/api/statistics/scheduler')
 def api_scheduler_status():
     """API per stato dello scheduler"""
     if not is_database_available():
@@ -1069,7 +1070,7 @@ def api_scheduler_status():
         })
     
     try:
-        scheduler_obj = get_scheduler()
+        scheduler_obj = scheduler
         processor_summary = {}
         
         if is_log_processor_available():
@@ -1080,36 +1081,49 @@ def api_scheduler_status():
             'running': scheduler_obj.running if scheduler_obj else False,
             'scheduler_available': True,
             'next_jobs': scheduler_obj.get_next_runs() if scheduler_obj else [],
+            'watcher': scheduler_obj.watcher.get_stats() if scheduler_obj and scheduler_obj.watcher else None,
+            'site_watchers': {site_id: watcher.get_stats() for site_id, watcher in scheduler_obj.site_watchers.items()}
+                             if scheduler_obj else {},
+            'leader': scheduler_obj.get_leader_status() if scheduler_obj else None,
+            'push_ingest': push_ingest.get_stats() if push_ingest else None,
+            'syslog': scheduler_obj.syslog_listener.get_stats()
+                      if scheduler_obj and scheduler_obj.syslog_listener else None,
+            'live_feed': get_live_feed(log_processor.data_dir).get_stats() if is_log_processor_available() else None,
             'processor_summary': processor_summary
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/statistics/force-process', methods=['POST'])
+@bp.route('/api/statistics/force-process', methods=['POST'])
 def api_force_process():
-    """API per forzare processamento immediato"""
+    """API per forzare processamento immediato (in background, con manutenzione finale)"""
     if not is_database_available():
         return jsonify({'error': 'Database non disponibile'}), 503
     
-    if not is_scheduler_available():
+    if not is_scheduler_available() or not is_log_processor_available():
         return jsonify({'error': 'Scheduler non disponibile - funzionalità automatiche disabilitate'}), 503
     
     try:
-        scheduler_obj = get_scheduler()
-        result = scheduler_obj.force_process()
-        
-        return jsonify({
-            'success': True,
-            'processed': result['processed'],
-            'errors': result['errors'],
-            'message': f"Processamento forzato: {result['processed']} file elaborati"
-        })
+        return submit_processing_job('force-process')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/reload-db', methods=['POST'])
+@bp.route('/api/jobs')
+def api_jobs():
+    """API per l'elenco dei job di processamento recenti"""
+    return jsonify({'success': True, 'jobs': get_job_manager().list_jobs()})
+
+@bp.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """API per avanzamento, throughput ed errori di un job"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job non trovato'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@bp.route('/api/reload-db', methods=['POST'])
 def reload_database():
     """Ricarica il database manager per sincronizzare con i dati aggiornati"""
     global db_manager, DB_AVAILABLE
@@ -1136,7 +1150,7 @@ def reload_database():
             'error': str(e)
         }), 500
 
-@app.route('/api/reset-db', methods=['POST'])
+@bp.route('/api/reset-db', methods=['POST'])
 def reset_database():
     """Resetta completamente il database eliminando tutti i dati"""
     global db_manager, DB_AVAILABLE
@@ -1168,18 +1182,71 @@ def reset_database():
             'error': str(e)
         }), 500
 
-@app.route('/status')
+@bp.route('/status')
 def status():
     """Mostra lo stato dell'applicazione"""
     return {
         'database': "✅ Disponibile" if is_database_available() else "❌ Non disponibile",
         'log_processor': "✅ Disponibile" if is_log_processor_available() else "❌ Non disponibile", 
         'scheduler': "✅ Disponibile" if is_scheduler_available() else "❌ Non disponibile",
-        'db_available': is_database_available()
+        'db_available': is_database_available(),
+        'query_cache': db_manager.get_cache_stats() if db_manager is not None else {'enabled': False},
+        'schema': db_manager.get_schema_status() if db_manager is not None else None,
+        'partitions': db_manager.get_partitions() if db_manager is not None else [],
+        'analyzer': {
+            'version': ANALYZER_VERSION,
+            'outdated_days': len(db_manager.get_outdated_dates(ANALYZER_VERSION)) if db_manager is not None else None
+        },
+        'directory_index': log_processor.directory_index.get_stats() if is_log_processor_available() else None
     }
 
+def create_app(config=None, init=True):
+    """Crea e configura l'applicazione Flask.
+
+    Con init=False le risorse del processo (database, log processor,
+    scheduler) non vengono create: il server preforking le inizializza in
+    ogni worker dopo il fork chiamando init_resources().
+    """
+    app = Flask(__name__)
+    app.secret_key = 'svxlink_analyzer_secret_key_2024'
+    app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    
+    # Configurazione per reverse proxy Apache con HTTPS
+    app.config['APPLICATION_ROOT'] = '/websvxlinkstat'
+    app.config['PREFERRED_URL_SCHEME'] = 'https'
+    app.config['SERVER_NAME'] = None  # Lascia che Flask si adatti all'host
+    
+    if config:
+        app.config.update(config)
+    
+    # Configura ProxyFix per gestire headers del reverse proxy
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app, 
+        x_for=1, 
+        x_proto=1, 
+        x_host=1, 
+        x_prefix=1
+    )
+    
+    app.register_blueprint(bp)
+    
+    if init:
+        init_resources()
+    
+    return app
+
+# Applicazione di default per `python app.py`, gunicorn (app:app) e test, senza
+# risorse: le inizializzano il blocco __main__ e il post_fork di gunicorn.conf.py.
+# Eseguito come script il modulo è __main__: l'applicazione viene creata importandolo
+# come `app` (lo stesso modulo di gunicorn e dei test), con un'unica copia delle risorse
+if __name__ != '__main__':
+    app = create_app(init=False)
+
 if __name__ == '__main__':
-    import os
+    import app as app_module
+    from app import app
+    app_module.init_resources()
     
     # Configurazione per environment
     debug_mode = os.environ.get('FLASK_ENV', 'production') == 'development'
@@ -1192,4 +1259,6 @@ if __name__ == '__main__':
     print(f"🛠️ Debug: {debug_mode}")
     print(f"🌐 URL: http://{host}:{port}")
     
+    # app.run non ha un hook di avvio: il segnale parte subito prima, l'ingest è comunque in background
+    app_module.mark_server_ready()
     app.run(debug=debug_mode, host=host, port=port)
\ No newline at end of file
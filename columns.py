@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Cache binaria a colonne dei log elaborati per SVXLink Log Analyzer
+Durante l'ingest gli eventi estratti da ogni file log (tipo, epoch, TG,
+subtono, nodo) vengono salvati in un file binario accanto al database:
+
+    data/svxlink_stats.db
+    data/svxlink_stats.columns/2025-10-16.svxlink_log_2025-10-16.txt.<dimensione>-<hash>.cols
+    data/svxlink_stats.columns/<sito>/...   log degli altri siti (vedi sites.py)
+
+Il nome contiene data, dimensione e hash del contenuto del file log: una nuova
+elaborazione dello stesso file (es. processamento forzato) legge le colonne
+invece di rifare regex e strptime su ogni riga. Un file modificato o una
+nuova COLUMNS_VERSION producono semplicemente un nuovo file. reaggregate()
+ricalcola dalle colonne le statistiche di un periodo con soglie diverse.
+
+Uso: python columns.py [cartella_log]   confronta i tempi testo/colonne
+"""
+
+import os
+import struct
+import sys
+from datetime import time
+from typing import Dict, Optional
+
+from log_analyzer import (DISCONNECTED_AFTER, MIN_QSO_SECONDS, TX_NOISE_SECONDS, EventColumns,
+                          SVXLinkLogAnalyzer)
+from sites import DEFAULT_SITE
+
+# Versione del formato (e delle regole di estrazione degli eventi)
+COLUMNS_VERSION = 1
+MAGIC = b'SVXC'
+# magic, versione, byte order ('l'/'b'), troncato, eventi, righe, byte del log, byte dei nomi dei nodi
+HEADER = struct.Struct('<4sHcBIIQI')
+COLUMN_NAMES = ('kind', 'epoch', 'tg', 'tone', 'node')
+BYTE_ORDER = b'l' if sys.byteorder == 'little' else b'b'
+
+
+def columns_dir(db_path: str) -> str:
+    """Directory della cache: data/svxlink_stats.db -> data/svxlink_stats.columns"""
+    return os.path.splitext(db_path)[0] + '.columns'
+
+
+def site_columns_dir(directory: str, site_id: str = DEFAULT_SITE) -> str:
+    """Cache di un sito: quella del sito di default resta nella directory principale"""
+    return directory if site_id == DEFAULT_SITE else os.path.join(directory, site_id)
+
+
+def columns_path(directory: str, log_date: str, filename: str, size: int, content_hash: str) -> str:
+    """File delle colonne di un log, identificato da data e fingerprint"""
+    return os.path.join(directory, f"{log_date}.{filename}.{size}-{content_hash[:16]}.cols")
+
+
+def find_columns(directory: str, start_date: str, end_date: str) -> Dict[str, str]:
+    """File delle colonne dei giorni del periodo (il più recente se un giorno ha più log)"""
+    found: Dict[str, str] = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return found
+    for name in names:
+        day = name[:10]
+        if not name.endswith('.cols') or not start_date <= day <= end_date:
+            continue
+        path = os.path.join(directory, name)
+        if day not in found or os.path.getmtime(path) > os.path.getmtime(found[day]):
+            found[day] = path
+    return dict(sorted(found.items()))
+
+
+def prune_columns(directory: str, cutoff: str) -> int:
+    """Elimina le colonne dei giorni precedenti a cutoff, anche nelle cache dei siti"""
+    removed = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith('.cols') and name[:10] < cutoff:
+                try:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+                except OSError:
+                    pass
+    return removed
+
+
+def write_columns(path: str, columns: EventColumns, lines: int = 0, size: int = 0):
+    """Salva le colonne (scrittura atomica) e rimuove le versioni precedenti dello stesso log"""
+    directory, name = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    nodes = '\n'.join(columns.nodes).encode('utf-8')
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, COLUMNS_VERSION, BYTE_ORDER, int(columns.truncated),
+                            len(columns), lines, size, len(nodes)))
+        for column in COLUMN_NAMES:
+            getattr(columns, column).tofile(f)
+        f.write(nodes)
+    os.replace(tmp_path, path)
+
+    prefix = name.rsplit('.', 2)[0] + '.'
+    for other in os.listdir(directory):
+        if other != name and other.startswith(prefix) and other.endswith('.cols'):
+            try:
+                os.remove(os.path.join(directory, other))
+            except OSError:
+                pass
+
+
+def read_columns(path: str) -> Optional[dict]:
+    """Legge le colonne di un log; None se il file manca, è di un'altra versione o è incompleto.
+
+    Restituisce {'columns': EventColumns, 'lines': righe, 'bytes': dimensione del log}.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, byte_order, truncated, count, lines, size, nodes_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != COLUMNS_VERSION:
+        return None
+
+    columns = EventColumns(truncated=bool(truncated))
+    offset = HEADER.size
+    for column in COLUMN_NAMES:
+        values = getattr(columns, column)
+        end = offset + count * values.itemsize
+        values.frombytes(data[offset:end])
+        if byte_order != BYTE_ORDER:
+            values.byteswap()
+        offset = end
+    if len(data) != offset + nodes_size:
+        return None
+    nodes = data[offset:].decode('utf-8')
+    columns.nodes = nodes.split('\n') if nodes else []
+    return {'columns': columns, 'lines': lines, 'bytes': size}
+
+
+def reaggregate(directory: str, start_date: str, end_date: str, min_qso_seconds: float = MIN_QSO_SECONDS,
+                tx_noise_seconds: float = TX_NOISE_SECONDS, disconnected_after: time = DISCONNECTED_AFTER) -> Dict:
+    """Ricalcola dalle colonne salvate le statistiche TX, QSO e disconnessioni di un periodo.
+
+    Nessun file log viene riletto: le soglie possono essere provate
+    interattivamente anche su mesi di dati. I giorni senza colonne salvate
+    (importati prima della cache o con COLUMN_CACHE=false) non compaiono.
+    """
+    analyzer = SVXLinkLogAnalyzer()
+    days = []
+    for day, path in find_columns(directory, start_date, end_date).items():
+        cached = read_columns(path)
+        if cached is None:
+            continue
+        stats = analyzer.analyze_events(cached['columns'], min_qso_seconds, tx_noise_seconds, disconnected_after)
+        basic, qso, disconnections = stats['basic'], stats['qso'], stats['disconnections']
+        days.append({
+            'date': day,
+            'total_transmissions': basic['total_transmissions'],
+            'total_transmission_time': basic['total_transmission_time'],
+            'avg_transmission_time': basic['avg_transmission_time'],
+            'max_transmission_time': basic['max_transmission_time'],
+            'min_transmission_time': basic['min_transmission_time'],
+            'total_qso': qso['total_qso'],
+            'total_qso_time': qso['total_qso_time'],
+            'disconnection_periods': disconnections['total_periods'],
+            'disconnections': disconnections['total_disconnections'],
+            'disconnected_at_end': any(p['status'] == 'disconnected' for p in disconnections['periods'])
+        })
+
+    transmissions = sum(day['total_transmissions'] for day in days)
+    transmission_time = sum(day['total_transmission_time'] for day in days)
+    active_days = [day for day in days if day['total_transmissions']]
+    totals = {
+        'days': len(days),
+        'total_transmissions': transmissions,
+        'total_transmission_time': transmission_time,
+        'avg_transmission_time': transmission_time / transmissions if transmissions else 0,
+        'max_transmission_time': max((day['max_transmission_time'] for day in active_days), default=0),
+        'min_transmission_time': min((day['min_transmission_time'] for day in active_days), default=0),
+        'total_qso': sum(day['total_qso'] for day in days),
+        'total_qso_time': sum(day['total_qso_time'] for day in days),
+        'disconnection_periods': sum(day['disconnection_periods'] for day in days),
+        'disconnections': sum(day['disconnections'] for day in days),
+        'days_disconnected_at_end': sum(1 for day in days if day['disconnected_at_end'])
+    }
+    return {
+        'parameters': {
+            'min_qso_seconds': min_qso_seconds,
+            'tx_noise_seconds': tx_noise_seconds,
+            'disconnected_after': disconnected_after.strftime('%H:%M')
+        },
+        'totals': totals,
+        'days': days
+    }
+
+
+def benchmark(data_dir: str = 'data', runs: int = 5) -> dict:
+    """Tempo di ri-aggregazione dei log di data_dir: testo (regex) contro colonne salvate"""
+    import glob
+    import tempfile
+    from time import perf_counter
+
+    analyzer = SVXLinkLogAnalyzer()
+    files = sorted(glob.glob(os.path.join(data_dir, 'svxlink_log_*.txt')))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i, file_path in enumerate(files):
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            paths.append(os.path.join(tmp_dir, f"{i}.cols"))
+            write_columns(paths[-1], analyzer.extract_events(content))
+
+        def from_text():
+            for file_path in files:
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    analyzer.analyze_log(f.read())
+
+        def from_columns():
+            for path in paths:
+                analyzer.analyze_events(read_columns(path)['columns'])
+
+        timings = {}
+        for name, run in (('text', from_text), ('columns', from_columns)):
+            best = float('inf')
+            for _ in range(runs):
+                started = perf_counter()
+                run()
+                best = min(best, perf_counter() - started)
+            timings[name] = best
+    return {
+        'files': len(files),
+        'text_seconds': round(timings['text'], 4),
+        'columns_seconds': round(timings['columns'], 4),
+        'speedup': round(timings['text'] / timings['columns'], 1) if timings['columns'] else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark(sys.argv[1] if len(sys.argv) > 1 else 'data')
+    print(f"📊 {result['files']} file: testo {result['text_seconds']}s, "
+          f"colonne {result['columns_seconds']}s ({result['speedup']}x)")
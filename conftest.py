@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Configurazione comune dei test (pytest) e helper condivisi
+I test non toccano il database e il log dello scheduler del repository: le
+risorse create con i percorsi di default vanno in una cartella temporanea.
+Processor, feed e lock dell'ingest lavorano su cartelle dati temporanee; un
+test che crea file in data/ del repository (live_feed.ndjson, lock) fallisce.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_REPO_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+_TEST_DIR = tempfile.mkdtemp(prefix='svxlink_test_')
+atexit.register(shutil.rmtree, _TEST_DIR, ignore_errors=True)
+
+os.environ.setdefault('DATABASE_PATH', os.path.join(_TEST_DIR, 'svxlink_stats.db'))
+os.environ.setdefault('SCHEDULER_LOG_FILE', os.path.join(_TEST_DIR, 'scheduler.log'))
+
+
+def _repo_data_entries():
+    try:
+        return set(os.listdir(_REPO_DATA_DIR))
+    except FileNotFoundError:
+        return set()
+
+
+@pytest.fixture(autouse=True)
+def repo_data_untouched():
+    """Verifica che il test non abbia creato file nella cartella data del repository"""
+    before = _repo_data_entries()
+    yield
+    created = _repo_data_entries() - before
+    assert not created, f"File creati in {_REPO_DATA_DIR}: {sorted(created)}"
+
+
+def daily_stats(day, transmissions, site_id='default', **fields):
+    """Statistiche giornaliere di prova; i campi passati sostituiscono i valori fissi"""
+    from database import DailyLogStats
+
+    values = dict(
+        date=day, filename=f"svxlink_log_{day}.txt", file_size=1024,
+        total_transmissions=transmissions, total_transmission_time=60,
+        avg_transmission_time=6.0, max_transmission_time=10,
+        min_transmission_time=1, total_qso=1, total_qso_time=30, site_id=site_id
+    )
+    values.update(fields)
+    return DailyLogStats(**values)
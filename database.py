@@ -6,11 +6,32 @@ Gestisce SQLite database per statistiche storiche
 
 import sqlite3
 import os
-from datetime import datetime, date
-from typing import Dict, List, Optional, Tuple
+import copy
+import time
+import functools
+import hashlib
+import heapq
+import itertools
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 import json
 
+from columns import columns_dir, prune_columns
+from health import get_health_monitor, is_connection_error
+from migrations import BASELINE_VERSION, SCHEMA_VERSION, apply_schema_migrations, get_pending_backfills, run_backfills
+from partitions import (DATA_TABLES, group_by_partition, make_writable, move_legacy_days, open_partition,
+                        partition_path, partitions_dir, refresh_catalog, table_columns)
+from running_totals import forget_running_totals, range_totals, running_totals_ready, update_running_totals
+from sites import DEFAULT_SITE
+
+# Sezioni della dashboard lette insieme da get_dashboard (/api/statistics/dashboard)
+DASHBOARD_SECTIONS = ('daily', 'ctcss', 'talkgroups', 'disconnections')
+
 @dataclass
 class DailyLogStats:
     """Statistiche giornaliere di un log"""
@@ -24,6 +45,8 @@ class DailyLogStats:
     min_transmission_time: int
     total_qso: int
     total_qso_time: int
+    analyzer_version: int = 0  # ANALYZER_VERSION che ha prodotto i dati (0 = sconosciuta)
+    site_id: str = DEFAULT_SITE
 
 @dataclass
 class CTCSSStats:
@@ -32,6 +55,7 @@ class CTCSSStats:
     ctcss_frequency: float
     count: int
     percentage: float
+    site_id: str = DEFAULT_SITE
 
 @dataclass
 class TGStats:
@@ -43,6 +67,7 @@ class TGStats:
     qso_count: int
     avg_duration: float
     percentage: float
+    site_id: str = DEFAULT_SITE
 
 @dataclass
 class QSOEvent:
@@ -65,17 +90,299 @@ class DisconnectionPeriod:
     duration: Optional[int] = None  # secondi
     disconnection_count: int = 1
     status: str = 'resolved'  # 'resolved' o 'ongoing'
+    site_id: str = DEFAULT_SITE
+
+@dataclass
+class FileFingerprint:
+    """Fingerprint di un file log importato"""
+    path: str
+    log_date: str
+    size: int
+    mtime_ns: int
+    inode: int
+    content_hash: str  # hash dei blocchi iniziale e finale
+
+def data_file_signature(db_path: str) -> Tuple:
+    """Firma economica dello stato dei dati, senza eseguire query.
+
+    Combina stat (dimensione, mtime) del database e del suo WAL con il
+    "file change counter" dell'header SQLite, incrementato a ogni commit in
+    modalità rollback journal. È uguale per tutti i processi che leggono lo
+    stesso file e cambia a ogni scrittura.
+    """
+    signature = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            signature.append(None)
+    try:
+        with open(db_path, 'rb') as f:
+            header = f.read(28)
+        signature.append(header[24:28].hex())
+    except OSError:
+        signature.append(None)
+    return tuple(signature)
+
+class QueryCache:
+    """Cache LRU read-through dei risultati delle query statistiche.
+
+    Ogni scrittura incrementa un contatore di generazione: globale (pulizia,
+    reset) oppure per singola data (salvataggio di un giorno). Una voce in cache
+    resta valida finché nessuna data del suo intervallo è stata modificata dopo
+    il suo inserimento. Le scritture fatte da altri processi vengono rilevate
+    dal cambio di data_file_signature() e invalidano tutta la cache.
+
+    Le generazioni per data restano al massimo max_entries: quelle più vecchie
+    della voce più vecchia in cache vengono scartate, e oltre il limite le voci
+    più vecchie vengono invalidate insieme alle date che le riguardano.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 256, ttl: Optional[float] = None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._global_generation = 0
+        self._date_generations: Dict[str, int] = {}
+        self._entries: 'OrderedDict[Tuple, Tuple]' = OrderedDict()
+        self._file_signature = None
+        self._lock = threading.Lock()
+
+    def _check_external_writes(self):
+        """Invalida tutto se il file è stato modificato fuori da questo processo"""
+        signature = data_file_signature(self.db_path)
+        if signature != self._file_signature:
+            if self._file_signature is not None:
+                self.generation += 1
+                self._global_generation = self.generation
+                self._date_generations.clear()
+            self._file_signature = signature
+
+    def _is_valid(self, stamp: int, stored_at: float, date_range: Optional[Tuple[str, str]]) -> bool:
+        if stamp < self._global_generation:
+            return False
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            return False
+        for day, day_generation in self._date_generations.items():
+            if day_generation > stamp and (date_range is None or date_range[0] <= day <= date_range[1]):
+                return False
+        return True
+
+    def get(self, key: Tuple, date_range: Optional[Tuple[str, str]]):
+        """Restituisce (trovato, valore, generazione corrente)"""
+        with self._lock:
+            self._check_external_writes()
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stamp, stored_at = entry
+                if self._is_valid(stamp, stored_at, date_range):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value, self.generation
+                del self._entries[key]
+            self.misses += 1
+            return False, None, self.generation
+
+    def put(self, key: Tuple, value, stamp: int):
+        """Memorizza un risultato calcolato alla generazione `stamp`"""
+        with self._lock:
+            if stamp != self.generation:
+                # Dati modificati durante la query: il risultato potrebbe essere vecchio
+                return
+            self._entries[key] = (value, stamp, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self, dates: Optional[List[str]] = None):
+        """Registra una scrittura: per le date indicate oppure globale se dates è None"""
+        with self._lock:
+            self.generation += 1
+            if dates is None:
+                self._global_generation = self.generation
+                self._date_generations.clear()
+                self._entries.clear()
+            else:
+                for day in dates:
+                    self._date_generations[day] = self.generation
+                self._compact()
+            # Le nostre scritture non devono sembrare scritture esterne
+            self._file_signature = data_file_signature(self.db_path)
+
+    def _compact(self):
+        """Scarta le generazioni per data che non possono più invalidare alcuna voce"""
+        oldest = max(min((stamp for _, stamp, _ in self._entries.values()), default=self.generation),
+                     self._global_generation)
+        generations = {day: generation for day, generation in self._date_generations.items() if generation > oldest}
+        if len(generations) > self.max_entries:
+            # Troppe date modificate: le voci precedenti alla soglia vengono invalidate come da un bump globale
+            threshold = sorted(generations.values())[-self.max_entries - 1]
+            self._global_generation = threshold
+            generations = {day: generation for day, generation in generations.items() if generation > threshold}
+            for key in [key for key, (_, stamp, _) in self._entries.items() if stamp < threshold]:
+                del self._entries[key]
+        self._date_generations = generations
+
+    def get_stats(self) -> Dict:
+        """Contatori per il monitoraggio"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': True,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'generation': self.generation
+            }
+
+
+# Una cache condivisa per file database, così tutte le istanze di DatabaseManager
+# dello stesso processo (app, log processor, scheduler) vedono le stesse invalidazioni
+_query_caches: Dict[str, QueryCache] = {}
+_query_caches_lock = threading.Lock()
+
+def get_query_cache(db_path: str) -> Optional[QueryCache]:
+    """Restituisce la cache condivisa per il database, None se disabilitata (QUERY_CACHE_SIZE=0)"""
+    max_entries = int(os.getenv('QUERY_CACHE_SIZE', 256))
+    if max_entries <= 0:
+        return None
+    ttl = float(os.getenv('QUERY_CACHE_TTL', 0)) or None
+    key = os.path.abspath(db_path)
+    with _query_caches_lock:
+        if key not in _query_caches:
+            _query_caches[key] = QueryCache(key, max_entries, ttl)
+        return _query_caches[key]
+
+def _month_range(year: int, month: int) -> Tuple[str, str]:
+    return (f"{year}-{month:02d}-01", f"{year}-{month:02d}-31")
+
+def _year_range(year: int) -> Tuple[str, str]:
+    return (f"{year}-01-01", f"{year}-12-31")
+
+def _period(start_date: str, end_date: str, site: Optional[str] = None) -> Tuple[str, str]:
+    return (start_date, end_date)
+
+def _site_filter(site: Optional[str], column: str = 'site_id') -> Tuple[str, Tuple]:
+    """Condizione sul sito da anteporre al filtro per data (vuota = tutti i siti).
+
+    Con il sito come prima condizione SQLite usa gli indici univoci
+    (site_id, data, ...): il costo di una query non cresce con il numero di siti.
+    """
+    if site is None:
+        return '', ()
+    return f"{column} = ? AND ", (site,)
+
+def _totals_summary(row: Dict) -> Dict:
+    """Totali di un periodo con i nomi delle statistiche aggregate (mensili, annuali)"""
+    return {
+        'total_days': row['days'],
+        'total_transmissions': row['transmissions'],
+        'total_time': row['transmission_time'],
+        'total_qso': row['qso'],
+        'total_qso_time': row['qso_time'],
+        'avg_daily_transmissions': row['transmissions'] / row['days'] if row['days'] else None
+    }
+
+def cached_query(date_range: Optional[Callable[..., Tuple[str, str]]] = None):
+    """Decoratore read-through per i metodi di lettura di DatabaseManager.
+
+    La chiave è (nome metodo, argomenti, sito). `date_range` calcola dagli argomenti
+    l'intervallo di date da cui dipende il risultato; senza, il risultato dipende
+    da tutte le date. I risultati delle query fallite non vengono memorizzati.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.query_cache
+            if cache is None:
+                self._local.query_failed = False
+                value = method(self, *args, **kwargs)
+                if not self._local.query_failed:
+                    self.health.record_success()
+                return value
+
+            key = (method.__name__,) + args + tuple(sorted(kwargs.items()))
+            rng = date_range(*args, **kwargs) if date_range else None
+            found, value, stamp = cache.get(key, rng)
+            if not found:
+                self._local.query_failed = False
+                value = method(self, *args, **kwargs)
+                if self._local.query_failed:
+                    return value
+                self.health.record_success()
+                cache.put(key, value, stamp)
+            return copy.deepcopy(value)
+        return wrapper
+    return decorator
+
 
 class DatabaseManager:
     """Gestione database SQLite per statistiche SVXLink"""
-    
+
     def __init__(self, db_path: str = None):
         # Usa variabile d'ambiente se disponibile, altrimenti default
         if db_path is None:
             db_path = os.getenv('DATABASE_PATH', 'data/svxlink_stats.db')
         self.db_path = db_path
+        self.query_cache = get_query_cache(db_path)
+        self.health = get_health_monitor(db_path, self.ping)
+        self._local = threading.local()
         self.ensure_db_directory()
         self.init_database()
+
+    def _record_failure(self, error: Exception):
+        # Solo gli errori di connessione rendono il database non disponibile
+        if is_connection_error(error):
+            self.health.record_failure(error)
+
+    def _report_query_error(self, message: str, error: Exception):
+        """Segnala un errore di lettura (il risultato non verrà messo in cache)"""
+        self._local.query_failed = True
+        self._record_failure(error)
+        print(f"❌ {message}: {error}")
+
+    def _invalidate(self, dates: Optional[List[str]] = None):
+        """Incrementa la generazione dei dati per le date indicate (tutte se None)"""
+        if self.query_cache is not None:
+            self.query_cache.bump(dates)
+
+    def ping(self) -> Optional[str]:
+        """Probe di liveness economica: restituisce il momento dell'ultima scrittura dei dati"""
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            # Il catalogo registra ogni scrittura nelle partizioni: nessun file di partizione da aprire
+            row = conn.execute("""
+                SELECT MAX(last_write) FROM (
+                    SELECT MAX(processed_at) AS last_write FROM daily_logs
+                    UNION ALL SELECT MAX(updated_at) FROM partitions
+                )
+            """).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def get_data_version(self) -> Dict:
+        """Versione corrente dei dati (token opaco + ultima scrittura) senza interrogare il database"""
+        signature = data_file_signature(self.db_path)
+        mtimes = [item[1] for item in signature[:2] if item]
+        last_modified = datetime.fromtimestamp(max(mtimes) / 1e9, tz=timezone.utc) if mtimes else None
+        return {
+            'token': hashlib.sha1(repr(signature).encode()).hexdigest()[:16],
+            'last_modified': last_modified
+        }
+
+    def get_cache_stats(self) -> Dict:
+        """Statistiche hit/miss della cache delle query"""
+        if self.query_cache is None:
+            return {'enabled': False}
+        return self.query_cache.get_stats()
     
     def ensure_db_directory(self):
         """Assicura che la directory del database esista"""
@@ -87,8 +394,200 @@ class DatabaseManager:
         conn.row_factory = sqlite3.Row
         return conn
     
+    def _partition_paths(self, conn: sqlite3.Connection, start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> List[str]:
+        """File delle partizioni che si sovrappongono all'intervallo, dalla più recente"""
+        cursor = conn.execute("""
+            SELECT filename FROM partitions
+            WHERE period_end >= COALESCE(?, period_end) AND period_start <= COALESCE(?, period_start)
+            ORDER BY key DESC
+        """, (start_date, end_date))
+        paths = [partition_path(self.db_path, row[0]) for row in cursor.fetchall()]
+        # Un file può mancare se la retention è stata interrotta tra eliminazione e catalogo
+        return [path for path in paths if os.path.exists(path)]
+
+    def _fan_out(self, sql: str, params: Tuple, order_by: str, start_date: Optional[str] = None,
+                 end_date: Optional[str] = None, batch_size: int = 500) -> Iterator[Dict]:
+        """Esegue la stessa query sul database principale e su ogni partizione dell'intervallo.
+
+        Ogni sorgente restituisce righe in ordine decrescente di `order_by`: i
+        risultati vengono fusi in streaming mantenendo l'ordine. Il database
+        principale contiene solo le righe non ancora spostate dalla migrazione 3.
+        Le query vengono eseguite subito, così gli errori SQL emergono al
+        chiamante prima che inizi lo streaming.
+        """
+        conn = self.get_connection()
+        connections = [conn]
+        try:
+            for path in self._partition_paths(conn, start_date, end_date):
+                part = sqlite3.connect(path)
+                part.row_factory = sqlite3.Row
+                connections.append(part)
+            cursors = [source.execute(sql, params) for source in connections]
+        except Exception:
+            for source in connections:
+                source.close()
+            raise
+        return self._merge_cursors(connections, cursors, order_by, batch_size)
+
+    @staticmethod
+    def _merge_cursors(connections: List[sqlite3.Connection], cursors: List[sqlite3.Cursor],
+                       order_by: str, batch_size: int) -> Iterator[Dict]:
+        """Fonde i cursori ordinati e chiude le connessioni a fine lettura"""
+        def drain(cursor):
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        try:
+            yield from heapq.merge(*(drain(cursor) for cursor in cursors),
+                                   key=lambda row: row[order_by] or '', reverse=True)
+        finally:
+            for conn in connections:
+                conn.close()
+
+    @contextmanager
+    def _range_connection(self, start_date: Optional[str], end_date: Optional[str]):
+        """Connessione per le query aggregate su un intervallo di date.
+
+        Collega (ATTACH) solo le partizioni che si sovrappongono all'intervallo
+        e crea viste temporanee con i nomi delle tabelle dati, che uniscono le
+        righe del database principale e delle partizioni: le query SQL restano
+        quelle di una tabella unica. Con più partizioni dei database collegabili
+        (SQLITE_LIMIT_ATTACHED, di solito 10) le righe dell'intervallo vengono
+        copiate in tabelle temporanee, collegando le partizioni a gruppi.
+        """
+        conn = self.get_connection()
+        try:
+            paths = self._partition_paths(conn, start_date, end_date)
+            limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+            if len(paths) > limit:
+                self._copy_range(conn, paths, limit, start_date, end_date)
+                yield conn
+                return
+            for index, path in enumerate(paths):
+                conn.execute(f"ATTACH DATABASE ? AS p{index}", (path,))
+            for table in DATA_TABLES:
+                columns = ', '.join(table_columns(table))
+                sources = ['main'] + [f"p{index}" for index in range(len(paths))]
+                conn.execute(f"CREATE TEMP VIEW {table} AS " + " UNION ALL ".join(
+                    f"SELECT {columns} FROM {source}.{table}" for source in sources))
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _copy_range(conn: sqlite3.Connection, paths: List[str], limit: int,
+                    start_date: Optional[str], end_date: Optional[str]):
+        """Tabelle temporanee con le righe dell'intervallo di tutte le partizioni"""
+        for table, date_column in DATA_TABLES.items():
+            columns = ', '.join(table_columns(table))
+            conn.execute(f"CREATE TEMP TABLE {table} AS SELECT {columns} FROM main.{table} WHERE "
+                         f"{date_column} BETWEEN COALESCE(?, {date_column}) AND COALESCE(?, {date_column})",
+                         (start_date, end_date))
+        for offset in range(0, len(paths), limit):
+            group = paths[offset:offset + limit]
+            for index, path in enumerate(group):
+                conn.execute(f"ATTACH DATABASE ? AS p{index}", (path,))
+            for index in range(len(group)):
+                for table, date_column in DATA_TABLES.items():
+                    columns = ', '.join(table_columns(table))
+                    conn.execute(f"INSERT INTO temp.{table} SELECT {columns} FROM p{index}.{table} WHERE "
+                                 f"{date_column} BETWEEN COALESCE(?, {date_column}) AND COALESCE(?, {date_column})",
+                                 (start_date, end_date))
+            # DETACH non è ammesso con una transazione aperta
+            conn.commit()
+            for index in range(len(group)):
+                conn.execute(f"DETACH DATABASE p{index}")
+
+    @contextmanager
+    def _totals_connection(self, start_date: str, end_date: str):
+        """Connessione per i totali di un intervallo.
+
+        Con i totali cumulativi pronti basta il database principale, senza
+        collegare le partizioni; durante i backfill delle migrazioni si usa
+        la connessione delle query aggregate (_range_connection).
+        """
+        conn = self.get_connection()
+        try:
+            if running_totals_ready(conn):
+                yield conn
+                return
+        finally:
+            conn.close()
+        with self._range_connection(start_date, end_date) as conn:
+            yield conn
+
+    def _write_partitions(self, days: List[str], write: Callable[[sqlite3.Connection, List[str]], None],
+                          fingerprints: Optional[List[FileFingerprint]] = None):
+        """Scrive i dati dei giorni indicati nelle rispettive partizioni.
+
+        `write(conn, giorni)` riceve la connessione di una partizione e i giorni
+        che le appartengono, dopo che vi sono state spostate le righe di quei
+        giorni ancora nel database principale (backfill della migrazione 3 in
+        corso). Ogni partizione ha la sua transazione; poi catalogo, totali
+        cumulativi (running_totals.py) e fingerprint vengono registrati nel
+        database principale. Un'interruzione tra le due fasi lascia i file
+        "da importare": il reimport sostituisce gli stessi giorni.
+        """
+        with self.get_connection() as conn:
+            for key, group in group_by_partition(days).items():
+                make_writable(conn, self.db_path, key)
+                part = open_partition(self.db_path, key)
+                try:
+                    # Righe di questi giorni non ancora spostate dal backfill della migrazione 3
+                    move_legacy_days(conn, part, group)
+                    write(part, group)
+                    part.commit()
+                    refresh_catalog(conn, key, part)
+                    update_running_totals(conn, part, group)
+                finally:
+                    part.close()
+            if fingerprints:
+                self._write_fingerprints(conn, fingerprints)
+            conn.commit()
+
+    def get_schema_version(self) -> int:
+        """Versione dello schema registrata nel database (0 se mai inizializzato)"""
+        with self.get_connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def get_schema_status(self) -> Dict:
+        """Versione dello schema e backfill delle migrazioni ancora in corso"""
+        return {
+            'version': self.get_schema_version(),
+            'target_version': SCHEMA_VERSION,
+            'pending_backfills': get_pending_backfills(self.db_path)
+        }
+    
     def init_database(self):
-        """Inizializza il database con lo schema"""
+        """Porta il database alla versione corrente dello schema.
+
+        Con user_version già aggiornata non esegue nulla. Un database nuovo
+        riceve lo schema iniziale; poi si applicano le migrazioni mancanti
+        (solo DDL: i backfill dei dati girano in background, vedi migrations.py).
+        """
+        version = self.get_schema_version()
+        if version == SCHEMA_VERSION:
+            return
+        if version > SCHEMA_VERSION:
+            print(f"⚠️ Schema database v{version} più recente dell'applicazione (v{SCHEMA_VERSION})")
+            return
+        if version < BASELINE_VERSION:
+            self.create_initial_schema()
+        apply_schema_migrations(self.db_path)
+        if version < BASELINE_VERSION and self._is_empty():
+            # Database nuovo: i backfill non hanno dati da aggiornare e terminano subito
+            run_backfills(self.db_path)
+    
+    def _is_empty(self) -> bool:
+        with self.get_connection() as conn:
+            return conn.execute("SELECT 1 FROM daily_logs LIMIT 1").fetchone() is None
+
+    def create_initial_schema(self):
+        """Crea lo schema iniziale da database_schema.sql (o lo schema di base)"""
         schema_file = 'database_schema.sql'
         if not os.path.exists(schema_file):
             print(f"⚠️ Schema file {schema_file} non trovato, creo schema basic")
@@ -100,6 +599,7 @@ class DatabaseManager:
         
         with self.get_connection() as conn:
             conn.executescript(schema_sql)
+            conn.execute(f"PRAGMA user_version = {BASELINE_VERSION}")
             conn.commit()
             print(f"✅ Database inizializzato: {self.db_path}")
     
@@ -153,108 +653,138 @@ class DatabaseManager:
             status TEXT DEFAULT 'resolved'
         );
         
+        CREATE TABLE IF NOT EXISTS ingested_files (
+            path TEXT PRIMARY KEY,
+            log_date DATE NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        
         CREATE INDEX IF NOT EXISTS idx_daily_logs_date ON daily_logs(date);
         CREATE INDEX IF NOT EXISTS idx_ctcss_stats_date ON daily_ctcss_stats(log_date);
         CREATE INDEX IF NOT EXISTS idx_tg_stats_date ON daily_tg_stats(log_date);
         CREATE INDEX IF NOT EXISTS idx_disconnections_date ON daily_disconnections(log_date);
+        CREATE INDEX IF NOT EXISTS idx_ingested_files_date ON ingested_files(log_date);
         """
         
         with self.get_connection() as conn:
             conn.executescript(basic_schema)
+            conn.execute(f"PRAGMA user_version = {BASELINE_VERSION}")
             conn.commit()
     
     def save_daily_stats(self, stats: DailyLogStats) -> bool:
         """Salva statistiche giornaliere"""
+        processed_at = datetime.now().isoformat()
+
+        def write(conn, days):
+            conn.execute("""
+                INSERT OR REPLACE INTO daily_logs 
+                (date, filename, file_size, total_transmissions, total_transmission_time,
+                 avg_transmission_time, max_transmission_time, min_transmission_time,
+                 total_qso, total_qso_time, processed_at, analyzer_version, site_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                stats.date, stats.filename, stats.file_size,
+                stats.total_transmissions, stats.total_transmission_time,
+                stats.avg_transmission_time, stats.max_transmission_time,
+                stats.min_transmission_time, stats.total_qso, stats.total_qso_time,
+                processed_at, stats.analyzer_version, stats.site_id
+            ))
+
         try:
-            with self.get_connection() as conn:
-                conn.execute("""
-                    INSERT OR REPLACE INTO daily_logs 
-                    (date, filename, file_size, total_transmissions, total_transmission_time,
-                     avg_transmission_time, max_transmission_time, min_transmission_time,
-                     total_qso, total_qso_time, processed_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    stats.date, stats.filename, stats.file_size,
-                    stats.total_transmissions, stats.total_transmission_time,
-                    stats.avg_transmission_time, stats.max_transmission_time,
-                    stats.min_transmission_time, stats.total_qso, stats.total_qso_time,
-                    datetime.now().isoformat()
-                ))
-                conn.commit()
-                return True
+            self._write_partitions([stats.date], write)
+            self.health.record_ingest(processed_at)
+            return True
         except Exception as e:
+            self._record_failure(e)
             print(f"❌ Errore salvataggio statistiche giornaliere: {e}")
             return False
+        finally:
+            self._invalidate([stats.date])
     
     def save_ctcss_stats(self, ctcss_list: List[CTCSSStats]) -> bool:
         """Salva statistiche CTCSS"""
-        try:
-            with self.get_connection() as conn:
-                # Cancella vecchie statistiche per la data
-                if ctcss_list:
-                    conn.execute("DELETE FROM daily_ctcss_stats WHERE log_date = ?", 
-                               (ctcss_list[0].log_date,))
-                
-                # Inserisci nuove statistiche
-                for ctcss in ctcss_list:
+        def write(conn, days):
+            # Cancella vecchie statistiche per sito e data
+            conn.executemany("DELETE FROM daily_ctcss_stats WHERE site_id = ? AND log_date = ?",
+                             {(c.site_id, c.log_date) for c in ctcss_list if c.log_date in days})
+
+            # Inserisci nuove statistiche
+            for ctcss in ctcss_list:
+                if ctcss.log_date in days:
                     conn.execute("""
                         INSERT INTO daily_ctcss_stats 
-                        (log_date, ctcss_frequency, count, percentage)
-                        VALUES (?, ?, ?, ?)
-                    """, (ctcss.log_date, ctcss.ctcss_frequency, ctcss.count, ctcss.percentage))
-                
-                conn.commit()
-                return True
+                        (log_date, ctcss_frequency, count, percentage, site_id)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (ctcss.log_date, ctcss.ctcss_frequency, ctcss.count, ctcss.percentage, ctcss.site_id))
+
+        try:
+            self._write_partitions(sorted({c.log_date for c in ctcss_list}), write)
+            return True
         except Exception as e:
             print(f"❌ Errore salvataggio statistiche CTCSS: {e}")
             return False
+        finally:
+            self._invalidate(sorted({c.log_date for c in ctcss_list}))
     
     def save_tg_stats(self, tg_list: List[TGStats]) -> bool:
         """Salva statistiche Talk Groups"""
-        try:
-            with self.get_connection() as conn:
-                # Cancella vecchie statistiche per la data
-                if tg_list:
-                    conn.execute("DELETE FROM daily_tg_stats WHERE log_date = ?", 
-                               (tg_list[0].log_date,))
-                
-                # Inserisci nuove statistiche
-                for tg in tg_list:
+        def write(conn, days):
+            # Cancella vecchie statistiche per sito e data
+            conn.executemany("DELETE FROM daily_tg_stats WHERE site_id = ? AND log_date = ?",
+                             {(t.site_id, t.log_date) for t in tg_list if t.log_date in days})
+
+            # Inserisci nuove statistiche
+            for tg in tg_list:
+                if tg.log_date in days:
                     conn.execute("""
                         INSERT INTO daily_tg_stats 
                         (log_date, tg_number, transmission_count, total_duration,
-                         qso_count, avg_duration, percentage)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                         qso_count, avg_duration, percentage, site_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """, (tg.log_date, tg.tg_number, tg.transmission_count,
-                          tg.total_duration, tg.qso_count, tg.avg_duration, tg.percentage))
-                
-                conn.commit()
-                return True
+                          tg.total_duration, tg.qso_count, tg.avg_duration, tg.percentage, tg.site_id))
+
+        try:
+            self._write_partitions(sorted({t.log_date for t in tg_list}), write)
+            return True
         except Exception as e:
             print(f"❌ Errore salvataggio statistiche TG: {e}")
             return False
+        finally:
+            self._invalidate(sorted({t.log_date for t in tg_list}))
     
-    def get_daily_stats(self, start_date: str, end_date: str) -> List[Dict]:
+    def iter_daily_stats(self, start_date: str, end_date: str,
+                         batch_size: int = 500, site: Optional[str] = None) -> Iterator[Dict]:
+        """Itera le statistiche giornaliere del periodo (di un sito o di tutti) senza materializzarle in memoria"""
+        site_sql, site_params = _site_filter(site)
+        return self._fan_out(f"""
+            SELECT * FROM daily_logs
+            WHERE {site_sql}date BETWEEN ? AND ?
+            ORDER BY date DESC
+        """, site_params + (start_date, end_date), 'date', start_date, end_date, batch_size)
+
+    @cached_query(_period)
+    def get_daily_stats(self, start_date: str, end_date: str, site: Optional[str] = None) -> List[Dict]:
         """Recupera statistiche giornaliere per periodo"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("""
-                    SELECT * FROM daily_logs 
-                    WHERE date BETWEEN ? AND ?
-                    ORDER BY date DESC
-                """, (start_date, end_date))
-                
-                return [dict(row) for row in cursor.fetchall()]
+            return list(self.iter_daily_stats(start_date, end_date, site=site))
         except Exception as e:
-            print(f"❌ Errore recupero statistiche giornaliere: {e}")
+            self._report_query_error("Errore recupero statistiche giornaliere", e)
             return []
     
-    def get_monthly_aggregated_stats(self, year: int, month: int) -> Dict:
+    @cached_query(lambda year, month, site=None: _month_range(year, month))
+    def get_monthly_aggregated_stats(self, year: int, month: int, site: Optional[str] = None) -> Dict:
         """Recupera statistiche aggregate mensili"""
+        start_date, end_date = _month_range(year, month)
+        site_sql, site_params = _site_filter(site)
         try:
-            with self.get_connection() as conn:
+            with self._range_connection(start_date, end_date) as conn:
                 # Stats aggregate del mese
-                cursor = conn.execute("""
+                cursor = conn.execute(f"""
                     SELECT 
                         COUNT(*) as total_days,
                         SUM(total_transmissions) as total_transmissions,
@@ -264,48 +794,61 @@ class DatabaseManager:
                         MAX(total_transmissions) as peak_transmissions,
                         MIN(total_transmissions) as min_transmissions
                     FROM daily_logs 
-                    WHERE strftime('%Y', date) = ? AND strftime('%m', date) = ?
-                """, (str(year), f"{month:02d}"))
+                    WHERE {site_sql}date BETWEEN ? AND ?
+                """, site_params + (start_date, end_date))
                 
                 monthly_stats = dict(cursor.fetchone() or {})
                 
-                # Top CTCSS del mese
-                cursor = conn.execute("""
+                if running_totals_ready(conn):
+                    # Top CTCSS e TG dai totali cumulativi del mese
+                    ctcss = range_totals(conn, 'ctcss', start_date, end_date, site)
+                    tgs = range_totals(conn, 'talkgroups', start_date, end_date, site)
+                    monthly_stats['top_ctcss'] = [
+                        {'ctcss_frequency': row['key'], 'total_count': row['count']}
+                        for row in sorted(ctcss, key=lambda row: row['count'], reverse=True)[:5]]
+                    monthly_stats['top_tgs'] = [
+                        {'tg_number': row['key'], 'total_count': row['transmissions'], 'total_duration': row['duration']}
+                        for row in sorted(tgs, key=lambda row: row['transmissions'], reverse=True)[:5]]
+                    return monthly_stats
+                
+                # Top CTCSS del mese (range sulla data invece di strftime: la query usa l'indice)
+                cursor = conn.execute(f"""
                     SELECT ctcss_frequency, SUM(count) as total_count
-                    FROM daily_ctcss_stats dcs
-                    JOIN daily_logs dl ON dcs.log_date = dl.date
-                    WHERE strftime('%Y', dl.date) = ? AND strftime('%m', dl.date) = ?
+                    FROM daily_ctcss_stats
+                    WHERE {site_sql}log_date BETWEEN ? AND ?
                     GROUP BY ctcss_frequency
                     ORDER BY total_count DESC
                     LIMIT 5
-                """, (str(year), f"{month:02d}"))
+                """, site_params + (start_date, end_date))
                 
                 monthly_stats['top_ctcss'] = [dict(row) for row in cursor.fetchall()]
                 
                 # Top TG del mese
-                cursor = conn.execute("""
+                cursor = conn.execute(f"""
                     SELECT tg_number, SUM(transmission_count) as total_count,
                            SUM(total_duration) as total_duration
-                    FROM daily_tg_stats dts
-                    JOIN daily_logs dl ON dts.log_date = dl.date
-                    WHERE strftime('%Y', dl.date) = ? AND strftime('%m', dl.date) = ?
+                    FROM daily_tg_stats
+                    WHERE {site_sql}log_date BETWEEN ? AND ?
                     GROUP BY tg_number
                     ORDER BY total_count DESC
                     LIMIT 5
-                """, (str(year), f"{month:02d}"))
+                """, site_params + (start_date, end_date))
                 
                 monthly_stats['top_tgs'] = [dict(row) for row in cursor.fetchall()]
                 
                 return monthly_stats
         except Exception as e:
-            print(f"❌ Errore recupero statistiche mensili: {e}")
+            self._report_query_error("Errore recupero statistiche mensili", e)
             return {}
     
-    def get_yearly_aggregated_stats(self, year: int) -> Dict:
+    @cached_query(lambda year, site=None: _year_range(year))
+    def get_yearly_aggregated_stats(self, year: int, site: Optional[str] = None) -> Dict:
         """Recupera statistiche aggregate annuali"""
+        start_date, end_date = _year_range(year)
+        site_sql, site_params = _site_filter(site)
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("""
+            with self._range_connection(start_date, end_date) as conn:
+                cursor = conn.execute(f"""
                     SELECT 
                         COUNT(*) as total_days,
                         SUM(total_transmissions) as total_transmissions,
@@ -315,52 +858,203 @@ class DatabaseManager:
                         MAX(total_transmissions) as peak_transmissions,
                         MIN(total_transmissions) as min_transmissions
                     FROM daily_logs 
-                    WHERE strftime('%Y', date) = ?
-                """, (str(year),))
+                    WHERE {site_sql}date BETWEEN ? AND ?
+                """, site_params + (start_date, end_date))
                 
                 return dict(cursor.fetchone() or {})
         except Exception as e:
-            print(f"❌ Errore recupero statistiche annuali: {e}")
+            self._report_query_error("Errore recupero statistiche annuali", e)
             return {}
     
-    def get_available_dates(self) -> List[str]:
-        """Recupera tutte le date disponibili nel database"""
+    @cached_query()
+    def get_available_dates(self, site: Optional[str] = None) -> List[str]:
+        """Recupera tutte le date disponibili nel database (di un sito o di almeno un sito)"""
+        where, params = ("WHERE site_id = ?", (site,)) if site is not None else ("", ())
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("SELECT DISTINCT date FROM daily_logs ORDER BY date DESC")
-                return [row[0] for row in cursor.fetchall()]
+            rows = self._fan_out(f"SELECT DISTINCT date FROM daily_logs {where} ORDER BY date DESC", params, 'date')
+            # Durante la migrazione un giorno può comparire sia nel principale sia in una partizione
+            return [day for day, _ in itertools.groupby(row['date'] for row in rows)]
         except Exception as e:
-            print(f"❌ Errore recupero date disponibili: {e}")
+            self._report_query_error("Errore recupero date disponibili", e)
             return []
     
+    @cached_query()
     def get_date_range_stats(self) -> Dict:
         """Recupera statistiche sul range di date disponibili"""
         try:
             with self.get_connection() as conn:
+                # Dal catalogo delle partizioni, più le eventuali righe non ancora migrate
                 cursor = conn.execute("""
                     SELECT 
-                        MIN(date) as first_date,
-                        MAX(date) as last_date,
-                        COUNT(*) as total_days
-                    FROM daily_logs
+                        MIN(first_date) as first_date,
+                        MAX(last_date) as last_date,
+                        SUM(days) as total_days
+                    FROM (
+                        SELECT first_date, last_date, days FROM partitions
+                        UNION ALL
+                        SELECT MIN(date), MAX(date), COUNT(*) FROM daily_logs
+                    )
                 """)
                 
                 return dict(cursor.fetchone() or {})
         except Exception as e:
-            print(f"❌ Errore recupero range date: {e}")
+            self._report_query_error("Errore recupero range date", e)
             return {}
+
+    @cached_query()
+    def get_sites(self) -> List[Dict]:
+        """Siti presenti nei dati con primo e ultimo giorno e numero di giorni"""
+        try:
+            # Ogni sorgente legge solo l'indice univoco (site_id, date)
+            rows = self._fan_out("""
+                SELECT site_id, MIN(date) AS first_date, MAX(date) AS last_date, COUNT(*) AS days
+                FROM daily_logs
+                GROUP BY site_id
+                ORDER BY site_id DESC
+            """, (), 'site_id')
+            sites = []
+            for site_id, group in itertools.groupby(rows, key=lambda row: row['site_id']):
+                group = list(group)
+                sites.append({
+                    'site_id': site_id,
+                    'first_date': min(row['first_date'] for row in group),
+                    'last_date': max(row['last_date'] for row in group),
+                    'days': sum(row['days'] for row in group)
+                })
+            return sites[::-1]
+        except Exception as e:
+            self._report_query_error("Errore recupero siti", e)
+            return []
+
+    @cached_query(_period)
+    def get_site_comparison(self, start_date: str, end_date: str) -> List[Dict]:
+        """Confronto tra i siti nel periodo: totali di trasmissioni, QSO e disconnessioni per sito"""
+        try:
+            with self._range_connection(start_date, end_date) as conn:
+                cursor = conn.execute("""
+                    SELECT 
+                        site_id,
+                        COUNT(*) as total_days,
+                        SUM(total_transmissions) as total_transmissions,
+                        SUM(total_transmission_time) as total_time,
+                        SUM(total_qso) as total_qso,
+                        SUM(total_qso_time) as total_qso_time,
+                        AVG(total_transmissions) as avg_daily_transmissions,
+                        MAX(total_transmissions) as peak_transmissions
+                    FROM daily_logs
+                    WHERE date BETWEEN ? AND ?
+                    GROUP BY site_id
+                    ORDER BY site_id
+                """, (start_date, end_date))
+                sites = [dict(row) for row in cursor.fetchall()]
+                
+                cursor = conn.execute("""
+                    SELECT site_id, COUNT(*) as periods, SUM(disconnection_count) as disconnections
+                    FROM daily_disconnections
+                    WHERE log_date BETWEEN ? AND ?
+                    GROUP BY site_id
+                """, (start_date, end_date))
+                disconnections = {row['site_id']: row for row in cursor.fetchall()}
+                
+                for site in sites:
+                    row = disconnections.get(site['site_id'])
+                    site['disconnection_periods'] = row['periods'] if row else 0
+                    site['disconnections'] = (row['disconnections'] or 0) if row else 0
+                return sites
+        except Exception as e:
+            self._report_query_error("Errore confronto siti", e)
+            return []
+    
+    @staticmethod
+    def _site_totals_rows(conn: sqlite3.Connection, start_date: str, end_date: str,
+                          site: Optional[str]) -> List[Dict]:
+        if running_totals_ready(conn):
+            rows = range_totals(conn, 'daily', start_date, end_date, site, by_site=True)
+            return [{column: value for column, value in row.items() if column != 'key'} for row in rows]
+        site_sql, site_params = _site_filter(site)
+        cursor = conn.execute(f"""
+            SELECT 
+                site_id,
+                COUNT(*) as days,
+                SUM(total_transmissions) as transmissions,
+                SUM(total_transmission_time) as transmission_time,
+                SUM(total_qso) as qso,
+                SUM(total_qso_time) as qso_time
+            FROM daily_logs
+            WHERE {site_sql}date BETWEEN ? AND ?
+            GROUP BY site_id
+            ORDER BY site_id
+        """, site_params + (start_date, end_date))
+        return [dict(row) for row in cursor.fetchall()]
+
+    @cached_query(_period)
+    def get_range_totals(self, start_date: str, end_date: str, site: Optional[str] = None) -> Dict:
+        """Totali del periodo, complessivi e per sito: giorni, trasmissioni, tempo di trasmissione e QSO.
+
+        Con i totali cumulativi (running_totals.py) il costo non dipende dalla
+        lunghezza del periodo: due ricerche nell'indice per sito.
+        """
+        try:
+            with self._totals_connection(start_date, end_date) as conn:
+                rows = self._site_totals_rows(conn, start_date, end_date, site)
+        except Exception as e:
+            self._report_query_error("Errore recupero totali del periodo", e)
+            return {}
+        overall = {column: sum(row[column] or 0 for row in rows)
+                   for column in ('days', 'transmissions', 'transmission_time', 'qso', 'qso_time')}
+        return {
+            'totals': _totals_summary(overall),
+            'sites': [dict(site_id=row['site_id'], **_totals_summary(row)) for row in rows]
+        }
     
     def cleanup_old_data(self, keep_days: int = 365):
-        """Pulisce dati vecchi mantenendo solo gli ultimi N giorni"""
+        """Pulisce dati vecchi mantenendo solo gli ultimi N giorni.
+
+        Le partizioni interamente più vecchie del limite vengono eliminate come
+        file; in quella a cavallo del limite (e nelle righe non ancora migrate)
+        si cancellano i giorni vecchi da tutte le tabelle dati, statistiche
+        CTCSS, TG e disconnessioni comprese. I totali cumulativi vengono ribasati
+        e le colonne salvate dei giorni eliminati rimosse.
+        """
+        cutoff = (date.today() - timedelta(days=keep_days)).isoformat()
+        deleted = 0
         try:
             with self.get_connection() as conn:
-                cursor = conn.execute("""
-                    DELETE FROM daily_logs 
-                    WHERE date < date('now', '-{} days')
-                """.format(keep_days))
-                
-                deleted = cursor.rowcount
+                expired = conn.execute("SELECT key, filename, period_end, days FROM partitions WHERE period_start < ?",
+                                       (cutoff,)).fetchall()
+                for partition in expired:
+                    path = partition_path(self.db_path, partition['filename'])
+                    if partition['period_end'] < cutoff:
+                        for suffix in ('', '-journal', '-wal', '-shm'):
+                            if os.path.exists(path + suffix):
+                                os.remove(path + suffix)
+                        conn.execute("DELETE FROM partitions WHERE key = ?", (partition['key'],))
+                        deleted += partition['days'] or 0
+                        print(f"🗑️ Partizione {partition['key']} eliminata")
+                        continue
+                    make_writable(conn, self.db_path, partition['key'])
+                    part = open_partition(self.db_path, partition['key'])
+                    try:
+                        for table, date_column in DATA_TABLES.items():
+                            cursor = part.execute(f"DELETE FROM {table} WHERE {date_column} < ?", (cutoff,))
+                            if table == 'daily_logs':
+                                deleted += cursor.rowcount
+                        part.commit()
+                        refresh_catalog(conn, partition['key'], part)
+                    finally:
+                        part.close()
+
+                # Righe non ancora spostate nelle partizioni
+                for table, date_column in DATA_TABLES.items():
+                    cursor = conn.execute(f"DELETE FROM {table} WHERE {date_column} < ?", (cutoff,))
+                    if table == 'daily_logs':
+                        deleted += cursor.rowcount
+                # I file dei giorni eliminati tornano a essere "da importare", come prima del registro
+                conn.execute("DELETE FROM ingested_files WHERE log_date < ?", (cutoff,))
+                conn.execute("DELETE FROM ingest_files WHERE log_date < ?", (cutoff,))
+                forget_running_totals(conn, cutoff)
                 conn.commit()
+                prune_columns(columns_dir(self.db_path), cutoff)
                 
                 if deleted > 0:
                     print(f"🧹 Eliminati {deleted} record vecchi (oltre {keep_days} giorni)")
@@ -369,17 +1063,70 @@ class DatabaseManager:
         except Exception as e:
             print(f"❌ Errore pulizia dati: {e}")
             return 0
+        finally:
+            self._invalidate()
+
+    def compact_partitions(self) -> List[str]:
+        """Compatta (VACUUM) le partizioni degli anni chiusi e le rende di sola lettura.
+
+        Una partizione compattata viene riaperta in scrittura automaticamente
+        se arriva un log in ritardo per il suo periodo. Restituisce le chiavi
+        delle partizioni compattate.
+        """
+        compacted = []
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute("SELECT key, filename FROM partitions WHERE period_end < ? AND read_only = 0",
+                                    (date.today().isoformat(),)).fetchall()
+                for row in rows:
+                    path = partition_path(self.db_path, row['filename'])
+                    if not os.path.exists(path):
+                        continue
+                    part = sqlite3.connect(path)
+                    try:
+                        part.execute("VACUUM")
+                    finally:
+                        part.close()
+                    os.chmod(path, 0o444)
+                    conn.execute("UPDATE partitions SET read_only = 1, compacted_at = ? WHERE key = ?",
+                                 (datetime.now().isoformat(), row['key']))
+                    compacted.append(row['key'])
+                    print(f"📦 Partizione {row['key']} compattata e resa di sola lettura")
+                conn.commit()
+        except Exception as e:
+            print(f"❌ Errore compattazione partizioni: {e}")
+        finally:
+            # Solo il catalogo è cambiato: nessuna data da invalidare
+            self._invalidate([])
+        return compacted
+
+    def get_partitions(self) -> List[Dict]:
+        """Catalogo delle partizioni con la dimensione dei file, per il monitoraggio"""
+        try:
+            with self.get_connection() as conn:
+                rows = [dict(row) for row in conn.execute("SELECT * FROM partitions ORDER BY key DESC")]
+        except Exception as e:
+            self._report_query_error("Errore recupero partizioni", e)
+            return []
+        for row in rows:
+            path = partition_path(self.db_path, row['filename'])
+            row['size'] = os.path.getsize(path) if os.path.exists(path) else None
+        return rows
     
     def reset_database(self):
         """Resetta completamente il database eliminando tutti i dati e ricreando le tabelle"""
         try:
             with self.get_connection() as conn:
                 # Conta i record prima della cancellazione per logging
-                cursor = conn.execute("SELECT COUNT(*) as count FROM daily_logs")
-                count_before = cursor.fetchone()['count']
+                count_before = self.get_date_range_stats()['total_days'] or 0
                 
-                # Elimina tutte le tabelle
-                tables = ['daily_logs', 'ctcss_stats', 'tg_stats', 'qso_events', 'transmissions']
+                # Elimina le partizioni e tutte le tabelle
+                shutil.rmtree(partitions_dir(self.db_path), ignore_errors=True)
+                tables = ['daily_logs', 'daily_ctcss_stats', 'daily_tg_stats', 'daily_disconnections',
+                          'ctcss_stats', 'tg_stats', 'qso_events', 'transmissions', 'ingested_files',
+                          'ingest_streams', 'ingest_files', 'schema_backfills', 'partitions',
+                          'running_daily_totals', 'running_tg_totals', 'running_ctcss_totals',
+                          'running_total_keys', 'running_totals_rebuild']
                 for table in tables:
                     try:
                         conn.execute(f"DROP TABLE IF EXISTS {table}")
@@ -387,6 +1134,8 @@ class DatabaseManager:
                     except Exception as e:
                         print(f"⚠️ Errore eliminazione tabella {table}: {e}")
                 
+                # Versione azzerata: init_database ricrea lo schema e riapplica le migrazioni
+                conn.execute("PRAGMA user_version = 0")
                 conn.commit()
                 print(f"🧹 Database resettato: eliminati {count_before} record")
                 
@@ -399,98 +1148,369 @@ class DatabaseManager:
         except Exception as e:
             print(f"❌ Errore reset database: {e}")
             raise e
+        finally:
+            self._invalidate()
+    
+    @staticmethod
+    def _ctcss_rows(conn: sqlite3.Connection, start_date: str, end_date: str, site: Optional[str]) -> List[Dict]:
+        if running_totals_ready(conn):
+            # Dai totali cumulativi: due ricerche nell'indice per tono, qualunque sia l'intervallo
+            rows = [{
+                'ctcss_frequency': row['key'],
+                'total_count': row['count'],
+                'avg_percentage': row['percentage'] / row['days']
+            } for row in range_totals(conn, 'ctcss', start_date, end_date, site)]
+            return sorted(rows, key=lambda row: row['total_count'], reverse=True)
+        site_sql, site_params = _site_filter(site)
+        cursor = conn.execute(f"""
+            SELECT 
+                ctcss_frequency,
+                SUM(count) as total_count,
+                AVG(percentage) as avg_percentage
+            FROM daily_ctcss_stats
+            WHERE {site_sql}log_date BETWEEN ? AND ?
+            GROUP BY ctcss_frequency
+            ORDER BY total_count DESC
+        """, site_params + (start_date, end_date))
+        return [dict(row) for row in cursor.fetchall()]
     
-    def get_ctcss_stats(self, start_date: str, end_date: str) -> List[Dict]:
+    @staticmethod
+    def _tg_rows(conn: sqlite3.Connection, start_date: str, end_date: str, site: Optional[str]) -> List[Dict]:
+        if running_totals_ready(conn):
+            rows = [{
+                'tg_number': row['key'],
+                'total_transmissions': row['transmissions'],
+                'total_duration': row['duration'],
+                'total_qso': row['qso'],
+                'avg_duration': row['avg_duration'] / row['days'],
+                'avg_percentage': row['percentage'] / row['days']
+            } for row in range_totals(conn, 'talkgroups', start_date, end_date, site) if row['key'] != 0]
+            return sorted(rows, key=lambda row: row['total_transmissions'], reverse=True)
+        site_sql, site_params = _site_filter(site)
+        cursor = conn.execute(f"""
+            SELECT 
+                tg_number,
+                SUM(transmission_count) as total_transmissions,
+                SUM(total_duration) as total_duration,
+                SUM(qso_count) as total_qso,
+                AVG(avg_duration) as avg_duration,
+                AVG(percentage) as avg_percentage
+            FROM daily_tg_stats
+            WHERE {site_sql}log_date BETWEEN ? AND ? AND tg_number != 0
+            GROUP BY tg_number
+            ORDER BY total_transmissions DESC
+        """, site_params + (start_date, end_date))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _daily_rows(conn: sqlite3.Connection, start_date: str, end_date: str, site: Optional[str]) -> List[Dict]:
+        site_sql, site_params = _site_filter(site)
+        cursor = conn.execute(f"""
+            SELECT * FROM daily_logs
+            WHERE {site_sql}date BETWEEN ? AND ?
+            ORDER BY date DESC
+        """, site_params + (start_date, end_date))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _disconnection_rows(conn: sqlite3.Connection, start_date: str, end_date: str,
+                            site: Optional[str]) -> List[Dict]:
+        site_sql, site_params = _site_filter(site)
+        cursor = conn.execute(f"""
+            SELECT * FROM daily_disconnections
+            WHERE {site_sql}log_date BETWEEN ? AND ?
+            ORDER BY start_time DESC
+        """, site_params + (start_date, end_date))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @cached_query(_period)
+    def get_ctcss_stats(self, start_date: str, end_date: str, site: Optional[str] = None) -> List[Dict]:
         """Recupera statistiche CTCSS aggregate per range di date"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("""
-                    SELECT 
-                        ctcss_frequency,
-                        SUM(count) as total_count,
-                        AVG(percentage) as avg_percentage
-                    FROM daily_ctcss_stats
-                    WHERE log_date BETWEEN ? AND ?
-                    GROUP BY ctcss_frequency
-                    ORDER BY total_count DESC
-                """, (start_date, end_date))
-                
-                return [dict(row) for row in cursor.fetchall()]
+            with self._totals_connection(start_date, end_date) as conn:
+                return self._ctcss_rows(conn, start_date, end_date, site)
         except Exception as e:
-            print(f"❌ Errore recupero statistiche CTCSS: {e}")
+            self._report_query_error("Errore recupero statistiche CTCSS", e)
             return []
     
-    def get_tg_stats(self, start_date: str, end_date: str) -> List[Dict]:
+    @cached_query(_period)
+    def get_tg_stats(self, start_date: str, end_date: str, site: Optional[str] = None) -> List[Dict]:
         """Recupera statistiche Talk Group aggregate per range di date"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("""
-                    SELECT 
-                        tg_number,
-                        SUM(transmission_count) as total_transmissions,
-                        SUM(total_duration) as total_duration,
-                        SUM(qso_count) as total_qso,
-                        AVG(avg_duration) as avg_duration,
-                        AVG(percentage) as avg_percentage
-                    FROM daily_tg_stats
-                    WHERE log_date BETWEEN ? AND ? AND tg_number != 0
-                    GROUP BY tg_number
-                    ORDER BY total_transmissions DESC
-                """, (start_date, end_date))
-                
-                return [dict(row) for row in cursor.fetchall()]
+            with self._totals_connection(start_date, end_date) as conn:
+                return self._tg_rows(conn, start_date, end_date, site)
         except Exception as e:
-            print(f"❌ Errore recupero statistiche TG: {e}")
+            self._report_query_error("Errore recupero statistiche TG", e)
             return []
     
+    @cached_query(lambda start_date, end_date, sections=DASHBOARD_SECTIONS, site=None: (start_date, end_date))
+    def get_dashboard(self, start_date: str, end_date: str, sections: Tuple[str, ...] = DASHBOARD_SECTIONS,
+                      site: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """Dati dei widget della dashboard per il periodo, letti con una sola connessione.
+
+        Le partizioni dell'intervallo vengono collegate una volta e le query
+        delle sezioni richieste (vedi DASHBOARD_SECTIONS) girano sulla stessa
+        connessione, invece di una connessione per ogni API.
+        """
+        queries = {
+            'daily': self._daily_rows,
+            'ctcss': self._ctcss_rows,
+            'talkgroups': self._tg_rows,
+            'disconnections': self._disconnection_rows
+        }
+        try:
+            with self._range_connection(start_date, end_date) as conn:
+                return {section: queries[section](conn, start_date, end_date, site) for section in sections}
+        except Exception as e:
+            self._report_query_error("Errore recupero dati della dashboard", e)
+            return {}
+    
+    @cached_query()
     def get_all_daily_stats(self):
         """Recupera tutte le statistiche giornaliere (per conteggio record)"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.execute("SELECT * FROM daily_logs ORDER BY date DESC")
-                return [dict(row) for row in cursor.fetchall()]
+            return list(self._fan_out("SELECT * FROM daily_logs ORDER BY date DESC", (), 'date'))
         except Exception as e:
-            print(f"❌ Errore recupero tutti i dati: {e}")
+            self._report_query_error("Errore recupero tutti i dati", e)
             return []
     
     def save_disconnections(self, disconnections: List[DisconnectionPeriod]) -> bool:
         """Salva periodi di disconnessione ReflectorLogic"""
-        try:
-            with self.get_connection() as conn:
-                # Cancella vecchie disconnessioni per la data
-                if disconnections:
-                    conn.execute("DELETE FROM daily_disconnections WHERE log_date = ?", 
-                               (disconnections[0].log_date,))
-                
-                # Inserisci nuove disconnessioni
-                for disc in disconnections:
+        def write(conn, days):
+            # Cancella vecchie disconnessioni per sito e data
+            conn.executemany("DELETE FROM daily_disconnections WHERE site_id = ? AND log_date = ?",
+                             {(d.site_id, d.log_date) for d in disconnections if d.log_date in days})
+
+            # Inserisci nuove disconnessioni
+            for disc in disconnections:
+                if disc.log_date in days:
                     conn.execute("""
                         INSERT INTO daily_disconnections 
-                        (log_date, start_time, end_time, duration, disconnection_count, status)
-                        VALUES (?, ?, ?, ?, ?, ?)
+                        (log_date, start_time, end_time, duration, disconnection_count, status, site_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
                     """, (disc.log_date, disc.start_time.isoformat(), 
                           disc.end_time.isoformat() if disc.end_time else None,
-                          disc.duration, disc.disconnection_count, disc.status))
-                
-                conn.commit()
-                return True
+                          disc.duration, disc.disconnection_count, disc.status, disc.site_id))
+
+        try:
+            self._write_partitions(sorted({d.log_date for d in disconnections}), write)
+            return True
         except Exception as e:
             print(f"❌ Errore salvataggio disconnessioni: {e}")
             return False
+        finally:
+            self._invalidate(sorted({d.log_date for d in disconnections}))
     
-    def get_disconnections(self, start_date: str, end_date: str) -> List[Dict]:
-        """Recupera statistiche disconnessioni per periodo"""
+    def save_log_batch(self, batch: List[Tuple[DailyLogStats, List[CTCSSStats],
+                                               List[TGStats], List[DisconnectionPeriod]]],
+                       fingerprints: Optional[List[FileFingerprint]] = None) -> bool:
+        """Salva le statistiche di più giorni con una transazione per partizione.
+
+        Usato dall'ingest parallelo: un solo thread scrittore raggruppa i
+        risultati dei worker, evitando la contesa sul lock di SQLite. Per ogni
+        giorno i dati precedenti vengono sostituiti completamente. I fingerprint
+        dei file vengono registrati dopo i dati, insieme al catalogo. Con più
+        file per lo stesso giorno e sito vince il più recente (vedi _newest_files).
+        """
+        if not batch:
+            return True
+        if fingerprints and len(fingerprints) == len(batch):
+            batch = self._newest_files(batch, fingerprints)
+        else:
+            batch = list({(item[0].site_id, item[0].date): item for item in batch}.values())
+        processed_at = datetime.now().isoformat()
+        dates = sorted({daily.date for daily, _, _, _ in batch})
+
+        def write(conn, days):
+            part_batch = [item for item in batch if item[0].date in days]
+            conn.executemany("""
+                INSERT OR REPLACE INTO daily_logs 
+                (date, filename, file_size, total_transmissions, total_transmission_time,
+                 avg_transmission_time, max_transmission_time, min_transmission_time,
+                 total_qso, total_qso_time, processed_at, analyzer_version, site_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(
+                d.date, d.filename, d.file_size, d.total_transmissions,
+                d.total_transmission_time, d.avg_transmission_time,
+                d.max_transmission_time, d.min_transmission_time,
+                d.total_qso, d.total_qso_time, processed_at, d.analyzer_version, d.site_id
+            ) for d, _, _, _ in part_batch])
+
+            day_params = [(d.site_id, d.date) for d, _, _, _ in part_batch]
+            conn.executemany("DELETE FROM daily_ctcss_stats WHERE site_id = ? AND log_date = ?", day_params)
+            conn.executemany("DELETE FROM daily_tg_stats WHERE site_id = ? AND log_date = ?", day_params)
+            conn.executemany("DELETE FROM daily_disconnections WHERE site_id = ? AND log_date = ?", day_params)
+
+            conn.executemany("""
+                INSERT INTO daily_ctcss_stats 
+                (log_date, ctcss_frequency, count, percentage, site_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(c.log_date, c.ctcss_frequency, c.count, c.percentage, c.site_id)
+                  for _, ctcss_list, _, _ in part_batch for c in ctcss_list])
+            conn.executemany("""
+                INSERT INTO daily_tg_stats 
+                (log_date, tg_number, transmission_count, total_duration,
+                 qso_count, avg_duration, percentage, site_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(t.log_date, t.tg_number, t.transmission_count, t.total_duration,
+                   t.qso_count, t.avg_duration, t.percentage, t.site_id)
+                  for _, _, tg_list, _ in part_batch for t in tg_list])
+            conn.executemany("""
+                INSERT INTO daily_disconnections 
+                (log_date, start_time, end_time, duration, disconnection_count, status, site_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(d.log_date, d.start_time.isoformat(),
+                   d.end_time.isoformat() if d.end_time else None,
+                   d.duration, d.disconnection_count, d.status, d.site_id)
+                  for _, _, _, disc_list in part_batch for d in disc_list])
+
+        try:
+            self._write_partitions(dates, write, fingerprints)
+            self.health.record_ingest(processed_at)
+            return True
+        except Exception as e:
+            self._record_failure(e)
+            print(f"❌ Errore salvataggio batch di {len(batch)} giorni: {e}")
+            return False
+        finally:
+            self._invalidate(dates)
+
+    def _newest_files(self, batch: List[Tuple], fingerprints: List[FileFingerprint]) -> List[Tuple]:
+        """Giorni del blocco da salvare: per ogni giorno e sito il file più recente (mtime).
+
+        Come process_specific_date, indipendentemente dall'ordine in cui i
+        worker dell'ingest parallelo finiscono: un giorno già salvato da un file
+        più recente della stessa cartella (registro ingested_files) non viene
+        sovrascritto. I fingerprint di tutti i file vengono comunque registrati.
+        """
+        newest: Dict[Tuple[str, str], Tuple] = {}
+        for item, fingerprint in zip(batch, fingerprints):
+            key = (item[0].site_id, item[0].date)
+            if key not in newest or fingerprint.mtime_ns >= newest[key][1].mtime_ns:
+                newest[key] = (item, fingerprint)
+
+        days = sorted({fingerprint.log_date for _, fingerprint in newest.values()})
+        with self.get_connection() as conn:
+            registered = conn.execute(f"""
+                SELECT path, log_date, mtime_ns FROM ingested_files
+                WHERE log_date IN ({', '.join('?' * len(days))})
+            """, days).fetchall()
+        for path, log_date, mtime_ns in registered:
+            for key, (_, fingerprint) in list(newest.items()):
+                if (log_date == fingerprint.log_date and path != fingerprint.path
+                        and mtime_ns > fingerprint.mtime_ns
+                        and os.path.dirname(path) == os.path.dirname(fingerprint.path)
+                        and os.path.exists(path)):
+                    del newest[key]
+        return [item for item, _ in newest.values()]
+
+    def get_outdated_dates(self, analyzer_version: int, site: Optional[str] = None) -> List[str]:
+        """Giorni salvati da una versione precedente dell'analizzatore, dal più recente"""
+        site_sql, site_params = _site_filter(site)
+        try:
+            return [row['date'] for row in self._fan_out(f"""
+                SELECT date FROM daily_logs
+                WHERE {site_sql}COALESCE(analyzer_version, 0) < ?
+                ORDER BY date DESC
+            """, site_params + (analyzer_version,), 'date')]
+        except Exception as e:
+            self._report_query_error("Errore recupero giorni da rielaborare", e)
+            return []
+
+    def get_ingested_files(self) -> Dict[str, Dict]:
+        """Registro dei file importati, indicizzato per percorso"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.execute("""
-                    SELECT * FROM daily_disconnections 
-                    WHERE log_date BETWEEN ? AND ?
-                    ORDER BY start_time DESC
-                """, (start_date, end_date))
-                
-                return [dict(row) for row in cursor.fetchall()]
+                    SELECT path, log_date, size, mtime_ns, inode, content_hash, ingested_at
+                    FROM ingested_files
+                """)
+                return {row['path']: dict(row) for row in cursor.fetchall()}
+        except Exception as e:
+            self._report_query_error("Errore recupero registro file", e)
+            return {}
+
+    def _write_fingerprints(self, conn: sqlite3.Connection, fingerprints: List[FileFingerprint]):
+        conn.executemany("""
+            INSERT OR REPLACE INTO ingested_files 
+            (path, log_date, size, mtime_ns, inode, content_hash, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(f.path, f.log_date, f.size, f.mtime_ns, f.inode, f.content_hash,
+               datetime.now().isoformat()) for f in fingerprints])
+
+    def save_file_fingerprints(self, fingerprints: List[FileFingerprint]) -> bool:
+        """Registra i fingerprint dei file importati"""
+        if not fingerprints:
+            return True
+        try:
+            with self.get_connection() as conn:
+                self._write_fingerprints(conn, fingerprints)
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"❌ Errore salvataggio registro file: {e}")
+            return False
+        finally:
+            self._invalidate(sorted({f.log_date for f in fingerprints}))
+
+    def iter_disconnections(self, start_date: str, end_date: str,
+                            batch_size: int = 500, site: Optional[str] = None) -> Iterator[Dict]:
+        """Itera i periodi di disconnessione del periodo a blocchi di batch_size righe"""
+        site_sql, site_params = _site_filter(site)
+        return self._fan_out(f"""
+            SELECT * FROM daily_disconnections
+            WHERE {site_sql}log_date BETWEEN ? AND ?
+            ORDER BY start_time DESC
+        """, site_params + (start_date, end_date), 'start_time', start_date, end_date, batch_size)
+
+    def iter_table_rows(self, table: str, start_date: str, end_date: str,
+                        batch_size: int = 500) -> Iterator[Dict]:
+        """Itera in ordine cronologico le righe di una tabella dati, per l'export.
+
+        Ogni blocco è una query separata che riparte dall'ultima chiave letta
+        (data, id): tra un blocco e l'altro nessun lock resta aperto sui file,
+        così un export lento (anni di dati verso un client lento) non blocca
+        lo scrittore dell'ingest.
+        """
+        date_column = DATA_TABLES[table]
+        conn = self.get_connection()
+        try:
+            paths = [self.db_path] + self._partition_paths(conn, start_date, end_date)
+        finally:
+            conn.close()
+        sources = [self._iter_keyset(path, table, date_column, start_date, end_date, batch_size) for path in paths]
+        return heapq.merge(*sources, key=lambda row: row[date_column])
+
+    @staticmethod
+    def _iter_keyset(path: str, table: str, date_column: str, start_date: str, end_date: str,
+                     batch_size: int) -> Iterator[Dict]:
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            last_date, last_id = start_date, -1
+            while True:
+                # fetchall chiude lo statement: il lock di lettura dura solo il blocco
+                rows = conn.execute(f"""
+                    SELECT * FROM {table}
+                    WHERE ({date_column}, id) > (?, ?) AND {date_column} <= ?
+                    ORDER BY {date_column}, id
+                    LIMIT ?
+                """, (last_date, last_id, end_date, batch_size)).fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+                last_date, last_id = rows[-1][date_column], rows[-1]['id']
+        finally:
+            conn.close()
+
+    @cached_query(_period)
+    def get_disconnections(self, start_date: str, end_date: str, site: Optional[str] = None) -> List[Dict]:
+        """Recupera statistiche disconnessioni per periodo"""
+        try:
+            return list(self.iter_disconnections(start_date, end_date, site=site))
         except Exception as e:
-            print(f"❌ Errore recupero disconnessioni: {e}")
+            self._report_query_error("Errore recupero disconnessioni", e)
             return []
 
 # Test del database manager
@@ -103,6 +103,17 @@ CREATE TABLE IF NOT EXISTS daily_disconnections (
     FOREIGN KEY (log_date) REFERENCES daily_logs(date)
 );
 
+-- Registro dei file importati: il fingerprint permette di riprocessare solo i file modificati
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    log_date DATE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    content_hash TEXT NOT NULL, -- hash dei blocchi iniziale e finale del file
+    ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Indici per performance
 CREATE INDEX IF NOT EXISTS idx_daily_logs_date ON daily_logs(date);
 CREATE INDEX IF NOT EXISTS idx_ctcss_stats_date ON daily_ctcss_stats(log_date);
@@ -112,6 +123,7 @@ CREATE INDEX IF NOT EXISTS idx_qso_events_time ON daily_qso_events(start_time, e
 CREATE INDEX IF NOT EXISTS idx_monthly_stats_period ON monthly_stats(year, month);
 CREATE INDEX IF NOT EXISTS idx_disconnections_date ON daily_disconnections(log_date);
 CREATE INDEX IF NOT EXISTS idx_yearly_stats_year ON yearly_stats(year);
+CREATE INDEX IF NOT EXISTS idx_ingested_files_date ON ingested_files(log_date);
 
 -- Views per query comuni
 CREATE VIEW IF NOT EXISTS v_daily_summary AS
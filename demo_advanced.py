@@ -7,7 +7,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(__file__))
 
-from app import SVXLinkLogAnalyzer
+from log_analyzer import SVXLinkLogAnalyzer
 
 def demo_advanced_features():
     """Dimostra le nuove funzionalità implementate"""
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Indice della cartella dei log per SVXLink Log Analyzer
+Mantiene in memoria l'elenco dei file log della cartella data (e delle sue
+sottocartelle, candidate a siti), aggiornato solo quando cambia l'mtime della
+directory (aggiunta, rimozione o rinomina di file), così pagine e scheduler
+non ripetono la scansione a ogni chiamata.
+"""
+
+import fnmatch
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Estensioni dei file log considerate dall'indice
+LOG_FILE_PATTERNS = ('*.txt', '*.log')
+
+# Un mtime più recente di questo margine rispetto alla scansione non è affidabile:
+# su filesystem con risoluzione grossolana una modifica successiva potrebbe
+# lasciare l'mtime invariato
+MTIME_GRANULARITY_NS = 2 * 10**9
+
+
+class DirectoryIndex:
+    """Elenco in cache dei file log e delle sottocartelle di una directory"""
+
+    def __init__(self, directory: Path, patterns: Tuple[str, ...] = LOG_FILE_PATTERNS):
+        self.directory = Path(directory)
+        self.patterns = patterns
+        self._entries: Dict[str, Path] = {}
+        self._subdirs: Dict[str, Path] = {}
+        self._dir_mtime_ns: Optional[int] = None
+        self._scanned_at_ns = 0
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.hits = 0
+
+    def _matches(self, name: str) -> bool:
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def _is_fresh(self, dir_mtime_ns: int) -> bool:
+        return (dir_mtime_ns == self._dir_mtime_ns
+                and self._scanned_at_ns - dir_mtime_ns > MTIME_GRANULARITY_NS)
+
+    def refresh(self) -> bool:
+        """Riscansiona la directory se è cambiata. Restituisce True se ha riscansionato."""
+        with self._lock:
+            try:
+                dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+            except FileNotFoundError:
+                self._entries = {}
+                self._subdirs = {}
+                self._dir_mtime_ns = None
+                return False
+
+            if self._is_fresh(dir_mtime_ns):
+                self.hits += 1
+                return False
+
+            scanned_at_ns = time.time_ns()
+            names, subdirs = set(), set()
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        subdirs.add(entry.name)
+                    elif self._matches(entry.name) and entry.is_file():
+                        names.add(entry.name)
+
+            # Aggiornamento incrementale: si mantengono i Path già noti
+            entries = {name: self._entries.get(name) or self.directory / name for name in names}
+            self._entries = entries
+            self._subdirs = {name: self._subdirs.get(name) or self.directory / name for name in subdirs}
+            self._dir_mtime_ns = dir_mtime_ns
+            self._scanned_at_ns = scanned_at_ns
+            self.scans += 1
+            return True
+
+    def invalidate(self):
+        """Forza una nuova scansione alla prossima richiesta"""
+        with self._lock:
+            self._dir_mtime_ns = None
+
+    def files(self, pattern: Optional[str] = None) -> List[Path]:
+        """File log della directory (senza duplicati), filtrati opzionalmente per pattern"""
+        self.refresh()
+        with self._lock:
+            names = sorted(self._entries)
+            if pattern:
+                names = [name for name in names if fnmatch.fnmatch(name, pattern)]
+            return [self._entries[name] for name in names]
+
+    def subdirectories(self) -> List[Path]:
+        """Sottocartelle della directory, in ordine di nome"""
+        self.refresh()
+        with self._lock:
+            return [self._subdirs[name] for name in sorted(self._subdirs)]
+
+    def get_stats(self) -> Dict:
+        """Contatori per il monitoraggio"""
+        with self._lock:
+            return {
+                'directory': str(self.directory),
+                'files': len(self._entries),
+                'scans': self.scans,
+                'hits': self.hits
+            }
+
+
+# Un indice condiviso per directory, come per la cache delle query
+_indexes: Dict[str, DirectoryIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_directory_index(directory: Path) -> DirectoryIndex:
+    """Restituisce l'indice condiviso per la directory"""
+    key = os.path.abspath(directory)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = DirectoryIndex(Path(directory))
+        return _indexes[key]
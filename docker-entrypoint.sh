@@ -22,15 +22,16 @@ echo "=================================="
 echo "🔍 Testing network connectivity..."
 netstat -tlnp | grep :${FLASK_PORT} || echo "⚠️ Porta ${FLASK_PORT} non ancora in ascolto"
 
-# Esegui migrazioni database
-echo "📊 Verifica schema database..."
-python migrate_database.py
-if [ $? -eq 0 ]; then
-    echo "✅ Database pronto"
-else
-    echo "⚠️ Attenzione: problemi con la migrazione database"
+# Schema database: le migrazioni vengono applicate dall'applicazione all'avvio
+# (nessun lavoro se user_version è già aggiornata) e i backfill dei dati girano
+# in background. Aggiornamento manuale: python migrate_database.py
+
+# Avvia l'applicazione: gunicorn in produzione, server Flask in sviluppo
+SERVER=${SERVER:-gunicorn}
+if [ "${FLASK_ENV}" = "development" ] || [ "${SERVER}" = "flask" ]; then
+    echo "🎬 Avviando applicazione Flask (server di sviluppo)..."
+    exec python app.py
 fi
 
-# Avvia l'applicazione Flask
-echo "🎬 Avviando applicazione Flask..."
-exec python app.py
\ No newline at end of file
+echo "🎬 Avviando gunicorn (${WEB_WORKERS:-2} worker x ${WEB_THREADS:-4} thread + ${LIVE_MAX_CLIENTS:-32} stream)..."
+exec gunicorn -c gunicorn.conf.py app:app
\ No newline at end of file
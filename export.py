@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Export massivo delle statistiche salvate per SVXLink Log Analyzer
+Produce CSV o NDJSON in streaming, a blocchi di righe, con compressione gzip
+opzionale al volo: la memoria usata non dipende dall'ampiezza del periodo.
+Usato dalle API /api/export e dal comando `export` di log_processor.py.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date
+from typing import Iterable, Iterator
+
+from partitions import table_columns
+
+# Dataset esportabili e relativa tabella
+EXPORT_DATASETS = {
+    'daily': 'daily_logs',
+    'ctcss': 'daily_ctcss_stats',
+    'tg': 'daily_tg_stats',
+    'disconnections': 'daily_disconnections',
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Periodo di default: tutti i dati
+EXPORT_START = date.min.isoformat()
+EXPORT_END = date.max.isoformat()
+
+
+def export_filename(dataset: str, start_date: str, end_date: str, fmt: str, compress: bool = False) -> str:
+    """Nome file suggerito per un export"""
+    period = 'all' if (start_date, end_date) == (EXPORT_START, EXPORT_END) else f"{start_date}_{end_date}"
+    return f"svxlink_{dataset}_{period}.{fmt}" + ('.gz' if compress else '')
+
+
+def iter_export(db_manager, dataset: str, start_date: str = EXPORT_START, end_date: str = EXPORT_END,
+                fmt: str = 'csv', batch_size: int = 500) -> Iterator[str]:
+    """Restituisce il contenuto dell'export a blocchi di testo (un blocco ogni `batch_size` righe)"""
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Dataset non valido: {dataset} (disponibili: {', '.join(EXPORT_DATASETS)})")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato non valido: {fmt} (disponibili: {', '.join(EXPORT_FORMATS)})")
+
+    table = EXPORT_DATASETS[dataset]
+    rows = db_manager.iter_table_rows(table, start_date, end_date, batch_size)
+    if fmt == 'csv':
+        return _iter_csv(rows, table_columns(table), batch_size)
+    return _iter_ndjson(rows, batch_size)
+
+
+def _iter_csv(rows: Iterable[dict], columns, batch_size: int) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _iter_ndjson(rows: Iterable[dict], batch_size: int) -> Iterator[str]:
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(row, ensure_ascii=False, default=str))
+        if len(chunk) >= batch_size:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Comprime al volo in formato gzip un flusso di blocchi di testo"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = header gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_to_file(db_manager, dataset: str, path: str, start_date: str = EXPORT_START, end_date: str = EXPORT_END,
+                   fmt: str = 'csv', compress: bool = False, batch_size: int = 500) -> int:
+    """Scrive un export su file e restituisce i byte scritti"""
+    chunks = iter_export(db_manager, dataset, start_date, end_date, fmt, batch_size)
+    body = gzip_chunks(chunks) if compress else (chunk.encode('utf-8') for chunk in chunks)
+    written = 0
+    with open(path, 'wb') as f:
+        for data in body:
+            f.write(data)
+            written += len(data)
+    return written
@@ -10,8 +10,14 @@ from pathlib import Path
 # Aggiungi il percorso corrente al path Python
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-def force_import():
-    """Forza l'importazione dei file di log presenti nella cartella data"""
+def force_import(workers=None):
+    """Forza l'importazione dei file di log presenti nella cartella data.
+
+    Il parsing usa `workers` processi in parallelo (default: INGEST_WORKERS
+    se impostata, altrimenti tutti i core disponibili).
+    """
+    if workers is None:
+        workers = int(os.getenv('INGEST_WORKERS', os.cpu_count() or 1))
     
     try:
         # Import con gestione errori
@@ -24,7 +30,7 @@ def force_import():
         
         # Inizializza log processor (che inizializzerà anche il database manager)
         print("� Inizializzazione log processor...")
-        log_processor = LogProcessor()
+        log_processor = LogProcessor(start_method='fork')
         
         # Ottieni reference al database manager
         db_manager = log_processor.db_manager
@@ -39,11 +45,14 @@ def force_import():
         
         # Forza processamento di tutti i file
         print("\n🚀 Avvio processamento forzato...")
-        result = log_processor.process_all_files(force=True)
+        with log_processor.ingest_lock():
+            result = log_processor.process_all_files(force=True, workers=workers)
         
         print(f"\n✅ Processamento completato:")
         print(f"   📊 File processati: {result['processed']}")
         print(f"   ❌ Errori: {result['errors']}")
+        if result.get('files_per_second') is not None:
+            print(f"   ⏱️ {result['files_per_second']} file/s con {result['workers']} worker")
         
         if result['errors'] > 0:
             print(f"\n⚠️ Dettagli errori:")
@@ -77,7 +86,12 @@ if __name__ == "__main__":
     print("🎯 SVXLink Log Analyzer - Importazione Forzata")
     print("=" * 50)
     
-    success = force_import()
+    # Opzione --workers N per il numero di processi di parsing
+    workers = None
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+    
+    success = force_import(workers)
     
     print("=" * 50)
     if success:
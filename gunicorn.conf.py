@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Configurazione gunicorn per SVXLink Log Analyzer (modalità produzione)
+Avvio: gunicorn -c gunicorn.conf.py app:app
+
+Ogni worker prepara le proprie risorse dopo il fork (post_fork) e crea
+database e log processor al primo utilizzo; l'elezione del leader garantisce
+che un solo worker esegua scheduler e ingest, avviato quando il worker è
+pronto a servire richieste (post_worker_init). `kill -HUP <master>` ricarica
+i worker senza interrompere le richieste in corso.
+"""
+
+import os
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5000')}"
+
+# Processi worker e thread per worker (worker gthread): ogni stream /api/stream
+# aperto tiene un thread, quindi ai WEB_THREADS delle richieste si aggiungono i
+# thread riservati agli stream (LIVE_MAX_CLIENTS, stesso default di live_feed.py)
+workers = int(os.getenv('WEB_WORKERS', 2))
+threads = int(os.getenv('WEB_THREADS', 4)) + int(os.getenv('LIVE_MAX_CLIENTS', 32))
+worker_class = 'gthread'
+
+# Connessioni persistenti e tempi di arresto
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+
+# Riciclo periodico dei worker (0 = disattivato)
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = os.getenv('WEB_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+accesslog = '-' if os.getenv('WEB_ACCESS_LOG', 'false').lower() in ('1', 'true', 'yes') else None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Inizializza le risorse per-processo nel worker appena creato"""
+    import app
+    app.init_resources()
+
+
+def post_worker_init(worker):
+    """Worker pronto ad accettare richieste: parte l'ingest all'avvio (solo nel leader)"""
+    import app
+    app.mark_server_ready()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Monitor di salute del database per SVXLink Log Analyzer
+Mantiene in cache lo stato di raggiungibilità del database, aggiornato dagli
+esiti reali delle query e da una probe economica eseguita in background al
+massimo ogni N secondi.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# Errori SQLite del database stesso (file, disco, lock), non della singola query
+CONNECTION_ERROR_CODES = ('SQLITE_CANTOPEN', 'SQLITE_IOERR', 'SQLITE_BUSY', 'SQLITE_LOCKED',
+                          'SQLITE_CORRUPT', 'SQLITE_NOTADB', 'SQLITE_FULL')
+# Stessi errori riconosciuti dal messaggio (Python < 3.11 non espone il codice)
+CONNECTION_ERROR_MESSAGES = ('unable to open', 'disk i/o error', 'database is locked', 'database table is locked',
+                             'malformed', 'file is not a database', 'database or disk is full')
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Vero se l'errore indica un database non raggiungibile.
+
+    Errori della query (tabella mancante, SQL non valido, troppe partizioni
+    collegate) o del codice non dicono nulla sulla salute del database.
+    """
+    if not isinstance(error, sqlite3.DatabaseError):
+        return False
+    name = getattr(error, 'sqlite_errorname', None)
+    if name:
+        return name.startswith(CONNECTION_ERROR_CODES)
+    message = str(error).lower()
+    return any(text in message for text in CONNECTION_ERROR_MESSAGES)
+
+
+class HealthMonitor:
+    """Stato di salute in cache di una risorsa (il database SQLite)"""
+
+    def __init__(self, probe: Callable[[], Optional[str]], probe_interval: float = 30.0):
+        # probe: funzione economica che solleva eccezione se la risorsa non risponde
+        # e restituisce il timestamp dell'ultimo ingest (o None)
+        self._probe = probe
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._probe_running = False
+
+        self.available: Optional[bool] = None  # None = stato ancora sconosciuto
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[datetime] = None
+        self.last_failure_at: Optional[datetime] = None
+        self.last_ingest_at: Optional[str] = None
+        self.last_probe_at: Optional[datetime] = None
+        self.last_probe_latency_ms: Optional[float] = None
+        self.probe_count = 0
+        self._last_evidence = 0.0  # monotonic dell'ultimo esito (query reale o probe)
+
+    def record_success(self):
+        """Registra l'esito positivo di una query reale"""
+        with self._lock:
+            self.available = True
+            self.last_success_at = datetime.now()
+            self._last_evidence = time.monotonic()
+
+    def record_failure(self, error: Exception):
+        """Registra il fallimento di una query reale"""
+        with self._lock:
+            self.available = False
+            self.last_error = str(error)
+            self.last_failure_at = datetime.now()
+            self._last_evidence = time.monotonic()
+
+    def record_ingest(self, processed_at: Optional[str] = None):
+        """Registra un ingest completato con successo"""
+        processed_at = processed_at or datetime.now().isoformat()
+        with self._lock:
+            if self.last_ingest_at is None or processed_at > self.last_ingest_at:
+                self.last_ingest_at = processed_at
+        self.record_success()
+
+    def run_probe(self) -> bool:
+        """Esegue subito la probe e aggiorna lo stato"""
+        started = time.perf_counter()
+        try:
+            last_ingest = self._probe()
+        except Exception as e:
+            latency = (time.perf_counter() - started) * 1000
+            self.record_failure(e)
+            print(f"⚠️ Database non funzionante: {e}")
+            ok = False
+        else:
+            latency = (time.perf_counter() - started) * 1000
+            if last_ingest:
+                with self._lock:
+                    if self.last_ingest_at is None or last_ingest > self.last_ingest_at:
+                        self.last_ingest_at = last_ingest
+            self.record_success()
+            ok = True
+
+        with self._lock:
+            self.last_probe_at = datetime.now()
+            self.last_probe_latency_ms = round(latency, 3)
+            self.probe_count += 1
+            self._probe_running = False
+        return ok
+
+    def _probe_in_background(self):
+        with self._lock:
+            if self._probe_running:
+                return
+            self._probe_running = True
+        threading.Thread(target=self.run_probe, name='health-probe', daemon=True).start()
+
+    def is_available(self) -> bool:
+        """Restituisce lo stato in cache.
+
+        Solo la prima volta (stato sconosciuto) la probe è sincrona; in seguito,
+        se non ci sono esiti recenti, viene avviata in background e si risponde
+        subito con l'ultimo stato noto.
+        """
+        if self.available is None:
+            with self._lock:
+                self._probe_running = True
+            return self.run_probe()
+
+        if time.monotonic() - self._last_evidence >= self.probe_interval:
+            self._probe_in_background()
+        return self.available
+
+    def get_status(self) -> Dict:
+        """Stato dettagliato per /health"""
+        with self._lock:
+            return {
+                'available': self.available,
+                'last_success_at': self.last_success_at.isoformat() if self.last_success_at else None,
+                'last_failure_at': self.last_failure_at.isoformat() if self.last_failure_at else None,
+                'last_error': self.last_error,
+                'last_ingest_at': self.last_ingest_at,
+                'probe': {
+                    'interval_seconds': self.probe_interval,
+                    'last_probe_at': self.last_probe_at.isoformat() if self.last_probe_at else None,
+                    'latency_ms': self.last_probe_latency_ms,
+                    'count': self.probe_count
+                }
+            }
+
+
+# Un monitor condiviso per file database, come per la cache delle query
+_monitors: Dict[str, HealthMonitor] = {}
+_monitors_lock = threading.Lock()
+
+def get_health_monitor(db_path: str, probe: Callable[[], Optional[str]]) -> HealthMonitor:
+    """Restituisce il monitor condiviso per il database (intervallo da HEALTH_PROBE_INTERVAL)"""
+    key = os.path.abspath(db_path)
+    with _monitors_lock:
+        if key not in _monitors:
+            interval = float(os.getenv('HEALTH_PROBE_INTERVAL', 30))
+            _monitors[key] = HealthMonitor(probe, interval)
+        return _monitors[key]
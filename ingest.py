@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Ingest in push delle righe di log per SVXLink Log Analyzer
+I ripetitori remoti inviano a POST /api/ingest/lines blocchi di righe grezze
+con l'identificativo del sito e un numero di sequenza crescente. Le righe
+vengono aggiunte al log del giorno del sito (data/<sito>/svxlink_log_<data>.txt,
+vedi sites.py), come se il file fosse stato copiato, e le statistiche del
+giorno vengono aggiornate subito analizzando solo le righe nuove; gli eventi
+delle righe nuove vengono pubblicati sul feed della dashboard (live_feed.py).
+
+Idempotenza: un blocco con sequenza già confermata viene riconosciuto senza
+riscriverlo. I byte scritti da un gruppo non confermato (processo interrotto
+tra scrittura e commit) vengono troncati alla scrittura successiva del file.
+
+Group commit: un unico thread scrittore raccoglie i blocchi delle richieste
+concorrenti e li conferma insieme, con un fsync per file e una transazione
+per gruppo; ogni richiesta attende la conferma del gruppo che la contiene.
+Tra più processi (worker gunicorn) i gruppi sono serializzati da un lock file.
+"""
+
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from columns import columns_path, site_columns_dir, write_columns
+from live_feed import LiveState, counters_update, get_live_feed
+from log_analyzer import EventColumns, SVXLinkLogAnalyzer
+from log_processor import ParsedLog, file_fingerprint, fill_statistics
+from sites import DEFAULT_SITE, is_valid_site, site_dir
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Senza flock (Windows) i gruppi sono serializzati solo all'interno del processo
+    FCNTL_AVAILABLE = False
+
+# Blocchi confermati al massimo da un gruppo (una transazione, un fsync per file)
+INGEST_GROUP_SIZE = int(os.getenv('INGEST_GROUP_SIZE', 256))
+# Attesa massima della conferma per una richiesta, in secondi
+INGEST_COMMIT_TIMEOUT = float(os.getenv('INGEST_COMMIT_TIMEOUT', 30))
+# Dimensione massima di una richiesta dopo la decompressione
+INGEST_MAX_BYTES = int(os.getenv('INGEST_MAX_BYTES', 8 * 1024 * 1024))
+# Giorni (sito, data) i cui eventi restano in memoria per l'analisi incrementale
+INGEST_STREAM_CACHE = int(os.getenv('INGEST_STREAM_CACHE', 64))
+
+# Timestamp SVXLink a inizio riga: "Sun Oct 19 08:02:33 2025: ..."
+LINE_DATE = re.compile(r'^\w{3} (\w{3}) +(\d{1,2}) \d{2}:\d{2}:\d{2} (\d{4}):')
+MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+
+class PayloadTooLarge(ValueError):
+    """Richiesta oltre INGEST_MAX_BYTES"""
+
+
+def line_date(line: str) -> Optional[str]:
+    """Data (YYYY-MM-DD) del timestamp di una riga, None se la riga non ne ha uno"""
+    match = LINE_DATE.match(line)
+    if not match or match.group(1) not in MONTHS:
+        return None
+    return f"{match.group(3)}-{MONTHS[match.group(1)]:02d}-{int(match.group(2)):02d}"
+
+
+def split_by_day(lines: List[str], default_day: str) -> List[Tuple[str, List[str]]]:
+    """Divide le righe per giorno, nell'ordine di arrivo.
+
+    Le righe senza timestamp seguono il giorno della riga precedente
+    (`default_day` per le prime): un blocco a cavallo della mezzanotte
+    finisce nei log dei due giorni.
+    """
+    groups: List[Tuple[str, List[str]]] = []
+    day = default_day
+    for line in lines:
+        day = line_date(line) or day
+        if not groups or groups[-1][0] != day:
+            groups.append((day, []))
+        groups[-1][1].append(line)
+    return groups
+
+
+def decode_body(body: bytes, encoding: Optional[str] = None, limit: int = INGEST_MAX_BYTES) -> bytes:
+    """Decomprime il corpo della richiesta (Content-Encoding gzip o deflate) entro `limit` byte"""
+    encoding = (encoding or 'identity').strip().lower()
+    if len(body) > limit:
+        raise PayloadTooLarge(f"Richiesta oltre {limit} byte")
+    if encoding == 'identity':
+        return body
+    if encoding not in ('gzip', 'x-gzip', 'deflate'):
+        raise ValueError(f"Content-Encoding non supportato: {encoding}")
+    # wbits 32+15: riconosce sia l'intestazione gzip sia quella zlib
+    decompressor = zlib.decompressobj(wbits=47)
+    try:
+        data = decompressor.decompress(body, limit + 1)
+    except zlib.error as e:
+        raise ValueError(f"Corpo compresso non valido: {e}")
+    if len(data) > limit or decompressor.unconsumed_tail:
+        raise PayloadTooLarge(f"Richiesta decompressa oltre {limit} byte")
+    return data
+
+
+def _clean_lines(lines: List[str]) -> List[str]:
+    cleaned = []
+    for item in lines:
+        cleaned.extend(line for line in item.splitlines() if line.strip())
+    return cleaned
+
+
+def _new_batch(site_id, sequence, lines) -> 'LineBatch':
+    site_id = site_id or DEFAULT_SITE
+    if not is_valid_site(site_id):
+        raise ValueError(f"Sito non valido: {site_id}")
+    try:
+        sequence = int(sequence)
+    except (TypeError, ValueError):
+        raise ValueError("Numero di sequenza mancante o non valido")
+    if sequence < 1:
+        raise ValueError("Il numero di sequenza deve essere maggiore di zero")
+    return LineBatch(site_id=site_id, sequence=sequence, lines=_clean_lines(lines))
+
+
+def parse_batches(body: bytes, content_type: str, site_id: Optional[str] = None,
+                  sequence: Optional[str] = None) -> List['LineBatch']:
+    """Blocchi di una richiesta.
+
+    - text/plain: righe del log; sito e sequenza da `site_id` e `sequence`
+    - application/x-ndjson: un blocco per riga,
+      {"site": "monte-cavo", "sequence": 42, "lines": ["...", "..."]}
+    """
+    text = body.decode('utf-8', errors='replace')
+    if content_type in ('application/x-ndjson', 'application/ndjson'):
+        batches = []
+        for number, record in enumerate(text.splitlines(), 1):
+            if not record.strip():
+                continue
+            try:
+                item = json.loads(record)
+            except ValueError:
+                raise ValueError(f"Riga NDJSON {number} non valida")
+            if not isinstance(item, dict):
+                raise ValueError(f"Riga NDJSON {number}: atteso un oggetto")
+            lines = item.get('lines', [])
+            if isinstance(lines, str):
+                lines = [lines]
+            if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+                raise ValueError(f"Riga NDJSON {number}: 'lines' deve essere una lista di stringhe")
+            batches.append(_new_batch(item.get('site', site_id), item.get('sequence'), lines))
+        if not batches:
+            raise ValueError("Nessun blocco nella richiesta")
+        return batches
+    return [_new_batch(site_id, sequence, [text])]
+
+
+@dataclass
+class LineBatch:
+    """Blocco di righe di un sito, confermato dal thread scrittore.
+
+    Con sequenza, il blocco viene scritto solo se segue l'ultima confermata
+    del sito; senza (es. righe dal listener syslog) viene sempre aggiunto e
+    la sequenza confermata del sito non cambia.
+    """
+    site_id: str
+    sequence: Optional[int]
+    lines: List[str]
+    status: str = 'pending'  # pending, committed, duplicate, out_of_order, failed
+    committed_sequence: int = 0
+    error: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def to_dict(self) -> Dict:
+        return {
+            'site': self.site_id,
+            'sequence': self.sequence,
+            'status': self.status,
+            'committed_sequence': self.committed_sequence,
+            'lines': len(self.lines),
+            'error': self.error
+        }
+
+
+@dataclass
+class DayStream:
+    """Eventi del log di un giorno di un sito, aggiornati leggendo solo i byte nuovi"""
+    site_id: str
+    log_date: str
+    path: Path
+    size: int = 0
+    lines: int = 0
+    columns: EventColumns = field(default_factory=EventColumns)
+    live: LiveState = field(default_factory=LiveState)
+
+
+class PushIngest:
+    """Riceve blocchi di righe, li scrive con group commit e aggiorna le statistiche"""
+
+    def __init__(self, processor, group_size: int = INGEST_GROUP_SIZE, stream_cache: int = INGEST_STREAM_CACHE):
+        # Cartella dei log, database e cache a colonne del LogProcessor
+        self.data_dir = Path(processor.data_dir)
+        self.db_manager = processor.db_manager
+        self.columns_dir = processor.columns_dir
+        self.group_size = max(1, group_size)
+        self.stream_cache = max(1, stream_cache)
+        self.lock_path = os.path.join(self.data_dir, 'ingest.lock')
+        self.live_feed = get_live_feed(self.data_dir)
+        # Usati solo dal thread scrittore (l'analyzer ha stato interno)
+        self.analyzer = SVXLinkLogAnalyzer()
+        self._streams: 'OrderedDict[str, DayStream]' = OrderedDict()
+        self._last_day: Dict[str, str] = {}
+        self._queue: 'queue.Queue[LineBatch]' = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {'batches': 0, 'duplicates': 0, 'out_of_order': 0, 'lines': 0, 'groups': 0, 'errors': 0}
+
+    def _ensure_writer(self):
+        # Il thread scrittore viene avviato alla prima richiesta
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name='push-ingest', daemon=True)
+                self._writer.start()
+
+    def submit(self, batches: List[LineBatch], timeout: Optional[float] = INGEST_COMMIT_TIMEOUT) -> List[LineBatch]:
+        """Accoda i blocchi e attende la conferma dei gruppi che li contengono (timeout None: senza limite)"""
+        self._ensure_writer()
+        for batch in batches:
+            self._queue.put(batch)
+        for batch in batches:
+            if not batch.done.wait(timeout):
+                raise TimeoutError(f"Blocco {batch.site_id}#{batch.sequence} non confermato entro {timeout}s")
+        return batches
+
+    def committed_sequences(self) -> Dict[str, int]:
+        """Ultima sequenza confermata per sito: da qui riprende un mittente riavviato"""
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.execute("SELECT site_id, sequence FROM ingest_streams ORDER BY site_id")
+            return {row['site_id']: row['sequence'] for row in cursor.fetchall()}
+
+    def get_stats(self) -> Dict:
+        """Contatori per il monitoraggio"""
+        stats = dict(self.stats)
+        stats['queued'] = self._queue.qsize()
+        stats['streams'] = len(self._streams)
+        stats['avg_group_size'] = round(stats['batches'] / stats['groups'], 2) if stats['groups'] else 0.0
+        return stats
+
+    def log_path(self, site_id: str, log_date: str) -> Path:
+        """File log di un giorno di un sito, con il nome riconosciuto dall'ingest dei file"""
+        return Path(os.path.abspath(site_dir(self.data_dir, site_id) / f"svxlink_log_{log_date}.txt"))
+
+    def _writer_loop(self):
+        while True:
+            # Un gruppo: il primo blocco in attesa e quelli arrivati nel frattempo
+            group = [self._queue.get()]
+            while len(group) < self.group_size:
+                try:
+                    group.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._process_lock():
+                    touched = self._append(group)
+                    self._update_statistics(touched)
+            except Exception as e:
+                print(f"❌ Errore ingest in push: {e}")
+                self.stats['errors'] += 1
+                for batch in group:
+                    if batch.status == 'pending':
+                        batch.status = 'failed'
+                        batch.error = str(e)
+            finally:
+                for batch in group:
+                    batch.done.set()
+
+    @contextmanager
+    def _process_lock(self):
+        # Serializza i gruppi dei diversi processi, dalla scrittura al salvataggio delle statistiche
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _append(self, group: List[LineBatch]) -> 'OrderedDict[Path, Tuple[str, str, int]]':
+        """Scrive le righe dei blocchi nuovi e conferma le sequenze in una transazione.
+
+        Restituisce i file scritti con sito, giorno e dimensione prima della
+        scrittura. In caso di errore i file
+        vengono riportati alla dimensione precedente e nessuna sequenza avanza.
+        """
+        conn = sqlite3.connect(self.db_manager.db_path, timeout=30, isolation_level=None)
+        extended: Dict[Path, int] = {}
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            sites = sorted({batch.site_id for batch in group})
+            committed = dict(conn.execute(
+                f"SELECT site_id, sequence FROM ingest_streams WHERE site_id IN ({','.join('?' * len(sites))})",
+                sites).fetchall())
+            last_day = dict(self._last_day)
+            advanced = set()
+            decisions = []
+            appends: 'OrderedDict[Path, Tuple[str, str, List[str]]]' = OrderedDict()
+            for batch in group:
+                if batch.sequence is not None:
+                    # Sequenza già confermata (reinvio dopo un timeout): nessuna scrittura
+                    if batch.sequence <= committed.get(batch.site_id, 0):
+                        decisions.append((batch, 'duplicate'))
+                        continue
+                    # Buco o blocco arrivato prima del precedente: il mittente riprende dalla successiva
+                    if batch.sequence != committed.get(batch.site_id, 0) + 1:
+                        decisions.append((batch, 'out_of_order'))
+                        continue
+                    committed[batch.site_id] = batch.sequence
+                    advanced.add(batch.site_id)
+                decisions.append((batch, 'committed'))
+                default_day = last_day.get(batch.site_id) or date.today().isoformat()
+                for day, lines in split_by_day(batch.lines, default_day):
+                    path = self.log_path(batch.site_id, day)
+                    appends.setdefault(path, (batch.site_id, day, []))[2].extend(lines)
+                    last_day[batch.site_id] = day
+
+            for path, (site_id, day, lines) in appends.items():
+                row = conn.execute("SELECT size FROM ingest_files WHERE path = ?", (str(path),)).fetchone()
+                extended[path], size = self._append_lines(path, lines, row[0] if row else None)
+                conn.execute("INSERT OR REPLACE INTO ingest_files (path, site_id, log_date, size) VALUES (?, ?, ?, ?)",
+                             (str(path), site_id, day, size))
+            for site_id in advanced:
+                conn.execute("INSERT OR REPLACE INTO ingest_streams (site_id, sequence, updated_at) "
+                             "VALUES (?, ?, CURRENT_TIMESTAMP)", (site_id, committed[site_id]))
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for path, size in extended.items():
+                try:
+                    os.truncate(path, size)
+                except OSError:
+                    pass
+            raise
+        finally:
+            conn.close()
+
+        self._last_day = last_day
+        for batch, status in decisions:
+            batch.status = status
+            batch.committed_sequence = committed.get(batch.site_id, 0)
+            if status == 'committed':
+                self.stats['batches'] += 1
+                self.stats['lines'] += len(batch.lines)
+            elif status == 'out_of_order':
+                batch.error = f"Sequenza {batch.sequence} fuori ordine: attesa {batch.committed_sequence + 1}"
+                self.stats['out_of_order'] += 1
+            else:
+                self.stats['duplicates'] += 1
+        self.stats['groups'] += 1
+        return OrderedDict((path, (site_id, day, extended[path])) for path, (site_id, day, _) in appends.items())
+
+    @staticmethod
+    def _append_lines(path: Path, lines: List[str], committed_size: Optional[int]) -> Tuple[int, int]:
+        """Aggiunge le righe al file con fsync; restituisce la dimensione prima e dopo"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            if committed_size is not None and size > committed_size:
+                # Byte di un gruppo non confermato: il mittente li reinvierà
+                f.truncate(committed_size)
+                size = committed_size
+            data = '\n'.join(lines) + '\n'
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b'\n':
+                    data = '\n' + data
+            f.write(data.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+            return size, f.tell()
+
+    def _stream(self, path: Path, site_id: str, log_date: str) -> DayStream:
+        key = str(path)
+        stream = self._streams.pop(key, None) or DayStream(site_id=site_id, log_date=log_date, path=path)
+        self._streams[key] = stream
+        while len(self._streams) > self.stream_cache:
+            self._streams.popitem(last=False)
+        return stream
+
+    def _follow(self, stream: DayStream, size: int) -> EventColumns:
+        """Aggiunge agli eventi del giorno le righe complete scritte dopo `stream.size`; restituisce i nuovi"""
+        if size < stream.size:
+            # File sostituito o troncato dall'esterno: si rilegge da capo
+            stream.size, stream.lines, stream.columns, stream.live = 0, 0, EventColumns(), LiveState()
+        if size == stream.size:
+            return EventColumns()
+        with open(stream.path, 'rb') as f:
+            f.seek(stream.size)
+            data = f.read(size - stream.size)
+        end = data.rfind(b'\n') + 1
+        content = data[:end].decode('utf-8', errors='ignore')
+        columns = self.analyzer.extract_events(content)
+        stream.columns.extend(columns)
+        stream.size += end
+        stream.lines += content.count('\n')
+        return columns
+
+    def _update_statistics(self, touched: 'OrderedDict[Path, Tuple[str, str, int]]'):
+        """Ricalcola e salva le statistiche dei giorni scritti dal gruppo e pubblica gli aggiornamenti.
+
+        Le righe sono già confermate: se il salvataggio fallisce il file resta
+        "da importare" e l'ingest dei file lo rielabora.
+        """
+        batch = []
+        fingerprints = []
+        updates = []
+        for path, (site_id, day, start) in touched.items():
+            stream = self._stream(path, site_id, day)
+            parsed = ParsedLog(filename=path.name, log_date=day, fingerprint=file_fingerprint(path, day))
+            # Le righe precedenti al gruppo (giorno non ancora in memoria) aggiornano solo lo stato del feed
+            stream.live.apply(self._follow(stream, start), site_id)
+            updates.extend(stream.live.apply(self._follow(stream, parsed.fingerprint.size), site_id))
+            parsed.lines, parsed.bytes = stream.lines, stream.size
+            fill_statistics(parsed, self.analyzer.analyze_events(stream.columns), site_id)
+            batch.append((parsed.daily, parsed.ctcss, parsed.tg, parsed.disconnections))
+            fingerprints.append(parsed.fingerprint)
+            updates.append(counters_update(parsed))
+            if self.columns_dir:
+                try:
+                    write_columns(columns_path(site_columns_dir(self.columns_dir, site_id), day, path.name,
+                                               parsed.fingerprint.size, parsed.fingerprint.content_hash),
+                                  stream.columns, stream.lines, stream.size)
+                except OSError as e:
+                    print(f"⚠️ Cache colonne non salvata per {path.name}: {e}")
+        if batch and not self.db_manager.save_log_batch(batch, fingerprints):
+            print(f"⚠️ Statistiche dell'ingest in push non salvate: {len(batch)} giorni da rielaborare")
+            updates = [update for update in updates if update['type'] != 'counters']
+        self.live_feed.publish(updates)
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Coda di job in background per SVXLink Log Analyzer
+Esegue il processamento dei file log fuori dalla richiesta HTTP, su un pool
+limitato di worker, con avanzamento per file, throughput ed errori.
+
+Lo stato dei job è salvato in un database SQLite accanto a quello delle
+statistiche (data/svxlink_stats.jobs.db), condiviso dai worker gunicorn: lo
+stato di un job è leggibile da qualunque worker e le richieste duplicate
+vengono unite anche se arrivano a processi diversi. Il job viene eseguito
+dal processo che lo ha creato.
+"""
+
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Priorità: numeri più bassi vengono eseguiti prima
+PRIORITY_RECENT = 0    # job che include i file di oggi o di ieri
+PRIORITY_BACKFILL = 1  # solo file storici
+
+
+@dataclass
+class Job:
+    """Job di processamento file log"""
+    id: str
+    kind: str
+    priority: int = PRIORITY_BACKFILL
+    status: str = 'queued'  # queued, running, completed, failed
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # File del job: solo nel processo che lo esegue, negli altri resta il totale
+    files: List[Path] = field(default_factory=list)
+    total_files: int = 0
+    processed_files: int = 0
+    failed_files: int = 0
+    lines_processed: int = 0
+    bytes_processed: int = 0
+    current_file: Optional[str] = None
+    errors: List[Dict] = field(default_factory=list)
+    message: Optional[str] = None
+    # Richieste unite mentre il job è in esecuzione: i file vengono riletti a fine giro
+    rescan: bool = False
+    # Job in chiusura: le nuove richieste creano un altro job
+    closed: bool = False
+    # Processo che esegue il job
+    owner_host: str = field(default_factory=socket.gethostname)
+    owner_pid: int = field(default_factory=os.getpid)
+
+    @property
+    def done_files(self) -> int:
+        return self.processed_files + self.failed_files
+
+    def elapsed_seconds(self) -> float:
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or datetime.now()
+        return max((end - self.started_at).total_seconds(), 0.0)
+
+    def to_dict(self) -> Dict:
+        elapsed = self.elapsed_seconds()
+        total = self.total_files
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'priority': 'recent' if self.priority == PRIORITY_RECENT else 'backfill',
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'progress': {
+                'total_files': total,
+                'done_files': self.done_files,
+                'processed_files': self.processed_files,
+                'failed_files': self.failed_files,
+                'percent': round(self.done_files / total * 100, 1) if total else 100.0,
+                'current_file': self.current_file
+            },
+            'throughput': {
+                'elapsed_seconds': round(elapsed, 3),
+                'files_per_second': round(self.done_files / elapsed, 2) if elapsed else 0.0,
+                'lines_per_second': round(self.lines_processed / elapsed, 1) if elapsed else 0.0,
+                'lines_processed': self.lines_processed,
+                'bytes_processed': self.bytes_processed
+            },
+            'errors': self.errors,
+            'message': self.message,
+            # Compatibilità con la risposta sincrona precedente
+            'processed': self.processed_files,
+            'error_count': self.failed_files
+        }
+
+
+def order_files_by_priority(files: List[Path], extract_date: Callable[[str], Optional[str]],
+                            today: Optional[date] = None) -> Tuple[List[Path], int]:
+    """Ordina i file: oggi e ieri per primi, poi il backfill dal più recente.
+
+    Restituisce la lista ordinata e la priorità del job che li contiene.
+    """
+    today = today or date.today()
+    recent_dates = {today.isoformat(), (today - timedelta(days=1)).isoformat()}
+
+    def sort_key(path: Path):
+        file_date = extract_date(path.name) or ''
+        return (0 if file_date in recent_dates else 1, _reverse_text(file_date), path.name)
+
+    ordered = sorted(files, key=sort_key)
+    has_recent = any((extract_date(p.name) or '') in recent_dates for p in files)
+    return ordered, PRIORITY_RECENT if has_recent else PRIORITY_BACKFILL
+
+
+def _reverse_text(value: str) -> Tuple[int, ...]:
+    # Chiave per ordinare le date ISO dalla più recente
+    return tuple(-ord(c) for c in value)
+
+
+def jobs_db_path(db_path: str) -> str:
+    """Database dei job: data/svxlink_stats.db -> data/svxlink_stats.jobs.db"""
+    return os.path.splitext(db_path)[0] + '.jobs.db'
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class JobStore:
+    """Stato dei job in SQLite, condiviso tra i processi.
+
+    Creazione e unione delle richieste duplicate avvengono in una transazione
+    BEGIN IMMEDIATE, quindi valgono tra worker diversi. Il file è separato dal
+    database delle statistiche: gli aggiornamenti dell'avanzamento non cambiano
+    data_file_signature() e non invalidano cache delle query ed ETag.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS processing_jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    total_files INTEGER DEFAULT 0,
+                    processed_files INTEGER DEFAULT 0,
+                    failed_files INTEGER DEFAULT 0,
+                    lines_processed INTEGER DEFAULT 0,
+                    bytes_processed INTEGER DEFAULT 0,
+                    current_file TEXT,
+                    errors TEXT DEFAULT '[]',
+                    message TEXT,
+                    rescan INTEGER DEFAULT 0,
+                    closed INTEGER DEFAULT 0,
+                    owner_host TEXT NOT NULL,
+                    owner_pid INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_processing_jobs_kind ON processing_jobs(kind, status)")
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        return Job(
+            id=row['id'], kind=row['kind'], priority=row['priority'], status=row['status'],
+            created_at=_datetime(row['created_at']), started_at=_datetime(row['started_at']),
+            finished_at=_datetime(row['finished_at']), total_files=row['total_files'],
+            processed_files=row['processed_files'], failed_files=row['failed_files'],
+            lines_processed=row['lines_processed'], bytes_processed=row['bytes_processed'],
+            current_file=row['current_file'], errors=json.loads(row['errors'] or '[]'),
+            message=row['message'], rescan=bool(row['rescan']), closed=bool(row['closed']),
+            owner_host=row['owner_host'], owner_pid=row['owner_pid']
+        )
+
+    def _fail_orphans(self, conn: sqlite3.Connection):
+        # Job di un worker terminato (riavvio, crash): non finirebbero mai e bloccherebbero le nuove richieste
+        host = socket.gethostname()
+        rows = conn.execute("SELECT id, owner_pid FROM processing_jobs "
+                            "WHERE status IN ('queued', 'running') AND owner_host = ?", (host,)).fetchall()
+        for row in rows:
+            if not _process_alive(row['owner_pid']):
+                conn.execute("UPDATE processing_jobs SET status = 'failed', closed = 1, finished_at = ?, "
+                             "message = 'Processo del job terminato' WHERE id = ?",
+                             (_timestamp(datetime.now()), row['id']))
+
+    def claim(self, job: Job, history_size: int) -> Tuple[Job, bool]:
+        """Registra il job, oppure restituisce quello dello stesso tipo a cui la richiesta viene unita.
+
+        Un job in coda assorbe la richiesta; uno in esecuzione viene segnato
+        per rileggere i file a fine giro. Restituisce (job, creato).
+        """
+        with self._transaction() as conn:
+            self._fail_orphans(conn)
+            row = conn.execute("SELECT * FROM processing_jobs WHERE kind = ? AND status = 'queued' "
+                               "ORDER BY created_at LIMIT 1", (job.kind,)).fetchone()
+            if row is not None:
+                return self._job(row), False
+            row = conn.execute("SELECT * FROM processing_jobs WHERE kind = ? AND status = 'running' AND closed = 0 "
+                               "ORDER BY created_at LIMIT 1", (job.kind,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE processing_jobs SET rescan = 1 WHERE id = ?", (row['id'],))
+                return self._job(row), False
+
+            conn.execute("""
+                INSERT INTO processing_jobs (id, kind, priority, status, created_at, total_files,
+                                             owner_host, owner_pid)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (job.id, job.kind, job.priority, job.status, _timestamp(job.created_at), job.total_files,
+                  job.owner_host, job.owner_pid))
+            # Storico limitato: restano gli ultimi job terminati
+            conn.execute("""
+                DELETE FROM processing_jobs WHERE status IN ('completed', 'failed') AND id NOT IN (
+                    SELECT id FROM processing_jobs ORDER BY created_at DESC LIMIT ?
+                )
+            """, (history_size,))
+            return job, True
+
+    def save(self, job: Job):
+        """Aggiorna stato e avanzamento (rescan resta gestito da claim e finish_round)"""
+        with self._transaction() as conn:
+            conn.execute("""
+                UPDATE processing_jobs SET status = ?, started_at = ?, finished_at = ?, total_files = ?,
+                    processed_files = ?, failed_files = ?, lines_processed = ?, bytes_processed = ?,
+                    current_file = ?, errors = ?, message = ?, closed = MAX(closed, ?)
+                WHERE id = ?
+            """, (job.status, _timestamp(job.started_at), _timestamp(job.finished_at), job.total_files,
+                  job.processed_files, job.failed_files, job.lines_processed, job.bytes_processed,
+                  job.current_file, json.dumps(job.errors), job.message, int(job.closed), job.id))
+
+    def finish_round(self, job_id: str) -> bool:
+        """Fine di un giro sui file: True se nel frattempo sono arrivate richieste, altrimenti chiude il job"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT rescan FROM processing_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row['rescan']:
+                conn.execute("UPDATE processing_jobs SET rescan = 0 WHERE id = ?", (job_id,))
+                return True
+            conn.execute("UPDATE processing_jobs SET closed = 1 WHERE id = ?", (job_id,))
+            return False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM processing_jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._job(row) if row is not None else None
+        finally:
+            conn.close()
+
+    def list(self, limit: int) -> List[Job]:
+        """Job più recenti per primi"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT * FROM processing_jobs ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                                (limit,)).fetchall()
+            return [self._job(row) for row in rows]
+        finally:
+            conn.close()
+
+
+class JobManager:
+    """Gestore dei job con pool limitato di worker e coda a priorità.
+
+    Lo stato dei job è in JobStore (condiviso tra i processi); coda e worker
+    sono del processo, che esegue i job creati dalle proprie richieste.
+    """
+
+    def __init__(self, processor_factory: Callable[[], object], store_path: str, max_workers: int = 2,
+                 history_size: int = 50, finalizers: Optional[Dict[str, Callable]] = None):
+        # processor_factory crea un LogProcessor per ogni worker (l'analyzer ha stato interno)
+        self.processor_factory = processor_factory
+        self.store = JobStore(store_path)
+        self.max_workers = max(1, max_workers)
+        self.history_size = history_size
+        # Azioni eseguite a fine job per tipo (es. manutenzione dopo force-process)
+        self.finalizers = finalizers or {}
+        self._queue: 'queue.PriorityQueue[Tuple[int, int, str]]' = queue.PriorityQueue()
+        # Job di questo processo in coda, con la funzione che rilegge i file
+        self._pending: Dict[str, Tuple[Job, Callable, Callable]] = {}
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._workers: List[threading.Thread] = []
+        self._local = threading.local()
+
+    def _ensure_workers(self):
+        # I worker vengono avviati alla prima richiesta
+        if self._workers:
+            return
+        for index in range(self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f'job-worker-{index}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _processor(self):
+        if getattr(self._local, 'processor', None) is None:
+            self._local.processor = self.processor_factory()
+        return self._local.processor
+
+    def submit(self, kind: str, list_files: Callable[[], List[Path]],
+               extract_date: Callable[[str], Optional[str]]) -> Tuple[Job, bool]:
+        """Accoda un job. Restituisce (job, creato).
+
+        Se un job dello stesso tipo è in coda o in esecuzione, anche in un
+        altro worker, la richiesta viene unita a quello (creato=False). La
+        lista dei file viene riletta all'avvio del job e, se nel frattempo sono
+        arrivate richieste, di nuovo a fine giro: anche i file arrivati dopo
+        l'accodamento vengono inclusi.
+        """
+        # Scansione e query del registro fuori dal lock: get() e gli aggiornamenti dei worker non attendono
+        ordered, priority = order_files_by_priority(list_files(), extract_date)
+        job = Job(id=uuid.uuid4().hex[:12], kind=kind, priority=priority, files=ordered, total_files=len(ordered))
+        job, created = self.store.claim(job, self.history_size)
+        if created:
+            with self._lock:
+                self._pending[job.id] = (job, list_files, extract_date)
+                self._sequence += 1
+                self._queue.put((priority, self._sequence, job.id))
+                self._ensure_workers()
+        return job, created
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def list_jobs(self) -> List[Dict]:
+        return [job.to_dict() for job in self.store.list(self.history_size)]
+
+    def _worker_loop(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            with self._lock:
+                job, list_files, extract_date = self._pending.pop(job_id)
+            self._run_job(job, list_files, extract_date)
+            self._queue.task_done()
+
+    def _run_job(self, job: Job, list_files: Callable[[], List[Path]], extract_date: Callable[[str], Optional[str]]):
+        job.status = 'running'
+        job.started_at = datetime.now()
+        try:
+            self.store.save(job)
+            processor = self._processor()
+            # Un solo ingest dei file alla volta, anche con scheduler e watcher (vedi log_processor.py)
+            lock = getattr(processor, 'ingest_lock', None)
+            with lock() if lock else nullcontext():
+                files, _ = order_files_by_priority(list_files(), extract_date)
+                job.files = list(files)
+                while True:
+                    job.total_files = len(job.files)
+                    self._process_files(job, processor, files)
+                    if not self.store.finish_round(job.id):
+                        break
+                    files, _ = order_files_by_priority(list_files(), extract_date)
+                    job.files.extend(files)
+                job.current_file = None
+
+                finalizer = self.finalizers.get(job.kind)
+                if finalizer:
+                    finalizer({'processed': job.processed_files, 'errors': job.failed_files})
+
+            job.status = 'completed'
+            job.message = f"Processati {job.processed_files} file, {job.failed_files} errori"
+        except Exception as e:
+            job.status = 'failed'
+            job.message = str(e)
+            job.errors.append({'file': job.current_file, 'error': str(e)})
+        finally:
+            job.closed = True
+            job.finished_at = datetime.now()
+            self.store.save(job)
+
+    def _process_files(self, job: Job, processor, files: List[Path]):
+        for file_path in files:
+            job.current_file = file_path.name
+            self.store.save(job)
+            ok = processor.process_log_file(file_path)
+            file_stats = getattr(processor, 'last_file_stats', {}) or {}
+            job.lines_processed += file_stats.get('lines', 0)
+            job.bytes_processed += file_stats.get('bytes', 0)
+            if ok:
+                job.processed_files += 1
+            else:
+                job.failed_files += 1
+                job.errors.append({
+                    'file': file_path.name,
+                    'error': file_stats.get('error') or 'errore di processamento'
+                })
+
+
+def job_workers_from_env() -> int:
+    """Numero di worker del pool (JOB_WORKERS, default 2)"""
+    return int(os.getenv('JOB_WORKERS', 2))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Elezione del leader tra processi per SVXLink Log Analyzer
+Con più worker web solo un processo deve eseguire scheduler, watcher e
+ingest all'avvio. Il leader è il processo che tiene il lock esclusivo su un
+file: il kernel lo rilascia alla terminazione del processo, e uno dei
+processi in attesa subentra immediatamente.
+"""
+
+import os
+import socket
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Senza flock (Windows) ogni processo si considera leader
+    FCNTL_AVAILABLE = False
+
+
+class LeaderElection:
+    """Lock file esclusivo con subentro automatico"""
+
+    def __init__(self, lock_path: str, on_elected: Callable[[], None]):
+        self.lock_path = lock_path
+        self.on_elected = on_elected
+        self.is_leader = False
+        self.elected_at: Optional[datetime] = None
+        self._file = None
+        self._waiter: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        """Tenta di diventare leader; altrimenti attende in background il subentro.
+
+        Restituisce True se il processo è diventato subito leader.
+        """
+        if not FCNTL_AVAILABLE:
+            self._become_leader()
+            return True
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        self._file = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Attesa bloccante in un thread: nessun polling, subentro appena il leader termina
+            self._waiter = threading.Thread(target=self._wait_for_lock, name='leader-election', daemon=True)
+            self._waiter.start()
+            return False
+        self._become_leader()
+        return True
+
+    def _wait_for_lock(self):
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except (OSError, ValueError):
+            # File chiuso da release(): il processo sta terminando
+            return
+        self._become_leader()
+
+    def _become_leader(self):
+        with self._lock:
+            self.is_leader = True
+            self.elected_at = datetime.now()
+            if self._file is not None:
+                # Identità del leader per lo stato mostrato dai follower
+                self._file.seek(0)
+                self._file.truncate()
+                self._file.write(f"{os.getpid()} {socket.gethostname()} {self.elected_at.isoformat()}\n")
+                self._file.flush()
+        self.on_elected()
+
+    def release(self):
+        """Rilascia il lock (o smette di attendere)"""
+        with self._lock:
+            self.is_leader = False
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _read_leader(self) -> Optional[Dict]:
+        try:
+            with open(self.lock_path) as f:
+                pid, host, elected_at = f.read().split()
+            return {'pid': int(pid), 'host': host, 'elected_at': elected_at}
+        except (OSError, ValueError):
+            return None
+
+    def get_status(self) -> Dict:
+        """Stato dell'elezione per le API"""
+        return {
+            'role': 'leader' if self.is_leader else 'follower',
+            'pid': os.getpid(),
+            'elected_at': self.elected_at.isoformat() if self.elected_at else None,
+            'lock_file': self.lock_path if FCNTL_AVAILABLE else None,
+            'leader': self._read_leader() if FCNTL_AVAILABLE else None
+        }
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Feed in tempo reale della dashboard (Server-Sent Events su GET /api/stream)
+Chi importa nuovi eventi (ingest in push, listener syslog, ingest dei file)
+pubblica aggiornamenti compatti: trasmettitore acceso/spento, cambio di TG,
+inizio e fine di una disconnessione, contatori del giorno. Gli aggiornamenti
+vengono aggiunti a un file condiviso nella cartella dei log
+(live_feed.ndjson), così arrivano ai client di tutti i worker gunicorn
+qualunque processo li abbia prodotti.
+
+In ogni processo un solo thread segue il file e distribuisce gli
+aggiornamenti alle code dei client. Le code sono limitate: un client troppo
+lento perde gli aggiornamenti e riceve 'resync' (ricarica le statistiche).
+Con molte dashboard aperte il costo resta una lettura del file per processo,
+non un ciclo di query per client.
+"""
+
+import json
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from log_analyzer import (EPOCH, EVENT_DISCONNECTED, EVENT_NODE_JOINED, EVENT_NODE_LEFT, EVENT_TG, EVENT_TX_OFF,
+                          EVENT_TX_ON, EventColumns)
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Senza flock (Windows) le scritture di processi diversi non sono serializzate
+    FCNTL_AVAILABLE = False
+
+LIVE_FEED_FILE = 'live_feed.ndjson'
+# Aggiornamenti in attesa per client: oltre il limite il client riceve 'resync'
+LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', 256))
+# Client dello stream per processo: ognuno occupa un thread del worker gthread, che
+# gunicorn.conf.py aggiunge a quelli delle altre richieste (WEB_THREADS)
+LIVE_MAX_CLIENTS = int(os.getenv('LIVE_MAX_CLIENTS', 32))
+# Secondi senza aggiornamenti dopo cui viene inviato un heartbeat
+LIVE_HEARTBEAT = float(os.getenv('LIVE_HEARTBEAT', 15))
+# Controllo del file per gli aggiornamenti pubblicati da altri processi, in secondi
+LIVE_POLL_INTERVAL = float(os.getenv('LIVE_POLL_INTERVAL', 0.5))
+# Dimensione oltre cui il file viene ruotato in live_feed.ndjson.1
+LIVE_FEED_MAX_BYTES = int(os.getenv('LIVE_FEED_MAX_BYTES', 1024 * 1024))
+# Aggiornamenti inviati al client in un'unica scrittura
+LIVE_SEND_BATCH = 64
+
+
+class TooManyClients(RuntimeError):
+    """Raggiunto il numero massimo di client dello stream nel processo"""
+
+
+def _time(epoch: int) -> str:
+    return (EPOCH + timedelta(seconds=epoch)).isoformat()
+
+
+@dataclass
+class LiveState:
+    """Stato del ripetitore ricostruito dagli eventi di un giorno, per pubblicare solo i cambiamenti"""
+    tx_on: Optional[int] = None         # epoch dell'accensione in corso
+    tg: int = 0                         # TG selezionato (0 = nessuno)
+    disconnected: Optional[int] = None  # epoch d'inizio della disconnessione in corso
+
+    def apply(self, columns: EventColumns, site_id: str) -> List[Dict]:
+        """Aggiorna lo stato con gli eventi di `columns` e restituisce gli aggiornamenti da pubblicare"""
+        updates = []
+        for kind, epoch, tg_id in zip(columns.kind, columns.epoch, columns.tg):
+            if kind == EVENT_TX_ON:
+                self.tx_on = epoch
+                updates.append({'type': 'tx', 'site': site_id, 'time': _time(epoch), 'on': True})
+            elif kind == EVENT_TX_OFF:
+                update = {'type': 'tx', 'site': site_id, 'time': _time(epoch), 'on': False}
+                if self.tx_on is not None:
+                    update['duration'] = epoch - self.tx_on
+                self.tx_on = None
+                updates.append(update)
+            elif kind == EVENT_TG and tg_id != self.tg:
+                self.tg = tg_id
+                updates.append({'type': 'tg', 'site': site_id, 'time': _time(epoch), 'tg': tg_id})
+            elif kind == EVENT_DISCONNECTED and self.disconnected is None:
+                self.disconnected = epoch
+                updates.append({'type': 'disconnection', 'site': site_id, 'time': _time(epoch), 'active': True})
+            elif kind in (EVENT_NODE_JOINED, EVENT_NODE_LEFT) and self.disconnected is not None:
+                # Come in analyze_events: un evento dei nodi chiude la disconnessione
+                updates.append({'type': 'disconnection', 'site': site_id, 'time': _time(epoch), 'active': False,
+                                'duration': epoch - self.disconnected})
+                self.disconnected = None
+        return updates
+
+
+def counters_update(parsed) -> Dict:
+    """Contatori del giorno di un log appena salvato (ParsedLog di log_processor.py)"""
+    daily = parsed.daily
+    return {
+        'type': 'counters',
+        'site': daily.site_id,
+        'date': daily.date,
+        'transmissions': daily.total_transmissions,
+        'transmission_time': daily.total_transmission_time,
+        'qso': daily.total_qso,
+        'qso_time': daily.total_qso_time,
+        'disconnections': len(parsed.disconnections)
+    }
+
+
+def sse_message(update: Dict) -> str:
+    """Aggiornamento nel formato text/event-stream (il tipo diventa il nome dell'evento)"""
+    return f"event: {update.get('type', 'message')}\ndata: {json.dumps(update, separators=(',', ':'))}\n\n"
+
+
+class LiveClient:
+    """Client dello stream: coda limitata, filtrata per sito"""
+
+    def __init__(self, site: Optional[str] = None, queue_size: int = LIVE_QUEUE_SIZE):
+        self.site = site
+        self.queue: 'queue.Queue[Dict]' = queue.Queue(maxsize=max(1, queue_size))
+        self.lagged = False
+        self.dropped = 0
+
+    def put(self, update: Dict):
+        if self.site is not None and update.get('site') != self.site:
+            return
+        try:
+            self.queue.put_nowait(update)
+        except queue.Full:
+            # Il client non tiene il passo: gli aggiornamenti persi sono sostituiti da 'resync'
+            self.lagged = True
+            self.dropped += 1
+
+
+class LiveFeed:
+    """Pubblicazione degli aggiornamenti sul file condiviso e distribuzione ai client del processo"""
+
+    def __init__(self, data_dir: Path, queue_size: int = LIVE_QUEUE_SIZE, max_clients: int = LIVE_MAX_CLIENTS,
+                 poll_interval: float = LIVE_POLL_INTERVAL, max_bytes: int = LIVE_FEED_MAX_BYTES):
+        self.path = Path(os.path.abspath(data_dir)) / LIVE_FEED_FILE
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._clients: List[LiveClient] = []
+        self._follower: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.stats = {'published': 0, 'delivered': 0, 'dropped': 0, 'rotations': 0, 'errors': 0}
+
+    def publish(self, updates: List[Dict]):
+        """Aggiunge gli aggiornamenti al file condiviso (una scrittura, serializzata tra processi)"""
+        if not updates:
+            return
+        data = ''.join(json.dumps(update, separators=(',', ':')) + '\n' for update in updates).encode('utf-8')
+        try:
+            self._write(data)
+        except OSError as e:
+            # Il feed è accessorio: un errore non deve far fallire l'ingest
+            print(f"⚠️ Feed live non aggiornato: {e}")
+            self.stats['errors'] += 1
+            return
+        self.stats['published'] += len(updates)
+        self._wake.set()
+
+    def _write(self, data: bytes):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                stat = os.fstat(fd)
+                try:
+                    current = os.stat(self.path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current != stat.st_ino:
+                    # Ruotato da un altro processo mentre si attendeva il lock: si riapre
+                    continue
+                if stat.st_size and stat.st_size + len(data) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                    self.stats['rotations'] += 1
+                    continue
+                os.write(fd, data)
+                return
+            finally:
+                # La chiusura rilascia anche il lock
+                os.close(fd)
+
+    def subscribe(self, site: Optional[str] = None) -> LiveClient:
+        """Registra un client (filtrato per sito) e avvia il thread che segue il file"""
+        client = LiveClient(site, self.queue_size)
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                raise TooManyClients(f"Troppi client dello stream ({self.max_clients})")
+            self._clients.append(client)
+            self._ensure_follower()
+        return client
+
+    def _ensure_follower(self):
+        # Chiamato con self._lock acquisito
+        if self._follower is None or not self._follower.is_alive():
+            # Si parte dalla fine del file: i client ricevono solo gli aggiornamenti successivi
+            self._follower = threading.Thread(target=self._follow_loop, args=(self._open(at_end=True),),
+                                              name='live-feed', daemon=True)
+            self._follower.start()
+
+    def unsubscribe(self, client: LiveClient):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+                self.stats['dropped'] += client.dropped
+        self._wake.set()
+
+    def stream(self, client: LiveClient, heartbeat: float = LIVE_HEARTBEAT) -> Iterator[str]:
+        """Messaggi SSE per il client; termina (e lo rimuove) alla chiusura della connessione.
+
+        L'heartbeat fa anche accorgere il server dei client disconnessi, che
+        altrimenti verrebbero rilevati solo al primo aggiornamento.
+        """
+        try:
+            yield f"retry: 5000\n{sse_message({'type': 'hello', 'site': client.site, 'heartbeat': heartbeat})}"
+            while True:
+                if client.lagged:
+                    while not client.queue.empty():
+                        client.queue.get_nowait()
+                    client.lagged = False
+                    yield sse_message({'type': 'resync', 'site': client.site})
+                    continue
+                try:
+                    updates = [client.queue.get(timeout=heartbeat)]
+                except queue.Empty:
+                    # Il thread del feed viene riavviato se si è fermato per un errore
+                    with self._lock:
+                        self._ensure_follower()
+                    yield ": heartbeat\n\n"
+                    continue
+                while len(updates) < LIVE_SEND_BATCH and not client.queue.empty():
+                    updates.append(client.queue.get_nowait())
+                self.stats['delivered'] += len(updates)
+                yield ''.join(sse_message(update) for update in updates)
+        finally:
+            self.unsubscribe(client)
+
+    def get_stats(self) -> Dict:
+        """Contatori per il monitoraggio"""
+        with self._lock:
+            clients = len(self._clients)
+            following = self._follower is not None and self._follower.is_alive()
+        return {**self.stats, 'clients': clients, 'following': following, 'path': str(self.path)}
+
+    def _open(self, at_end: bool):
+        try:
+            handle = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+        if at_end:
+            handle.seek(0, os.SEEK_END)
+        return handle
+
+    def _rotated(self, handle) -> bool:
+        try:
+            return os.stat(self.path).st_ino != os.fstat(handle.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _dispatch(self, lines: List[bytes]):
+        updates = []
+        for line in lines:
+            try:
+                updates.append(json.loads(line))
+            except ValueError:
+                continue
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            for update in updates:
+                client.put(update)
+
+    def _follow_loop(self, handle):
+        pending = b''
+        try:
+            while True:
+                with self._lock:
+                    if not self._clients:
+                        self._follower = None
+                        return
+                self._wake.clear()
+                if handle is not None:
+                    chunk = handle.read()
+                    if chunk:
+                        lines = (pending + chunk).split(b'\n')
+                        pending = lines.pop()
+                        self._dispatch(lines)
+                        continue
+                if handle is None or self._rotated(handle):
+                    # File ruotato: la coda del vecchio è già stata letta, il nuovo si legge dall'inizio
+                    if handle is not None:
+                        handle.close()
+                    handle = self._open(at_end=False)
+                    pending = b''
+                    if handle is not None:
+                        continue
+                self._wake.wait(self.poll_interval)
+        except Exception as e:
+            print(f"❌ Errore feed live: {e}")
+            self.stats['errors'] += 1
+            with self._lock:
+                self._follower = None
+        finally:
+            if handle is not None:
+                handle.close()
+
+
+# Un feed condiviso per cartella dei log, come per l'indice delle directory
+_feeds: Dict[str, LiveFeed] = {}
+_feeds_lock = threading.Lock()
+
+
+def get_live_feed(data_dir: Path) -> LiveFeed:
+    """Restituisce il feed condiviso della cartella dei log"""
+    key = os.path.abspath(data_dir)
+    with _feeds_lock:
+        if key not in _feeds:
+            _feeds[key] = LiveFeed(Path(data_dir))
+        return _feeds[key]
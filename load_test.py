@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Load test delle API statistiche con gunicorn
+Avvia il server con un numero crescente di worker e misura richieste al
+secondo e latenze, per verificare che il throughput scali con i worker.
+
+Con --dashboard misura invece il caricamento della vista giornaliera di
+/statistics: le quattro richieste separate (giornaliere e disconnessioni,
+poi CTCSS e TG) contro l'unica richiesta a /api/statistics/dashboard.
+
+Uso: python load_test.py [--workers 1,2,4] [--threads 4] [--concurrency 16] [--duration 10]
+     python load_test.py --dashboard [--rounds 50] [--start 2020-01-01]
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from partitions import copy_database
+
+ENDPOINTS = [
+    '/api/statistics/daily?start_date={start}&end_date={end}',
+    '/api/statistics/monthly?year={year}&month={month}',
+    '/api/statistics/ctcss?start_date={start}&end_date={end}',
+    '/api/statistics/talkgroups?start_date={start}&end_date={end}',
+]
+
+# Vista giornaliera di /statistics: richieste separate a due ondate (come faceva la pagina) o una sola
+DASHBOARD_PAGES = {
+    'separate': [
+        ['/api/statistics/daily?start_date={start}&end_date={end}',
+         '/api/statistics/disconnections?start_date={start}&end_date={end}'],
+        ['/api/statistics/ctcss?start_date={start}&end_date={end}',
+         '/api/statistics/talkgroups?start_date={start}&end_date={end}'],
+    ],
+    'dashboard': [
+        ['/api/statistics/dashboard?start_date={start}&end_date={end}'],
+    ],
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url, timeout=30, interval=0.2):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/health', timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            time.sleep(interval)
+    return False
+
+
+def _run_load(base_url, urls, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.time() + duration
+
+    def client(index):
+        nonlocal errors
+        local = []
+        i = index
+        while time.time() < deadline:
+            url = base_url + urls[i % len(urls)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    response.read()
+                local.append(time.perf_counter() - started)
+            except OSError:
+                errors += 1
+        return local
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for result in pool.map(client, range(concurrency)):
+            latencies.extend(result)
+    elapsed = time.time() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+def _page_load(base_url, waves):
+    """Tempo di caricamento di una pagina: le richieste di un'ondata partono insieme"""
+    def fetch(url):
+        with urllib.request.urlopen(base_url + url, timeout=30) as response:
+            response.read()
+
+    started = time.perf_counter()
+    for wave in waves:
+        with ThreadPoolExecutor(max_workers=len(wave)) as pool:
+            list(pool.map(fetch, wave))
+    return time.perf_counter() - started
+
+
+def _measure_dashboard(args, db_copy, params):
+    # Cache delle query disattivata: si misurano le letture dal database, non la cache
+    port = _free_port()
+    env = dict(os.environ, DATABASE_PATH=db_copy, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port),
+               WEB_WORKERS='1', WEB_THREADS=str(args.threads), WATCH_DATA_DIR='false', QUERY_CACHE_SIZE='0')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        if not _wait_ready(base_url):
+            print("❌ Server non pronto")
+            return
+        results = {}
+        for name, waves in DASHBOARD_PAGES.items():
+            waves = [[url.format(**params) for url in wave] for wave in waves]
+            _page_load(base_url, waves)  # riscaldamento
+            timings = sorted(_page_load(base_url, waves) for _ in range(args.rounds))
+            results[name] = statistics.median(timings) * 1000
+            requests = sum(len(wave) for wave in waves)
+            print(f"   📄 {name}: {requests} richieste, p50 {results[name]:.1f} ms, "
+                  f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.1f} ms")
+        print(f"\n📈 Caricamento della dashboard: x{results['separate'] / results['dashboard']:.2f} più veloce")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test API statistiche')
+    parser.add_argument('--workers', default='1,2,4', help='Numeri di worker da provare (es. 1,2,4)')
+    parser.add_argument('--threads', type=int, default=4, help='Thread per worker')
+    parser.add_argument('--concurrency', type=int, default=16, help='Client concorrenti')
+    parser.add_argument('--duration', type=float, default=10, help='Secondi di carico per configurazione')
+    parser.add_argument('--database', default=os.getenv('DATABASE_PATH', 'data/svxlink_stats.db'),
+                        help='Database da usare (ne viene usata una copia)')
+    parser.add_argument('--dashboard', action='store_true',
+                        help='Confronta il caricamento della dashboard: API separate o /api/statistics/dashboard')
+    parser.add_argument('--rounds', type=int, default=50, help='Caricamenti della dashboard per variante')
+    parser.add_argument('--start', default='2020-01-01', help='Inizio del periodo richiesto')
+    args = parser.parse_args()
+
+    today = time.strftime('%Y-%m-%d')
+    params = {'start': args.start, 'end': today, 'year': today[:4], 'month': int(today[5:7])}
+    urls = [endpoint.format(**params) for endpoint in ENDPOINTS]
+
+    if args.dashboard:
+        print(f"🏋️ Caricamento dashboard ({args.rounds} caricamenti per variante, dal {args.start})")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_copy = os.path.join(tmp_dir, 'db', 'svxlink_stats.db')
+            os.makedirs(os.path.dirname(db_copy))
+            if os.path.exists(args.database):
+                copy_database(args.database, db_copy)
+            _measure_dashboard(args, db_copy, params)
+        return
+
+    print("🏋️ Load test API statistiche")
+    print(f"   {args.concurrency} client, {args.duration}s per configurazione, {args.threads} thread/worker")
+    print(f"   CPU disponibili: {os.cpu_count()}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_copy = os.path.join(tmp_dir, 'db', 'svxlink_stats.db')
+        os.makedirs(os.path.dirname(db_copy))
+        if os.path.exists(args.database):
+            copy_database(args.database, db_copy)
+
+        for workers in [int(w) for w in args.workers.split(',')]:
+            port = _free_port()
+            env = dict(os.environ, DATABASE_PATH=db_copy, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port),
+                       WEB_WORKERS=str(workers), WEB_THREADS=str(args.threads), WATCH_DATA_DIR='false')
+            server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                                      env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            base_url = f'http://127.0.0.1:{port}'
+            try:
+                if not _wait_ready(base_url):
+                    print(f"❌ Server con {workers} worker non pronto")
+                    continue
+                _run_load(base_url, urls, args.concurrency, 1)  # riscaldamento
+                result = _run_load(base_url, urls, args.concurrency, args.duration)
+                result['workers'] = workers
+                results.append(result)
+                print(f"   ⚙️ {workers} worker: {result['rps']:.1f} req/s, p50 {result['p50_ms']:.1f} ms, "
+                      f"p95 {result['p95_ms']:.1f} ms, {result['errors']} errori")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    if results:
+        base = results[0]['rps'] or 1
+        print("\n📈 Scalabilità rispetto al primo run:")
+        for result in results:
+            print(f"   {result['workers']} worker: x{result['rps'] / base:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""
+Analizzatore dei log SVXLink
+Parsing di un log in trasmissioni, QSO, subtoni CTCSS, talk group e periodi
+di disconnessione. Non dipende da Flask né dal database: lo usano l'app web,
+il log processor, i worker dell'ingest parallelo e gli script batch.
+"""
+
+import array
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import List
+
+# Versione delle regole di analyze_events (soglie QSO, filtro rumore TX, disconnessioni):
+# va incrementata a ogni modifica, anche delle soglie di default qui sotto, così
+# `log_processor.py reprocess` rielabora solo i giorni salvati con regole precedenti
+ANALYZER_VERSION = 1
+
+# Soglie di default usate nell'ingest
+MIN_QSO_SECONDS = 3            # durata minima di un QSO (selezione TG -> TG #0)
+TX_NOISE_SECONDS = 0.1         # trasmissioni più brevi sono considerate rumore
+DISCONNECTED_AFTER = time(23, 50)  # disconnessione ancora in corso a fine log: stato 'disconnected'
+
+# Codici degli eventi nella colonna `kind` di EventColumns
+EVENT_CTCSS = 1
+EVENT_TG = 2
+EVENT_TX_ON = 3
+EVENT_TX_OFF = 4
+EVENT_SQUELCH_OPEN = 5
+EVENT_SQUELCH_CLOSED = 6
+EVENT_NODE_JOINED = 7
+EVENT_NODE_LEFT = 8
+EVENT_DISCONNECTED = 9
+
+# I timestamp dei log non hanno fuso orario: l'epoch è calcolato sull'ora del log
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+@dataclass
+class EventColumns:
+    """Eventi di un log in colonne tipizzate, un elemento per evento nell'ordine delle righe"""
+    kind: array.array = field(default_factory=lambda: array.array('B'))   # codice EVENT_*
+    epoch: array.array = field(default_factory=lambda: array.array('q'))  # secondi dall'epoch
+    tg: array.array = field(default_factory=lambda: array.array('i'))     # TG selezionato (EVENT_TG)
+    tone: array.array = field(default_factory=lambda: array.array('d'))   # frequenza CTCSS in Hz (EVENT_CTCSS)
+    node: array.array = field(default_factory=lambda: array.array('i'))   # indice in `nodes`, -1 se assente
+    nodes: List[str] = field(default_factory=list)
+    truncated: bool = False  # parsing interrotto da un errore
+
+    def __len__(self):
+        return len(self.kind)
+
+    def append(self, kind: int, epoch: int, tg: int = 0, tone: float = 0.0, node: int = -1):
+        self.kind.append(kind)
+        self.epoch.append(epoch)
+        self.tg.append(tg)
+        self.tone.append(tone)
+        self.node.append(node)
+
+    def extend(self, other: 'EventColumns'):
+        """Aggiunge in coda gli eventi di `other` (righe successive dello stesso log), rimappando i nodi"""
+        node_ids = {name: index for index, name in enumerate(self.nodes)}
+        remap = [node_ids.setdefault(name, len(node_ids)) for name in other.nodes]
+        self.kind.extend(other.kind)
+        self.epoch.extend(other.epoch)
+        self.tg.extend(other.tg)
+        self.tone.extend(other.tone)
+        self.node.extend(array.array(self.node.typecode, (remap[n] if n >= 0 else -1 for n in other.node)))
+        self.nodes = list(node_ids)
+        self.truncated = self.truncated or other.truncated
+
+
+class SVXLinkLogAnalyzer:
+    def __init__(self):
+        self.transmissions = []
+        self.carriers_opened = 0
+        self.total_transmission_time = timedelta()
+        self.stats = defaultdict(int)
+        # Nuove statistiche avanzate
+        self.ctcss_tones = defaultdict(int)  # Subtoni rilevati per frequenza
+        self.talk_groups = defaultdict(int)  # TG aperti con conteggio
+        self.qso_sessions = []  # QSO completi identificati
+        self.active_tg = None  # TG attualmente attivo
+        self.qso_start = None  # Inizio QSO corrente
+        # Tracciamento disconnessioni
+        self.disconnections = []  # Periodi di disconnessione
+        self.current_disconnection = None  # Disconnessione attualmente in corso
+        
+    def parse_log_file(self, file_path):
+        """Analizza il file di log SVXLink"""
+        self.transmissions = []
+        self.carriers_opened = 0
+        self.total_transmission_time = timedelta()
+        self.stats = defaultdict(int)
+        # Reset delle nuove statistiche
+        self.ctcss_tones = defaultdict(int)
+        self.talk_groups = defaultdict(int)
+        self.qso_sessions = []
+        self.active_tg = None
+        self.qso_start = None
+        # Reset disconnessioni
+        self.disconnections = []
+        self.current_disconnection = None
+        
+        tx_sessions = []  # Per tracciare le sessioni ON/OFF
+        
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                lines = file.readlines()
+                
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                    
+                # Parse del timestamp e del messaggio
+                # Supporta sia "Oct 21" che "Nov  1" (con spazio extra per giorni a cifra singola)
+                match = re.match(r'^(\w{3} \w{3} \s*\d{1,2} \d{2}:\d{2}:\d{2} \d{4}): (.+)$', line)
+                if not match:
+                    continue
+                    
+                timestamp_str, message = match.groups()
+                # Normalizza gli spazi extra nel timestamp prima del parsing
+                timestamp_str = re.sub(r'\s+', ' ', timestamp_str.strip())
+                timestamp = datetime.strptime(timestamp_str, '%a %b %d %H:%M:%S %Y')
+                
+                # === ANALISI SUBTONI CTCSS ===
+                ctcss_match = re.search(r'(\d+\.?\d*) Hz CTCSS tone detected', message)
+                if ctcss_match:
+                    tone_freq = float(ctcss_match.group(1))
+                    self.ctcss_tones[tone_freq] += 1
+                    self.stats['ctcss_detections'] += 1
+                    
+                    # Possibile inizio QSO se c'è un subtono
+                    if self.qso_start is None:
+                        self.qso_start = timestamp
+                
+                # === ANALISI TALK GROUPS ===
+                tg_match = re.search(r'Selecting TG #(\d+)', message)
+                if tg_match:
+                    tg_number = int(tg_match.group(1))
+                    
+                    # Se TG #0, potrebbe essere fine QSO
+                    if tg_number == 0:
+                        if self.active_tg is not None and self.qso_start is not None:
+                            # Registra QSO completo
+                            qso_duration = timestamp - self.qso_start
+                            self.qso_sessions.append({
+                                'start': self.qso_start,
+                                'end': timestamp,
+                                'duration': qso_duration,
+                                'tg': self.active_tg,
+                                'duration_seconds': qso_duration.total_seconds()
+                            })
+                        self.active_tg = None
+                        self.qso_start = None
+                    else:
+                        # TG diverso da 0 - possibile inizio/cambio QSO
+                        self.talk_groups[tg_number] += 1
+                        self.active_tg = tg_number
+                        
+                        # Se non abbiamo un inizio QSO, lo impostiamo ora
+                        if self.qso_start is None:
+                            self.qso_start = timestamp
+                
+                # Cerca eventi di trasmissione
+                if "Turning the transmitter ON" in message:
+                    # Nuova trasmissione inizia
+                    tx_sessions.append({
+                        'start': timestamp,
+                        'end': None,
+                        'message': message
+                    })
+                    self.carriers_opened += 1
+                    self.stats['transmitter_on'] += 1
+                    
+                elif "Turning the transmitter OFF" in message:
+                    # Trasmissione termina
+                    if tx_sessions and tx_sessions[-1]['end'] is None:
+                        tx_sessions[-1]['end'] = timestamp
+                        
+                        # Calcola durata
+                        duration = timestamp - tx_sessions[-1]['start']
+                        self.total_transmission_time += duration
+                        
+                        self.transmissions.append({
+                            'start': tx_sessions[-1]['start'],
+                            'end': timestamp,
+                            'duration': duration,
+                            'duration_seconds': duration.total_seconds()
+                        })
+                        
+                    self.stats['transmitter_off'] += 1
+                
+                # Altri eventi interessanti
+                elif "squelch is OPEN" in message:
+                    self.stats['squelch_open'] += 1
+                elif "squelch is CLOSED" in message:
+                    self.stats['squelch_closed'] += 1
+                elif "Talker start" in message:
+                    self.stats['talker_start'] += 1
+                elif "Talker stop" in message:
+                    self.stats['talker_stop'] += 1
+                elif "Node joined" in message or "Node left" in message:
+                    # Eventi di nodi - chiudono eventuali disconnessioni in corso
+                    if self.current_disconnection:
+                        self.current_disconnection['end'] = timestamp
+                        self.current_disconnection['duration'] = (timestamp - self.current_disconnection['start']).total_seconds()
+                        self.disconnections.append(self.current_disconnection)
+                        self.current_disconnection = None
+                    
+                    if "Node joined" in message:
+                        self.stats['nodes_joined'] += 1
+                    else:
+                        self.stats['nodes_left'] += 1
+                elif "identification" in message.lower():
+                    self.stats['identifications'] += 1
+                
+                # === TRACCIAMENTO DISCONNESSIONI ===
+                if "ReflectorLogic: Disconnected from" in message and "Connection timed out" in message:
+                    if self.current_disconnection is None:
+                        # Inizio nuovo periodo di disconnessione
+                        self.current_disconnection = {
+                            'start': timestamp,
+                            'end': None,
+                            'count': 1,
+                            'last_disconnection': timestamp
+                        }
+                    else:
+                        # Incrementa il contatore di disconnessioni dello stesso periodo
+                        self.current_disconnection['count'] += 1
+                        self.current_disconnection['last_disconnection'] = timestamp
+                    self.stats['disconnections'] += 1
+            
+            # Gestione disconnessioni ancora in corso alla fine del log
+            if self.current_disconnection:
+                # Chiudi il periodo con l'ultima disconnessione rilevata
+                self.current_disconnection['end'] = self.current_disconnection['last_disconnection']
+                self.current_disconnection['duration'] = (
+                    self.current_disconnection['last_disconnection'] - 
+                    self.current_disconnection['start']
+                ).total_seconds()
+                # Se la disconnessione arriva fino alle 23:50 o oltre, stato disconnesso
+                end_time = self.current_disconnection['last_disconnection']
+                if end_time.hour == 23 and end_time.minute >= 50:
+                    self.current_disconnection['status'] = 'disconnected'
+                else:
+                    self.current_disconnection['status'] = 'resolved'
+                self.disconnections.append(self.current_disconnection)
+                self.current_disconnection = None
+                    
+        except Exception as e:
+            raise Exception(f"Errore durante l'analisi del file: {str(e)}")
+    
+    def get_statistics(self):
+        """Restituisce le statistiche calcolate"""
+        total_seconds = self.total_transmission_time.total_seconds()
+        
+        # Calcola statistiche di durata
+        durations = [t['duration_seconds'] for t in self.transmissions]
+        avg_duration = sum(durations) / len(durations) if durations else 0
+        min_duration = min(durations) if durations else 0
+        max_duration = max(durations) if durations else 0
+        
+        # Calcola statistiche QSO
+        qso_durations = [q['duration_seconds'] for q in self.qso_sessions]
+        qso_total_time = sum(qso_durations)
+        qso_avg_duration = sum(qso_durations) / len(qso_durations) if qso_durations else 0
+        qso_min_duration = min(qso_durations) if qso_durations else 0
+        qso_max_duration = max(qso_durations) if qso_durations else 0
+        
+        # Prepara i subtoni per il display (ordinati per frequenza di utilizzo)
+        sorted_ctcss = sorted(self.ctcss_tones.items(), key=lambda x: x[1], reverse=True)
+        
+        # Prepara i TG per il display (ordinati per frequenza di utilizzo)
+        sorted_tg = sorted(self.talk_groups.items(), key=lambda x: x[1], reverse=True)
+        
+        # Calcola durate per Talk Group
+        tg_durations = {}
+        for qso_session in self.qso_sessions:
+            tg = qso_session['tg']
+            if tg not in tg_durations:
+                tg_durations[tg] = {
+                    'total_seconds': 0,
+                    'qso_count': 0,
+                    'avg_duration': 0
+                }
+            tg_durations[tg]['total_seconds'] += qso_session['duration_seconds']
+            tg_durations[tg]['qso_count'] += 1
+        
+        # Calcola durate medie per TG
+        for tg in tg_durations:
+            avg_seconds = tg_durations[tg]['total_seconds'] / tg_durations[tg]['qso_count']
+            tg_durations[tg]['avg_duration'] = avg_seconds
+            tg_durations[tg]['formatted_total'] = f"{int(tg_durations[tg]['total_seconds'] // 60)}m {int(tg_durations[tg]['total_seconds'] % 60)}s"
+            tg_durations[tg]['formatted_avg'] = f"{int(avg_seconds // 60)}m {int(avg_seconds % 60)}s"
+        
+        # Ordina TG per durata totale (decrescente)
+        sorted_tg_by_duration = sorted(tg_durations.items(), key=lambda x: x[1]['total_seconds'], reverse=True)
+        
+        return {
+            'total_transmission_time': {
+                'hours': int(total_seconds // 3600),
+                'minutes': int((total_seconds % 3600) // 60),
+                'seconds': int(total_seconds % 60),
+                'total_seconds': total_seconds
+            },
+            'carriers_opened': self.carriers_opened,
+            'total_transmissions': len(self.transmissions),
+            'average_duration': {
+                'seconds': avg_duration,
+                'formatted': f"{int(avg_duration // 60)}m {int(avg_duration % 60)}s"
+            },
+            'min_duration': {
+                'seconds': min_duration,
+                'formatted': f"{int(min_duration // 60)}m {int(min_duration % 60)}s"
+            },
+            'max_duration': {
+                'seconds': max_duration,
+                'formatted': f"{int(max_duration // 60)}m {int(max_duration % 60)}s"
+            },
+            # === NUOVE STATISTICHE AVANZATE ===
+            'ctcss_tones': {
+                'total_detections': sum(self.ctcss_tones.values()),
+                'unique_tones': len(self.ctcss_tones),
+                'tones_detail': sorted_ctcss[:10]  # Top 10 subtoni più usati
+            },
+            'talk_groups': {
+                'total_selections': sum(self.talk_groups.values()),
+                'unique_tgs': len(self.talk_groups),
+                'tgs_detail': sorted_tg[:10],  # Top 10 TG più usati
+                'tg_durations': sorted_tg_by_duration  # TG ordinati per durata totale
+            },
+            'qso_analysis': {
+                'total_qso': len(self.qso_sessions),
+                'qso_time': {
+                    'hours': int(qso_total_time // 3600),
+                    'minutes': int((qso_total_time % 3600) // 60),
+                    'seconds': int(qso_total_time % 60),
+                    'total_seconds': qso_total_time
+                },
+                'qso_avg_duration': {
+                    'seconds': qso_avg_duration,
+                    'formatted': f"{int(qso_avg_duration // 60)}m {int(qso_avg_duration % 60)}s"
+                },
+                'qso_min_duration': {
+                    'seconds': qso_min_duration,
+                    'formatted': f"{int(qso_min_duration // 60)}m {int(qso_min_duration % 60)}s"
+                },
+                'qso_max_duration': {
+                    'seconds': qso_max_duration,
+                    'formatted': f"{int(qso_max_duration // 60)}m {int(qso_max_duration % 60)}s"
+                },
+                'qso_sessions': self.qso_sessions[:20]  # Prime 20 QSO per performance
+            },
+            'disconnections': {
+                'total_periods': len(self.disconnections),
+                'total_disconnections': sum(d['count'] for d in self.disconnections),
+                'periods': [
+                    {
+                        'start': d['start'].strftime('%Y-%m-%d %H:%M:%S'),
+                        'end': d['end'].strftime('%Y-%m-%d %H:%M:%S') if d.get('end') else 'In corso',
+                        'duration': d.get('duration'),
+                        'duration_formatted': f"{int(d['duration'] // 60)}m {int(d['duration'] % 60)}s" if d.get('duration') else 'In corso',
+                        'count': d['count'],
+                        'status': d.get('status', 'resolved')
+                    }
+                    for d in self.disconnections
+                ]
+            },
+            'events': dict(self.stats),
+            'transmissions': self.transmissions[:50]  # Mostra solo le prime 50 per performance
+        }
+    
+    def analyze_log(self, content):
+        """Analizza il contenuto del log (compatibilità con log_processor.py)"""
+        return self.analyze_events(self.extract_events(content))
+    
+    def extract_events(self, content):
+        """Estrae dal testo del log gli eventi usati dalle statistiche, in colonne tipizzate.
+
+        Per ogni riga gli eventi sono emessi nello stesso ordine in cui
+        analyze_events li valuta; è l'unico passaggio che usa regex e strptime.
+        """
+        columns = EventColumns()
+        node_ids = {}
+        
+        try:
+            lines = content.strip().split('\n')
+                
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                    
+                # Parse del timestamp e del messaggio
+                # Supporta sia "Oct 21" che "Nov  1" (con spazio extra per giorni a cifra singola)
+                match = re.match(r'^(\w{3} \w{3} \s*\d{1,2} \d{2}:\d{2}:\d{2} \d{4}): (.+)$', line)
+                if not match:
+                    continue
+                    
+                timestamp_str, message = match.groups()
+                # Normalizza gli spazi extra nel timestamp prima del parsing
+                timestamp_str = re.sub(r'\s+', ' ', timestamp_str.strip())
+                timestamp = datetime.strptime(timestamp_str, '%a %b %d %H:%M:%S %Y')
+                epoch = (timestamp - EPOCH) // SECOND
+                
+                ctcss_match = re.search(r'(\d+\.?\d*) Hz CTCSS tone detected', message)
+                if ctcss_match:
+                    columns.append(EVENT_CTCSS, epoch, tone=float(ctcss_match.group(1)))
+                
+                tg_match = re.search(r'Selecting TG #(\d+)', message)
+                if tg_match:
+                    columns.append(EVENT_TG, epoch, tg=int(tg_match.group(1)))
+                
+                if 'Turning the transmitter ON' in message:
+                    columns.append(EVENT_TX_ON, epoch)
+                elif 'Turning the transmitter OFF' in message:
+                    columns.append(EVENT_TX_OFF, epoch)
+                
+                if 'The squelch is OPEN' in message:
+                    columns.append(EVENT_SQUELCH_OPEN, epoch)
+                elif 'The squelch is CLOSED' in message:
+                    columns.append(EVENT_SQUELCH_CLOSED, epoch)
+                
+                if "Node joined" in message or "Node left" in message:
+                    node_match = re.search(r'Node (?:joined|left): (\S+)', message)
+                    node = node_ids.setdefault(node_match.group(1), len(node_ids)) if node_match else -1
+                    kind = EVENT_NODE_JOINED if "Node joined" in message else EVENT_NODE_LEFT
+                    columns.append(kind, epoch, node=node)
+                
+                if "ReflectorLogic: Disconnected from" in message and "Connection timed out" in message:
+                    columns.append(EVENT_DISCONNECTED, epoch)
+                
+        except Exception as e:
+            print(f"Errore durante l'analisi: {e}")
+            # Come nel parsing originale la disconnessione in corso resta aperta
+            columns.truncated = True
+        
+        columns.nodes = list(node_ids)
+        return columns
+    
+    def analyze_events(self, columns, min_qso_seconds=MIN_QSO_SECONDS, tx_noise_seconds=TX_NOISE_SECONDS,
+                       disconnected_after=DISCONNECTED_AFTER):
+        """Calcola le statistiche a partire dagli eventi in colonne (vedi extract_events).
+
+        Le soglie possono essere cambiate per provare regole diverse sugli
+        eventi salvati, senza rileggere il testo dei log.
+        """
+        # Reset delle statistiche
+        self.transmissions = []
+        self.carriers_opened = 0
+        self.total_transmission_time = timedelta()
+        self.stats = defaultdict(int)
+        self.ctcss_tones = defaultdict(int)
+        self.talk_groups = defaultdict(int)
+        self.qso_sessions = []
+        self.active_tg = None
+        self.qso_start = None
+        # Reset disconnessioni
+        self.disconnections = []
+        self.current_disconnection = None
+        
+        stats = self.stats
+        tx_start = None  # Inizio della sessione ON/OFF ancora aperta
+        total_transmission_seconds = 0
+        
+        for kind, epoch, tg_id, tone_freq in zip(columns.kind, columns.epoch, columns.tg, columns.tone):
+            # === ANALISI SUBTONI CTCSS ===
+            if kind == EVENT_CTCSS:
+                self.ctcss_tones[tone_freq] += 1
+                stats['ctcss_detections'] += 1
+            
+            # === ANALISI TALK GROUPS E IDENTIFICAZIONE QSO ===
+            # QSO: selezione di un TG diverso da 0, chiuso da TG #0
+            elif kind == EVENT_TG:
+                if tg_id == 0:
+                    if self.active_tg is not None and self.qso_start is not None:
+                        duration = float(epoch - self.qso_start)
+                        
+                        if duration >= min_qso_seconds:  # QSO valido solo se abbastanza lungo
+                            self.qso_sessions.append({
+                                'tg': self.active_tg,
+                                'start_time': EPOCH + timedelta(seconds=self.qso_start),
+                                'end_time': EPOCH + timedelta(seconds=epoch),
+                                'duration_seconds': duration
+                            })
+                            stats['valid_qso'] += 1
+                    
+                    self.qso_start = None
+                    self.active_tg = None
+                else:
+                    self.talk_groups[tg_id] += 1
+                    stats['tg_selections'] += 1
+                    if self.qso_start is None:
+                        self.qso_start = epoch
+                    self.active_tg = tg_id
+            
+            # === ANALISI TRASMISSIONE ===
+            elif kind == EVENT_TX_ON:
+                tx_start = epoch
+                stats['tx_on'] += 1
+            
+            elif kind == EVENT_TX_OFF:
+                if tx_start is not None:
+                    duration_seconds = float(epoch - tx_start)
+                    if duration_seconds >= tx_noise_seconds:  # Filtro rumore
+                        self.transmissions.append({
+                            'start_epoch': tx_start,
+                            'end_epoch': epoch,
+                            'duration_seconds': duration_seconds
+                        })
+                        total_transmission_seconds += epoch - tx_start
+                    tx_start = None
+                    stats['tx_off'] += 1
+            
+            # === CONTEGGIO PORTANTI ===
+            elif kind == EVENT_SQUELCH_OPEN:
+                self.carriers_opened += 1
+                stats['squelch_open'] += 1
+            elif kind == EVENT_SQUELCH_CLOSED:
+                stats['squelch_closed'] += 1
+            
+            # === EVENTI NODI: chiudono eventuali disconnessioni in corso ===
+            elif kind == EVENT_NODE_JOINED or kind == EVENT_NODE_LEFT:
+                if self.current_disconnection:
+                    self.current_disconnection['end'] = epoch
+                    self.current_disconnection['duration'] = float(epoch - self.current_disconnection['start'])
+                    self.disconnections.append(self.current_disconnection)
+                    self.current_disconnection = None
+                
+                if kind == EVENT_NODE_JOINED:
+                    stats['nodes_joined'] += 1
+                else:
+                    stats['nodes_left'] += 1
+            
+            # === TRACCIAMENTO DISCONNESSIONI ===
+            elif kind == EVENT_DISCONNECTED:
+                if self.current_disconnection is None:
+                    self.current_disconnection = {
+                        'start': epoch,
+                        'end': None,
+                        'count': 1,
+                        'last_disconnection': epoch
+                    }
+                else:
+                    self.current_disconnection['count'] += 1
+                    self.current_disconnection['last_disconnection'] = epoch
+                stats['disconnections'] += 1
+        
+        # Gestione disconnessioni ancora in corso alla fine del log
+        if self.current_disconnection and not columns.truncated:
+            last = self.current_disconnection['last_disconnection']
+            self.current_disconnection['end'] = last
+            self.current_disconnection['duration'] = float(last - self.current_disconnection['start'])
+            # Se la disconnessione arriva fino a fine giornata (default 23:50), stato disconnesso
+            end_time = EPOCH + timedelta(seconds=last)
+            if end_time.time() >= disconnected_after:
+                self.current_disconnection['status'] = 'disconnected'
+            else:
+                self.current_disconnection['status'] = 'resolved'
+            self.disconnections.append(self.current_disconnection)
+            self.current_disconnection = None
+        
+        # Timestamp dei periodi di disconnessione da epoch a datetime
+        for period in self.disconnections:
+            period['start'] = EPOCH + timedelta(seconds=period['start'])
+            period['last_disconnection'] = EPOCH + timedelta(seconds=period['last_disconnection'])
+            if period['end'] is not None:
+                period['end'] = EPOCH + timedelta(seconds=period['end'])
+        self.total_transmission_time = timedelta(seconds=total_transmission_seconds)
+            
+        # Statistiche finali - converti timedelta in secondi
+        total_seconds = self.total_transmission_time.total_seconds()
+        
+        # Calcola statistiche durata trasmissioni
+        durations = [t['duration_seconds'] for t in self.transmissions]
+        avg_duration = sum(durations) / len(durations) if durations else 0
+        min_duration = min(durations) if durations else 0
+        max_duration = max(durations) if durations else 0
+        
+        # Calcola statistiche QSO
+        qso_durations = [q['duration_seconds'] for q in self.qso_sessions]
+        qso_total_time = sum(qso_durations)
+        
+        # Prepara i subtoni per il display con formato compatibile (ordinati per frequenza)
+        total_ctcss_detections = sum(self.ctcss_tones.values())
+        sorted_ctcss = []
+        for freq, count in sorted(self.ctcss_tones.items(), key=lambda x: x[1], reverse=True):
+            percentage = (count / total_ctcss_detections * 100) if total_ctcss_detections > 0 else 0
+            sorted_ctcss.append((freq, {'count': count, 'percentage': round(percentage, 2)}))
+        
+        # Prepara i TG per il display con formato compatibile (ordinati per frequenza)
+        total_tg_selections = sum(self.talk_groups.values())
+        sorted_tg = []
+        for tg_id, count in sorted(self.talk_groups.items(), key=lambda x: x[1], reverse=True):
+            percentage = (count / total_tg_selections * 100) if total_tg_selections > 0 else 0
+            sorted_tg.append((tg_id, {'count': count, 'percentage': round(percentage, 2)}))
+        
+        # Calcola durate per TG basandosi sui QSO
+        tg_durations = {}
+        for qso in self.qso_sessions:
+            tg = qso.get('tg', 0)
+            if tg not in tg_durations:
+                tg_durations[tg] = {
+                    'total_seconds': 0,
+                    'qso_count': 0,
+                    'avg_duration': 0
+                }
+            tg_durations[tg]['total_seconds'] += qso['duration_seconds']
+            tg_durations[tg]['qso_count'] += 1
+        
+        # Calcola durate medie per TG
+        for tg in tg_durations:
+            avg_seconds = tg_durations[tg]['total_seconds'] / tg_durations[tg]['qso_count']
+            tg_durations[tg]['avg_duration'] = avg_seconds
+        
+        # Ordina TG per durata totale (decrescente)
+        sorted_tg_by_duration = sorted(tg_durations.items(), key=lambda x: x[1]['total_seconds'], reverse=True)
+        
+        # Formato compatibile con log_processor.py
+        return {
+            'basic': {
+                'total_transmissions': len(self.transmissions),
+                'total_transmission_time': total_seconds,
+                'avg_transmission_time': avg_duration,
+                'max_transmission_time': max_duration,
+                'min_transmission_time': min_duration,
+                'carriers_opened': self.carriers_opened
+            },
+            'ctcss': {
+                'total_detections': sum(self.ctcss_tones.values()),
+                'unique_tones': len(self.ctcss_tones),
+                'ctcss_list': sorted_ctcss
+            },
+            'talk_groups': {
+                'total_selections': sum(self.talk_groups.values()),
+                'unique_tgs': len(self.talk_groups),
+                'tg_list': sorted_tg,
+                'tg_durations': sorted_tg_by_duration
+            },
+            'qso': {
+                'total_qso': len(self.qso_sessions),
+                'total_qso_time': qso_total_time,
+                'qso_sessions': self.qso_sessions
+            },
+            'disconnections': {
+                'total_periods': len(self.disconnections),
+                'total_disconnections': sum(d['count'] for d in self.disconnections),
+                'periods': [
+                    {
+                        'start': d['start'],
+                        'end': d.get('end'),
+                        'duration': d.get('duration'),
+                        'duration_formatted': f"{int(d['duration'] // 60)}m {int(d['duration'] % 60)}s" if d.get('duration') else 'In corso',
+                        'count': d['count'],
+                        'status': d.get('status', 'resolved')
+                    }
+                    for d in self.disconnections
+                ]
+            },
+            'events': dict(self.stats)
+        }
+
+
+def analyze_log_content(content):
+    """Funzione helper per analizzare il contenuto di un log"""
+    analyzer = SVXLinkLogAnalyzer()
+    return analyzer.analyze_log(content)
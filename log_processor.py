@@ -1,198 +1,464 @@
 #!/usr/bin/env python3
 """
 Log Processor per SVXLink Log Analyzer
-Elabora automaticamente file log dalla cartella /data e salva nel database
+Elabora automaticamente file log dalla cartella /data (e dalle sottocartelle
+dei siti, vedi sites.py) e salva nel database
 """
 
 import os
-import glob
+import hashlib
+import itertools
+import multiprocessing
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, date
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+
+from columns import columns_dir, columns_path, read_columns, site_columns_dir, write_columns
+from database import DatabaseManager, DailyLogStats, CTCSSStats, TGStats, DisconnectionPeriod, FileFingerprint
+from directory_index import get_directory_index
+from live_feed import counters_update, get_live_feed
+from log_analyzer import ANALYZER_VERSION, SVXLinkLogAnalyzer
+from sites import DEFAULT_SITE, discover_sites, is_valid_site
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Senza flock (Windows) l'ingest è serializzato solo tra i thread del processo
+    FCNTL_AVAILABLE = False
+
+# Numero di processi per l'ingest parallelo (1 = sequenziale)
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', 1))
+# Numero massimo di giorni scritti in una singola transazione dal thread scrittore
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 20))
+# Dimensione dei blocchi iniziale e finale usati per l'hash del contenuto
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+# Cache binaria a colonne degli eventi di ogni log (COLUMN_CACHE=false per disattivarla)
+COLUMN_CACHE = os.getenv('COLUMN_CACHE', 'true').lower() in ('1', 'true', 'yes')
+
+
+@dataclass
+class ParsedLog:
+    """Risultato compatto del parsing di un file log, trasferibile tra processi"""
+    filename: str
+    log_date: Optional[str] = None
+    daily: Optional[DailyLogStats] = None
+    ctcss: List[CTCSSStats] = field(default_factory=list)
+    tg: List[TGStats] = field(default_factory=list)
+    disconnections: List[DisconnectionPeriod] = field(default_factory=list)
+    fingerprint: Optional[FileFingerprint] = None
+    lines: int = 0
+    bytes: int = 0
+    error: Optional[str] = None
+
+
+def content_hash(file_path: Path, size: int) -> str:
+    """Hash di dimensione, blocco iniziale e blocco finale del file"""
+    digest = hashlib.sha1(str(size).encode())
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+        if size > FINGERPRINT_BLOCK_SIZE:
+            f.seek(max(size - FINGERPRINT_BLOCK_SIZE, FINGERPRINT_BLOCK_SIZE))
+            digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+    return digest.hexdigest()
+
+
+def file_fingerprint(file_path: Path, log_date: str, stat: Optional[os.stat_result] = None) -> FileFingerprint:
+    """Calcola il fingerprint di un file (stat e hash dei blocchi estremi)"""
+    stat = stat or file_path.stat()
+    return FileFingerprint(
+        path=os.path.abspath(file_path),
+        log_date=log_date,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        inode=stat.st_ino,
+        content_hash=content_hash(file_path, stat.st_size)
+    )
+
+
+def _same_stat(entry: Dict, stat: os.stat_result) -> bool:
+    return (entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+            and entry['inode'] == stat.st_ino)
+
+
+def extract_date_from_filename(filename: str) -> Optional[str]:
+    """Estrae la data dal nome del file"""
+    # Pattern per svxlink_log_YYYY-MM-DD.txt
+    patterns = [
+        r'svxlink_log_(\d{4}-\d{2}-\d{2})\.txt',
+        r'svxlink_(\d{4}-\d{2}-\d{2})\.log',
+        r'(\d{4}-\d{2}-\d{2})\.txt',
+        r'(\d{4})(\d{2})(\d{2})\.txt',  # YYYYMMDD.txt
+        r'log_(\d{4}-\d{2}-\d{2})',
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, filename)
+        if match:
+            if len(match.groups()) == 1:
+                return match.group(1)
+            elif len(match.groups()) == 3:
+                # YYYYMMDD format
+                return f"{match.group(1)}-{match.group(2)}-{match.group(3)}"
+    
+    return None
+
+
+def fill_statistics(parsed: ParsedLog, stats: Dict, site_id: str = DEFAULT_SITE):
+    """Converte le statistiche di analyze_events nei record del database di `parsed`"""
+    # Prepara statistiche giornaliere
+    parsed.daily = DailyLogStats(
+        date=parsed.log_date,
+        filename=parsed.filename,
+        file_size=parsed.fingerprint.size,
+        total_transmissions=stats['basic']['total_transmissions'],
+        total_transmission_time=int(stats['basic']['total_transmission_time']),
+        avg_transmission_time=stats['basic']['avg_transmission_time'],
+        max_transmission_time=stats['basic']['max_transmission_time'],
+        min_transmission_time=stats['basic']['min_transmission_time'],
+        total_qso=stats['qso']['total_qso'],
+        total_qso_time=int(stats['qso']['total_qso_time']),
+        analyzer_version=ANALYZER_VERSION,
+        site_id=site_id
+    )
+    
+    # Prepara statistiche CTCSS
+    if stats['ctcss']['ctcss_list']:
+        for ctcss_freq, data in stats['ctcss']['ctcss_list']:
+            parsed.ctcss.append(CTCSSStats(
+                log_date=parsed.log_date,
+                ctcss_frequency=float(ctcss_freq),
+                count=data['count'],
+                percentage=data['percentage'],
+                site_id=site_id
+            ))
+    
+    # Prepara statistiche TG
+    if stats['talk_groups']['tg_list']:
+        for tg_num, data in stats['talk_groups']['tg_list']:
+            # Trova durate TG se disponibili
+            tg_duration_data = None
+            if stats['talk_groups']['tg_durations']:
+                for tg_dur, dur_data in stats['talk_groups']['tg_durations']:
+                    if tg_dur == tg_num:
+                        tg_duration_data = dur_data
+                        break
+            
+            parsed.tg.append(TGStats(
+                log_date=parsed.log_date,
+                tg_number=int(tg_num),
+                transmission_count=data['count'],
+                total_duration=int(tg_duration_data['total_seconds']) if tg_duration_data else 0,
+                qso_count=tg_duration_data['qso_count'] if tg_duration_data else 0,
+                avg_duration=tg_duration_data['avg_duration'] if tg_duration_data else 0.0,
+                percentage=data['percentage'],
+                site_id=site_id
+            ))
+    
+    # Prepara statistiche disconnessioni
+    if stats.get('disconnections') and stats['disconnections'].get('periods'):
+        for disc in stats['disconnections']['periods']:
+            parsed.disconnections.append(DisconnectionPeriod(
+                log_date=parsed.log_date,
+                start_time=datetime.strptime(disc['start'].strftime('%Y-%m-%d %H:%M:%S'), '%Y-%m-%d %H:%M:%S') if isinstance(disc['start'], datetime) else datetime.strptime(disc['start'], '%Y-%m-%d %H:%M:%S'),
+                end_time=datetime.strptime(disc['end'].strftime('%Y-%m-%d %H:%M:%S'), '%Y-%m-%d %H:%M:%S') if disc.get('end') and isinstance(disc['end'], datetime) else None,
+                duration=int(disc.get('duration')) if disc.get('duration') else None,
+                disconnection_count=disc.get('count', 1),
+                status=disc.get('status', 'resolved'),
+                site_id=site_id
+            ))
+
+
+def parse_log_file(file_path: Path, analyzer: SVXLinkLogAnalyzer, cache_dir: Optional[str] = None,
+                   site_id: str = DEFAULT_SITE) -> ParsedLog:
+    """Legge e analizza un file log del sito `site_id` senza accedere al database.
+
+    Con `cache_dir` gli eventi estratti vengono salvati in colonne binarie
+    (vedi columns.py): se il file non è cambiato le elaborazioni successive
+    leggono le colonne invece del testo.
+    """
+    parsed = ParsedLog(filename=file_path.name)
+    try:
+        # Estrai data dal filename
+        log_date = extract_date_from_filename(file_path.name)
+        if not log_date:
+            parsed.error = 'data non riconosciuta nel nome del file'
+            return parsed
+        parsed.log_date = log_date
+        # Fingerprint prima della lettura: se il file cresce nel frattempo
+        # verrà visto come modificato al giro successivo
+        parsed.fingerprint = file_fingerprint(file_path, log_date)
+        
+        cache_path = None
+        cached = None
+        if cache_dir:
+            cache_path = columns_path(site_columns_dir(cache_dir, site_id), log_date, file_path.name,
+                                      parsed.fingerprint.size, parsed.fingerprint.content_hash)
+            cached = read_columns(cache_path)
+        
+        if cached:
+            columns = cached['columns']
+            parsed.lines = cached['lines']
+            parsed.bytes = cached['bytes']
+        else:
+            # Leggi file
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            parsed.lines = content.count('\n')
+            parsed.bytes = len(content)
+            
+            if not content.strip():
+                parsed.error = 'file vuoto'
+                return parsed
+            
+            columns = analyzer.extract_events(content)
+            if cache_path:
+                try:
+                    write_columns(cache_path, columns, parsed.lines, parsed.bytes)
+                except OSError as e:
+                    print(f"⚠️ Cache colonne non salvata per {file_path.name}: {e}")
+        
+        # Analizza il log
+        fill_statistics(parsed, analyzer.analyze_events(columns), site_id)
+    except Exception as e:
+        parsed.error = str(e)
+    return parsed
+
+
+# Analyzer del processo worker, creato alla prima chiamata
+_worker_analyzer = None
+
+def _parse_in_worker(file_path: str, cache_dir: Optional[str] = None, site_id: str = DEFAULT_SITE) -> ParsedLog:
+    """Entry point dei processi worker dell'ingest parallelo"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = SVXLinkLogAnalyzer()
+    return parse_log_file(Path(file_path), _worker_analyzer, cache_dir, site_id)
+
+
+def _pool_context(start_method: Optional[str] = None):
+    # Di default forkserver (o spawn): nel processo web i thread di scheduler, job e
+    # watcher possono tenere lock che un fork copierebbe nei figli; i worker importano
+    # solo log_processor e log_analyzer, senza Flask né app. fork (i worker ereditano
+    # i moduli già importati) solo se richiesto, dagli script a riga di comando
+    methods = multiprocessing.get_all_start_methods()
+    if start_method is None:
+        start_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+    if start_method not in methods:
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context(start_method)
+    if start_method == 'forkserver':
+        context.set_forkserver_preload(['log_processor'])
+    return context
+
+
+# Lock dei thread del processo per cartella dati; tra processi serializza il flock
+_ingest_locks: Dict[str, threading.Lock] = {}
+_ingest_locks_guard = threading.Lock()
+
+
+@contextmanager
+def ingest_lock(data_dir) -> Iterator[None]:
+    """Serializza l'ingest dei file di una cartella dati (job, scheduler, watcher).
+
+    Vale tra i thread del processo e, con un flock su data/process.lock, tra
+    i worker web e il processo leader dello scheduler.
+    """
+    path = os.path.abspath(os.path.join(data_dir, 'process.lock'))
+    with _ingest_locks_guard:
+        lock = _ingest_locks.setdefault(path, threading.Lock())
+    with lock:
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
 
-from database import DatabaseManager, DailyLogStats, CTCSSStats, TGStats, DisconnectionPeriod
-from app import SVXLinkLogAnalyzer
 
 class LogProcessor:
     """Processore automatico per file log SVXLink"""
     
-    def __init__(self, data_dir: str = 'data', db_path: str = None):
+    def __init__(self, data_dir: str = 'data', db_path: str = None, db_manager: Optional[DatabaseManager] = None,
+                 start_method: Optional[str] = None):
         self.data_dir = Path(data_dir)
-        # Usa variabile d'ambiente se db_path non specificato
-        if db_path is None:
-            import os
-            db_path = os.getenv('DATABASE_PATH', 'data/svxlink_stats.db')
-        self.db_manager = DatabaseManager(db_path)
+        # Avvio dei processi dell'ingest parallelo ('fork' solo negli script a riga di comando)
+        self.start_method = start_method
+        if db_manager is None:
+            # Usa variabile d'ambiente se db_path non specificato
+            if db_path is None:
+                db_path = os.getenv('DATABASE_PATH', 'data/svxlink_stats.db')
+            db_manager = DatabaseManager(db_path)
+        # Un DatabaseManager esistente (es. quello dell'app) può essere condiviso
+        self.db_manager = db_manager
         self.analyzer = SVXLinkLogAnalyzer()
+        # Colonne binarie degli eventi accanto al database (data/svxlink_stats.columns)
+        self.columns_dir = columns_dir(self.db_manager.db_path) if COLUMN_CACHE else None
+        # Dettagli dell'ultimo file elaborato (righe, byte, errore) per il monitoraggio
+        self.last_file_stats = {'lines': 0, 'bytes': 0, 'error': None}
         
         # Assicura che la directory data esista
         self.data_dir.mkdir(exist_ok=True)
+        # Elenco dei file log in cache, riscansionato solo quando la directory cambia
+        self.directory_index = get_directory_index(self.data_dir)
     
     def extract_date_from_filename(self, filename: str) -> Optional[str]:
         """Estrae la data dal nome del file"""
-        # Pattern per svxlink_log_YYYY-MM-DD.txt
-        patterns = [
-            r'svxlink_log_(\d{4}-\d{2}-\d{2})\.txt',
-            r'svxlink_(\d{4}-\d{2}-\d{2})\.log',
-            r'(\d{4}-\d{2}-\d{2})\.txt',
-            r'(\d{4})(\d{2})(\d{2})\.txt',  # YYYYMMDD.txt
-            r'log_(\d{4}-\d{2}-\d{2})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, filename)
-            if match:
-                if len(match.groups()) == 1:
-                    return match.group(1)
-                elif len(match.groups()) == 3:
-                    # YYYYMMDD format
-                    return f"{match.group(1)}-{match.group(2)}-{match.group(3)}"
-        
-        return None
+        return extract_date_from_filename(filename)
     
-    def get_unprocessed_files(self) -> List[Path]:
-        """Trova file non ancora processati"""
-        # Pattern per file log
-        log_patterns = [
-            '*.txt',
-            '*.log',
-            'svxlink_log_*.txt',
-            'svxlink_*.log'
-        ]
-        
-        all_files = []
-        for pattern in log_patterns:
-            all_files.extend(self.data_dir.glob(pattern))
-        
-        # Filtra file già processati
-        processed_dates = set(self.db_manager.get_available_dates())
+    def ingest_lock(self):
+        """Lock condiviso dagli ingest dei file di questa cartella dati (vedi ingest_lock)"""
+        return ingest_lock(self.data_dir)
+    
+    def get_sites(self) -> Dict[str, Path]:
+        """Cartelle dei log per sito: data per il sito di default, data/<sito> per gli altri"""
+        # La cartella del database (es. data/db nel container) non è un sito
+        db_dir = Path(os.path.abspath(self.db_manager.db_path)).parent
+        return {site: path for site, path in discover_sites(self.data_dir).items()
+                if site == DEFAULT_SITE or Path(os.path.abspath(path)) != db_dir}
+    
+    def site_of(self, file_path: Path) -> str:
+        """Sito di un file log, dalla cartella in cui si trova"""
+        parent = Path(os.path.abspath(file_path)).parent
+        if parent.parent == Path(os.path.abspath(self.data_dir)) and is_valid_site(parent.name):
+            return parent.name
+        return DEFAULT_SITE
+    
+    def log_files(self, pattern: Optional[str] = None) -> List[Path]:
+        """File log di tutti i siti (ogni cartella ha il suo indice in cache)"""
+        files = []
+        for site_dir in self.get_sites().values():
+            files.extend(get_directory_index(site_dir).files(pattern))
+        return files
+    
+    def _interleave_sites(self, files: List[Path]) -> List[Path]:
+        """Alterna i file dei diversi siti: un sito con molti arretrati non ritarda gli altri"""
+        by_site: Dict[str, List[Path]] = {}
+        for file_path in files:
+            by_site.setdefault(self.site_of(file_path), []).append(file_path)
+        return [file_path for group in itertools.zip_longest(*by_site.values())
+                for file_path in group if file_path is not None]
+    
+    def get_unprocessed_files(self, paths: Optional[List[Path]] = None) -> List[Path]:
+        """Trova file nuovi o modificati dall'ultima importazione.
+
+        Un file il cui stat (dimensione, mtime, inode) coincide con il registro
+        viene saltato senza leggerlo; l'hash del contenuto viene calcolato solo
+        quando lo stat è cambiato, per distinguere un semplice touch da una
+        modifica reale. Con `paths` (es. i file segnalati dal watcher) vengono
+        controllati solo quei file invece di tutti i log dei siti.
+        """
+        registry = self.db_manager.get_ingested_files()
+        processed_dates: Dict[str, set] = {}
         unprocessed = []
+        refreshed = []
         
-        for file_path in all_files:
+        for file_path in (self.log_files() if paths is None else paths):
             file_date = self.extract_date_from_filename(file_path.name)
-            if file_date and file_date not in processed_dates:
-                unprocessed.append(file_path)
+            if not file_date:
+                continue
+            
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                # Rimosso dopo l'ultima scansione
+                get_directory_index(file_path.parent).invalidate()
+                continue
+            entry = registry.get(os.path.abspath(file_path))
+            if entry is not None and _same_stat(entry, stat):
+                continue
+            
+            if entry is None:
+                # Giorni importati prima del registro: si adotta il file così com'è
+                site_id = self.site_of(file_path)
+                if site_id not in processed_dates:
+                    processed_dates[site_id] = set(self.db_manager.get_available_dates(site_id))
+                if file_date in processed_dates[site_id]:
+                    refreshed.append(file_fingerprint(file_path, file_date, stat))
+                    continue
+            else:
+                fingerprint = file_fingerprint(file_path, file_date, stat)
+                if fingerprint.size == entry['size'] and fingerprint.content_hash == entry['content_hash']:
+                    # Solo metadati cambiati (touch, copia): aggiorna il registro
+                    refreshed.append(fingerprint)
+                    continue
+            
+            unprocessed.append(file_path)
+        
+        if refreshed:
+            self.db_manager.save_file_fingerprints(refreshed)
         
         return sorted(unprocessed)
     
     def process_log_file(self, file_path: Path) -> bool:
         """Processa singolo file log e salva nel database"""
+        site_id = self.site_of(file_path)
+        print(f"📄 Processando {file_path.name}" + (f" (sito {site_id})..." if site_id != DEFAULT_SITE else "..."))
+        parsed = parse_log_file(file_path, self.analyzer, self.columns_dir, site_id)
+        self.last_file_stats = {'lines': parsed.lines, 'bytes': parsed.bytes, 'error': parsed.error}
+        
+        if parsed.error:
+            print(f"❌ Errore processando {file_path.name}: {parsed.error}")
+            return False
+        
         try:
-            print(f"📄 Processando {file_path.name}...")
-            
-            # Estrai data dal filename
-            log_date = self.extract_date_from_filename(file_path.name)
-            if not log_date:
-                print(f"⚠️ Non riesco a estrarre data da {file_path.name}")
-                return False
-            
-            # Leggi file
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            if not content.strip():
-                print(f"⚠️ File vuoto: {file_path.name}")
-                return False
-            
-            # Analizza il log
-            stats = self.analyzer.analyze_log(content)
-            
-            # Prepara statistiche giornaliere
-            daily_stats = DailyLogStats(
-                date=log_date,
-                filename=file_path.name,
-                file_size=file_path.stat().st_size,
-                total_transmissions=stats['basic']['total_transmissions'],
-                total_transmission_time=int(stats['basic']['total_transmission_time']),
-                avg_transmission_time=stats['basic']['avg_transmission_time'],
-                max_transmission_time=stats['basic']['max_transmission_time'],
-                min_transmission_time=stats['basic']['min_transmission_time'],
-                total_qso=stats['qso']['total_qso'],
-                total_qso_time=int(stats['qso']['total_qso_time'])
-            )
-            
-            # Prepara statistiche CTCSS
-            ctcss_stats = []
-            if stats['ctcss']['ctcss_list']:
-                for ctcss_freq, data in stats['ctcss']['ctcss_list']:
-                    ctcss_stats.append(CTCSSStats(
-                        log_date=log_date,
-                        ctcss_frequency=float(ctcss_freq),
-                        count=data['count'],
-                        percentage=data['percentage']
-                    ))
-            
-            # Prepara statistiche TG
-            tg_stats = []
-            if stats['talk_groups']['tg_list']:
-                for tg_num, data in stats['talk_groups']['tg_list']:
-                    # Trova durate TG se disponibili
-                    tg_duration_data = None
-                    if stats['talk_groups']['tg_durations']:
-                        for tg_dur, dur_data in stats['talk_groups']['tg_durations']:
-                            if tg_dur == tg_num:
-                                tg_duration_data = dur_data
-                                break
-                    
-                    tg_stats.append(TGStats(
-                        log_date=log_date,
-                        tg_number=int(tg_num),
-                        transmission_count=data['count'],
-                        total_duration=int(tg_duration_data['total_seconds']) if tg_duration_data else 0,
-                        qso_count=tg_duration_data['qso_count'] if tg_duration_data else 0,
-                        avg_duration=tg_duration_data['avg_duration'] if tg_duration_data else 0.0,
-                        percentage=data['percentage']
-                    ))
-            
-            # Prepara statistiche disconnessioni
-            disconnection_stats = []
-            if stats.get('disconnections') and stats['disconnections'].get('periods'):
-                for disc in stats['disconnections']['periods']:
-                    disconnection_stats.append(DisconnectionPeriod(
-                        log_date=log_date,
-                        start_time=datetime.strptime(disc['start'].strftime('%Y-%m-%d %H:%M:%S'), '%Y-%m-%d %H:%M:%S') if isinstance(disc['start'], datetime) else datetime.strptime(disc['start'], '%Y-%m-%d %H:%M:%S'),
-                        end_time=datetime.strptime(disc['end'].strftime('%Y-%m-%d %H:%M:%S'), '%Y-%m-%d %H:%M:%S') if disc.get('end') and isinstance(disc['end'], datetime) else None,
-                        duration=int(disc.get('duration')) if disc.get('duration') else None,
-                        disconnection_count=disc.get('count', 1),
-                        status=disc.get('status', 'resolved')
-                    ))
-            
-            # Salva nel database
-            success = True
-            success &= self.db_manager.save_daily_stats(daily_stats)
-            
-            if ctcss_stats:
-                success &= self.db_manager.save_ctcss_stats(ctcss_stats)
-            
-            if tg_stats:
-                success &= self.db_manager.save_tg_stats(tg_stats)
-            
-            if disconnection_stats:
-                success &= self.db_manager.save_disconnections(disconnection_stats)
-            
-            if success:
-                print(f"✅ {file_path.name} processato con successo")
-                print(f"   📊 {daily_stats.total_transmissions} trasmissioni, "
-                      f"{daily_stats.total_qso} QSO, "
-                      f"{len(ctcss_stats)} CTCSS, {len(tg_stats)} TG, "
-                      f"{len(disconnection_stats)} periodi disconnessione")
-            else:
-                print(f"❌ Errore nel salvataggio di {file_path.name}")
-            
-            return success
-            
+            success = self.save_parsed_log(parsed)
         except Exception as e:
             print(f"❌ Errore processando {file_path.name}: {e}")
+            self.last_file_stats['error'] = str(e)
             return False
+        
+        if success:
+            self.publish_counters([parsed])
+            print(f"✅ {file_path.name} processato con successo")
+            print(f"   📊 {parsed.daily.total_transmissions} trasmissioni, "
+                  f"{parsed.daily.total_qso} QSO, "
+                  f"{len(parsed.ctcss)} CTCSS, {len(parsed.tg)} TG, "
+                  f"{len(parsed.disconnections)} periodi disconnessione")
+        else:
+            print(f"❌ Errore nel salvataggio di {file_path.name}")
+            self.last_file_stats['error'] = 'errore nel salvataggio su database'
+        
+        return success
     
-    def process_all_files(self, force: bool = False) -> Dict[str, int]:
-        """Processa tutti i file non ancora elaborati"""
+    def save_parsed_log(self, parsed: ParsedLog) -> bool:
+        """Salva nel database il risultato del parsing di un file e ne registra il fingerprint.
+
+        Il giorno viene sostituito in una sola transazione: chi legge vede i
+        dati precedenti o quelli nuovi, mai un giorno parziale.
+        """
+        return self.db_manager.save_log_batch(
+            [(parsed.daily, parsed.ctcss, parsed.tg, parsed.disconnections)],
+            [parsed.fingerprint] if parsed.fingerprint else None)
+    
+    def publish_counters(self, parsed_logs: List[ParsedLog]):
+        """Pubblica sul feed della dashboard (live_feed.py) i contatori dei giorni appena salvati"""
+        get_live_feed(self.data_dir).publish([counters_update(parsed) for parsed in parsed_logs])
+    
+    def process_all_files(self, force: bool = False, workers: Optional[int] = None) -> Dict[str, int]:
+        """Processa tutti i file non ancora elaborati.
+
+        Con workers > 1 il parsing viene distribuito su un pool di processi e
+        un unico thread scrittore salva i risultati nel database a blocchi.
+        Con più siti da aggiornare i file dei siti vengono alternati e, se
+        `workers` non è indicato, si usa almeno un worker per sito (fino al
+        numero di core): i siti vengono importati in parallelo.
+        """
         print("🔄 Cercando file da processare...")
         
         if force:
-            # Se force=True, processa tutti i file nella cartella
-            unprocessed_files = list(self.data_dir.glob("svxlink_log_*.txt"))
+            # Se force=True, processa tutti i file nelle cartelle dei siti
+            unprocessed_files = self.log_files('svxlink_log_*.txt')
             print(f"🔧 Modalità forzata: processamento di tutti i {len(unprocessed_files)} file")
         else:
             unprocessed_files = self.get_unprocessed_files()
@@ -201,33 +467,164 @@ class LogProcessor:
             print("✅ Nessun file nuovo da processare")
             return {'processed': 0, 'errors': 0}
         
-        print(f"📁 Trovati {len(unprocessed_files)} file da processare")
+        if workers is None:
+            sites = {self.site_of(file_path) for file_path in unprocessed_files}
+            workers = max(INGEST_WORKERS, min(len(sites), os.cpu_count() or 1))
+        return self._process_files(self._interleave_sites(unprocessed_files), workers)
+    
+    def reprocess_outdated(self, workers: Optional[int] = None) -> Dict:
+        """Rielabora solo i giorni salvati da una versione precedente dell'analizzatore.
+
+        I file vengono elaborati dal giorno più recente, in parallelo (default:
+        tutti i core). Ogni giorno è sostituito in una sola transazione, quindi
+        le API continuano a servire i dati precedenti finché il nuovo risultato
+        non è salvato. I giorni il cui file log non è più presente restano
+        invariati (in `missing` come data, o sito/data per gli altri siti).
+        """
+        outdated = 0
+        dated_files = []
+        missing = []
+        for site_id, site_dir in self.get_sites().items():
+            site_outdated = self.db_manager.get_outdated_dates(ANALYZER_VERSION, site_id)
+            if not site_outdated:
+                continue
+            outdated += len(site_outdated)
+            
+            # Più file per la stessa data: il più recente, come in process_specific_date
+            wanted = set(site_outdated)
+            files_by_date = {}
+            for file_path in get_directory_index(site_dir).files():
+                file_date = self.extract_date_from_filename(file_path.name)
+                if file_date in wanted:
+                    current = files_by_date.get(file_date)
+                    if current is None or file_path.stat().st_mtime > current.stat().st_mtime:
+                        files_by_date[file_date] = file_path
+            
+            dated_files.extend((day, files_by_date[day]) for day in site_outdated if day in files_by_date)
+            missing.extend(day if site_id == DEFAULT_SITE else f"{site_id}/{day}"
+                           for day in site_outdated if day not in files_by_date)
+        
+        if not outdated:
+            print(f"✅ Nessun giorno da rielaborare (analizzatore v{ANALYZER_VERSION})")
+            return {'processed': 0, 'errors': 0, 'outdated': 0, 'missing': []}
         
-        processed = 0
-        errors = 0
+        # Dal giorno più recente, qualunque sia il sito
+        files = [file_path for _, file_path in sorted(dated_files, key=lambda item: item[0], reverse=True)]
+        print(f"🔁 {outdated} giorni da rielaborare con l'analizzatore v{ANALYZER_VERSION}")
+        if missing:
+            print(f"⚠️ {len(missing)} giorni senza file log, dati invariati: {', '.join(missing[:10])}")
         
-        for file_path in unprocessed_files:
-            if self.process_log_file(file_path):
-                processed += 1
-            else:
-                errors += 1
+        if files:
+            result = self._process_files(files, (os.cpu_count() or 1) if workers is None else workers)
+        else:
+            result = {'processed': 0, 'errors': 0}
+        result['outdated'] = outdated
+        result['missing'] = missing
+        return result
+    
+    def _process_files(self, files: List[Path], workers: int) -> Dict:
+        """Elabora i file nell'ordine dato, in sequenza o su un pool di processi"""
+        workers = max(1, min(workers, len(files)))
+        print(f"📁 Trovati {len(files)} file da processare ({workers} worker)")
+        
+        started = time.perf_counter()
+        if workers > 1:
+            result = self._process_files_parallel(files, workers)
+        else:
+            result = {'processed': 0, 'errors': 0, 'lines': 0, 'error_details': []}
+            for file_path in files:
+                if self.process_log_file(file_path):
+                    result['processed'] += 1
+                else:
+                    result['errors'] += 1
+                    result['error_details'].append(f"{file_path.name}: {self.last_file_stats['error']}")
+                result['lines'] += self.last_file_stats['lines']
+        elapsed = time.perf_counter() - started
+        
+        result['workers'] = workers
+        result['elapsed_seconds'] = round(elapsed, 3)
+        result['files_per_second'] = round(len(files) / elapsed, 2) if elapsed else 0.0
+        result['lines_per_second'] = round(result['lines'] / elapsed, 1) if elapsed else 0.0
         
         print(f"\n🎯 Elaborazione completata:")
-        print(f"   ✅ Processati: {processed}")
-        print(f"   ❌ Errori: {errors}")
+        print(f"   ✅ Processati: {result['processed']}")
+        print(f"   ❌ Errori: {result['errors']}")
+        print(f"   ⏱️ {result['elapsed_seconds']}s, {result['files_per_second']} file/s, "
+              f"{result['lines_per_second']} righe/s")
         print(f"   📊 Totale file nel database: {len(self.db_manager.get_available_dates())}")
         
-        return {'processed': processed, 'errors': errors}
+        return result
+    
+    def _process_files_parallel(self, files: List[Path], workers: int) -> Dict:
+        """Parsing su pool di processi, scrittura a blocchi da un unico thread"""
+        results: 'queue.Queue[Optional[ParsedLog]]' = queue.Queue()
+        result = {'processed': 0, 'errors': 0, 'lines': 0, 'error_details': []}
+        writer = threading.Thread(target=self._write_parsed_logs, args=(results, result),
+                                  name='ingest-writer', daemon=True)
+        writer.start()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(self.start_method)) as pool:
+                futures = {pool.submit(_parse_in_worker, str(path), self.columns_dir, self.site_of(path)): path
+                           for path in files}
+                for future in as_completed(futures):
+                    try:
+                        parsed = future.result()
+                    except Exception as e:
+                        parsed = ParsedLog(filename=futures[future].name, error=str(e))
+                    results.put(parsed)
+        finally:
+            results.put(None)
+            writer.join()
+        return result
+    
+    def _write_parsed_logs(self, results: 'queue.Queue[Optional[ParsedLog]]', result: Dict):
+        """Thread scrittore: raggruppa i risultati disponibili in transazioni da INGEST_BATCH_SIZE giorni"""
+        finished = False
+        while not finished:
+            batch = [results.get()]
+            while len(batch) < INGEST_BATCH_SIZE:
+                try:
+                    batch.append(results.get_nowait())
+                except queue.Empty:
+                    break
+            finished = None in batch
+            
+            valid = []
+            for parsed in batch:
+                if parsed is None:
+                    continue
+                result['lines'] += parsed.lines
+                if parsed.error:
+                    result['errors'] += 1
+                    result['error_details'].append(f"{parsed.filename}: {parsed.error}")
+                    print(f"❌ Errore processando {parsed.filename}: {parsed.error}")
+                else:
+                    valid.append(parsed)
+            
+            if not valid:
+                continue
+            if self.db_manager.save_log_batch([(p.daily, p.ctcss, p.tg, p.disconnections) for p in valid],
+                                              [p.fingerprint for p in valid]):
+                result['processed'] += len(valid)
+                self.publish_counters(valid)
+                print(f"💾 Salvati {len(valid)} giorni ({result['processed']} totali)")
+            else:
+                result['errors'] += len(valid)
+                result['error_details'].extend(f"{p.filename}: errore nel salvataggio su database" for p in valid)
     
-    def process_specific_date(self, target_date: str, force: bool = False) -> bool:
-        """Processa file per una data specifica"""
+    def process_specific_date(self, target_date: str, force: bool = False, site_id: str = DEFAULT_SITE) -> bool:
+        """Processa file per una data specifica di un sito"""
         print(f"🎯 Cercando file per data: {target_date}")
         
+        site_dir = self.get_sites().get(site_id)
+        if site_dir is None:
+            print(f"❌ Sito {site_id} non trovato in {self.data_dir}")
+            return False
+        
         # Cerca file che corrispondono alla data
-        all_files = list(self.data_dir.glob('*.txt')) + list(self.data_dir.glob('*.log'))
         target_files = []
         
-        for file_path in all_files:
+        for file_path in get_directory_index(site_dir).files():
             file_date = self.extract_date_from_filename(file_path.name)
             if file_date == target_date:
                 target_files.append(file_path)
@@ -237,7 +634,7 @@ class LogProcessor:
             return False
         
         # Controlla se già processato
-        if not force and target_date in self.db_manager.get_available_dates():
+        if not force and target_date in self.db_manager.get_available_dates(site_id):
             print(f"⚠️ Data {target_date} già processata. Usa force=True per riprocessare.")
             return False
         
@@ -251,9 +648,8 @@ class LogProcessor:
         cutoff_date = cutoff_date.replace(day=cutoff_date.day - keep_days)
         
         removed = 0
-        all_files = list(self.data_dir.glob('*.txt')) + list(self.data_dir.glob('*.log'))
         
-        for file_path in all_files:
+        for file_path in self.log_files():
             file_date_str = self.extract_date_from_filename(file_path.name)
             if file_date_str:
                 try:
@@ -272,8 +668,9 @@ class LogProcessor:
     
     def get_processing_summary(self) -> Dict:
         """Ottieni riepilogo dello stato di processamento"""
-        # File disponibili
-        all_files = list(self.data_dir.glob('*.txt')) + list(self.data_dir.glob('*.log'))
+        # File disponibili in tutti i siti
+        sites = self.get_sites()
+        all_files = self.log_files()
         
         # Date processate
         processed_dates = set(self.db_manager.get_available_dates())
@@ -289,33 +686,43 @@ class LogProcessor:
             'processed_dates': len(processed_dates),
             'unprocessed_files': len(unprocessed),
             'date_range': date_range,
-            'unprocessed_list': [f.name for f in unprocessed[:10]]  # Prime 10
+            'unprocessed_list': [f.name for f in unprocessed[:10]],  # Prime 10
+            'sites': list(sites)
         }
 
 # Script principale
 if __name__ == "__main__":
     import sys
     
-    processor = LogProcessor()
+    processor = LogProcessor(start_method='fork')
+    
+    # Opzione --workers N per l'ingest parallelo
+    workers = None
+    if "--workers" in sys.argv:
+        index = sys.argv.index("--workers")
+        workers = int(sys.argv[index + 1])
+        del sys.argv[index:index + 2]
     
     if len(sys.argv) > 1:
         command = sys.argv[1]
         
         if command == "process":
             # Processa tutti i file
-            processor.process_all_files()
+            processor.process_all_files(workers=workers)
             
         elif command == "date" and len(sys.argv) > 2:
             # Processa data specifica
             target_date = sys.argv[2]
-            force = len(sys.argv) > 3 and sys.argv[3] == "--force"
-            processor.process_specific_date(target_date, force)
+            force = "--force" in sys.argv[3:]
+            site_id = sys.argv[sys.argv.index("--site") + 1] if "--site" in sys.argv else DEFAULT_SITE
+            processor.process_specific_date(target_date, force, site_id)
             
         elif command == "summary":
             # Mostra riepilogo
             summary = processor.get_processing_summary()
             print("📊 Riepilogo processamento:")
-            print(f"   📁 File totali: {summary['total_files']}")
+            print(f"   📁 File totali: {summary['total_files']} ({len(summary['sites'])} siti: "
+                  f"{', '.join(summary['sites'])})")
             print(f"   ✅ Date processate: {summary['processed_dates']}")
             print(f"   ⏳ File da processare: {summary['unprocessed_files']}")
             
@@ -328,6 +735,35 @@ if __name__ == "__main__":
                 for filename in summary['unprocessed_list']:
                     print(f"      - {filename}")
                     
+        elif command == "export" and len(sys.argv) > 2:
+            # Export di un dataset: export DATASET [START END] [--format csv|ndjson] [--gzip] [--output FILE]
+            from export import EXPORT_END, EXPORT_START, export_filename, export_to_file
+            options = sys.argv[2:]
+            export_format = 'csv'
+            output = None
+            if "--format" in options:
+                index = options.index("--format")
+                export_format = options[index + 1]
+                del options[index:index + 2]
+            if "--output" in options:
+                index = options.index("--output")
+                output = options[index + 1]
+                del options[index:index + 2]
+            compress = "--gzip" in options
+            if compress:
+                options.remove("--gzip")
+            dataset = options[0]
+            start_date = options[1] if len(options) > 1 else EXPORT_START
+            end_date = options[2] if len(options) > 2 else EXPORT_END
+            output = output or export_filename(dataset, start_date, end_date, export_format, compress)
+            written = export_to_file(processor.db_manager, dataset, output, start_date, end_date,
+                                     export_format, compress)
+            print(f"📤 Export {dataset} salvato in {output} ({written} byte)")
+            
+        elif command == "reprocess":
+            # Rielabora i giorni prodotti da una versione precedente dell'analizzatore
+            processor.reprocess_outdated(workers=workers)
+            
         elif command == "cleanup":
             # Pulizia file vecchi
             days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
@@ -335,8 +771,10 @@ if __name__ == "__main__":
             
         else:
             print("❓ Comando non riconosciuto")
-            print("Uso: python log_processor.py [process|date YYYY-MM-DD|summary|cleanup [days]]")
+            print("Uso: python log_processor.py [process [--workers N]|reprocess [--workers N]|date YYYY-MM-DD [--force] [--site SITO]|"
+                  "summary|cleanup [days]|"
+                  "export DATASET [START END] [--format csv|ndjson] [--gzip] [--output FILE]]")
     else:
         # Default: processa tutto
         print("🚀 Log Processor - Processamento automatico")
-        processor.process_all_files()
\ No newline at end of file
+        processor.process_all_files(workers=workers)
\ No newline at end of file
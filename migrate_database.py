@@ -1,71 +1,51 @@
 #!/usr/bin/env python3
 """
 Script di migrazione database per SVXLink Log Analyzer
-Aggiunge tabelle mancanti senza perdere dati esistenti
+Porta il database alla versione corrente dello schema e completa i backfill
+dei dati senza perdere dati esistenti.
+
+L'applicazione applica da sola le migrazioni all'avvio ed esegue i backfill
+in background; questo script serve per aggiornamenti manuali (es. prima di
+un deploy), con l'applicazione ferma o in esecuzione.
 """
 
 import os
 import sqlite3
 import sys
 
-def table_exists(cursor, table_name):
-    """Verifica se una tabella esiste"""
-    cursor.execute("""
-        SELECT name FROM sqlite_master 
-        WHERE type='table' AND name=?
-    """, (table_name,))
-    return cursor.fetchone() is not None
+from migrations import MIGRATION_BATCH_SIZE, SCHEMA_VERSION, get_pending_backfills, run_backfills
 
-def migrate_database(db_path):
+def migrate_database(db_path, run_data_backfills=True):
     """Esegue migrazioni necessarie sul database"""
     print("🔄 SVXLink Database Migration Tool")
     print("=" * 50)
     print(f"📁 Database: {db_path}")
-    
+
     if not os.path.exists(db_path):
         print("⚠️ Database non trovato - verrà creato al primo avvio")
         return 0
-    
+
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        migrations_done = 0
-        
-        # Migrazione 1: Tabella daily_disconnections
-        if not table_exists(cursor, 'daily_disconnections'):
-            print("\n📝 Creazione tabella 'daily_disconnections'...")
-            cursor.execute("""
-                CREATE TABLE daily_disconnections (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    log_date TEXT NOT NULL,
-                    start_time TEXT NOT NULL,
-                    end_time TEXT,
-                    duration INTEGER,
-                    disconnection_count INTEGER NOT NULL DEFAULT 1,
-                    status TEXT NOT NULL DEFAULT 'ongoing'
-                )
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_disconnections_date 
-                ON daily_disconnections(log_date)
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_disconnections_status 
-                ON daily_disconnections(status)
-            """)
-            print("✅ Tabella 'daily_disconnections' creata con successo")
-            migrations_done += 1
-        else:
-            print("✓ Tabella 'daily_disconnections' già presente")
-        
-        conn.commit()
-        conn.close()
-        
+        from database import DatabaseManager
+
+        # Schema iniziale e DDL delle migrazioni mancanti
+        db_manager = DatabaseManager(db_path)
+        print(f"✓ Schema alla versione {db_manager.get_schema_version()} (attesa {SCHEMA_VERSION})")
+
+        pending = get_pending_backfills(db_path)
+        if pending and run_data_backfills:
+            for backfill in pending:
+                print(f"\n📝 Backfill migrazione {backfill['version']}: {backfill['description']} "
+                      f"(blocchi da {MIGRATION_BATCH_SIZE} righe)")
+            updated = run_backfills(db_path)
+            print(f"✅ Backfill completati: {sum(updated.values())} righe aggiornate")
+        elif pending:
+            print(f"⏳ {len(pending)} backfill in sospeso (verranno eseguiti dall'applicazione)")
+
         print("\n" + "=" * 50)
-        print(f"✅ Migrazione completata! ({migrations_done} modifiche applicate)")
+        print("✅ Migrazione completata!")
         return 0
-        
+
     except sqlite3.Error as e:
         print(f"\n❌ Errore durante la migrazione: {e}")
         return 1
@@ -77,9 +57,9 @@ def main():
     """Funzione principale"""
     # Ottieni path database da variabile d'ambiente o usa default
     db_path = os.getenv('DATABASE_PATH', 'data/svxlink_stats.db')
-    
-    # Esegui migrazioni
-    exit_code = migrate_database(db_path)
+
+    # Esegui migrazioni (--schema-only lascia i backfill all'applicazione)
+    exit_code = migrate_database(db_path, run_data_backfills='--schema-only' not in sys.argv)
     sys.exit(exit_code)
 
 if __name__ == '__main__':
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Migrazioni dello schema per SVXLink Log Analyzer
+Registro ordinato delle versioni dello schema, registrata in PRAGMA
+user_version. Ogni migrazione ha una parte di schema (DDL veloce, eseguita
+all'avvio in una transazione) e opzionalmente un backfill dei dati, eseguito
+in background a blocchi di dimensione limitata: ogni blocco è una transazione
+breve seguita da una pausa, così letture e ingest non restano bloccati.
+"""
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from partitions import add_site_dimension, create_catalog, move_legacy_rows, upgrade_partitions
+from running_totals import create_running_totals, rebuild_running_totals
+
+# Righe aggiornate da ogni blocco di backfill (una transazione per blocco)
+MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 5000))
+# Pausa tra due blocchi, per lasciare spazio alle altre connessioni
+MIGRATION_BATCH_PAUSE = float(os.getenv('MIGRATION_BATCH_PAUSE', 0.05))
+
+# Versione creata da database_schema.sql (o dallo schema di base)
+BASELINE_VERSION = 1
+
+
+@dataclass
+class Migration:
+    """Passo di migrazione verso `version`"""
+    version: int
+    description: str
+    # DDL eseguito nella transazione che porta il database a `version`
+    schema: Optional[Callable[[sqlite3.Connection], None]] = None
+    # Aggiorna al massimo `batch_size` righe e restituisce quante ne ha aggiornate (0 = finito)
+    backfill: Optional[Callable[[sqlite3.Connection, int], int]] = None
+
+
+def add_column(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    """ALTER TABLE ADD COLUMN idempotente (lo schema può essere rieseguito dopo un reset)"""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _index_disconnection_status(conn: sqlite3.Connection):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_disconnections_status ON daily_disconnections(status)")
+
+
+def _add_analyzer_version(conn: sqlite3.Connection):
+    # 0 = giorno salvato prima del versionamento: da rielaborare
+    add_column(conn, 'daily_logs', 'analyzer_version', 'INTEGER DEFAULT 0')
+    upgrade_partitions(conn)
+
+
+def _add_site(conn: sqlite3.Connection):
+    # Le chiavi univoche passano da (data, ...) a (sito, data, ...): tabelle ricreate
+    add_site_dimension(conn)
+    upgrade_partitions(conn)
+
+
+def _create_ingest_streams(conn: sqlite3.Connection):
+    # Ingest in push (ingest.py): ultima sequenza confermata per sito e byte confermati per file
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_streams (
+            site_id TEXT PRIMARY KEY,
+            sequence INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_files (
+            path TEXT PRIMARY KEY,
+            site_id TEXT NOT NULL,
+            log_date DATE NOT NULL,
+            size INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ingest_files_date ON ingest_files(log_date)")
+
+
+# Registro ordinato: aggiungere sempre in coda con versione crescente
+MIGRATIONS: List[Migration] = [
+    Migration(BASELINE_VERSION, 'Schema iniziale (database_schema.sql)'),
+    Migration(2, 'Indice sullo stato delle disconnessioni', schema=_index_disconnection_status),
+    Migration(3, 'Partizioni annuali dei dati giornalieri', schema=create_catalog, backfill=move_legacy_rows),
+    Migration(4, "Versione dell'analizzatore per giorno", schema=_add_analyzer_version),
+    Migration(5, 'Dimensione sito (più ripetitori)', schema=_add_site),
+    Migration(6, "Sequenze dell'ingest in push", schema=_create_ingest_streams),
+    Migration(7, 'Totali cumulativi per intervalli di date', schema=create_running_totals,
+              backfill=rebuild_running_totals),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    # Transazioni esplicite: BEGIN IMMEDIATE serializza i processi che migrano insieme
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_backfills (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            rows_done INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return conn
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Versione dello schema registrata nel database (0 se mai inizializzato)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_schema_migrations(db_path: str, migrations: List[Migration] = MIGRATIONS) -> List[int]:
+    """Applica la parte di schema delle migrazioni mancanti, una transazione per versione.
+
+    I backfill non vengono eseguiti: restano registrati in schema_backfills
+    per run_backfills(). Restituisce le versioni applicate.
+    """
+    applied = []
+    conn = _connect(db_path)
+    try:
+        for migration in migrations:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Riletta dentro il lock: un altro processo può averla già applicata
+                if get_schema_version(conn) >= migration.version:
+                    conn.execute("COMMIT")
+                    continue
+                if migration.schema:
+                    migration.schema(conn)
+                if migration.backfill:
+                    conn.execute("INSERT OR IGNORE INTO schema_backfills (version, description) VALUES (?, ?)",
+                                 (migration.version, migration.description))
+                conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(migration.version)
+            print(f"🔄 Migrazione {migration.version} applicata: {migration.description}")
+    finally:
+        conn.close()
+    return applied
+
+
+def get_pending_backfills(db_path: str) -> List[Dict]:
+    """Backfill registrati e non ancora completati"""
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute("SELECT version, description, rows_done FROM schema_backfills ORDER BY version")
+        return [{'version': row[0], 'description': row[1], 'rows_done': row[2]} for row in rows]
+    finally:
+        conn.close()
+
+
+def run_backfills(db_path: str, migrations: List[Migration] = MIGRATIONS,
+                  batch_size: int = MIGRATION_BATCH_SIZE, pause: float = MIGRATION_BATCH_PAUSE,
+                  should_stop: Optional[Callable[[], bool]] = None) -> Dict[int, int]:
+    """Esegue i backfill in sospeso a blocchi, riprendendo da dove si erano fermati.
+
+    Ogni blocco aggiorna al massimo `batch_size` righe in una transazione
+    breve, poi attende `pause` secondi. `should_stop` permette di
+    interrompere tra un blocco e l'altro (il lavoro fatto resta salvato).
+    Restituisce le righe aggiornate per versione.
+    """
+    by_version = {migration.version: migration for migration in migrations}
+    updated: Dict[int, int] = {}
+    conn = _connect(db_path)
+    try:
+        for pending in [row[0] for row in conn.execute("SELECT version FROM schema_backfills ORDER BY version")]:
+            migration = by_version.get(pending)
+            if migration is None or migration.backfill is None:
+                continue
+            updated[pending] = 0
+            while not (should_stop and should_stop()):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    rows = migration.backfill(conn, batch_size)
+                    if rows:
+                        conn.execute("UPDATE schema_backfills SET rows_done = rows_done + ? WHERE version = ?",
+                                     (rows, pending))
+                    else:
+                        conn.execute("DELETE FROM schema_backfills WHERE version = ?", (pending,))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                if not rows:
+                    print(f"✅ Backfill migrazione {pending} completato ({updated[pending]} righe)")
+                    break
+                updated[pending] += rows
+                time.sleep(pause)
+    finally:
+        conn.close()
+    return updated
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Partizioni temporali dei dati per SVXLink Log Analyzer
+I dati giornalieri (log, CTCSS, Talk Group, disconnessioni) sono salvati in un
+file SQLite per anno, accanto al database principale:
+
+    data/svxlink_stats.db                   catalogo partizioni, registro file, schema
+    data/svxlink_stats.partitions/2025.db   dati giornalieri del 2025
+
+Le query aprono solo le partizioni che si sovrappongono all'intervallo
+richiesto, la retention elimina interi file invece di cancellare righe e gli
+anni chiusi vengono compattati (VACUUM) e resi di sola lettura.
+"""
+
+import functools
+import os
+import shutil
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from sites import DEFAULT_SITE
+
+# Tabelle dati partizionate e relativa colonna data
+DATA_TABLES: Dict[str, str] = {
+    'daily_logs': 'date',
+    'daily_ctcss_stats': 'log_date',
+    'daily_tg_stats': 'log_date',
+    'daily_disconnections': 'log_date',
+}
+
+# Stesse colonne (e nello stesso ordine) delle tabelle di database_schema.sql, più
+# quelle aggiunte dalle migrazioni; le chiavi esterne verso daily_logs non servono:
+# ogni giorno vive in una sola partizione. Le chiavi univoche iniziano dal sito, così
+# gli stessi indici servono le query filtrate per sito e per sito e data.
+PARTITION_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS daily_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date DATE NOT NULL,
+    filename TEXT NOT NULL,
+    file_size INTEGER,
+    total_transmissions INTEGER DEFAULT 0,
+    total_transmission_time INTEGER DEFAULT 0,
+    avg_transmission_time REAL DEFAULT 0,
+    max_transmission_time INTEGER DEFAULT 0,
+    min_transmission_time INTEGER DEFAULT 0,
+    total_qso INTEGER DEFAULT 0,
+    total_qso_time INTEGER DEFAULT 0,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    analyzer_version INTEGER DEFAULT 0,
+    site_id TEXT NOT NULL DEFAULT '{DEFAULT_SITE}',
+    UNIQUE(site_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_ctcss_stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_date DATE NOT NULL,
+    ctcss_frequency REAL NOT NULL,
+    count INTEGER NOT NULL,
+    percentage REAL NOT NULL,
+    site_id TEXT NOT NULL DEFAULT '{DEFAULT_SITE}',
+    UNIQUE(site_id, log_date, ctcss_frequency)
+);
+
+CREATE TABLE IF NOT EXISTS daily_tg_stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_date DATE NOT NULL,
+    tg_number INTEGER NOT NULL,
+    transmission_count INTEGER NOT NULL,
+    total_duration INTEGER NOT NULL,
+    qso_count INTEGER NOT NULL,
+    avg_duration REAL NOT NULL,
+    percentage REAL NOT NULL,
+    site_id TEXT NOT NULL DEFAULT '{DEFAULT_SITE}',
+    UNIQUE(site_id, log_date, tg_number)
+);
+
+CREATE TABLE IF NOT EXISTS daily_disconnections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_date DATE NOT NULL,
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP,
+    duration INTEGER,
+    disconnection_count INTEGER DEFAULT 1,
+    status TEXT DEFAULT 'resolved',
+    site_id TEXT NOT NULL DEFAULT '{DEFAULT_SITE}'
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_logs_date ON daily_logs(date);
+CREATE INDEX IF NOT EXISTS idx_ctcss_stats_date ON daily_ctcss_stats(log_date);
+CREATE INDEX IF NOT EXISTS idx_tg_stats_date ON daily_tg_stats(log_date);
+CREATE INDEX IF NOT EXISTS idx_disconnections_date ON daily_disconnections(log_date);
+CREATE INDEX IF NOT EXISTS idx_disconnections_status ON daily_disconnections(status);
+CREATE INDEX IF NOT EXISTS idx_disconnections_site ON daily_disconnections(site_id, log_date);
+"""
+
+# Versione dello schema delle partizioni (PRAGMA user_version di ogni file)
+PARTITION_SCHEMA_VERSION = 3
+
+
+def schema_statements() -> List[str]:
+    """Istruzioni di PARTITION_SCHEMA, da eseguire una alla volta dentro una transazione"""
+    return [statement.strip() for statement in PARTITION_SCHEMA.split(';') if statement.strip()]
+
+
+def rebuild_table(conn: sqlite3.Connection, table: str):
+    """Ricrea una tabella dati con la definizione di PARTITION_SCHEMA mantenendone le righe.
+
+    SQLite non permette di modificare i vincoli UNIQUE: si crea la nuova
+    tabella, si copiano le colonne in comune (le altre prendono il default) e
+    la si sostituisce alla vecchia. Gli indici vanno ricreati dal chiamante.
+    """
+    create = next(statement for statement in schema_statements()
+                  if statement.startswith(f"CREATE TABLE IF NOT EXISTS {table} ("))
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    columns = ', '.join(column for column in table_columns(table) if column in existing)
+    conn.execute(f"DROP TABLE IF EXISTS {table}_rebuild")
+    conn.execute(create.replace(f"IF NOT EXISTS {table} (", f"{table}_rebuild (", 1))
+    conn.execute(f"INSERT INTO {table}_rebuild ({columns}) SELECT {columns} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    # Le viste di database_schema.sql fanno riferimento alla tabella appena eliminata
+    conn.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conn.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+    finally:
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+
+
+def add_site_dimension(conn: sqlite3.Connection):
+    """Aggiunge site_id alle tabelle dati: i dati esistenti appartengono al sito di default"""
+    for table in DATA_TABLES:
+        rebuild_table(conn, table)
+    for statement in schema_statements():
+        if statement.startswith('CREATE INDEX'):
+            conn.execute(statement)
+
+
+# Aggiornamenti dei file creati con una versione precedente, per versione di arrivo
+PARTITION_UPGRADES: Dict[int, Callable[[sqlite3.Connection], None]] = {
+    2: lambda conn: conn.execute("ALTER TABLE daily_logs ADD COLUMN analyzer_version INTEGER DEFAULT 0"),
+    3: add_site_dimension,
+}
+
+
+def create_catalog(conn: sqlite3.Connection):
+    """Catalogo delle partizioni nel database principale (migrazione 3)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS partitions (
+            key TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            period_start DATE NOT NULL,
+            period_end DATE NOT NULL,
+            first_date DATE,
+            last_date DATE,
+            days INTEGER DEFAULT 0,
+            read_only INTEGER DEFAULT 0,
+            compacted_at TIMESTAMP,
+            updated_at TIMESTAMP
+        )
+    """)
+
+
+def partition_key(day: str) -> str:
+    """Partizione di una data YYYY-MM-DD (l'anno)"""
+    return day[:4]
+
+
+def period_bounds(key: str) -> Tuple[str, str]:
+    """Primo e ultimo giorno coperti da una partizione"""
+    return (f"{key}-01-01", f"{key}-12-31")
+
+
+def group_by_partition(days: Iterable[str]) -> Dict[str, List[str]]:
+    """Raggruppa le date per partizione"""
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for day in days:
+        groups[partition_key(day)].append(day)
+    return dict(groups)
+
+
+def partitions_dir(db_path: str) -> str:
+    """Directory delle partizioni: data/svxlink_stats.db -> data/svxlink_stats.partitions"""
+    return os.path.splitext(db_path)[0] + '.partitions'
+
+
+def partition_path(db_path: str, filename: str) -> str:
+    return os.path.join(partitions_dir(db_path), filename)
+
+
+def copy_database(src_path: str, dst_path: str):
+    """Copia il database principale insieme alle sue partizioni (es. per i benchmark)"""
+    shutil.copy(src_path, dst_path)
+    shutil.rmtree(partitions_dir(dst_path), ignore_errors=True)
+    if os.path.isdir(partitions_dir(src_path)):
+        shutil.copytree(partitions_dir(src_path), partitions_dir(dst_path))
+
+
+@functools.lru_cache(maxsize=None)
+def table_columns(table: str) -> Tuple[str, ...]:
+    """Colonne di una tabella partizionata, nell'ordine dello schema"""
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.executescript(PARTITION_SCHEMA)
+        return tuple(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+    finally:
+        conn.close()
+
+
+def open_partition(db_path: str, key: str) -> sqlite3.Connection:
+    """Apre in scrittura il file di una partizione, creandolo se serve"""
+    os.makedirs(partitions_dir(db_path), exist_ok=True)
+    conn = sqlite3.connect(partition_path(db_path, f"{key}.db"), timeout=30)
+    conn.row_factory = sqlite3.Row
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version != PARTITION_SCHEMA_VERSION:
+        # Aggiornamento e nuova versione in una sola transazione: un'interruzione lo lascia da rifare
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Riletta dentro il lock: un altro processo può averla già aggiornata
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version:
+                for target, upgrade in sorted(PARTITION_UPGRADES.items()):
+                    if version < target <= PARTITION_SCHEMA_VERSION:
+                        upgrade(conn)
+            for statement in schema_statements():
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {PARTITION_SCHEMA_VERSION}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.close()
+            raise
+    return conn
+
+
+def upgrade_partitions(conn: sqlite3.Connection):
+    """Porta allo schema corrente tutte le partizioni del catalogo, anche quelle di sola lettura"""
+    db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+    for key, filename in conn.execute("SELECT key, filename FROM partitions").fetchall():
+        path = partition_path(db_path, filename)
+        if not os.path.exists(path):
+            continue
+        mode = os.stat(path).st_mode & 0o777
+        os.chmod(path, 0o644)
+        try:
+            open_partition(db_path, key).close()
+        finally:
+            os.chmod(path, mode)
+
+
+def make_writable(conn: sqlite3.Connection, db_path: str, key: str):
+    """Riapre in scrittura una partizione compattata (es. log arrivato in ritardo)"""
+    row = conn.execute("SELECT filename FROM partitions WHERE key = ? AND read_only = 1", (key,)).fetchone()
+    if row is None:
+        return
+    path = partition_path(db_path, row[0])
+    if os.path.exists(path):
+        os.chmod(path, 0o644)
+    conn.execute("UPDATE partitions SET read_only = 0, compacted_at = NULL WHERE key = ?", (key,))
+    print(f"🔓 Partizione {key} riaperta in scrittura")
+
+
+def refresh_catalog(conn: sqlite3.Connection, key: str, part: sqlite3.Connection):
+    """Aggiorna nel catalogo (database principale) il riepilogo di una partizione.
+
+    Ogni scrittura nelle partizioni passa da qui: il file principale cambia
+    sempre, quindi cache e ETag continuano a rilevare le modifiche dalla sua firma.
+    """
+    # Giorni distinti: con più siti lo stesso giorno ha una riga per sito
+    first_date, last_date, days = part.execute(
+        "SELECT MIN(date), MAX(date), COUNT(DISTINCT date) FROM daily_logs").fetchone()
+    period_start, period_end = period_bounds(key)
+    conn.execute("""
+        INSERT INTO partitions (key, filename, period_start, period_end, first_date, last_date, days, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            first_date = excluded.first_date,
+            last_date = excluded.last_date,
+            days = excluded.days,
+            updated_at = excluded.updated_at
+    """, (key, f"{key}.db", period_start, period_end, first_date, last_date, days, datetime.now().isoformat()))
+
+
+def move_legacy_days(conn: sqlite3.Connection, part: sqlite3.Connection, days: List[str]):
+    """Sposta nella partizione le righe dei giorni indicati ancora nel database principale.
+
+    Le righe del database principale sono precedenti ai siti: solo il sito di
+    default. Una tabella che nella partizione ha già righe di quel giorno è
+    più recente (scritta dopo l'aggiornamento) e non viene sovrascritta; le
+    righe del database principale vengono comunque eliminate. Partizione e
+    database principale vanno confermati dal chiamante, in quest'ordine.
+    """
+    placeholders = ', '.join('?' * len(days))
+    for table, date_column in DATA_TABLES.items():
+        columns = [column for column in table_columns(table) if column != 'id']
+        rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {date_column} IN ({placeholders})",
+                            days).fetchall()
+        if not rows:
+            continue
+        present = {row[0] for row in part.execute(
+            f"SELECT DISTINCT {date_column} FROM {table} WHERE site_id = ? AND {date_column} IN ({placeholders})",
+            [DEFAULT_SITE] + days)}
+        date_index = columns.index(date_column)
+        part.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                         [row for row in rows if row[date_index] not in present])
+        conn.execute(f"DELETE FROM {table} WHERE {date_column} IN ({placeholders})", days)
+
+
+def move_legacy_rows(conn: sqlite3.Connection, batch_size: int) -> int:
+    """Backfill della migrazione 3: sposta nelle partizioni i dati del database principale.
+
+    Ogni blocco sposta al massimo `batch_size` giorni (con tutte le righe
+    collegate) e restituisce quanti giorni ha spostato. È ripetibile e non
+    sovrascrive i giorni già scritti nelle partizioni (vedi move_legacy_days):
+    le scritture durante il backfill spostano prima le righe dei loro giorni.
+    """
+    days = [row[0] for row in conn.execute("""
+        SELECT DISTINCT day FROM (
+            SELECT date AS day FROM daily_logs
+            UNION SELECT log_date FROM daily_ctcss_stats
+            UNION SELECT log_date FROM daily_tg_stats
+            UNION SELECT log_date FROM daily_disconnections
+        ) ORDER BY day LIMIT ?
+    """, (batch_size,))]
+    if not days:
+        return 0
+
+    db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+    for key, group in group_by_partition(days).items():
+        make_writable(conn, db_path, key)
+        part = open_partition(db_path, key)
+        try:
+            move_legacy_days(conn, part, group)
+            part.commit()
+            refresh_catalog(conn, key, part)
+        finally:
+            part.close()
+    return len(days)
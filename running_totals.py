@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Totali cumulativi (somme prefisse) per SVXLink Log Analyzer
+Per ogni sito, chiave (Talk Group, tono CTCSS) e giorno con dati, il database
+principale conserva la somma dei valori giornalieri dal primo giorno dei dati
+fino a quel giorno compreso. Il totale di un intervallo qualsiasi è la
+differenza tra due righe trovate con una ricerca nell'indice:
+
+    totale(inizio..fine) = cumulativo(ultimo giorno <= fine) - cumulativo(ultimo giorno < inizio)
+
+invece di una SUM su tutti i giorni dell'intervallo, che cresce con la sua
+lunghezza. I totali vengono aggiornati a ogni scrittura delle partizioni,
+nella stessa transazione del catalogo: un giorno rielaborato sposta i
+cumulativi dei giorni successivi delle sole chiavi che cambiano.
+"""
+
+import math
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from partitions import DATA_TABLES, partition_path
+
+
+@dataclass(frozen=True)
+class RunningTable:
+    """Totali cumulativi di una tabella dati, per sito, chiave e giorno"""
+    table: str
+    source: str
+    # Colonna chiave della tabella dati (None = un solo totale per sito, chiave 0)
+    key: Optional[str]
+    # (colonna cumulativa, espressione sulla tabella dati, tipo SQL); `days` conta i giorni con dati
+    values: Tuple[Tuple[str, str, str], ...]
+
+    @property
+    def columns(self) -> List[str]:
+        return [column for column, _, _ in self.values]
+
+
+RUNNING_TABLES: Dict[str, RunningTable] = {
+    'daily': RunningTable('running_daily_totals', 'daily_logs', None, (
+        ('days', '1', 'INTEGER'),
+        ('transmissions', 'total_transmissions', 'INTEGER'),
+        ('transmission_time', 'total_transmission_time', 'INTEGER'),
+        ('qso', 'total_qso', 'INTEGER'),
+        ('qso_time', 'total_qso_time', 'INTEGER'),
+    )),
+    'talkgroups': RunningTable('running_tg_totals', 'daily_tg_stats', 'tg_number', (
+        ('days', '1', 'INTEGER'),
+        ('transmissions', 'transmission_count', 'INTEGER'),
+        ('duration', 'total_duration', 'INTEGER'),
+        ('qso', 'qso_count', 'INTEGER'),
+        # Somme delle medie e percentuali giornaliere: divise per `days` danno le medie del periodo
+        ('avg_duration', 'avg_duration', 'REAL'),
+        ('percentage', 'percentage', 'REAL'),
+    )),
+    'ctcss': RunningTable('running_ctcss_totals', 'daily_ctcss_stats', 'ctcss_frequency', (
+        ('days', '1', 'INTEGER'),
+        ('count', 'count', 'INTEGER'),
+        ('percentage', 'percentage', 'REAL'),
+    )),
+}
+
+
+def create_running_totals(conn: sqlite3.Connection):
+    """Tabelle dei totali cumulativi nel database principale (migrazione 7)"""
+    for spec in RUNNING_TABLES.values():
+        values = ',\n'.join(f"{column} {sql_type} NOT NULL" for column, _, sql_type in spec.values)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {spec.table} (
+                site_id TEXT NOT NULL,
+                key NOT NULL,
+                date DATE NOT NULL,
+                {values},
+                PRIMARY KEY (site_id, key, date)
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{spec.table}_date ON {spec.table}(date)")
+    # Chiavi per tipo e sito: un intervallo cerca i due cumulativi di ogni chiave
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS running_total_keys (
+            kind TEXT NOT NULL,
+            site_id TEXT NOT NULL,
+            key NOT NULL,
+            PRIMARY KEY (kind, site_id, key)
+        ) WITHOUT ROWID
+    """)
+    # Ultimo giorno già elaborato dal backfill (rebuild_running_totals)
+    conn.execute("CREATE TABLE IF NOT EXISTS running_totals_rebuild (through DATE NOT NULL)")
+
+
+def running_totals_ready(conn: sqlite3.Connection) -> bool:
+    """True se i totali coprono tutti i dati: nessun backfill delle migrazioni in sospeso"""
+    return conn.execute("SELECT 1 FROM schema_backfills LIMIT 1").fetchone() is None
+
+
+def _day_values(source: sqlite3.Connection, spec: RunningTable, days: List[str]) -> Dict[Tuple, Optional[Tuple]]:
+    """Valori giornalieri dei giorni indicati, per (sito, chiave, giorno)"""
+    date_column = DATA_TABLES[spec.source]
+    expressions = ', '.join(f"COALESCE({expression}, 0)" for _, expression, _ in spec.values)
+    cursor = source.execute(f"""
+        SELECT site_id, {spec.key or 0}, {date_column}, {expressions}
+        FROM {spec.source}
+        WHERE {date_column} IN ({', '.join('?' * len(days))})
+    """, days)
+    return {tuple(row[:3]): tuple(row[3:]) for row in map(tuple, cursor)}
+
+
+def _same(first: Tuple, second: Tuple) -> bool:
+    # I valori giornalieri ricavati come differenze di cumulativi REAL non sono esatti al bit
+    return all(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6) for a, b in zip(first, second))
+
+
+def _apply(conn: sqlite3.Connection, kind: str, spec: RunningTable, changes: Dict[Tuple, Optional[Tuple]]):
+    """Imposta i valori giornalieri indicati (None = nessun dato) e sposta i cumulativi successivi"""
+    columns = ', '.join(spec.columns)
+    shift = ', '.join(f"{column} = {column} + ?" for column in spec.columns)
+    zero = (0,) * len(spec.values)
+
+    def cumulative(site_id, key, day: str, operator: str) -> Optional[Tuple]:
+        row = conn.execute(f"""
+            SELECT {columns} FROM {spec.table}
+            WHERE site_id = ? AND key = ? AND date {operator} ?
+            ORDER BY date DESC LIMIT 1
+        """, (site_id, key, day)).fetchone()
+        return tuple(row) if row else None
+
+    # In ordine di data: ogni passo lascia i cumulativi coerenti per il successivo
+    for (site_id, key, day), values in sorted(changes.items(), key=lambda item: item[0]):
+        previous = cumulative(site_id, key, day, '<') or zero
+        current = cumulative(site_id, key, day, '=')
+        if current is not None:
+            # Valore salvato del giorno: differenza tra il suo cumulativo e il precedente
+            current = tuple(a - b for a, b in zip(current, previous))
+        if current is None and values is None:
+            continue
+        if current is not None and values is not None and _same(current, values):
+            continue
+
+        delta = tuple(a - b for a, b in zip(values or zero, current or zero))
+        if values is None:
+            conn.execute(f"DELETE FROM {spec.table} WHERE site_id = ? AND key = ? AND date = ?", (site_id, key, day))
+        elif current is None:
+            conn.execute(f"INSERT INTO {spec.table} (site_id, key, date, {columns}) "
+                         f"VALUES ({', '.join('?' * (len(spec.values) + 3))})",
+                         (site_id, key, day) + tuple(a + b for a, b in zip(previous, values)))
+            conn.execute("INSERT OR IGNORE INTO running_total_keys (kind, site_id, key) VALUES (?, ?, ?)",
+                         (kind, site_id, key))
+        # Il giorno stesso (se aggiornato) e tutti i successivi della chiave si spostano dello stesso delta
+        operator = '>=' if values is not None and current is not None else '>'
+        conn.execute(f"UPDATE {spec.table} SET {shift} WHERE site_id = ? AND key = ? AND date {operator} ?",
+                     delta + (site_id, key, day))
+
+
+def update_running_totals(conn: sqlite3.Connection, part: sqlite3.Connection, days: List[str]):
+    """Allinea i totali cumulativi ai dati appena scritti in una partizione per i giorni indicati.
+
+    `conn` è il database principale (il chiamante fa il commit insieme al
+    catalogo), `part` la partizione già aggiornata. Le chiavi che avevano dati
+    in quei giorni e ora non ne hanno più vengono tolte.
+    """
+    if not days:
+        return
+    for kind, spec in RUNNING_TABLES.items():
+        changes = _day_values(part, spec, days)
+        for row in conn.execute(f"SELECT site_id, key, date FROM {spec.table} "
+                                f"WHERE date IN ({', '.join('?' * len(days))})", days):
+            changes.setdefault(tuple(row), None)
+        _apply(conn, kind, spec, changes)
+
+
+def forget_running_totals(conn: sqlite3.Connection, cutoff: str):
+    """Retention: elimina i totali dei giorni prima di `cutoff` e ribasa i cumulativi successivi"""
+    for spec in RUNNING_TABLES.values():
+        columns = spec.columns
+        # Ultimo cumulativo di ogni chiave prima del limite (colonne della riga con MAX(date))
+        bases = conn.execute(f"""
+            SELECT site_id, key, MAX(date), {', '.join(columns)} FROM {spec.table}
+            WHERE date < ?
+            GROUP BY site_id, key
+        """, (cutoff,)).fetchall()
+        assignments = ', '.join(f"{column} = {column} - ?" for column in columns)
+        conn.executemany(f"UPDATE {spec.table} SET {assignments} WHERE site_id = ? AND key = ? AND date >= ?",
+                         [tuple(row[3:]) + (row[0], row[1], cutoff) for row in bases])
+        conn.execute(f"DELETE FROM {spec.table} WHERE date < ?", (cutoff,))
+    for kind, spec in RUNNING_TABLES.items():
+        conn.execute(f"""
+            DELETE FROM running_total_keys
+            WHERE kind = ? AND NOT EXISTS (
+                SELECT 1 FROM {spec.table} t
+                WHERE t.site_id = running_total_keys.site_id AND t.key = running_total_keys.key
+            )
+        """, (kind,))
+
+
+def rebuild_running_totals(conn: sqlite3.Connection, batch_size: int) -> int:
+    """Backfill della migrazione 7: calcola i totali cumulativi dei dati già salvati.
+
+    Ogni blocco elabora al massimo `batch_size` giorni in ordine cronologico,
+    letti dalle partizioni, e registra l'ultimo giorno elaborato. Le scritture
+    arrivate nel frattempo aggiornano già i totali: rielaborare un giorno non
+    cambia nulla. Restituisce i giorni elaborati.
+    """
+    db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+    row = conn.execute("SELECT through FROM running_totals_rebuild").fetchone()
+    through = row[0] if row else ''
+    done = 0
+    partitions = conn.execute("SELECT filename FROM partitions WHERE period_end > ? ORDER BY key",
+                              (through,)).fetchall()
+    for (filename,) in partitions:
+        path = partition_path(db_path, filename)
+        if not os.path.exists(path):
+            continue
+        part = sqlite3.connect(path)
+        try:
+            days = [day for (day,) in part.execute("""
+                SELECT day FROM (
+                    SELECT date AS day FROM daily_logs
+                    UNION SELECT log_date FROM daily_tg_stats
+                    UNION SELECT log_date FROM daily_ctcss_stats
+                ) WHERE day > ? ORDER BY day LIMIT ?
+            """, (through, batch_size - done))]
+            update_running_totals(conn, part, days)
+        finally:
+            part.close()
+        if days:
+            through = days[-1]
+            done += len(days)
+        if done >= batch_size:
+            break
+
+    conn.execute("DELETE FROM running_totals_rebuild")
+    if done:
+        conn.execute("INSERT INTO running_totals_rebuild (through) VALUES (?)", (through,))
+    return done
+
+
+def range_totals(conn: sqlite3.Connection, kind: str, start_date: str, end_date: str,
+                 site: Optional[str] = None, by_site: bool = False) -> List[Dict]:
+    """Totali dell'intervallo per chiave (e per sito con `by_site`), dalle differenze dei cumulativi.
+
+    Per ogni chiave servono due ricerche nell'indice (site_id, key, date): il
+    costo dipende dal numero di chiavi, non dalla lunghezza dell'intervallo.
+    Solo le chiavi con almeno un giorno di dati nell'intervallo, ordinate per
+    chiave.
+    """
+    spec = RUNNING_TABLES[kind]
+    site_sql, site_params = ("AND site_id = ?", (site,)) if site is not None else ("", ())
+    group = "bounds.site_id, bounds.key" if by_site else "bounds.key"
+    sums = ', '.join(f"SUM(upto.{column} - COALESCE(prior.{column}, 0)) AS {column}" for column in spec.columns)
+    cursor = conn.execute(f"""
+        SELECT {group}, {sums}
+        FROM (
+            SELECT site_id, key,
+                (SELECT MAX(date) FROM {spec.table} t
+                 WHERE t.site_id = k.site_id AND t.key = k.key AND t.date <= ?) AS upto_date,
+                (SELECT MAX(date) FROM {spec.table} t
+                 WHERE t.site_id = k.site_id AND t.key = k.key AND t.date < ?) AS prior_date
+            FROM running_total_keys k
+            WHERE kind = ? {site_sql}
+        ) bounds
+        JOIN {spec.table} upto
+            ON upto.site_id = bounds.site_id AND upto.key = bounds.key AND upto.date = bounds.upto_date
+        LEFT JOIN {spec.table} prior
+            ON prior.site_id = bounds.site_id AND prior.key = bounds.key AND prior.date = bounds.prior_date
+        GROUP BY {group}
+        HAVING SUM(upto.days - COALESCE(prior.days, 0)) > 0
+        ORDER BY {group}
+    """, (end_date, start_date, kind) + site_params)
+    names = (['site_id'] if by_site else []) + ['key'] + spec.columns
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
@@ -1,56 +1,88 @@
 #!/usr/bin/env python3
 """
 Scheduler per processamento automatico file log SVXLink
-Esegue il processamento dei nuovi file ogni giorno alle 00:01
+Esegue il processamento dei nuovi file ogni giorno alle 00:01 e, tramite i
+watcher della cartella data e delle cartelle dei siti, entro pochi secondi
+dall'arrivo di un file. Con SYSLOG_LISTEN avvia anche il listener syslog
+(syslog_listener.py) nel processo leader
 """
 
+import os
 import threading
 import time
 import schedule
 import logging
 from datetime import datetime
+from ingest import PushIngest
+from leader import LeaderElection
 from log_processor import LogProcessor
+from migrations import get_pending_backfills, run_backfills
+from sites import DEFAULT_SITE
+from syslog_listener import SYSLOG_LISTEN, SyslogListener
+from watcher import DirectoryWatcher
+
+# File di log dello scheduler (SCHEDULER_LOG_FILE vuota = solo console)
+SCHEDULER_LOG_FILE = os.getenv('SCHEDULER_LOG_FILE', 'logs/scheduler.log')
 
 # Configurazione logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('logs/scheduler.log', mode='a')
-    ]
+    handlers=[logging.StreamHandler()] + (
+        [logging.FileHandler(SCHEDULER_LOG_FILE, mode='a')] if SCHEDULER_LOG_FILE else [])
 )
 
 logger = logging.getLogger(__name__)
 
+# Watcher della cartella data (WATCH_DATA_DIR=false per disattivarlo)
+WATCH_DATA_DIR = os.getenv('WATCH_DATA_DIR', 'true').lower() in ('1', 'true', 'yes')
+# Secondi di quiete dopo l'ultima scrittura prima di processare un file
+WATCH_DEBOUNCE = float(os.getenv('WATCH_DEBOUNCE', 2))
+# Intervallo di controllo quando inotify non è disponibile
+WATCH_POLL_INTERVAL = float(os.getenv('WATCH_POLL_INTERVAL', 5))
+# Attesa massima del segnale "server in ascolto" prima dell'ingest all'avvio
+STARTUP_INGEST_DELAY = float(os.getenv('STARTUP_INGEST_DELAY', 10))
+
 class LogScheduler:
     """Scheduler per processamento automatico dei log"""
     
-    def __init__(self):
-        self.processor = LogProcessor()
+    def __init__(self, processor_factory=LogProcessor):
+        self.processor_factory = processor_factory
+        self._processor = None
         self.running = False
         self.thread = None
+        self.watcher = None
+        # Watcher delle cartelle dei siti (data/<sito>), per sito
+        self.site_watchers = {}
+        # Listener syslog (solo con SYSLOG_LISTEN impostata)
+        self.syslog_listener = None
+        self.election = None
+        self._wakeup = threading.Event()
+        self._server_ready = threading.Event()
+    
+    @property
+    def processor(self):
+        """Log processor, creato al primo utilizzo (i follower non lo creano mai)"""
+        if self._processor is None:
+            self._processor = self.processor_factory()
+        return self._processor
+    
+    def mark_server_ready(self):
+        """Segnala che il server è in ascolto: l'ingest all'avvio può partire"""
+        self._server_ready.set()
     
     def process_daily_logs(self):
         """Job giornaliero per processare nuovi file"""
         try:
             logger.info("🔄 Avvio processamento automatico giornaliero")
             
-            # Processa tutti i file non elaborati
-            result = self.processor.process_all_files()
-            
-            logger.info(f"✅ Processamento completato: {result['processed']} file processati, {result['errors']} errori")
-            
-            # Pulizia file vecchi (opzionale, mantieni ultimi 60 giorni)
-            if result['processed'] > 0:
-                cleaned = self.processor.cleanup_old_files(keep_days=60)
-                if cleaned > 0:
-                    logger.info(f"🧹 Puliti {cleaned} file vecchi")
-            
-            # Pulizia database (mantieni ultimi 2 anni)
-            cleaned_db = self.processor.db_manager.cleanup_old_data(keep_days=730)
-            if cleaned_db > 0:
-                logger.info(f"🗄️ Puliti {cleaned_db} record vecchi dal database")
+            # Processa tutti i file non elaborati (un ingest alla volta, vedi LogProcessor.ingest_lock)
+            with self.processor.ingest_lock():
+                result = self.processor.process_all_files()
+                
+                logger.info(f"✅ Processamento completato: {result['processed']} file processati, {result['errors']} errori")
+                
+                self.run_maintenance(result)
             
             return result
             
@@ -58,6 +90,24 @@ class LogScheduler:
             logger.error(f"❌ Errore nel processamento automatico: {e}")
             return {'processed': 0, 'errors': 1}
     
+    def run_maintenance(self, result):
+        """Pulizia file e record vecchi dopo un processamento"""
+        # Pulizia file vecchi (opzionale, mantieni ultimi 60 giorni)
+        if result['processed'] > 0:
+            cleaned = self.processor.cleanup_old_files(keep_days=60)
+            if cleaned > 0:
+                logger.info(f"🧹 Puliti {cleaned} file vecchi")
+        
+        # Pulizia database (mantieni ultimi 2 anni)
+        cleaned_db = self.processor.db_manager.cleanup_old_data(keep_days=730)
+        if cleaned_db > 0:
+            logger.info(f"🗄️ Puliti {cleaned_db} record vecchi dal database")
+
+        # Anni chiusi: VACUUM e sola lettura
+        compacted = self.processor.db_manager.compact_partitions()
+        if compacted:
+            logger.info(f"📦 Partizioni compattate: {', '.join(compacted)}")
+    
     def process_on_startup(self):
         """Processa file all'avvio dell'applicazione"""
         try:
@@ -68,7 +118,8 @@ class LogScheduler:
             
             if summary['unprocessed_files'] > 0:
                 logger.info(f"📁 Trovati {summary['unprocessed_files']} file non processati")
-                result = self.processor.process_all_files()
+                with self.processor.ingest_lock():
+                    result = self.processor.process_all_files()
                 logger.info(f"✅ Processamento avvio completato: {result['processed']} file processati")
                 return result
             else:
@@ -102,16 +153,122 @@ class LogScheduler:
         
         logger.info("⏰ Scheduler avviato - processamento giornaliero alle 00:01")
         
+        # Watcher e ingest all'avvio partono quando il server è in ascolto
+        threading.Thread(target=self._start_after_server_ready, name='startup-ingest', daemon=True).start()
+    
+    def _start_after_server_ready(self):
+        """Avvia watcher e ingest all'avvio senza rallentare le prime richieste"""
+        if not self._server_ready.wait(STARTUP_INGEST_DELAY):
+            logger.info(f"⏳ Nessun segnale dal server entro {STARTUP_INGEST_DELAY:.0f}s, avvio ingest")
+        if not self.running:
+            return
+        
+        # Ingest entro pochi secondi dall'arrivo o dalla crescita di un file
+        if WATCH_DATA_DIR:
+            self.watcher = DirectoryWatcher(self.processor.data_dir, self._on_files_changed,
+                                            debounce=WATCH_DEBOUNCE, poll_interval=WATCH_POLL_INTERVAL)
+            self.watcher.start()
+            # inotify non segue le sottocartelle: un watcher per sito (i siti nuovi
+            # vengono presi dal controllo periodico fino al riavvio)
+            for site_id, site_dir in self.processor.get_sites().items():
+                if site_id != DEFAULT_SITE:
+                    self.site_watchers[site_id] = DirectoryWatcher(site_dir, self._on_files_changed,
+                                                                   debounce=WATCH_DEBOUNCE,
+                                                                   poll_interval=WATCH_POLL_INTERVAL)
+                    self.site_watchers[site_id].start()
+        
+        # Righe SVXLink ricevute via syslog: stessi file e statistiche dell'ingest in push
+        if SYSLOG_LISTEN:
+            self.start_syslog_listener()
+        
         # Processa file all'avvio
-        threading.Thread(target=self.process_on_startup, daemon=True).start()
+        self.process_on_startup()
+        
+        # Backfill delle migrazioni dopo l'ingest: i nuovi file non li attendono
+        self.run_migration_backfills()
+    
+    def start_syslog_listener(self):
+        """Avvia il listener syslog sugli endpoint di SYSLOG_LISTEN"""
+        try:
+            self.syslog_listener = SyslogListener(PushIngest(self.processor))
+            self.syslog_listener.start()
+            logger.info(f"📻 Listener syslog avviato: {', '.join(self.syslog_listener.get_stats()['endpoints'])}")
+        except Exception as e:
+            logger.error(f"❌ Listener syslog non avviato: {e}")
+            self.syslog_listener = None
+    
+    def run_migration_backfills(self):
+        """Completa a blocchi i backfill delle migrazioni dello schema"""
+        try:
+            db_path = self.processor.db_manager.db_path
+            pending = get_pending_backfills(db_path)
+            if not pending:
+                return
+            logger.info(f"🔄 Backfill migrazioni in corso: {', '.join(str(p['version']) for p in pending)}")
+            updated = run_backfills(db_path, should_stop=lambda: not self.running)
+            logger.info(f"✅ Backfill migrazioni: {sum(updated.values())} righe aggiornate")
+        except Exception as e:
+            logger.error(f"❌ Errore backfill migrazioni: {e}")
+    
+    def _on_files_changed(self, paths):
+        """Callback del watcher: processa i file segnalati, se nuovi o modificati secondo il registro"""
+        logger.info(f"👀 File modificati: {', '.join(p.name for p in paths)}")
+        with self.processor.ingest_lock():
+            for file_path in self.processor.get_unprocessed_files(paths):
+                try:
+                    written_at = file_path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if self.processor.process_log_file(file_path):
+                    latency = time.time() - written_at
+                    self.site_watchers.get(self.processor.site_of(file_path), self.watcher).record_latency(latency)
+                    logger.info(f"⚡ {file_path.name} importato {latency:.1f}s dopo l'ultima scrittura")
+    
+    def start_as_leader(self):
+        """Avvia lo scheduler solo se questo processo vince l'elezione del leader.
+
+        Con più worker web ogni processo crea lo scheduler, ma solo il leader
+        esegue job, watcher e ingest all'avvio; gli altri subentrano se il
+        leader termina.
+        """
+        db_path = os.getenv('DATABASE_PATH', 'data/svxlink_stats.db')
+        lock_path = os.getenv('SCHEDULER_LOCK_FILE') or os.path.join(
+            os.path.dirname(db_path) or '.', 'scheduler.lock')
+        self.election = LeaderElection(lock_path, self._on_elected)
+        if not self.election.start():
+            logger.info(f"👥 Scheduler in attesa: un altro processo è leader ({lock_path})")
+    
+    def _on_elected(self):
+        logger.info(f"👑 Processo {os.getpid()} eletto leader dello scheduler")
+        self.start_scheduler()
+    
+    def get_leader_status(self):
+        """Stato dell'elezione del leader (None se lo scheduler è avviato direttamente)"""
+        return self.election.get_status() if self.election else None
     
     def stop_scheduler(self):
         """Ferma lo scheduler"""
+        if self.election:
+            self.election.release()
+            self.election = None
+        
         if not self.running:
             return
         
         self.running = False
         schedule.clear()
+        self._wakeup.set()
+        self._server_ready.set()
+        
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        for watcher in self.site_watchers.values():
+            watcher.stop()
+        self.site_watchers = {}
+        if self.syslog_listener:
+            self.syslog_listener.stop()
+            self.syslog_listener = None
         
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=5)
@@ -120,13 +277,16 @@ class LogScheduler:
     
     def _run_scheduler(self):
         """Loop principale dello scheduler"""
+        self._wakeup.clear()
         while self.running:
             try:
                 schedule.run_pending()
-                time.sleep(60)  # Controlla ogni minuto
+                # Dorme fino al prossimo job invece di svegliarsi ogni minuto
+                idle = schedule.idle_seconds()
+                self._wakeup.wait(max(idle, 0) if idle is not None else None)
             except Exception as e:
                 logger.error(f"❌ Errore nel loop scheduler: {e}")
-                time.sleep(60)
+                self._wakeup.wait(60)
     
     def _check_new_files(self):
         """Controlla se ci sono nuovi file da processare (job ogni 6 ore)"""
@@ -136,10 +296,10 @@ class LogScheduler:
             if summary['unprocessed_files'] > 0:
                 logger.info(f"🔍 Controllo periodico: trovati {summary['unprocessed_files']} file non processati")
                 
-                # Processa solo se ci sono più di 2 file in attesa
-                if summary['unprocessed_files'] >= 2:
+                # Rete di sicurezza per eventi persi dal watcher: processa qualsiasi file in attesa
+                with self.processor.ingest_lock():
                     result = self.processor.process_all_files()
-                    logger.info(f"⚡ Processamento periodico: {result['processed']} file processati")
+                logger.info(f"⚡ Processamento periodico: {result['processed']} file processati")
             else:
                 logger.debug("✨ Controllo periodico: nessun file da processare")
                 
@@ -169,17 +329,17 @@ class LogScheduler:
 # Istanza globale dello scheduler
 scheduler_instance = None
 
-def get_scheduler():
+def get_scheduler(processor_factory=LogProcessor):
     """Ottieni l'istanza dello scheduler"""
     global scheduler_instance
     if scheduler_instance is None:
-        scheduler_instance = LogScheduler()
+        scheduler_instance = LogScheduler(processor_factory)
     return scheduler_instance
 
-def init_scheduler():
-    """Inizializza e avvia lo scheduler"""
-    scheduler = get_scheduler()
-    scheduler.start_scheduler()
+def init_scheduler(processor_factory=LogProcessor):
+    """Inizializza lo scheduler, avviato solo nel processo eletto leader"""
+    scheduler = get_scheduler(processor_factory)
+    scheduler.start_as_leader()
     return scheduler
 
 def stop_scheduler():
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Siti (ripetitori) per SVXLink Log Analyzer
+Ogni riga dei dati giornalieri appartiene a un sito (colonna site_id). I log
+di ogni sito stanno in una sottocartella della cartella data:
+
+    data/svxlink_log_2025-10-16.txt             sito "default"
+    data/monte-cavo/svxlink_log_2025-10-16.txt  sito "monte-cavo"
+
+Le installazioni con un solo ripetitore continuano a usare la cartella data
+come prima: i loro dati appartengono al sito DEFAULT_SITE.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from directory_index import get_directory_index
+
+# Sito dei log nella cartella data (e di tutti i dati salvati prima dei siti)
+DEFAULT_SITE = 'default'
+
+# Nomi validi per un sito: esclude le cartelle del database (svxlink_stats.partitions, .columns)
+SITE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# File log di un sito: una sottocartella senza log (backup, logs, __pycache__) non è un sito
+LOG_FILE_PATTERN = 'svxlink_log_*.txt'
+
+# Elenco esplicito dei siti, separati da virgola (vuoto = sottocartelle con almeno un log)
+SITES = [site.strip() for site in os.getenv('SITES', '').split(',') if site.strip()]
+
+
+def is_valid_site(site_id: Optional[str]) -> bool:
+    """True se `site_id` può essere usato come identificativo di un sito"""
+    return bool(site_id) and SITE_ID_PATTERN.match(site_id) is not None
+
+
+def site_dir(data_dir: Path, site_id: str = DEFAULT_SITE) -> Path:
+    """Cartella dei log di un sito: data per il sito di default, data/<sito> per gli altri"""
+    return Path(data_dir) if site_id == DEFAULT_SITE else Path(data_dir, site_id)
+
+
+def _has_logs(directory: Path) -> bool:
+    return bool(get_directory_index(directory).files(LOG_FILE_PATTERN))
+
+
+def discover_sites(data_dir: Path, names: Optional[List[str]] = None) -> Dict[str, Path]:
+    """Cartelle dei log per sito: il sito di default e una voce per ogni sito trovato.
+
+    Con `names` (default: variabile SITES) sono siti solo le sottocartelle
+    elencate; altrimenti ogni sottocartella con un nome valido che contiene
+    almeno un file log. Sottocartelle e file log vengono dagli indici in cache
+    (directory_index.py): solo uno stat per cartella finché nulla cambia.
+    """
+    data_dir = Path(data_dir)
+    names = SITES if names is None else names
+    sites = {DEFAULT_SITE: data_dir}
+    for entry in get_directory_index(data_dir).subdirectories():
+        if entry.name == DEFAULT_SITE or not is_valid_site(entry.name):
+            continue
+        if entry.name in names if names else _has_logs(entry):
+            sites[entry.name] = entry
+    return sites
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark dell'avvio a freddo di SVXLink Log Analyzer
+Misura il tempo di import del modulo app e il tempo dall'avvio del server
+alla prima risposta positiva di /health.
+
+Uso: python startup_benchmark.py [--runs 5] [--server gunicorn|flask]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from load_test import _free_port, _wait_ready
+from partitions import copy_database
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+
+def _measure_import(env):
+    output = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _measure_first_health(env, server, port):
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    else:
+        command = [sys.executable, 'app.py']
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not _wait_ready(f'http://127.0.0.1:{port}', interval=0.01):
+            return None
+        return time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark avvio a freddo')
+    parser.add_argument('--runs', type=int, default=5, help='Ripetizioni per misura')
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn', help='Server da avviare')
+    parser.add_argument('--database', default=os.getenv('DATABASE_PATH', 'data/svxlink_stats.db'),
+                        help='Database da usare (ne viene usata una copia per ogni run)')
+    args = parser.parse_args()
+
+    print("⏱️ Benchmark avvio a freddo")
+    print(f"   {args.runs} run, server {args.server}")
+
+    import_times, health_times = [], []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for _ in range(args.runs):
+            # Database copiato ogni volta: ogni run parte dallo stesso stato
+            db_copy = os.path.join(tmp_dir, 'svxlink_stats.db')
+            if os.path.exists(args.database):
+                copy_database(args.database, db_copy)
+            port = _free_port()
+            env = dict(os.environ, DATABASE_PATH=db_copy, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port),
+                       WEB_WORKERS='1', WATCH_DATA_DIR='false',
+                       SCHEDULER_LOCK_FILE=os.path.join(tmp_dir, 'scheduler.lock'))
+
+            import_times.append(_measure_import(env))
+            elapsed = _measure_first_health(env, args.server, port)
+            if elapsed is None:
+                print("❌ Server non pronto")
+                continue
+            health_times.append(elapsed)
+
+    if import_times:
+        print(f"   📦 import app: mediana {statistics.median(import_times) * 1000:.0f} ms, "
+              f"max {max(import_times) * 1000:.0f} ms")
+    if health_times:
+        print(f"   💚 prima /health: mediana {statistics.median(health_times) * 1000:.0f} ms, "
+              f"max {max(health_times) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
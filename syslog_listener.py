@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Ricevitore syslog (UDP/TCP) per SVXLink Log Analyzer
+SVXLink può scrivere il log su syslog invece che su file. Il listener riceve
+i messaggi (RFC 3164 o RFC 5424; su TCP con framing a conteggio di ottetti
+RFC 6587 o a righe), ricostruisce le righe nel formato del file log SVXLink
+e le passa all'ingest in push (ingest.py): stessi file giornalieri per sito,
+stesso aggiornamento incrementale delle statistiche.
+
+Il servizio gira su un event loop asyncio in un thread accanto all'app. La
+ricezione si limita ad accodare le righe in memoria; ogni
+SYSLOG_FLUSH_INTERVAL secondi (o a SYSLOG_BATCH_LINES righe) le righe in
+attesa vengono confermate insieme in un thread separato, senza fermare la
+ricezione.
+
+Uso: python syslog_listener.py [udp://0.0.0.0:5514,tcp://0.0.0.0:5514]
+"""
+
+import asyncio
+import os
+import re
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from ingest import LINE_DATE, MONTHS, LineBatch, PushIngest
+from sites import DEFAULT_SITE, is_valid_site
+
+# Endpoint in ascolto, es. "udp://0.0.0.0:5514,tcp://0.0.0.0:5514" (vuoto = disattivato)
+SYSLOG_LISTEN = os.getenv('SYSLOG_LISTEN', '')
+# Programma (tag syslog) dei messaggi SVXLink; vuoto = tutti i messaggi
+SYSLOG_PROGRAM = os.getenv('SYSLOG_PROGRAM', 'svxlink').lower()
+# Sito dal nome host del mittente (prima parte del nome); altrimenti sito di default
+SYSLOG_SITE_FROM_HOST = os.getenv('SYSLOG_SITE_FROM_HOST', 'false').lower() in ('1', 'true', 'yes')
+# Secondi tra due conferme delle righe ricevute
+SYSLOG_FLUSH_INTERVAL = float(os.getenv('SYSLOG_FLUSH_INTERVAL', 1))
+# Righe in attesa che anticipano la conferma
+SYSLOG_BATCH_LINES = int(os.getenv('SYSLOG_BATCH_LINES', 5000))
+# Righe tenute in memoria al massimo se le conferme falliscono (oltre: scartate le più vecchie)
+SYSLOG_MAX_PENDING = int(os.getenv('SYSLOG_MAX_PENDING', 200000))
+# Buffer di ricezione del socket UDP: assorbe i picchi durante una conferma
+SYSLOG_RCVBUF = int(os.getenv('SYSLOG_RCVBUF', 4 * 1024 * 1024))
+# Dimensione massima di un messaggio TCP
+SYSLOG_MAX_MESSAGE = 64 * 1024
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+MONTH_NAMES = {number: name for name, number in MONTHS.items()}
+
+# <PRI>1 TIMESTAMP HOST APP PROCID MSGID [SD] MSG
+RFC5424 = re.compile(r'^<(\d{1,3})>1 (\S+) (\S+) (\S+) (\S+) (\S+) (-|(?:\[(?:[^\]\\]|\\.)*\])+)(?: (.*))?$', re.S)
+# <PRI>Mmm dd hh:mm:ss [HOST] TAG[PID]: MSG (l'host non termina con ':', il tag sì)
+RFC3164 = re.compile(r'^<(\d{1,3})>([A-Z][a-z]{2}) +(\d{1,2}) (\d{2}):(\d{2}):(\d{2}) '
+                     r'(?:(\S*[^\s:]) )?([^\s:\[]+)(?:\[[^\]]*\])?: ?(.*)$', re.S)
+
+
+@dataclass
+class SyslogMessage:
+    """Messaggio syslog decodificato"""
+    host: Optional[str]
+    program: str
+    timestamp: datetime  # ora locale, come nei file log SVXLink
+    message: str
+
+
+def _rfc5424_timestamp(value: str, now: datetime) -> datetime:
+    if value == '-':
+        return now
+    try:
+        # Frazioni oltre i microsecondi non accettate da fromisoformat
+        value = re.sub(r'(\.\d{6})\d+', r'\1', value.replace('Z', '+00:00'))
+        timestamp = datetime.fromisoformat(value)
+    except ValueError:
+        return now
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+def parse_syslog(data: str, now: Optional[datetime] = None) -> Optional[SyslogMessage]:
+    """Decodifica un messaggio RFC 5424 o RFC 3164, None se non è un messaggio syslog"""
+    now = now or datetime.now()
+    match = RFC5424.match(data)
+    if match:
+        host, program = match.group(3), match.group(4)
+        return SyslogMessage(host=None if host == '-' else host, program='' if program == '-' else program,
+                             timestamp=_rfc5424_timestamp(match.group(2), now),
+                             message=(match.group(8) or '').lstrip('\ufeff'))
+    match = RFC3164.match(data)
+    if match and match.group(2) in MONTHS:
+        month, day = MONTHS[match.group(2)], int(match.group(3))
+        try:
+            timestamp = datetime(now.year, month, day, int(match.group(4)), int(match.group(5)), int(match.group(6)))
+        except ValueError:
+            return None
+        # Senza anno: un messaggio "nel futuro" è di fine anno precedente
+        if timestamp > now + timedelta(days=1):
+            timestamp = timestamp.replace(year=now.year - 1)
+        return SyslogMessage(host=match.group(7), program=match.group(8), timestamp=timestamp,
+                             message=match.group(9))
+    return None
+
+
+def svxlink_line(message: SyslogMessage) -> str:
+    """Riga nel formato del file log SVXLink ("Sun Oct 19 08:02:33 2025: ...")"""
+    text = message.message.rstrip()
+    if LINE_DATE.match(text):
+        # SVXLink ha già scritto il proprio timestamp nel messaggio
+        return text
+    ts = message.timestamp
+    return (f"{WEEKDAYS[ts.weekday()]} {MONTH_NAMES[ts.month]} {ts.day:2d} "
+            f"{ts.hour:02d}:{ts.minute:02d}:{ts.second:02d} {ts.year}: {text}")
+
+
+def parse_listen(listen: str) -> List[Tuple[str, str, int]]:
+    """Endpoint da "udp://host:porta,tcp://host:porta" """
+    endpoints = []
+    for item in filter(None, (part.strip() for part in listen.split(','))):
+        match = re.match(r'^(udp|tcp)://(.*):(\d+)$', item)
+        if not match:
+            raise ValueError(f"Endpoint syslog non valido: {item} (atteso udp://host:porta o tcp://host:porta)")
+        endpoints.append((match.group(1), match.group(2).strip('[]') or '0.0.0.0', int(match.group(3))))
+    return endpoints
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, listener: 'SyslogListener'):
+        self.listener = listener
+
+    def datagram_received(self, data, addr):
+        self.listener.receive(data)
+
+
+class SyslogListener:
+    """Servizio asyncio che riceve i messaggi syslog e li conferma a blocchi"""
+
+    def __init__(self, receiver: PushIngest, listen: str = SYSLOG_LISTEN, program: str = SYSLOG_PROGRAM,
+                 site_from_host: bool = SYSLOG_SITE_FROM_HOST, flush_interval: float = SYSLOG_FLUSH_INTERVAL,
+                 batch_lines: int = SYSLOG_BATCH_LINES, max_pending: int = SYSLOG_MAX_PENDING):
+        self.receiver = receiver
+        self.endpoints = parse_listen(listen)
+        self.program = program.lower()
+        self.site_from_host = site_from_host
+        self.flush_interval = flush_interval
+        self.batch_lines = max(1, batch_lines)
+        self.max_pending = max(self.batch_lines, max_pending)
+        # Indirizzi effettivi per protocollo (porta 0 = scelta dal sistema)
+        self.addresses: Dict[str, Tuple[str, int]] = {}
+        self.running = False
+        self.stats = {'received': 0, 'lines': 0, 'ignored': 0, 'invalid': 0, 'committed': 0,
+                      'flushes': 0, 'errors': 0, 'dropped': 0}
+        self.last_flush_at: Optional[str] = None
+        self._pending: Dict[str, List[str]] = {}
+        self._pending_lines = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_now: Optional[asyncio.Event] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def start(self, timeout: float = 5.0):
+        """Avvia il loop in un thread e attende che i socket siano in ascolto"""
+        if self.running:
+            return
+        if not self.endpoints:
+            raise ValueError("Nessun endpoint syslog configurato (SYSLOG_LISTEN)")
+        self._ready.clear()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='syslog-listener', daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error is not None:
+            raise self._error
+        self.running = True
+
+    def stop(self, timeout: float = 10.0):
+        """Chiude i socket e conferma le righe ancora in attesa"""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.running = False
+
+    def get_stats(self) -> Dict:
+        """Stato del listener per le API"""
+        stats = dict(self.stats)
+        stats.update({
+            'running': self.running,
+            'endpoints': [f"{proto}://{host}:{port}" for proto, (host, port) in self.addresses.items()],
+            'pending_lines': self._pending_lines,
+            'last_flush_at': self.last_flush_at
+        })
+        return stats
+
+    def receive(self, data: bytes):
+        """Accoda le righe SVXLink di un datagramma o messaggio TCP (nel thread del loop)"""
+        self.stats['received'] += 1
+        for raw in data.decode('utf-8', errors='replace').split('\n'):
+            raw = raw.rstrip('\r\0')
+            if not raw:
+                continue
+            message = parse_syslog(raw)
+            if message is None:
+                self.stats['invalid'] += 1
+                continue
+            if self.program and message.program.lower() != self.program:
+                self.stats['ignored'] += 1
+                continue
+            site_id = DEFAULT_SITE
+            if self.site_from_host and message.host:
+                host = message.host.split('.')[0]
+                site_id = host if is_valid_site(host) else DEFAULT_SITE
+            self._pending.setdefault(site_id, []).append(svxlink_line(message))
+            self._pending_lines += 1
+            self.stats['lines'] += 1
+        if self._pending_lines >= self.batch_lines and self._flush_now is not None:
+            self._flush_now.set()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._serve())
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+        finally:
+            self._loop.close()
+            self.running = False
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        self._flush_now = asyncio.Event()
+        self._stop = asyncio.Event()
+        servers = []
+        for proto, host, port in self.endpoints:
+            if proto == 'udp':
+                transport, _ = await loop.create_datagram_endpoint(lambda: _DatagramProtocol(self),
+                                                                   local_addr=(host, port))
+                sock = transport.get_extra_info('socket')
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SYSLOG_RCVBUF)
+                except OSError:
+                    pass
+                self.addresses['udp'] = sock.getsockname()[:2]
+                servers.append(transport)
+            else:
+                server = await asyncio.start_server(self._handle_tcp, host, port, limit=SYSLOG_MAX_MESSAGE)
+                self.addresses['tcp'] = server.sockets[0].getsockname()[:2]
+                servers.append(server)
+        print(f"📻 Listener syslog in ascolto: {', '.join(f'{p}://{h}:{n}' for p, (h, n) in self.addresses.items())}")
+        self._ready.set()
+
+        try:
+            while not self._stop.is_set():
+                stop = asyncio.ensure_future(self._stop.wait())
+                flush_now = asyncio.ensure_future(self._flush_now.wait())
+                await asyncio.wait({stop, flush_now}, timeout=self.flush_interval,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                stop.cancel()
+                flush_now.cancel()
+                self._flush_now.clear()
+                await self._flush()
+        finally:
+            for server in servers:
+                server.close()
+            await self._flush()
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # RFC 6587: "<lunghezza> <messaggio>" oppure un messaggio per riga
+        try:
+            while True:
+                first = await reader.read(1)
+                if not first:
+                    break
+                if first.isdigit():
+                    length = int(first + (await reader.readuntil(b' '))[:-1])
+                    if length > SYSLOG_MAX_MESSAGE:
+                        break
+                    self.receive(await reader.readexactly(length))
+                else:
+                    self.receive(first + await reader.readuntil(b'\n'))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _flush(self):
+        """Conferma le righe in attesa (nell'executor: la ricezione continua)"""
+        if not self._pending_lines:
+            return
+        pending, self._pending, self._pending_lines = self._pending, {}, 0
+        batches = [LineBatch(site_id, None, lines) for site_id, lines in pending.items()]
+        try:
+            # Senza timeout: un blocco non ancora confermato resta in coda e verrebbe scritto
+            # comunque, riproporlo duplicherebbe le righe
+            await asyncio.get_running_loop().run_in_executor(None, self.receiver.submit, batches, None)
+        except Exception as e:
+            print(f"❌ Errore conferma righe syslog: {e}")
+        for batch in batches:
+            if batch.status == 'committed':
+                self.stats['committed'] += len(batch.lines)
+                continue
+            self.stats['errors'] += 1
+            if batch.status != 'failed':
+                continue
+            # Gruppo annullato dallo scrittore (nessuna riga scritta): righe riproposte alla
+            # conferma successiva, prima di quelle arrivate nel frattempo
+            self._pending[batch.site_id] = batch.lines + self._pending.get(batch.site_id, [])
+            self._pending_lines += len(batch.lines)
+        while self._pending_lines > self.max_pending:
+            site_id = max(self._pending, key=lambda site: len(self._pending[site]))
+            excess = min(self._pending_lines - self.max_pending, len(self._pending[site_id]))
+            del self._pending[site_id][:excess]
+            self._pending_lines -= excess
+            self.stats['dropped'] += excess
+        self.stats['flushes'] += 1
+        self.last_flush_at = datetime.now().isoformat()
+
+
+if __name__ == "__main__":
+    from log_processor import LogProcessor
+
+    listener = SyslogListener(PushIngest(LogProcessor()),
+                              listen=sys.argv[1] if len(sys.argv) > 1 else (SYSLOG_LISTEN or 'udp://0.0.0.0:5514'))
+    listener.start()
+    try:
+        while listener.running:
+            time.sleep(10)
+            stats = listener.get_stats()
+            print(f"📊 {stats['lines']} righe ricevute, {stats['committed']} confermate, "
+                  f"{stats['ignored']} ignorate, {stats['invalid']} non valide")
+    except KeyboardInterrupt:
+        listener.stop()
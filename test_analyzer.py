@@ -3,11 +3,12 @@
 Script di test per verificare l'analisi del file SVXLink log
 """
 
+import subprocess
 import sys
 import os
 sys.path.append(os.path.dirname(__file__))
 
-from app import SVXLinkLogAnalyzer
+from log_analyzer import SVXLinkLogAnalyzer
 
 def test_analyzer():
     """Testa l'analyzer con il file di log esistente"""
@@ -101,5 +102,18 @@ def test_analyzer():
     except Exception as e:
         print(f"❌ Errore durante l'analisi: {e}")
 
+def test_headless_import():
+    """Analyzer, log processor e scheduler si importano senza Flask"""
+    print("🪶 Test import senza Flask...")
+    code = ("import sys, log_analyzer, log_processor, scheduler; "
+            "assert 'flask' not in sys.modules and 'app' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    # L'app riesporta la stessa classe per compatibilità
+    import app
+    assert app.SVXLinkLogAnalyzer is SVXLinkLogAnalyzer
+    print("✅ Pipeline di ingest importabile senza dipendenze web")
+
 if __name__ == "__main__":
-    test_analyzer()
\ No newline at end of file
+    test_analyzer()
+    test_headless_import()
\ No newline at end of file
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test della factory create_app() e dell'inizializzazione per-processo
+"""
+
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_create_app():
+    """Ogni chiamata crea un'applicazione indipendente con tutte le route"""
+    print("🏭 Test create_app...")
+    import app as app_module
+
+    first = app_module.create_app({'TESTING': True}, init=False)
+    second = app_module.create_app(init=False)
+    assert first is not second
+    assert first.config['TESTING'] and not second.config.get('TESTING')
+    assert first.config['APPLICATION_ROOT'] == '/websvxlinkstat'
+
+    rules = {rule.rule for rule in first.url_map.iter_rules()}
+    for path in ('/', '/statistics', '/health', '/api/statistics/daily', '/api/jobs/<job_id>'):
+        assert path in rules, path
+
+    response = first.test_client().get('/')
+    assert response.status_code == 200
+    assert b'/statistics' in response.data  # url_for('main.statistics') nel template
+    print("✅ Applicazioni indipendenti con le stesse route")
+
+
+def test_init_resources_once_per_process():
+    """init_resources non ricrea le risorse nello stesso processo"""
+    print("🔁 Test init_resources...")
+    import app as app_module
+
+    # L'import non inizializza le risorse (né scheduler né database)
+    output = subprocess.run([sys.executable, '-c', 'import app; print(app._resources_pid, app.db_manager)'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+                            check=True).stdout
+    assert output.strip().splitlines()[-1] == 'None None'
+
+    app_module.init_resources()
+    scheduler = app_module.scheduler
+    try:
+        app_module.init_resources()
+        assert app_module.scheduler is scheduler
+        assert app_module._resources_pid == os.getpid()
+    finally:
+        if scheduler is not None:
+            scheduler.stop_scheduler()
+    print("✅ Risorse inizializzate una sola volta per processo")
+
+
+def test_lazy_resources():
+    """Database e log processor vengono creati al primo utilizzo e condivisi"""
+    print("💤 Test inizializzazione lazy...")
+    import app as app_module
+
+    db_manager = app_module.get_db_manager()
+    assert db_manager is not None and app_module.get_db_manager() is db_manager
+    processor = app_module.get_log_processor()
+    assert processor.db_manager is db_manager
+    assert app_module.get_log_processor() is processor
+    print("✅ Un solo DatabaseManager condiviso")
+
+
+if __name__ == "__main__":
+    test_create_app()
+    test_init_resources_once_per_process()
+    test_lazy_resources()
+    print("🎉 Test factory completati!")
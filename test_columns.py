@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test della cache binaria a colonne degli eventi dei log
+"""
+
+import glob
+import os
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from columns import benchmark, columns_dir, columns_path, read_columns, reaggregate, write_columns
+from database import DailyLogStats, DatabaseManager
+from log_analyzer import EVENT_NODE_JOINED, SVXLinkLogAnalyzer
+from log_processor import LogProcessor
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def test_columns_round_trip():
+    """Le statistiche calcolate dalle colonne salvate coincidono con quelle dal testo"""
+    print("🧱 Test colonne eventi...")
+
+    analyzer = SVXLinkLogAnalyzer()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for log_file in sorted(glob.glob(os.path.join(DATA_DIR, 'svxlink_log_*.txt'))):
+            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            expected = analyzer.analyze_log(content)
+
+            path = os.path.join(tmp_dir, os.path.basename(log_file) + '.cols')
+            write_columns(path, analyzer.extract_events(content), lines=content.count('\n'), size=len(content))
+            cached = read_columns(path)
+            assert cached['lines'] == content.count('\n')
+            assert analyzer.analyze_events(cached['columns']) == expected
+
+        columns = cached['columns']
+        joined = [columns.nodes[node] for kind, node in zip(columns.kind, columns.node) if kind == EVENT_NODE_JOINED]
+        assert joined == re.findall(r'Node joined: (\S+)', content)
+        print("✅ Stesse statistiche da testo e da colonne")
+
+        # File troncato o mancante: la cache viene ignorata
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 1)
+        assert read_columns(path) is None
+        assert read_columns(os.path.join(tmp_dir, 'missing.cols')) is None
+        print("✅ File non validi ignorati")
+
+
+def test_ingest_uses_columns():
+    """L'ingest salva le colonne; un nuovo processamento le usa finché il file non cambia"""
+    print("📥 Test ingest con cache colonne...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_file = Path(tmp_dir, 'svxlink_log_2025-10-01.txt')
+        log_file.write_text("Wed Oct  1 08:00:00 2025: Tx1: Turning the transmitter ON\n"
+                            "Wed Oct  1 08:00:12 2025: Tx1: Turning the transmitter OFF\n")
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'stats.db'))
+        assert processor.process_all_files()['processed'] == 1
+        cache = os.listdir(columns_dir(processor.db_manager.db_path))
+        assert len(cache) == 1 and cache[0].startswith(f'2025-10-01.{log_file.name}.')
+
+        # Il testo non viene più letto: le colonne bastano
+        processor.analyzer.extract_events = None
+        assert processor.process_all_files(force=True)['processed'] == 1
+        assert processor.db_manager.get_daily_stats('2025-10-01', '2025-10-01')[0]['total_transmission_time'] == 12
+        print("✅ Colonne riusate")
+
+        # File cambiato: nuovo parsing e nuova cache al posto della vecchia
+        processor.analyzer = SVXLinkLogAnalyzer()
+        with open(log_file, 'a') as f:
+            f.write("Wed Oct  1 09:00:00 2025: Tx1: Turning the transmitter ON\n"
+                    "Wed Oct  1 09:00:30 2025: Tx1: Turning the transmitter OFF\n")
+        assert processor.process_all_files()['processed'] == 1
+        assert processor.db_manager.get_daily_stats('2025-10-01', '2025-10-01')[0]['total_transmissions'] == 2
+        assert os.listdir(columns_dir(processor.db_manager.db_path)) != cache
+        assert len(os.listdir(columns_dir(processor.db_manager.db_path))) == 1
+        print("✅ Cache rigenerata per il file modificato")
+
+        # La retention elimina anche le colonne dei giorni rimossi, siti compresi
+        cache_dir = columns_dir(processor.db_manager.db_path)
+        recent = (date.today() - timedelta(days=1)).isoformat()
+        kept = [os.path.join(cache_dir, f'{recent}.svxlink_log_{recent}.txt.10-abc.cols'),
+                os.path.join(cache_dir, 'rocca', f'{recent}.svxlink_log_{recent}.txt.10-abc.cols')]
+        old_site = os.path.join(cache_dir, 'rocca', '2025-10-01.svxlink_log_2025-10-01.txt.10-abc.cols')
+        for path in kept + [old_site]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            Path(path).write_bytes(b'')
+        processor.db_manager.cleanup_old_data(keep_days=30)
+        assert sorted(os.listdir(cache_dir)) == sorted([os.path.basename(kept[0]), 'rocca'])
+        assert os.listdir(os.path.join(cache_dir, 'rocca')) == [os.path.basename(kept[1])]
+        print("✅ Colonne dei giorni eliminati rimosse dalla retention")
+
+
+def test_reaggregate_thresholds():
+    """Statistiche di un periodo ricalcolate dalle colonne con soglie diverse, anche via API"""
+    print("🎛️ Test ri-aggregazione con soglie...")
+
+    import app as app_module
+
+    analyzer = SVXLinkLogAnalyzer()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'stats.db'))
+        cache_dir = columns_dir(db.db_path)
+        expected = {}
+        for log_file in sorted(glob.glob(os.path.join(DATA_DIR, 'svxlink_log_*.txt'))):
+            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            day = os.path.basename(log_file)[12:22]
+            expected[day] = analyzer.analyze_log(content)
+            write_columns(columns_path(cache_dir, day, os.path.basename(log_file), len(content), day),
+                          analyzer.extract_events(content))
+
+        # Soglie di default: stessi valori dell'ingest
+        result = reaggregate(cache_dir, '2025-10-17', '2025-10-19')
+        assert [d['date'] for d in result['days']] == ['2025-10-17', '2025-10-18', '2025-10-19']
+        for row in result['days']:
+            assert row['total_qso'] == expected[row['date']]['qso']['total_qso']
+            assert row['total_transmissions'] == expected[row['date']]['basic']['total_transmissions']
+        assert result['totals']['total_qso'] == sum(expected[d]['qso']['total_qso']
+                                                    for d in ('2025-10-17', '2025-10-18', '2025-10-19'))
+
+        # Soglie più restrittive: meno QSO e trasmissioni
+        stricter = reaggregate(cache_dir, '2025-10-17', '2025-10-19', min_qso_seconds=60, tx_noise_seconds=10)
+        assert stricter['totals']['total_qso'] < result['totals']['total_qso']
+        assert stricter['totals']['total_transmissions'] < result['totals']['total_transmissions']
+        assert stricter['parameters'] == {'min_qso_seconds': 60, 'tx_noise_seconds': 10, 'disconnected_after': '23:50'}
+        print("✅ Soglie applicate senza rileggere i log")
+
+        original_db = app_module.db_manager
+        app_module.db_manager = db
+        try:
+            # Giorni salvati con e senza colonne: solo i secondi sono segnalati
+            for day in ('2025-10-17', '2025-10-25', '2025-11-02'):
+                assert db.save_daily_stats(DailyLogStats(
+                    date=day, filename=f"svxlink_log_{day}.txt", file_size=10, total_transmissions=1,
+                    total_transmission_time=5, avg_transmission_time=5.0, max_transmission_time=5,
+                    min_transmission_time=5, total_qso=0, total_qso_time=0))
+            client = app_module.app.test_client()
+            response = client.get('/api/statistics/reaggregate?start_date=2025-10-16&end_date=2025-10-31'
+                                  '&min_qso_seconds=60&disconnected_after=00:00')
+            assert response.status_code == 200
+            data = response.get_json()
+            assert data['totals']['days'] == 6
+            assert data['missing_days'] == ['2025-10-25']
+            assert data['parameters']['disconnected_after'] == '00:00'
+            assert data['totals']['total_qso'] < sum(e['qso']['total_qso'] for e in expected.values())
+            assert client.get('/api/statistics/reaggregate?min_qso_seconds=-1').status_code == 400
+            assert client.get('/api/statistics/reaggregate?disconnected_after=25h').status_code == 400
+            print("✅ API ri-aggregazione")
+        finally:
+            app_module.db_manager = original_db
+
+
+def test_columns_benchmark():
+    """Il benchmark testo/colonne gira sui log di esempio.
+
+    Il rapporto dei tempi dipende dalla macchina e non viene verificato qui:
+    per misurarlo usare `python columns.py data`.
+    """
+    result = benchmark(DATA_DIR, runs=1)
+    print(f"⏱️ Testo {result['text_seconds']}s, colonne {result['columns_seconds']}s ({result['speedup']}x)")
+    assert result['files'] > 0
+    assert result['text_seconds'] > 0
+
+
+if __name__ == "__main__":
+    test_columns_round_trip()
+    test_ingest_uses_columns()
+    test_reaggregate_thresholds()
+    test_columns_benchmark()
+    print("🎉 Test colonne completato!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test delle risposte condizionali (ETag / Last-Modified / 304) delle API statistiche
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import daily_stats
+from database import DatabaseManager
+
+
+def test_conditional_responses():
+    """ETag stabile finché i dati non cambiano, 304 senza query al database"""
+    print("🏷️ Test ETag statistiche...")
+
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'etag_test.db'))
+        db.save_daily_stats(daily_stats('2025-10-01', 10))
+
+        original_db = app_module.db_manager
+        app_module.db_manager = db
+        try:
+            client = app_module.app.test_client()
+            url = '/api/statistics/ctcss?start_date=2025-10-01&end_date=2025-10-31'
+
+            response = client.get(url)
+            assert response.status_code == 200
+            etag = response.headers['ETag']
+            assert response.headers['Last-Modified']
+            assert 'max-age' in response.headers['Cache-Control']
+            print(f"✅ ETag: {etag}")
+
+            # Parametri diversi producono ETag diversi
+            other = client.get('/api/statistics/ctcss?start_date=2025-09-01&end_date=2025-10-31')
+            assert other.headers['ETag'] != etag
+
+            # Revalidazione: 304 anche con il database irraggiungibile
+            get_connection = db.get_connection
+            db.get_connection = lambda: (_ for _ in ()).throw(AssertionError("query eseguita"))
+            try:
+                response = client.get(url, headers={'If-None-Match': etag})
+                assert response.status_code == 304
+                assert response.headers['ETag'] == etag
+                assert response.get_data() == b''
+            finally:
+                db.get_connection = get_connection
+            print("✅ 304 senza accesso al database")
+
+            # If-Modified-Since non basta: non copre parametri e range di default
+            response = client.get('/api/statistics/ctcss',
+                                  headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+            assert response.status_code == 200
+
+            # Dopo un salvataggio l'ETag cambia
+            db.save_daily_stats(daily_stats('2025-10-02', 20))
+            response = client.get(url, headers={'If-None-Match': etag})
+            assert response.status_code == 200
+            assert response.headers['ETag'] != etag
+            print("✅ Nuovo ETag dopo l'ingest")
+
+            # Le risposte in streaming ricevono gli stessi header
+            response = client.get('/api/statistics/daily?start_date=2025-10-01&end_date=2025-10-31')
+            assert response.headers.get('ETag')
+            response = client.get('/api/statistics/daily?start_date=2025-10-01&end_date=2025-10-31',
+                                  headers={'If-None-Match': response.headers['ETag']})
+            assert response.status_code == 304
+
+            # Gli errori non sono cacheabili
+            response = client.get('/api/statistics/daily?start_date=bad&end_date=2025-10-31')
+            assert response.status_code == 400
+            assert 'ETag' not in response.headers
+        finally:
+            app_module.db_manager = original_db
+
+
+if __name__ == "__main__":
+    test_conditional_responses()
+    print("🎉 Test ETag completato!")
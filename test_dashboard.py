@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test dell'endpoint unico della dashboard (GET /api/statistics/dashboard)
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import daily_stats
+from database import CTCSSStats, DatabaseManager, DisconnectionPeriod, TGStats
+
+
+def _day(day, transmissions, site_id='default'):
+    daily = daily_stats(day, transmissions, site_id)
+    ctcss = [CTCSSStats(log_date=day, ctcss_frequency=88.5, count=transmissions, percentage=100.0, site_id=site_id)]
+    tg = [TGStats(log_date=day, tg_number=222, transmission_count=transmissions, total_duration=60,
+                  qso_count=1, avg_duration=60.0, percentage=100.0, site_id=site_id)]
+    start = datetime.fromisoformat(f"{day}T08:00:00")
+    disconnections = [DisconnectionPeriod(log_date=day, start_time=start, end_time=start.replace(minute=5),
+                                          duration=300, disconnection_count=2, status='resolved', site_id=site_id)]
+    return daily, ctcss, tg, disconnections
+
+
+def test_dashboard():
+    """Tutte le sezioni in una risposta, uguali alle API dedicate, su più partizioni"""
+    print("📊 Test dashboard...")
+
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'dashboard_test.db'))
+        # Giorni di due anni (due partizioni) e di due siti
+        db.save_log_batch([_day('2024-12-31', 5), _day('2025-01-01', 10), _day('2025-01-02', 20),
+                           _day('2025-01-01', 7, 'rocca')])
+
+        rows = db.get_dashboard('2024-12-01', '2025-01-31')
+        assert list(rows) == ['daily', 'ctcss', 'talkgroups', 'disconnections']
+        assert rows['daily'] == db.get_daily_stats('2024-12-01', '2025-01-31')
+        assert rows['ctcss'] == db.get_ctcss_stats('2024-12-01', '2025-01-31')
+        assert rows['talkgroups'] == db.get_tg_stats('2024-12-01', '2025-01-31')
+        assert rows['disconnections'] == db.get_disconnections('2024-12-01', '2025-01-31')
+        assert rows['ctcss'][0]['total_count'] == 42
+        print("✅ Sezioni uguali alle query dedicate")
+
+        original_db = app_module.db_manager
+        app_module.db_manager = db
+        try:
+            client = app_module.app.test_client()
+            url = '/api/statistics/dashboard?start_date=2025-01-01&end_date=2025-01-31&site=default'
+            response = client.get(url)
+            data = response.get_json()
+            assert response.status_code == 200
+            sections = data['sections']
+            assert sections['daily']['total_days'] == 2
+            assert [row['date'] for row in sections['daily']['data']] == ['2025-01-02', '2025-01-01']
+            assert sections['ctcss']['total_tones'] == 1 and sections['ctcss']['data'][0]['total_count'] == 30
+            assert sections['talkgroups']['total_tgs'] == 1
+            assert sections['disconnections']['summary'] == {'total_periods': 2, 'total_disconnections': 4,
+                                                             'total_duration_formatted': "Vedi dettagli"}
+            # Stessa forma delle API dedicate
+            ctcss = client.get('/api/statistics/ctcss?start_date=2025-01-01&end_date=2025-01-31&site=default')
+            assert ctcss.get_json()['data'] == sections['ctcss']['data']
+            disconnections = client.get('/api/statistics/disconnections?start_date=2025-01-01'
+                                        '&end_date=2025-01-31&site=default').get_json()
+            assert disconnections['summary'] == sections['disconnections']['summary']
+
+            # Revalidazione con ETag come le altre API statistiche
+            assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+            print("✅ Una sola richiesta per tutti i widget")
+
+            response = client.get('/api/statistics/dashboard?start_date=2025-01-01&end_date=2025-01-31'
+                                  '&sections=talkgroups,daily')
+            assert list(response.get_json()['sections']) == ['daily', 'talkgroups']
+            assert response.get_json()['sections']['daily']['total_days'] == 3
+            assert client.get('/api/statistics/dashboard?sections=daily,qso').status_code == 400
+            assert client.get('/api/statistics/dashboard?start_date=bad&end_date=2025-01-31').status_code == 400
+            print("✅ Sezioni a scelta e parametri non validi rifiutati")
+        finally:
+            app_module.db_manager = original_db
+
+
+if __name__ == "__main__":
+    test_dashboard()
+    print("🎉 Test dashboard completato!")
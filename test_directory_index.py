@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test dell'indice in cache della cartella dei log
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from directory_index import DirectoryIndex
+
+
+def _age_directory(path):
+    # Porta l'mtime della directory nel passato, oltre la granularità del filesystem
+    past = time.time_ns() - 60 * 10**9
+    os.utime(path, ns=(past, past))
+
+
+def test_directory_index():
+    """Una sola scansione finché la directory non cambia, senza duplicati"""
+    print("📂 Test indice directory...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in ('svxlink_log_2025-10-01.txt', 'svxlink_2025-10-02.log', 'note.md'):
+            Path(tmp_dir, name).write_text("x\n")
+        os.mkdir(os.path.join(tmp_dir, 'archivio.txt'))
+        _age_directory(tmp_dir)
+
+        index = DirectoryIndex(Path(tmp_dir))
+        names = [p.name for p in index.files()]
+        assert names == ['svxlink_2025-10-02.log', 'svxlink_log_2025-10-01.txt']
+        assert [p.name for p in index.files('svxlink_log_*.txt')] == ['svxlink_log_2025-10-01.txt']
+        assert index.scans == 1
+        assert [p.name for p in index.subdirectories()] == ['archivio.txt']
+
+        # Directory invariata: nessuna nuova scansione
+        for _ in range(5):
+            index.files()
+            index.subdirectories()
+        assert index.scans == 1
+        assert index.get_stats()['hits'] >= 5
+        print("✅ Scansione riutilizzata")
+
+        # Un nuovo file cambia l'mtime della directory
+        Path(tmp_dir, 'svxlink_log_2025-10-03.txt').write_text("x\n")
+        assert len(index.files()) == 3
+        assert index.scans == 2
+
+        # Una rimozione viene vista allo stesso modo
+        os.remove(os.path.join(tmp_dir, 'svxlink_2025-10-02.log'))
+        assert [p.name for p in index.files()] == ['svxlink_log_2025-10-01.txt', 'svxlink_log_2025-10-03.txt']
+
+        # Un mtime recente non è affidabile: si riscansiona finché non è abbastanza vecchio
+        scans = index.scans
+        index.files()
+        assert index.scans == scans + 1
+        _age_directory(tmp_dir)
+        index.files()
+        index.files()
+        assert index.scans == scans + 2
+        print("✅ Aggiunte e rimozioni rilevate")
+
+
+if __name__ == "__main__":
+    test_directory_index()
+    print("🎉 Test indice directory completato!")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test dell'export massivo (CSV/NDJSON in streaming, gzip opzionale)
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import daily_stats
+from database import DatabaseManager, CTCSSStats
+from export import export_to_file, iter_export
+from partitions import partitions_dir
+
+
+def _batch(day, transmissions):
+    ctcss = [CTCSSStats(log_date=day, ctcss_frequency=freq, count=transmissions, percentage=50.0)
+             for freq in (88.5, 123.0)]
+    return (daily_stats(day, transmissions), ctcss, [], [])
+
+
+def test_export_formats():
+    """Export cronologico su più partizioni, a blocchi, senza lock tra un blocco e l'altro"""
+    print("📤 Test export...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'export_test.db'))
+        days = ['2024-12-30', '2024-12-31', '2025-01-01', '2025-01-02', '2025-01-03']
+        db.save_log_batch([_batch(day, i + 1) for i, day in enumerate(days)])
+
+        # CSV con intestazione, ordine cronologico tra le partizioni
+        content = ''.join(iter_export(db, 'daily', fmt='csv', batch_size=2))
+        rows = list(csv.DictReader(io.StringIO(content)))
+        assert [row['date'] for row in rows] == days
+        assert rows[2]['total_transmissions'] == '3'
+
+        # NDJSON filtrato per periodo; blocchi da 3 righe su 6 righe CTCSS
+        chunks = list(iter_export(db, 'ctcss', '2024-12-31', '2025-01-02', fmt='ndjson', batch_size=3))
+        records = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+        assert len(chunks) == 2 and len(records) == 6
+        assert records[0]['log_date'] == '2024-12-31' and records[-1]['log_date'] == '2025-01-02'
+        print("✅ CSV e NDJSON")
+
+        # Tra un blocco e l'altro nessun lock aperto: l'ingest può scrivere durante l'export
+        stream = iter_export(db, 'daily', fmt='ndjson', batch_size=1)
+        next(stream)
+        writer = sqlite3.connect(os.path.join(partitions_dir(db.db_path), '2025.db'), timeout=0)
+        writer.execute("UPDATE daily_logs SET total_qso = 2")
+        writer.commit()
+        writer.close()
+        assert len(list(stream)) == len(days) - 1
+        print("✅ Nessun lock durante lo streaming")
+
+        # File compresso (comando export di log_processor.py)
+        path = os.path.join(tmp_dir, 'daily.csv.gz')
+        assert export_to_file(db, 'daily', path, compress=True) == os.path.getsize(path)
+        with gzip.open(path, 'rt') as f:
+            assert len(list(csv.DictReader(f))) == len(days)
+        print("✅ Export gzip su file")
+
+
+def test_export_api():
+    """/api/export/<dataset> risponde in streaming con allegato e gzip opzionale"""
+    print("🌐 Test API export...")
+
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'export_api.db'))
+        db.save_log_batch([_batch('2025-03-01', 4), _batch('2025-03-02', 5)])
+
+        original_db = app_module.db_manager
+        app_module.db_manager = db
+        try:
+            client = app_module.app.test_client()
+            assert 'ctcss' in client.get('/api/export').get_json()['datasets']
+
+            response = client.get('/api/export/daily?start_date=2025-03-02&end_date=2025-03-31')
+            assert response.status_code == 200
+            assert response.is_streamed
+            assert response.mimetype == 'text/csv'
+            assert 'svxlink_daily_2025-03-02_2025-03-31.csv' in response.headers['Content-Disposition']
+            assert len(list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))) == 1
+
+            response = client.get('/api/export/ctcss?format=ndjson&gzip=1')
+            assert response.mimetype == 'application/gzip'
+            lines = gzip.decompress(response.get_data()).decode().splitlines()
+            assert len(lines) == 4
+            assert json.loads(lines[0])['ctcss_frequency'] in (88.5, 123.0)
+
+            assert client.get('/api/export/events').status_code == 404
+            assert client.get('/api/export/daily?format=xml').status_code == 400
+            assert client.get('/api/export/daily?start_date=03/01/2025').status_code == 400
+            print("✅ API export")
+        finally:
+            app_module.db_manager = original_db
+
+
+if __name__ == "__main__":
+    test_export_formats()
+    test_export_api()
+    print("🎉 Test export completato!")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test del registro dei file importati (fingerprint) per il riprocessamento dei soli file modificati
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import log_processor as log_processor_module
+from database import DailyLogStats
+from log_processor import LogProcessor
+
+
+def _tx_lines(day, count):
+    lines = []
+    for hour in range(8, 8 + count):
+        lines.append(f"Wed Oct  {day} {hour:02d}:00:00 2025: Tx1: Turning the transmitter ON")
+        lines.append(f"Wed Oct  {day} {hour:02d}:00:20 2025: Tx1: Turning the transmitter OFF")
+    return "\n".join(lines) + "\n"
+
+
+def test_fingerprint_registry():
+    """Solo i file modificati vengono riprocessati, senza rileggere quelli invariati"""
+    print("🔏 Test registro fingerprint...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        first = Path(tmp_dir, 'svxlink_log_2025-10-01.txt')
+        second = Path(tmp_dir, 'svxlink_log_2025-10-02.txt')
+        first.write_text(_tx_lines(1, 2))
+        second.write_text(_tx_lines(2, 3))
+
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'fp.db'))
+        assert processor.process_all_files()['processed'] == 2
+
+        # Nessun hash ricalcolato per i file invariati
+        hashed = []
+        original_hash = log_processor_module.content_hash
+        log_processor_module.content_hash = lambda path, size: hashed.append(path) or original_hash(path, size)
+        try:
+            assert processor.get_unprocessed_files() == []
+            assert hashed == []
+
+            # Un file cresciuto viene riprocessato
+            with open(second, 'a') as f:
+                f.write(_tx_lines(2, 6)[len(_tx_lines(2, 3)):])
+            assert processor.get_unprocessed_files() == [second]
+            # Con i soli file segnalati dal watcher gli altri non vengono controllati
+            assert processor.get_unprocessed_files([first]) == []
+            assert processor.get_unprocessed_files([second, Path(tmp_dir, 'svxlink_log_2025-10-09.txt')]) == [second]
+            assert processor.process_all_files()['processed'] == 1
+            stats = processor.db_manager.get_daily_stats('2025-10-02', '2025-10-02')
+            assert stats[0]['total_transmissions'] == 6
+            print("✅ File modificato riprocessato")
+
+            # Un touch cambia solo i metadati: nessun riprocessamento
+            stat = first.stat()
+            os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            hashed.clear()
+            assert processor.get_unprocessed_files() == []
+            assert len(hashed) == 1
+            hashed.clear()
+            assert processor.get_unprocessed_files() == []
+            assert hashed == []
+            print("✅ Touch riconosciuto senza riprocessare")
+        finally:
+            log_processor_module.content_hash = original_hash
+
+
+def test_legacy_days_adopted():
+    """I giorni importati prima del registro non vengono riprocessati"""
+    print("📜 Test adozione giorni esistenti...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        Path(tmp_dir, 'svxlink_log_2025-10-03.txt').write_text(_tx_lines(3, 1))
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'legacy.db'))
+        processor.db_manager.save_daily_stats(DailyLogStats(
+            date='2025-10-03', filename='svxlink_log_2025-10-03.txt', file_size=10,
+            total_transmissions=1, total_transmission_time=20, avg_transmission_time=20.0,
+            max_transmission_time=20, min_transmission_time=20, total_qso=0, total_qso_time=0
+        ))
+
+        assert processor.get_unprocessed_files() == []
+        registry = processor.db_manager.get_ingested_files()
+        assert [entry['log_date'] for entry in registry.values()] == ['2025-10-03']
+        print("✅ Giorno esistente adottato nel registro")
+
+
+if __name__ == "__main__":
+    test_fingerprint_registry()
+    test_legacy_days_adopted()
+    print("🎉 Test fingerprint completati!")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test del monitor di salute del database (stato in cache + probe periodica)
+"""
+
+import os
+import sqlite3
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from health import HealthMonitor, is_connection_error
+from database import DatabaseManager, DailyLogStats
+
+
+def test_health_monitor_probe_interval():
+    """La probe viene eseguita al massimo ogni probe_interval secondi"""
+    print("💓 Test health monitor...")
+
+    calls = []
+
+    def probe():
+        calls.append(time.monotonic())
+        return '2025-10-21T10:00:00'
+
+    monitor = HealthMonitor(probe, probe_interval=0.2)
+
+    # Prima chiamata: stato sconosciuto, probe sincrona
+    assert monitor.is_available() is True
+    assert len(calls) == 1
+    assert monitor.get_status()['last_ingest_at'] == '2025-10-21T10:00:00'
+
+    # Chiamate ravvicinate: nessuna nuova probe
+    for _ in range(100):
+        assert monitor.is_available() is True
+    assert len(calls) == 1
+
+    # Un esito reale recente rimanda la probe
+    time.sleep(0.25)
+    monitor.record_success()
+    monitor.is_available()
+    assert len(calls) == 1
+
+    # Scaduto l'intervallo, la probe parte in background
+    time.sleep(0.25)
+    monitor.is_available()
+    for _ in range(50):
+        if len(calls) == 2:
+            break
+        time.sleep(0.01)
+    assert len(calls) == 2
+    assert monitor.get_status()['probe']['latency_ms'] is not None
+    print(f"✅ Probe eseguite: {len(calls)}")
+
+    # Un fallimento reale viene riflesso subito nello stato in cache
+    monitor.record_failure(RuntimeError("disk I/O error"))
+    assert monitor.is_available() is False
+    assert monitor.get_status()['last_error'] == "disk I/O error"
+
+
+def test_health_tracks_database_outcomes():
+    """DatabaseManager alimenta il monitor con gli esiti delle query e degli ingest"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'health_test.db'))
+        assert db.health.is_available() is True
+
+        db.save_daily_stats(DailyLogStats(
+            date='2025-10-21', filename='svxlink_log_2025-10-21.txt', file_size=10,
+            total_transmissions=1, total_transmission_time=1, avg_transmission_time=1.0,
+            max_transmission_time=1, min_transmission_time=1, total_qso=0, total_qso_time=0
+        ))
+        assert db.health.get_status()['last_ingest_at'] is not None
+
+        # Errore della query (non del database): lo stato non cambia
+        with db.get_connection() as conn:
+            conn.execute("DROP TABLE daily_ctcss_stats")
+            # Con i totali cumulativi pronti i totali CTCSS si leggono da qui
+            conn.execute("DROP TABLE running_ctcss_totals")
+        assert db.get_ctcss_stats('2025-10-01', '2025-10-31') == []
+        assert db.health.is_available() is True
+
+        # Database non apribile: il monitor passa a non disponibile senza probe aggiuntive
+        os.rename(db.db_path, db.db_path + '.bak')
+        os.mkdir(db.db_path)
+        probes = db.health.probe_count
+        db.get_daily_stats('2025-09-01', '2025-09-30')
+        assert db.health.is_available() is False
+        assert db.health.probe_count == probes
+
+        # Query riuscita: di nuovo disponibile
+        os.rmdir(db.db_path)
+        os.rename(db.db_path + '.bak', db.db_path)
+        db.get_daily_stats('2025-10-01', '2025-10-31')
+        assert db.health.is_available() is True
+        assert not is_connection_error(sqlite3.OperationalError("intervallo su 12 partizioni, massimo 10 database collegati"))
+        assert is_connection_error(sqlite3.OperationalError("database is locked"))
+        print("✅ Esiti reali registrati")
+
+
+if __name__ == "__main__":
+    test_health_monitor_probe_interval()
+    test_health_tracks_database_outcomes()
+    print("🎉 Test health completato!")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Test dell'ingest in push delle righe di log (POST /api/ingest/lines)
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingest import LineBatch, PushIngest, split_by_day
+from log_analyzer import SVXLinkLogAnalyzer
+from log_processor import LogProcessor
+from sites import DEFAULT_SITE
+
+
+def _tx(day, minute, seconds=12):
+    weekday = {19: 'Sun', 20: 'Mon'}[day]
+    return [f"{weekday} Oct {day} 08:{minute:02d}:00 2025: Tx1: Turning the transmitter ON",
+            f"{weekday} Oct {day} 08:{minute:02d}:{seconds:02d} 2025: Tx1: Turning the transmitter OFF"]
+
+
+def test_push_ingest_idempotent():
+    """Righe aggiunte al log del giorno, reinvii ignorati e statistiche aggiornate in modo incrementale"""
+    print("📡 Test ingest in push...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'stats.db'))
+        receiver = PushIngest(processor)
+        db = processor.db_manager
+
+        first = LineBatch('monte-cavo', 1, _tx(19, 0) + _tx(19, 5))
+        assert receiver.submit([first])[0].status == 'committed'
+        # Blocco a cavallo della mezzanotte: le righe finiscono nei log dei due giorni
+        second = LineBatch('monte-cavo', 2, _tx(19, 10, 30) + ["Mon Oct 20 00:00:01 2025: ReflectorLogic: Connected"]
+                           + _tx(20, 0))
+        receiver.submit([second])
+        assert second.committed_sequence == 2
+
+        log_file = Path(tmp_dir, 'monte-cavo', 'svxlink_log_2025-10-19.txt')
+        content = log_file.read_text()
+        assert content.count('\n') == 6
+        assert Path(tmp_dir, 'monte-cavo', 'svxlink_log_2025-10-20.txt').read_text().count('\n') == 3
+        stats = db.get_daily_stats('2025-10-19', '2025-10-19', site='monte-cavo')[0]
+        expected = SVXLinkLogAnalyzer().analyze_log(content)['basic']
+        assert stats['total_transmissions'] == expected['total_transmissions'] == 3
+        assert stats['total_transmission_time'] == 54
+        assert db.get_daily_stats('2025-10-20', '2025-10-20', site=DEFAULT_SITE) == []
+        print("✅ Righe divise per giorno e statistiche aggiornate")
+
+        # Reinvio dopo un timeout: nessuna scrittura
+        retry = LineBatch('monte-cavo', 2, _tx(19, 10, 30))
+        receiver.submit([retry])
+        assert retry.status == 'duplicate' and retry.committed_sequence == 2
+        assert log_file.read_text() == content
+        assert receiver.committed_sequences() == {'monte-cavo': 2}
+        print("✅ Sequenza già confermata ignorata")
+
+        # Buco nella sequenza: blocco rifiutato, il mittente riprende dalla 3
+        gap = LineBatch('monte-cavo', 4, _tx(19, 20))
+        receiver.submit([gap])
+        assert gap.status == 'out_of_order' and gap.committed_sequence == 2
+        assert log_file.read_text() == content
+        print("✅ Sequenza con un buco rifiutata")
+
+        # Byte di un gruppo mai confermato (processo interrotto): troncati alla scrittura successiva
+        with open(log_file, 'a') as f:
+            f.write(_tx(19, 20)[0] + "\n")
+        receiver.submit([LineBatch('monte-cavo', 3, _tx(19, 30))])
+        assert log_file.read_text() == content + '\n'.join(_tx(19, 30)) + '\n'
+        assert db.get_daily_stats('2025-10-19', '2025-10-19', site='monte-cavo')[0]['total_transmissions'] == 4
+        print("✅ Scrittura non confermata scartata")
+
+        # Un nuovo ricevitore (riavvio) rilegge il file e conosce le sequenze confermate
+        restarted = PushIngest(processor)
+        receiver.submit([LineBatch('monte-cavo', 4, _tx(19, 40))])
+        restarted.submit([LineBatch('monte-cavo', 4, _tx(19, 40)), LineBatch('monte-cavo', 5, _tx(19, 50))])
+        assert db.get_daily_stats('2025-10-19', '2025-10-19', site='monte-cavo')[0]['total_transmissions'] == 6
+
+        # Il file e le statistiche coincidono: l'ingest dei file non ha nulla da rielaborare
+        assert processor.get_unprocessed_files() == []
+        assert split_by_day(["senza timestamp"] + _tx(20, 0), '2025-10-19')[0] == ('2025-10-19', ["senza timestamp"])
+
+
+def test_push_ingest_group_commit():
+    """Molti mittenti concorrenti: blocchi confermati insieme, nessuna riga persa"""
+    print("📦 Test group commit...")
+
+    senders, batches_per_sender = 12, 10
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'stats.db'))
+        receiver = PushIngest(processor)
+        errors = []
+
+        def send(index):
+            site_id = f"site-{index}"
+            try:
+                for sequence in range(1, batches_per_sender + 1):
+                    batch = LineBatch(site_id, sequence, _tx(19, sequence))
+                    receiver.submit([batch])
+                    assert batch.status == 'committed'
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=send, args=(index,)) for index in range(senders)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+
+        stats = receiver.get_stats()
+        assert stats['batches'] == senders * batches_per_sender
+        assert stats['groups'] < senders * batches_per_sender
+        total = 0
+        for site in range(senders):
+            content = Path(tmp_dir, f"site-{site}", 'svxlink_log_2025-10-19.txt').read_text()
+            day = processor.db_manager.get_daily_stats('2025-10-19', '2025-10-19', site=f"site-{site}")[0]
+            assert day['total_transmissions'] == content.count('\n') // 2
+            total += day['total_transmissions']
+        assert total == stats['batches']
+        print(f"✅ {stats['batches']} blocchi in {stats['groups']} gruppi (media {stats['avg_group_size']})")
+
+
+def test_ingest_api():
+    """Autenticazione, corpo compresso, NDJSON e sequenze via API"""
+    print("🔐 Test API ingest...")
+
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'stats.db'))
+        originals = (app_module.db_manager, app_module.log_processor, app_module.push_ingest, app_module.INGEST_TOKEN)
+        app_module.db_manager = processor.db_manager
+        app_module.log_processor = processor
+        app_module.push_ingest = None
+        try:
+            client = app_module.app.test_client()
+            app_module.INGEST_TOKEN = ''
+            assert client.post('/api/ingest/lines').status_code == 404
+
+            app_module.INGEST_TOKEN = 'segreto'
+            auth = {'Authorization': 'Bearer segreto'}
+            assert client.post('/api/ingest/lines', headers={'Authorization': 'Bearer altro'}).status_code == 401
+            assert client.get('/api/ingest/lines').status_code == 401
+
+            body = gzip.compress(('\n'.join(_tx(19, 0)) + '\n').encode())
+            response = client.post('/api/ingest/lines?site=monte-cavo&sequence=1', data=body,
+                                   headers={**auth, 'Content-Encoding': 'gzip', 'Content-Type': 'text/plain'})
+            assert response.status_code == 200
+            assert response.get_json()['committed'] == {'monte-cavo': 1}
+
+            records = [{'site': 'monte-cavo', 'sequence': 1, 'lines': _tx(19, 0)},
+                       {'site': 'monte-cavo', 'sequence': 2, 'lines': _tx(19, 5)},
+                       {'sequence': 1, 'lines': '\n'.join(_tx(19, 0))}]
+            response = client.post('/api/ingest/lines', data='\n'.join(json.dumps(r) for r in records),
+                                   headers={**auth, 'Content-Type': 'application/x-ndjson'})
+            data = response.get_json()
+            assert response.status_code == 200
+            assert [b['status'] for b in data['batches']] == ['duplicate', 'committed', 'committed']
+            assert data['committed'] == {'monte-cavo': 2, DEFAULT_SITE: 1}
+            assert Path(tmp_dir, 'svxlink_log_2025-10-19.txt').exists()
+
+            sequences = client.get('/api/ingest/lines', headers=auth).get_json()['sequences']
+            assert sequences == {DEFAULT_SITE: 1, 'monte-cavo': 2}
+
+            # Buco nella sequenza: 409 con l'ultima sequenza confermata
+            response = client.post('/api/ingest/lines?site=monte-cavo&sequence=4', data='\n'.join(_tx(19, 10)),
+                                   headers={**auth, 'Content-Type': 'text/plain'})
+            assert response.status_code == 409
+            assert response.get_json()['committed'] == {'monte-cavo': 2}
+            assert response.get_json()['batches'][0]['status'] == 'out_of_order'
+
+            daily = client.get('/api/statistics/daily?start_date=2025-10-19&end_date=2025-10-19&site=monte-cavo')
+            assert daily.get_json()['data'][0]['total_transmissions'] == 2
+            print("✅ Blocchi confermati via API")
+
+            for url, data, headers in (('/api/ingest/lines?sequence=0', 'x', {}),
+                                       ('/api/ingest/lines?sequence=1&site=../etc', 'x', {}),
+                                       ('/api/ingest/lines?sequence=3', b'non gzip', {'Content-Encoding': 'gzip'}),
+                                       ('/api/ingest/lines', '{"lines": []}', {'Content-Type': 'application/x-ndjson'})):
+                assert client.post(url, data=data, headers={**auth, **headers}).status_code == 400
+            bomb = gzip.compress(b'\n' * (9 * 1024 * 1024))
+            response = client.post('/api/ingest/lines?sequence=3', data=bomb,
+                                   headers={**auth, 'Content-Encoding': 'gzip'})
+            assert response.status_code == 413
+            print("✅ Richieste non valide rifiutate")
+        finally:
+            (app_module.db_manager, app_module.log_processor,
+             app_module.push_ingest, app_module.INGEST_TOKEN) = originals
+
+
+if __name__ == "__main__":
+    test_push_ingest_idempotent()
+    test_push_ingest_group_commit()
+    test_ingest_api()
+    print("🎉 Test ingest in push completato!")
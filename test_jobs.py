@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Test della coda di job in background per il processamento dei log
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jobs import JobManager, order_files_by_priority, PRIORITY_RECENT, PRIORITY_BACKFILL
+
+
+def _extract_date(filename):
+    return filename[len('svxlink_log_'):-len('.txt')] if filename.startswith('svxlink_log_') else None
+
+
+class _FakeProcessor:
+    """Processor minimale: registra l'ordine dei file e attende il via libera"""
+
+    def __init__(self, gate, seen):
+        self.gate = gate
+        self.seen = seen
+        self.last_file_stats = {'lines': 0, 'bytes': 0, 'error': None}
+
+    def process_log_file(self, file_path):
+        self.gate.wait(5)
+        self.seen.append(file_path.name)
+        if 'bad' in file_path.name:
+            self.last_file_stats = {'lines': 0, 'bytes': 0, 'error': 'file vuoto'}
+            return False
+        self.last_file_stats = {'lines': 10, 'bytes': 100, 'error': None}
+        return True
+
+
+def _store(tmp_dir):
+    return os.path.join(tmp_dir, 'stats.jobs.db')
+
+
+def _wait(manager, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job.status in ('completed', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} non terminato")
+
+
+def test_priority_order():
+    """Oggi e ieri prima del backfill, il backfill dal più recente"""
+    print("🧭 Test ordinamento priorità...")
+    today = date(2025, 10, 20)
+    names = ['svxlink_log_2025-09-01.txt', 'svxlink_log_2025-10-19.txt',
+             'svxlink_log_2025-10-01.txt', 'svxlink_log_2025-10-20.txt']
+    ordered, priority = order_files_by_priority([Path(n) for n in names], _extract_date, today)
+    assert [p.name for p in ordered] == [
+        'svxlink_log_2025-10-20.txt', 'svxlink_log_2025-10-19.txt',
+        'svxlink_log_2025-10-01.txt', 'svxlink_log_2025-09-01.txt'
+    ]
+    assert priority == PRIORITY_RECENT
+
+    _, priority = order_files_by_priority([Path(names[0])], _extract_date, today)
+    assert priority == PRIORITY_BACKFILL
+    print("✅ Ordinamento corretto")
+
+
+def test_job_lifecycle_and_coalescing():
+    """Job in background con avanzamento, errori e richieste duplicate unite"""
+    print("⚙️ Test ciclo di vita job...")
+    gate = threading.Event()
+    seen = []
+    today = date.today().isoformat()
+    files = [Path('svxlink_log_2020-01-01.txt'), Path(f'svxlink_log_{today}.txt'),
+             Path('svxlink_log_bad.txt')]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = JobManager(lambda: _FakeProcessor(gate, seen), _store(tmp_dir), max_workers=1)
+        first, created = manager.submit('process', lambda: files, _extract_date)
+        assert created
+
+        # Attende che il primo job sia in esecuzione (bloccato sul gate)
+        deadline = time.time() + 5
+        while manager.get(first.id).status != 'running' and time.time() < deadline:
+            time.sleep(0.01)
+
+        # Le richieste arrivate con il job in esecuzione vengono unite a quello,
+        # che a fine giro rilegge i file una volta sola
+        second, created = manager.submit('process', lambda: files, _extract_date)
+        assert not created and second.id == first.id
+        third, created = manager.submit('process', lambda: files, _extract_date)
+        assert not created and third.id == first.id
+
+        gate.set()
+        job = _wait(manager, first.id)
+        assert job.status == 'completed'
+        data = job.to_dict()
+        assert data['progress']['processed_files'] == 4
+        assert data['progress']['failed_files'] == 2
+        assert data['progress']['percent'] == 100.0
+        assert data['throughput']['lines_processed'] == 40
+        assert data['errors'] == [{'file': 'svxlink_log_bad.txt', 'error': 'file vuoto'}] * 2
+        # Il file di oggi viene processato per primo
+        assert seen[0] == f'svxlink_log_{today}.txt'
+
+        # A job terminato una nuova richiesta crea un altro job
+        fourth, created = manager.submit('process', lambda: files, _extract_date)
+        assert created and fourth.id != first.id
+        _wait(manager, fourth.id)
+        assert len(manager.list_jobs()) == 2
+    print("✅ Job completati, duplicati uniti")
+
+
+def test_submit_scan_outside_lock():
+    """La scansione dei file di una nuova richiesta non blocca la lettura dello stato dei job"""
+    print("🔓 Test scansione fuori dal lock...")
+    gate, scanning = threading.Event(), threading.Event()
+    gate.set()
+    files = [Path('svxlink_log_2025-01-01.txt')]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = JobManager(lambda: _FakeProcessor(gate, []), _store(tmp_dir), max_workers=1)
+        first, _ = manager.submit('process', lambda: files, _extract_date)
+        _wait(manager, first.id)
+
+        release = threading.Event()
+
+        def slow_list():
+            scanning.set()
+            release.wait(5)
+            return files
+
+        submitter = threading.Thread(target=manager.submit, args=('process', slow_list, _extract_date))
+        submitter.start()
+        try:
+            assert scanning.wait(5)
+            started = time.time()
+            assert manager.get(first.id).status == 'completed'
+            assert manager.list_jobs()
+            assert time.time() - started < 1
+        finally:
+            release.set()
+            submitter.join(5)
+        for job in manager.list_jobs():
+            _wait(manager, job['id'])
+    print("✅ Stato dei job leggibile durante la scansione")
+
+
+def test_jobs_shared_between_workers():
+    """Stato e richieste duplicate condivisi tra i worker web tramite il database dei job"""
+    print("🤝 Test job condivisi tra worker...")
+    gate = threading.Event()
+    seen = []
+    files = [Path('svxlink_log_2025-01-01.txt')]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Due gestori sullo stesso database, come due worker gunicorn
+        first_worker = JobManager(lambda: _FakeProcessor(gate, seen), _store(tmp_dir), max_workers=1)
+        other_worker = JobManager(lambda: _FakeProcessor(gate, seen), _store(tmp_dir), max_workers=1)
+
+        job, created = first_worker.submit('process', lambda: files, _extract_date)
+        assert created
+        assert other_worker.get(job.id).kind == 'process'
+        deadline = time.time() + 5
+        while other_worker.get(job.id).status != 'running' and time.time() < deadline:
+            time.sleep(0.01)
+
+        # La richiesta arrivata all'altro worker si unisce al job in esecuzione
+        merged, created = other_worker.submit('process', lambda: files, _extract_date)
+        assert not created and merged.id == job.id
+        gate.set()
+        done = _wait(other_worker, job.id)
+        assert done.status == 'completed'
+        assert done.processed_files == 2  # il job ha riletto i file a fine giro
+        assert seen == [files[0].name] * 2
+        assert [j['id'] for j in other_worker.list_jobs()] == [job.id]
+
+        # Job di un worker terminato: fallito, le nuove richieste non restano unite a lui
+        child = subprocess.Popen([sys.executable, '-c', 'pass'])
+        child.wait()
+        conn = sqlite3.connect(_store(tmp_dir))
+        conn.execute("UPDATE processing_jobs SET status = 'queued', owner_pid = ? WHERE id = ?", (child.pid, job.id))
+        conn.commit()
+        conn.close()
+        retry, created = other_worker.submit('process', lambda: files, _extract_date)
+        assert created and retry.id != job.id
+        assert other_worker.get(job.id).status == 'failed'
+        _wait(other_worker, retry.id)
+    print("✅ Job visibili e uniti da qualunque worker")
+
+
+def test_ingest_lock():
+    """Job di tipi diversi e scheduler non elaborano file insieme"""
+    print("🔒 Test lock dell'ingest...")
+    from log_processor import ingest_lock
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        active, overlaps = [], []
+
+        class LockedProcessor(_FakeProcessor):
+            def ingest_lock(self):
+                return ingest_lock(tmp_dir)
+
+            def process_log_file(self, file_path):
+                active.append(file_path)
+                if len(active) > 1:
+                    overlaps.append(file_path)
+                time.sleep(0.01)
+                active.remove(file_path)
+                return super().process_log_file(file_path)
+
+        gate = threading.Event()
+        gate.set()
+        files = [Path(f'svxlink_log_2025-01-{day:02d}.txt') for day in range(1, 6)]
+        manager = JobManager(lambda: LockedProcessor(gate, []), _store(tmp_dir), max_workers=2)
+        with ingest_lock(tmp_dir):
+            # Lo scheduler tiene il lock: i job attendono
+            jobs = [manager.submit(kind, lambda: files, _extract_date)[0] for kind in ('process', 'force-process')]
+            time.sleep(0.05)
+            assert all(manager.get(job.id).processed_files == 0 for job in jobs)
+        for job in jobs:
+            assert _wait(manager, job.id).processed_files == len(files)
+        assert overlaps == []
+    print("✅ Ingest serializzati")
+
+
+def test_jobs_api():
+    """Gli endpoint restituiscono subito l'id del job e ne espongono lo stato"""
+    print("🌐 Test API job...")
+    import app as app_module
+    from log_processor import LogProcessor
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'jobs_test.db'))
+        (Path(tmp_dir) / 'svxlink_log_2025-10-01.txt').write_text(
+            "Wed Oct  1 10:00:00 2025: Tx1: Turning the transmitter ON\n"
+            "Wed Oct  1 10:00:30 2025: Tx1: Turning the transmitter OFF\n"
+        )
+
+        originals = (app_module.db_manager, app_module.log_processor, app_module.job_manager)
+        app_module.db_manager = processor.db_manager
+        app_module.log_processor = processor
+        app_module.job_manager = None
+        try:
+            client = app_module.app.test_client()
+            response = client.post('/api/statistics/process')
+            assert response.status_code == 202
+            job_id = response.get_json()['job_id']
+            assert response.headers['Location'].endswith(f'/api/jobs/{job_id}')
+
+            job = _wait(app_module.job_manager, job_id)
+            assert job.status == 'completed', job.to_dict()
+
+            response = client.get(f'/api/jobs/{job_id}')
+            assert response.status_code == 200
+            assert response.get_json()['job']['progress']['processed_files'] == 1
+            assert processor.db_manager.get_available_dates() == ['2025-10-01']
+
+            assert client.get('/api/jobs/inesistente').status_code == 404
+            assert client.get('/api/jobs').get_json()['jobs'][0]['id'] == job_id
+        finally:
+            app_module.db_manager, app_module.log_processor, app_module.job_manager = originals
+    print("✅ API job funzionanti")
+
+
+if __name__ == "__main__":
+    test_priority_order()
+    test_job_lifecycle_and_coalescing()
+    test_submit_scan_outside_lock()
+    test_jobs_shared_between_workers()
+    test_ingest_lock()
+    test_jobs_api()
+    print("🎉 Test job completati!")
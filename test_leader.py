@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test dell'elezione del leader tra processi (lock file)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from leader import LeaderElection, FCNTL_AVAILABLE
+
+HOLDER_SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+from leader import LeaderElection
+election = LeaderElection({lock!r}, lambda: None)
+print('leader' if election.start() else 'follower', flush=True)
+time.sleep(60)
+"""
+
+
+def test_single_leader_and_takeover():
+    """Un solo leader; alla morte del processo leader un follower subentra"""
+    print("👑 Test elezione leader...")
+    if not FCNTL_AVAILABLE:
+        print("⚠️ fcntl non disponibile, test saltato")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lock_path = os.path.join(tmp_dir, 'scheduler.lock')
+        root = os.path.dirname(os.path.abspath(__file__))
+        holder = subprocess.Popen(
+            [sys.executable, '-c', HOLDER_SCRIPT.format(root=root, lock=lock_path)],
+            stdout=subprocess.PIPE, text=True
+        )
+        try:
+            assert holder.stdout.readline().strip() == 'leader'
+
+            elected = threading.Event()
+            election = LeaderElection(lock_path, elected.set)
+            assert election.start() is False
+            status = election.get_status()
+            assert status['role'] == 'follower'
+            assert status['leader']['pid'] == holder.pid
+            print("✅ Secondo processo in attesa come follower")
+
+            # Il leader termina: il kernel rilascia il lock e il follower subentra
+            holder.kill()
+            holder.wait()
+            assert elected.wait(5)
+            status = election.get_status()
+            assert status['role'] == 'leader'
+            assert status['leader']['pid'] == os.getpid()
+            print("✅ Subentro dopo la terminazione del leader")
+
+            election.release()
+            assert election.get_status()['role'] == 'follower'
+        finally:
+            if holder.poll() is None:
+                holder.kill()
+                holder.wait()
+
+
+if __name__ == "__main__":
+    test_single_leader_and_takeover()
+    print("🎉 Test elezione leader completato!")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test del feed in tempo reale della dashboard (GET /api/stream)
+"""
+
+import json
+import os
+import queue
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingest import LineBatch, PushIngest
+from live_feed import LiveFeed, TooManyClients, get_live_feed
+from log_processor import LogProcessor
+
+
+def _line(minute, second, message):
+    return f"Sun Oct 19 08:{minute:02d}:{second:02d} 2025: {message}"
+
+
+def _drain(client, count, timeout=5):
+    return [client.queue.get(timeout=timeout) for _ in range(count)]
+
+
+def test_push_ingest_updates():
+    """Solo gli eventi delle righe nuove diventano aggiornamenti, più i contatori del giorno"""
+    print("📡 Test aggiornamenti dall'ingest in push...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'stats.db'))
+        receiver = PushIngest(processor)
+        feed = get_live_feed(tmp_dir)
+        client = feed.subscribe()
+        rocca = feed.subscribe('rocca')
+        try:
+            receiver.submit([LineBatch('monte-cavo', 1, [
+                _line(0, 0, "ReflectorLogic: Selecting TG #222"),
+                _line(0, 1, "Tx1: Turning the transmitter ON"),
+                _line(0, 13, "Tx1: Turning the transmitter OFF"),
+                _line(0, 20, "ReflectorLogic: Selecting TG #222"),
+                _line(1, 0, "ReflectorLogic: Disconnected from 1.2.3.4:5300: Connection timed out"),
+                _line(1, 30, "ReflectorLogic: Disconnected from 1.2.3.4:5300: Connection timed out")])])
+            updates = _drain(client, 5)
+            assert [u['type'] for u in updates] == ['tg', 'tx', 'tx', 'disconnection', 'counters']
+            assert updates[0] == {'type': 'tg', 'site': 'monte-cavo', 'time': '2025-10-19T08:00:00', 'tg': 222}
+            assert updates[2]['on'] is False and updates[2]['duration'] == 12
+            assert updates[3]['active'] is True
+            assert updates[4]['transmissions'] == 1 and updates[4]['transmission_time'] == 12
+            print("✅ Cambi di stato e contatori pubblicati")
+
+            # Un nuovo ricevitore (riavvio) non ripubblica le righe già nel file
+            restarted = PushIngest(processor)
+            restarted.submit([LineBatch('monte-cavo', 2, [_line(2, 0, "ReflectorLogic: Node joined: IU0ABC")])])
+            updates = _drain(client, 2)
+            assert updates[0]['type'] == 'disconnection' and updates[0]['active'] is False
+            assert updates[0]['duration'] == 60
+            assert updates[1]['type'] == 'counters' and updates[1]['disconnections'] == 1
+            assert client.queue.empty()
+            assert rocca.queue.empty()
+            print("✅ Nessun aggiornamento per le righe già importate")
+        finally:
+            feed.unsubscribe(client)
+            feed.unsubscribe(rocca)
+
+
+def test_feed_between_processes():
+    """Due feed sulla stessa cartella (due worker): rotazione del file e code limitate"""
+    print("🔀 Test feed tra processi...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        publisher = LiveFeed(tmp_dir, max_bytes=2000)
+        worker = LiveFeed(tmp_dir, poll_interval=0.05, max_clients=2)
+        client = worker.subscribe()
+        slow = worker.subscribe()
+        slow.queue = queue.Queue(maxsize=5)
+        try:
+            try:
+                worker.subscribe()
+                assert False, "atteso TooManyClients"
+            except TooManyClients:
+                pass
+
+            # 200 aggiornamenti in piccoli blocchi: il file viene ruotato più volte
+            received = []
+            for index in range(0, 200, 4):
+                publisher.publish([{'type': 'tg', 'site': 'default', 'tg': n} for n in range(index, index + 4)])
+                received.extend(update['tg'] for update in _drain(client, 4))
+            assert publisher.stats['rotations'] > 0
+            assert received == list(range(200))
+            print(f"✅ 200 aggiornamenti ricevuti in ordine con {publisher.stats['rotations']} rotazioni")
+
+            # Il client lento perde gli aggiornamenti e riceve resync
+            assert slow.lagged and slow.dropped > 0
+            messages = worker.stream(slow, heartbeat=0.05)
+            assert next(messages).startswith("retry: 5000\nevent: hello")
+            assert next(messages).startswith("event: resync\n")
+            assert next(messages) == ": heartbeat\n\n"
+            messages.close()
+            assert worker.get_stats()['clients'] == 1
+            print("✅ Client lento: resync e heartbeat")
+        finally:
+            worker.unsubscribe(client)
+            worker.unsubscribe(slow)
+
+
+def test_stream_api():
+    """GET /api/stream: text/event-stream filtrato per sito"""
+    print("🌐 Test API stream...")
+
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'stats.db'))
+        originals = (app_module.db_manager, app_module.log_processor)
+        app_module.db_manager = processor.db_manager
+        app_module.log_processor = processor
+        try:
+            client = app_module.app.test_client()
+            assert client.get('/api/stream?site=../etc').status_code == 400
+
+            response = client.get('/api/stream?site=rocca', buffered=False)
+            assert response.status_code == 200
+            assert response.mimetype == 'text/event-stream'
+            assert response.headers['Cache-Control'] == 'no-cache'
+            chunks = iter(response.response)
+            hello = next(chunks)
+            assert b'event: hello' in hello and b'"site":"rocca"' in hello
+
+            get_live_feed(tmp_dir).publish([{'type': 'tx', 'site': 'default', 'on': True},
+                                            {'type': 'tx', 'site': 'rocca', 'on': True}])
+            event, data = next(chunks).decode().strip().split('\n')
+            assert event == 'event: tx'
+            assert json.loads(data.split(': ', 1)[1]) == {'type': 'tx', 'site': 'rocca', 'on': True}
+            response.close()
+            assert get_live_feed(tmp_dir).get_stats()['clients'] == 0
+            print("✅ Stream SSE via API")
+        finally:
+            app_module.db_manager, app_module.log_processor = originals
+
+
+if __name__ == "__main__":
+    test_push_ingest_updates()
+    test_feed_between_processes()
+    test_stream_api()
+    print("🎉 Test feed in tempo reale completato!")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test dell'ingest parallelo: stessi risultati del processamento sequenziale
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from log_processor import LogProcessor
+
+
+def _write_logs(data_dir):
+    for day in range(1, 6):
+        lines = []
+        for hour in range(8, 8 + day):
+            lines.append(f"Wed Oct  {day} {hour:02d}:00:00 2025: Tx1: Turning the transmitter ON")
+            lines.append(f"Wed Oct  {day} {hour:02d}:00:2{day} 2025: Tx1: Turning the transmitter OFF")
+        Path(data_dir, f"svxlink_log_2025-10-0{day}.txt").write_text("\n".join(lines) + "\n")
+    # File vuoto: deve essere contato come errore
+    Path(data_dir, "svxlink_log_2025-10-09.txt").write_text("")
+    # Copia più vecchia dello stesso giorno, elencata dopo l'originale: vince il file più recente
+    copy = Path(data_dir, "svxlink_log_2025-10-03_copia.txt")
+    copy.write_text("Wed Oct  3 07:00:00 2025: Tx1: Turning the transmitter ON\n"
+                    "Wed Oct  3 07:00:10 2025: Tx1: Turning the transmitter OFF\n")
+    original = Path(data_dir, "svxlink_log_2025-10-03.txt").stat().st_mtime
+    os.utime(copy, (original - 3600, original - 3600))
+
+
+def _snapshot(processor):
+    rows = processor.db_manager.get_all_daily_stats()
+    for row in rows:
+        row.pop('processed_at', None)
+        row.pop('created_at', None)
+        row.pop('id', None)
+    return sorted(rows, key=lambda row: row['date'])
+
+
+def test_parallel_matches_sequential():
+    """Il pool di processi con scrittore unico produce gli stessi dati"""
+    print("⚡ Test ingest parallelo...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _write_logs(tmp_dir)
+
+        sequential = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'seq.db'))
+        seq_result = sequential.process_all_files(workers=1)
+
+        parallel = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'par.db'))
+        par_result = parallel.process_all_files(workers=3)
+
+        assert seq_result['processed'] == par_result['processed'] == 6
+        assert seq_result['errors'] == par_result['errors'] == 1
+        assert par_result['workers'] == 3
+        assert par_result['files_per_second'] > 0
+        assert any('svxlink_log_2025-10-09.txt' in e for e in par_result['error_details'])
+        assert _snapshot(sequential) == _snapshot(parallel)
+        day = [row for row in _snapshot(parallel) if row['date'] == '2025-10-03'][0]
+        assert day['filename'] == 'svxlink_log_2025-10-03.txt' and day['total_transmissions'] == 3
+        print(f"✅ {par_result['files_per_second']} file/s con {par_result['workers']} worker")
+
+        # I file già salvati non vengono riprocessati
+        again = parallel.process_all_files(workers=3)
+        assert again['processed'] == 0
+
+
+if __name__ == "__main__":
+    test_parallel_matches_sequential()
+    print("🎉 Test ingest parallelo completato!")
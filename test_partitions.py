@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test delle partizioni annuali del database (fan-out delle query, retention, compattazione)
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import daily_stats
+from database import DatabaseManager, CTCSSStats, TGStats
+from migrations import get_pending_backfills, run_backfills
+from partitions import partitions_dir
+
+
+def _day_batch(day, transmissions):
+    return (daily_stats(day, transmissions),
+            [CTCSSStats(log_date=day, ctcss_frequency=88.5, count=transmissions, percentage=100.0)],
+            [TGStats(log_date=day, tg_number=222, transmission_count=transmissions, total_duration=60,
+                     qso_count=1, avg_duration=6.0, percentage=100.0)],
+            [])
+
+
+def _child_rows(db, day):
+    with sqlite3.connect(os.path.join(partitions_dir(db.db_path), f"{day[:4]}.db")) as conn:
+        return conn.execute("SELECT COUNT(*) FROM daily_ctcss_stats WHERE log_date = ?", (day,)).fetchone()[0]
+
+
+def test_partitioned_queries():
+    """Un file per anno; le query leggono solo le partizioni dell'intervallo"""
+    print("🗂️ Test partizioni annuali...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'stats.db'))
+        days = ['2023-06-01', '2024-12-31', '2025-01-01', '2025-03-15']
+        assert db.save_log_batch([_day_batch(day, i + 1) for i, day in enumerate(days)])
+
+        assert sorted(os.listdir(partitions_dir(db.db_path))) == ['2023.db', '2024.db', '2025.db']
+        with db.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM daily_logs").fetchone()[0] == 0
+            assert [os.path.basename(p) for p in db._partition_paths(conn, '2024-06-01', '2025-01-31')] == \
+                ['2025.db', '2024.db']
+        print("✅ Dati scritti nelle partizioni, catalogo nel database principale")
+
+        # Fan-out ordinato tra partizioni
+        assert db.get_available_dates() == sorted(days, reverse=True)
+        assert [row['date'] for row in db.get_daily_stats('2024-12-01', '2025-01-31')] == ['2025-01-01', '2024-12-31']
+        assert db.get_date_range_stats() == {'first_date': '2023-06-01', 'last_date': '2025-03-15', 'total_days': 4}
+
+        # Aggregati su più partizioni collegate con ATTACH
+        ctcss = db.get_ctcss_stats('2024-01-01', '2025-12-31')
+        assert ctcss[0]['total_count'] == 2 + 3 + 4
+        assert db.get_tg_stats('2023-01-01', '2023-12-31')[0]['total_transmissions'] == 1
+        assert db.get_yearly_aggregated_stats(2025)['total_days'] == 2
+        assert db.get_monthly_aggregated_stats(2024, 12)['top_tgs'][0]['total_count'] == 2
+        print("✅ Query su più partizioni")
+
+        # Più anni dei database collegabili con ATTACH (di solito 10): partizioni lette a gruppi
+        old_days = [f"{year}-07-01" for year in range(2010, 2023)]
+        assert db.save_log_batch([_day_batch(day, 10) for day in old_days])
+        dashboard = db.get_dashboard('2010-01-01', '2025-12-31')
+        assert len(dashboard['daily']) == len(old_days) + len(days)
+        assert dashboard['ctcss'][0]['total_count'] == 10 * len(old_days) + 1 + 2 + 3 + 4
+        assert db.get_tg_stats('2010-01-01', '2025-01-01')[0]['total_transmissions'] == 10 * len(old_days) + 1 + 2 + 3
+        with db.get_connection() as conn:
+            # Totali cumulativi non ancora pronti: somme sui giorni
+            conn.execute("INSERT INTO schema_backfills (version, description) VALUES (7, 'Totali cumulativi')")
+        assert db.get_range_totals('2010-01-01', '2024-12-31')['totals']['total_days'] == len(old_days) + 2
+        assert db.health.is_available() is True
+        print(f"✅ Query su {len(db.get_partitions())} partizioni")
+
+
+def test_retention_and_compaction():
+    """La retention elimina i file scaduti e le righe collegate; gli anni chiusi diventano di sola lettura"""
+    print("🧹 Test retention partizioni...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'stats.db'))
+        today = date.today()
+        old_day = (today.replace(month=1, day=1) - timedelta(days=400)).isoformat()
+        straddling = [(today - timedelta(days=offset)).isoformat() for offset in (20, 5)]
+        assert db.save_log_batch([_day_batch(day, 1) for day in [old_day] + straddling])
+
+        deleted = db.cleanup_old_data(keep_days=10)
+        assert deleted == 2
+        assert db.get_available_dates() == [straddling[1]]
+        assert not os.path.exists(os.path.join(partitions_dir(db.db_path), f"{old_day[:4]}.db"))
+        # Nessuna statistica orfana nella partizione a cavallo del limite
+        assert _child_rows(db, straddling[0]) == 0
+        assert _child_rows(db, straddling[1]) == 1
+        print("✅ Partizione scaduta eliminata, righe collegate rimosse")
+
+        # Un anno chiuso viene compattato; un log in ritardo lo riapre in scrittura
+        last_year = f"{today.year - 1}-12-30"
+        db.save_daily_stats(daily_stats(last_year, 5))
+        assert db.compact_partitions() == [str(today.year - 1)]
+        assert db.compact_partitions() == []
+        partition = next(p for p in db.get_partitions() if p['key'] == str(today.year - 1))
+        assert partition['read_only'] == 1 and partition['compacted_at']
+        assert db.get_daily_stats(last_year, last_year)[0]['total_transmissions'] == 5
+
+        assert db.save_daily_stats(daily_stats(last_year, 7))
+        partition = next(p for p in db.get_partitions() if p['key'] == str(today.year - 1))
+        assert partition['read_only'] == 0
+        assert db.get_daily_stats(last_year, last_year)[0]['total_transmissions'] == 7
+        print("✅ Compattazione e riapertura")
+
+
+def test_legacy_rows_migration():
+    """La migrazione 3 sposta a blocchi i dati del database principale; nel frattempo le query li vedono"""
+    print("🚚 Test migrazione dati legacy...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'stats.db')
+        DatabaseManager(db_path)
+        # Database alla versione 2: dati nelle tabelle del file principale
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DROP TABLE partitions")
+            conn.execute("PRAGMA user_version = 2")
+            for i, day in enumerate(['2024-11-30', '2024-12-01', '2025-01-02', '2025-01-03', '2025-01-04']):
+                conn.execute("INSERT INTO daily_logs (date, filename, total_transmissions) VALUES (?, ?, ?)",
+                             (day, f"log_{day}.txt", i + 1))
+                conn.execute("INSERT INTO daily_ctcss_stats (log_date, ctcss_frequency, count, percentage) "
+                             "VALUES (?, 88.5, ?, 100.0)", (day, i + 1))
+
+        db = DatabaseManager(db_path)
+        assert [p['version'] for p in get_pending_backfills(db_path)] == [3, 7]
+        assert len(db.get_available_dates()) == 5
+        assert db.get_ctcss_stats('2024-01-01', '2025-12-31')[0]['total_count'] == 15
+
+        # Blocchi da 2 giorni: a metà migrazione i risultati non cambiano
+        updated = run_backfills(db_path, batch_size=2, pause=0, should_stop=lambda: len(db.get_partitions()) > 0)
+        assert updated == {3: 2, 7: 0}
+        assert len(db.get_available_dates()) == 5
+        assert db.get_ctcss_stats('2024-01-01', '2025-12-31')[0]['total_count'] == 15
+
+        # Scritture durante il backfill: nessun duplicato e il backfill non le sovrascrive
+        assert db.save_log_batch([_day_batch('2025-01-03', 100)])
+        assert db.save_ctcss_stats([CTCSSStats(log_date='2025-01-04', ctcss_frequency=88.5, count=50, percentage=100.0)])
+        assert len(db.get_available_dates()) == 5
+        assert db.get_ctcss_stats('2024-01-01', '2025-12-31')[0]['total_count'] == 156
+
+        # Poi la migrazione 7 calcola i totali cumulativi dei 5 giorni spostati
+        assert run_backfills(db_path, batch_size=2, pause=0) == {3: 1, 7: 5}
+        assert get_pending_backfills(db_path) == []
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM daily_logs").fetchone()[0] == 0
+            assert conn.execute("SELECT COUNT(*) FROM daily_ctcss_stats").fetchone()[0] == 0
+        assert [p['days'] for p in db.get_partitions()] == [3, 2]
+        assert db.get_available_dates()[0] == '2025-01-04'
+        assert db.get_ctcss_stats('2024-01-01', '2025-12-31')[0]['total_count'] == 156
+        assert [row['total_transmissions'] for row in db.get_daily_stats('2025-01-03', '2025-01-04')] == [5, 100]
+        print("✅ Dati legacy spostati nelle partizioni")
+
+
+if __name__ == "__main__":
+    test_partitioned_queries()
+    test_retention_and_compaction()
+    test_legacy_rows_migration()
+    print("🎉 Test partizioni completato!")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test della cache delle query di DatabaseManager (LRU + generazioni dei dati)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from conftest import daily_stats
+from database import DatabaseManager, CTCSSStats, QueryCache
+
+
+def test_query_cache():
+    """Verifica hit/miss e invalidazione globale e per data"""
+    print("🗃️ Test cache query...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'cache_test.db'))
+        db.save_daily_stats(daily_stats('2025-10-01', 10))
+        db.save_daily_stats(daily_stats('2025-11-01', 20))
+        db.save_ctcss_stats([CTCSSStats('2025-10-01', 88.5, 5, 100.0)])
+
+        base = db.get_cache_stats()
+        october = db.get_daily_stats('2025-10-01', '2025-10-31')
+        november = db.get_daily_stats('2025-11-01', '2025-11-30')
+        assert db.get_daily_stats('2025-10-01', '2025-10-31') == october
+        stats = db.get_cache_stats()
+        assert stats['misses'] - base['misses'] == 2
+        assert stats['hits'] - base['hits'] == 1
+        print(f"✅ Hit/miss: {stats}")
+
+        # I risultati restituiti sono copie: modificarli non altera la cache
+        october[0]['total_transmissions'] = -1
+        assert db.get_daily_stats('2025-10-01', '2025-10-31')[0]['total_transmissions'] == 10
+
+        # Scrittura di novembre: ottobre resta in cache, novembre viene ricalcolato
+        db.save_daily_stats(daily_stats('2025-11-01', 25))
+        before = db.get_cache_stats()
+        db.get_daily_stats('2025-10-01', '2025-10-31')
+        november = db.get_daily_stats('2025-11-01', '2025-11-30')
+        after = db.get_cache_stats()
+        assert after['hits'] - before['hits'] == 1
+        assert after['misses'] - before['misses'] == 1
+        assert november[0]['total_transmissions'] == 25
+        print("✅ Invalidazione per data")
+
+        # Le query che dipendono da tutte le date vengono invalidate da ogni scrittura
+        assert db.get_date_range_stats()['total_days'] == 2
+        db.save_daily_stats(daily_stats('2025-12-01', 5))
+        assert db.get_date_range_stats()['total_days'] == 3
+        assert db.get_monthly_aggregated_stats(2025, 12)['total_transmissions'] == 5
+
+        # Invalidazione globale (pulizia)
+        db.cleanup_old_data(keep_days=1)
+        assert db.get_date_range_stats()['total_days'] == 0
+        print("✅ Invalidazione globale")
+
+        # Altre istanze sullo stesso file condividono la cache
+        other = DatabaseManager(db.db_path)
+        other.save_daily_stats(daily_stats('2025-12-02', 7))
+        assert db.get_date_range_stats()['total_days'] == 1
+
+        # Scrittura esterna (altro processo): rilevata dal cambio del file
+        db.get_available_dates()
+        subprocess.run([sys.executable, '-c',
+                        f"from database import DatabaseManager; DatabaseManager({db.db_path!r}).cleanup_old_data(0)"],
+                       cwd=os.path.dirname(os.path.abspath(__file__)), check=True, capture_output=True)
+        assert db.get_available_dates() == []
+        print("✅ Scritture esterne rilevate")
+
+
+def test_date_generations_bounded():
+    """Le generazioni per data non crescono con i giorni scritti e le voci restano corrette"""
+    print("🗃️ Test compattazione generazioni...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = QueryCache(os.path.join(tmp_dir, 'gen.db'), max_entries=4)
+        cache.bump(['2025-09-01'])
+        assert cache._date_generations == {}  # nessuna voce in cache da invalidare
+        cache.put(('ottobre',), 'vecchio', cache.generation)
+        cache.bump(['2025-11-01'])
+        assert cache._date_generations == {'2025-11-01': cache.generation}
+        assert cache.get(('ottobre',), ('2025-10-01', '2025-10-31'))[1] == 'vecchio'
+
+        cache.put(('novembre',), 'novembre', cache.generation)
+        for day in range(1, 31):
+            cache.bump([f'2025-12-{day:02d}'])
+        assert len(cache._date_generations) <= 4
+        # Voce più vecchia delle date scartate: invalidata, non servita con dati vecchi
+        assert cache.get(('novembre',), ('2025-11-01', '2025-11-30'))[0] is False
+
+        cache.put(('dicembre',), 'dicembre', cache.generation)
+        cache.bump(['2025-12-31'])
+        assert cache.get(('dicembre',), ('2025-12-01', '2025-12-30'))[1] == 'dicembre'
+        assert cache.get(('dicembre',), ('2025-12-01', '2025-12-31'))[0] is False
+        print("✅ Generazioni per data limitate")
+
+
+if __name__ == "__main__":
+    test_query_cache()
+    test_date_generations_bounded()
+    print("🎉 Test cache completato!")
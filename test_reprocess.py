@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test della rielaborazione selettiva dei giorni prodotti da versioni precedenti dell'analizzatore
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseManager, DailyLogStats
+from log_analyzer import ANALYZER_VERSION
+from log_processor import LogProcessor
+from migrations import SCHEMA_VERSION
+from partitions import partitions_dir
+
+
+def _write_logs(data_dir, days):
+    for day in days:
+        lines = [f"Wed Oct  {day} 08:00:00 2025: Tx1: Turning the transmitter ON",
+                 f"Wed Oct  {day} 08:00:1{day} 2025: Tx1: Turning the transmitter OFF"]
+        Path(data_dir, f"svxlink_log_2025-10-0{day}.txt").write_text("\n".join(lines) + "\n")
+
+
+def _partition(db):
+    conn = sqlite3.connect(os.path.join(partitions_dir(db.db_path), '2025.db'))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def test_reprocess_outdated_days():
+    """Solo i giorni di versioni precedenti vengono rielaborati, dal più recente"""
+    print("🔁 Test rielaborazione selettiva...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _write_logs(tmp_dir, [1, 2, 3, 4])
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'stats.db'))
+        db = processor.db_manager
+        assert processor.process_all_files()['processed'] == 4
+        assert db.get_outdated_dates(ANALYZER_VERSION) == []
+        assert processor.reprocess_outdated()['outdated'] == 0
+
+        # Giorni prodotti da un analizzatore precedente (con risultati diversi)
+        with _partition(db) as conn:
+            conn.execute("UPDATE daily_logs SET analyzer_version = 0, total_transmission_time = 99 "
+                         "WHERE date IN ('2025-10-01', '2025-10-03', '2025-10-04')")
+            untouched = conn.execute("SELECT processed_at FROM daily_logs WHERE date = '2025-10-02'").fetchone()[0]
+        os.remove(os.path.join(tmp_dir, 'svxlink_log_2025-10-04.txt'))
+        assert db.get_outdated_dates(ANALYZER_VERSION) == ['2025-10-04', '2025-10-03', '2025-10-01']
+
+        result = processor.reprocess_outdated(workers=2)
+        assert result['outdated'] == 3 and result['processed'] == 2 and result['errors'] == 0
+        assert result['missing'] == ['2025-10-04']
+        print("✅ Rielaborati 2 giorni, 1 senza file log")
+
+        rows = {row['date']: row for row in db.get_daily_stats('2025-10-01', '2025-10-31')}
+        assert rows['2025-10-01']['total_transmission_time'] == 11
+        assert rows['2025-10-03']['total_transmission_time'] == 13
+        assert rows['2025-10-03']['analyzer_version'] == ANALYZER_VERSION
+        # Giorno senza file: i dati precedenti restano disponibili
+        assert rows['2025-10-04']['total_transmission_time'] == 99
+        assert rows['2025-10-02']['processed_at'] == untouched
+        assert db.get_outdated_dates(ANALYZER_VERSION) == ['2025-10-04']
+        print("✅ Giorni aggiornati sostituiti, gli altri invariati")
+
+
+def test_analyzer_version_migration():
+    """La migrazione 4 aggiunge la versione a database principale e partizioni esistenti"""
+    print("🔄 Test migrazione versione analizzatore...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'stats.db')
+        db = DatabaseManager(db_path)
+        db.save_daily_stats(DailyLogStats(
+            date='2024-05-01', filename='svxlink_log_2024-05-01.txt', file_size=10,
+            total_transmissions=3, total_transmission_time=30, avg_transmission_time=10.0,
+            max_transmission_time=12, min_transmission_time=8, total_qso=1, total_qso_time=20,
+            analyzer_version=ANALYZER_VERSION))
+        assert db.compact_partitions() == ['2024']
+
+        # Database v3 con una partizione v1 compattata (sola lettura)
+        partition = os.path.join(partitions_dir(db_path), '2024.db')
+        os.chmod(partition, 0o644)
+        with sqlite3.connect(partition) as conn:
+            conn.execute("ALTER TABLE daily_logs DROP COLUMN analyzer_version")
+            conn.execute("PRAGMA user_version = 1")
+        os.chmod(partition, 0o444)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("ALTER TABLE daily_logs DROP COLUMN analyzer_version")
+            conn.execute("PRAGMA user_version = 3")
+
+        db = DatabaseManager(db_path)
+        assert db.get_schema_version() == SCHEMA_VERSION
+        assert os.stat(partition).st_mode & 0o777 == 0o444
+        assert db.get_outdated_dates(ANALYZER_VERSION) == ['2024-05-01']
+        assert db.get_yearly_aggregated_stats(2024)['total_days'] == 1
+        print("✅ Partizione esistente aggiornata, giorni senza versione da rielaborare")
+
+
+if __name__ == "__main__":
+    test_reprocess_outdated_days()
+    test_analyzer_version_migration()
+    print("🎉 Test rielaborazione completato!")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Test dei totali cumulativi (somme prefisse) per i totali di intervalli di date
+"""
+
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import CTCSSStats, DailyLogStats, DatabaseManager, TGStats
+from migrations import get_pending_backfills, run_backfills
+from running_totals import RUNNING_TABLES
+
+TODAY = date.today()
+SITES = ('default', 'rocca')
+
+
+def _day(rng, site_id, day):
+    transmissions = rng.randint(1, 200)
+    daily = DailyLogStats(
+        date=day, filename=f"svxlink_log_{day}.txt", file_size=1024,
+        total_transmissions=transmissions, total_transmission_time=transmissions * 7,
+        avg_transmission_time=7.0, max_transmission_time=30, min_transmission_time=1,
+        total_qso=transmissions // 10, total_qso_time=transmissions * 3, site_id=site_id
+    )
+    ctcss = [CTCSSStats(log_date=day, ctcss_frequency=frequency, count=rng.randint(0, 50),
+                        percentage=round(rng.uniform(0, 100), 2), site_id=site_id)
+             for frequency in rng.sample([67.0, 71.9, 88.5, 94.8, 123.0], 3)]
+    tg = [TGStats(log_date=day, tg_number=number, transmission_count=rng.randint(0, 40),
+                  total_duration=rng.randint(0, 900), qso_count=rng.randint(0, 5),
+                  avg_duration=round(rng.uniform(1, 60), 1), percentage=round(rng.uniform(0, 100), 2),
+                  site_id=site_id)
+          for number in rng.sample([0, 222, 2222, 22251, 91, 1, 3100], 4)]
+    return daily, ctcss, tg, []
+
+
+def _expected(data, start_date, end_date, site=None):
+    """Totali calcolati in Python dai dati generati"""
+    totals = defaultdict(int)
+    ctcss = defaultdict(lambda: [0, 0.0, 0])
+    tgs = defaultdict(lambda: [0, 0, 0, 0.0, 0])
+    for (site_id, day), (daily, ctcss_list, tg_list, _) in data.items():
+        if not start_date <= day <= end_date or (site is not None and site_id != site):
+            continue
+        totals['total_days'] += 1
+        totals['total_transmissions'] += daily.total_transmissions
+        totals['total_qso_time'] += daily.total_qso_time
+        for c in ctcss_list:
+            ctcss[c.ctcss_frequency][0] += c.count
+            ctcss[c.ctcss_frequency][1] += c.percentage
+            ctcss[c.ctcss_frequency][2] += 1
+        for t in tg_list:
+            row = tgs[t.tg_number]
+            row[0] += t.transmission_count
+            row[1] += t.total_duration
+            row[2] += t.qso_count
+            row[3] += t.avg_duration
+            row[4] += 1
+    return dict(totals), dict(ctcss), {tg: row for tg, row in tgs.items() if tg != 0}
+
+
+def _check(db, data, start_date, end_date, site=None):
+    totals, ctcss, tgs = _expected(data, start_date, end_date, site)
+
+    result = db.get_range_totals(start_date, end_date, site)
+    for name, value in totals.items():
+        assert result['totals'][name] == value, (start_date, end_date, site, name)
+    assert result['totals']['total_days'] == totals.get('total_days', 0)
+
+    rows = db.get_ctcss_stats(start_date, end_date, site)
+    assert {row['ctcss_frequency']: row['total_count'] for row in rows} == {f: c[0] for f, c in ctcss.items()}
+    for row in rows:
+        count, percentage, days = ctcss[row['ctcss_frequency']]
+        assert math.isclose(row['avg_percentage'], percentage / days, abs_tol=1e-6)
+    assert [row['total_count'] for row in rows] == sorted((c[0] for c in ctcss.values()), reverse=True)
+
+    rows = db.get_tg_stats(start_date, end_date, site)
+    assert {row['tg_number']: (row['total_transmissions'], row['total_duration'], row['total_qso'])
+            for row in rows} == {tg: tuple(t[:3]) for tg, t in tgs.items()}
+    for row in rows:
+        assert math.isclose(row['avg_duration'], tgs[row['tg_number']][3] / tgs[row['tg_number']][4], abs_tol=1e-6)
+
+
+def _running_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {spec.table: [tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+                             for row in conn.execute(f"SELECT * FROM {spec.table} ORDER BY site_id, key, date")]
+                for spec in RUNNING_TABLES.values()}
+
+
+def _random_ranges(rng, first, count):
+    span = (TODAY - first).days
+    for _ in range(count):
+        start = first + timedelta(days=rng.randint(-5, span))
+        yield start.isoformat(), (start + timedelta(days=rng.randint(0, span))).isoformat()
+
+
+def test_running_totals():
+    """Totali di intervalli qualsiasi uguali alle somme dei giorni, anche dopo la rielaborazione di giorni passati"""
+    print("➕ Test totali cumulativi...")
+
+    rng = random.Random(50)
+    first = TODAY - timedelta(days=500)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'stats.db')
+        db = DatabaseManager(db_path)
+        data = {(site_id, day): _day(rng, site_id, day)
+                for site_id in SITES
+                for day in ((first + timedelta(days=n)).isoformat() for n in range(0, 500, 3))
+                if rng.random() < 0.8}
+
+        # Giorni salvati in ordine sparso e a blocchi, come dall'ingest parallelo
+        items = list(data.values())
+        rng.shuffle(items)
+        for index in range(0, len(items), 25):
+            assert db.save_log_batch(items[index:index + 25])
+
+        for start_date, end_date in _random_ranges(rng, first, 30):
+            _check(db, data, start_date, end_date)
+            _check(db, data, start_date, end_date, 'rocca')
+        print(f"✅ {len(data)} giorni su {len(db.get_partitions())} partizioni: totali corretti")
+
+        # Rielaborazione di giorni passati: valori cambiati, TG e toni spariti o nuovi
+        for key in rng.sample(sorted(data), 15):
+            data[key] = _day(rng, *key)
+            assert db.save_log_batch([data[key]])
+        site_id, day = sorted(data)[10]
+        data[(site_id, day)][2].pop()
+        assert db.save_tg_stats(data[(site_id, day)][2])
+        for start_date, end_date in _random_ranges(rng, first, 30):
+            _check(db, data, start_date, end_date)
+            _check(db, data, start_date, end_date, 'default')
+
+        # Stesso risultato di un ricalcolo completo
+        updated = _running_rows(db_path)
+        with sqlite3.connect(db_path) as conn:
+            for spec in RUNNING_TABLES.values():
+                conn.execute(f"DELETE FROM {spec.table}")
+            conn.execute("DELETE FROM running_total_keys")
+            conn.execute("INSERT INTO schema_backfills (version, description) VALUES (7, 'Totali cumulativi')")
+        assert run_backfills(db_path, batch_size=40, pause=0) == {7: len({day for _, day in data})}
+        assert _running_rows(db_path) == updated
+        print("✅ Giorni rielaborati: cumulativi aggiornati come da ricalcolo completo")
+
+        month = date.fromisoformat(sorted(data)[-1][1])
+        monthly = db.get_monthly_aggregated_stats(month.year, month.month)
+        _, ctcss, _ = _expected(data, f"{month:%Y-%m}-01", f"{month:%Y-%m}-31")
+        assert [row['total_count'] for row in monthly['top_ctcss']] == \
+            sorted((c[0] for c in ctcss.values()), reverse=True)[:5]
+        print("✅ Top CTCSS e TG mensili dai totali cumulativi")
+
+
+def test_retention_and_backfill():
+    """Retention ribasa i cumulativi; durante il backfill della migrazione 7 le query usano le somme"""
+    print("🧹 Test retention e backfill dei totali cumulativi...")
+
+    rng = random.Random(7)
+    first = TODAY - timedelta(days=400)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'stats.db')
+        db = DatabaseManager(db_path)
+        data = {(site_id, day): _day(rng, site_id, day)
+                for site_id in SITES
+                for day in ((first + timedelta(days=n)).isoformat() for n in range(0, 400, 2))}
+        assert db.save_log_batch(list(data.values()))
+
+        db.cleanup_old_data(keep_days=200)
+        cutoff = (TODAY - timedelta(days=200)).isoformat()
+        data = {key: value for key, value in data.items() if key[1] >= cutoff}
+        for start_date, end_date in _random_ranges(rng, first, 20):
+            _check(db, data, start_date, end_date)
+        assert db.get_range_totals(first.isoformat(), (TODAY - timedelta(days=250)).isoformat())['totals'] == \
+            {'total_days': 0, 'total_transmissions': 0, 'total_time': 0, 'total_qso': 0,
+             'total_qso_time': 0, 'avg_daily_transmissions': None}
+        print("✅ Giorni eliminati dalla retention esclusi dai totali")
+
+        # Database alla versione 6: totali cumulativi ancora da calcolare
+        with sqlite3.connect(db_path) as conn:
+            for spec in RUNNING_TABLES.values():
+                conn.execute(f"DROP TABLE {spec.table}")
+            conn.execute("DROP TABLE running_total_keys")
+            conn.execute("PRAGMA user_version = 6")
+        db = DatabaseManager(db_path)
+        assert [p['version'] for p in get_pending_backfills(db_path)] == [7]
+        _check(db, data, cutoff, TODAY.isoformat())
+
+        # A metà backfill le query restano corrette (somme sui giorni)
+        assert run_backfills(db_path, batch_size=30, pause=0,
+                             should_stop=lambda: _running_rows(db_path)['running_daily_totals'] != []) == {7: 30}
+        _check(db, data, cutoff, TODAY.isoformat(), 'rocca')
+        run_backfills(db_path, batch_size=30, pause=0)
+        assert get_pending_backfills(db_path) == []
+        for start_date, end_date in _random_ranges(rng, first, 20):
+            _check(db, data, start_date, end_date)
+        print("✅ Backfill a blocchi della migrazione 7")
+
+        import app as app_module
+        original_db = app_module.db_manager
+        app_module.db_manager = db
+        try:
+            client = app_module.app.test_client()
+            response = client.get(f"/api/statistics/totals?start_date={cutoff}&end_date={TODAY}")
+            result = response.get_json()
+            assert response.status_code == 200
+            totals, _, _ = _expected(data, cutoff, TODAY.isoformat())
+            assert result['totals']['total_transmissions'] == totals['total_transmissions']
+            assert [site['site_id'] for site in result['sites']] == list(SITES)
+            assert sum(site['total_days'] for site in result['sites']) == totals['total_days']
+            assert client.get('/api/statistics/totals?start_date=bad&end_date=2025-01-01').status_code == 400
+            print("✅ API totali del periodo")
+        finally:
+            app_module.db_manager = original_db
+
+
+if __name__ == "__main__":
+    test_running_totals()
+    test_retention_and_backfill()
+    print("🎉 Test totali cumulativi completato!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test della versione dello schema e delle migrazioni del database
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseManager
+from migrations import (MIGRATIONS, SCHEMA_VERSION, Migration, add_column, apply_schema_migrations,
+                        get_pending_backfills, run_backfills)
+
+
+def test_schema_version():
+    """Lo schema viene eseguito solo se user_version non è aggiornata"""
+    print("🗂️ Test versione schema...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'stats.db')
+        db = DatabaseManager(db_path)
+        assert db.get_schema_version() == SCHEMA_VERSION
+        assert db.get_schema_status()['pending_backfills'] == []
+
+        # Una tabella rimossa non viene ricreata: lo schema è considerato aggiornato
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("DROP TABLE ingested_files")
+        DatabaseManager(db_path)
+        with sqlite3.connect(db_path) as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        assert 'ingested_files' not in tables
+        print("✅ Schema saltato con user_version aggiornata")
+
+        # Con una versione diversa lo schema viene rieseguito
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("PRAGMA user_version = 0")
+        db = DatabaseManager(db_path)
+        assert db.get_ingested_files() == {}
+        assert db.get_schema_version() == SCHEMA_VERSION
+        print("✅ Schema rieseguito con versione obsoleta")
+
+
+def _add_weekday(conn):
+    add_column(conn, 'daily_logs', 'weekday', 'INTEGER')
+
+
+def _backfill_weekday(conn, batch_size):
+    return conn.execute("""
+        UPDATE daily_logs SET weekday = CAST(strftime('%w', date) AS INTEGER)
+        WHERE id IN (SELECT id FROM daily_logs WHERE weekday IS NULL LIMIT ?)
+    """, (batch_size,)).rowcount
+
+
+def test_chunked_backfill():
+    """Le migrazioni applicano il DDL subito e il backfill a blocchi ripristinabili"""
+    print("🧱 Test migrazione con backfill...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'stats.db')
+        DatabaseManager(db_path)
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany("INSERT INTO daily_logs (date, filename) VALUES (?, ?)",
+                             [(f"2024-01-01 +{day} days", f"log_{day}.txt") for day in range(250)])
+            conn.execute("UPDATE daily_logs SET date = date(substr(date, 1, 10), substr(date, 12))")
+
+        registry = MIGRATIONS + [Migration(SCHEMA_VERSION + 1, 'Giorno della settimana',
+                                           schema=_add_weekday, backfill=_backfill_weekday)]
+        assert apply_schema_migrations(db_path, registry) == [SCHEMA_VERSION + 1]
+        assert apply_schema_migrations(db_path, registry) == []
+        assert [p['version'] for p in get_pending_backfills(db_path)] == [SCHEMA_VERSION + 1]
+
+        # Tra un blocco e l'altro nessuna transazione è aperta: i lettori non attendono
+        batches = []
+        def stop_after_three():
+            reader = sqlite3.connect(db_path, timeout=0)
+            try:
+                reader.execute("SELECT COUNT(*) FROM daily_logs").fetchone()
+            finally:
+                reader.close()
+            batches.append(1)
+            return len(batches) > 3
+
+        updated = run_backfills(db_path, registry, batch_size=40, pause=0, should_stop=stop_after_three)
+        assert updated == {SCHEMA_VERSION + 1: 120}
+        assert get_pending_backfills(db_path)[0]['rows_done'] == 120
+        print("✅ Backfill interrotto dopo 3 blocchi da 40 righe")
+
+        # Ripresa da dove si era fermato
+        updated = run_backfills(db_path, registry, batch_size=40, pause=0)
+        assert updated == {SCHEMA_VERSION + 1: 130}
+        assert get_pending_backfills(db_path) == []
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM daily_logs WHERE weekday IS NULL").fetchone()[0] == 0
+            assert conn.execute("SELECT weekday FROM daily_logs WHERE date = '2024-01-01'").fetchone()[0] == 1
+        print("✅ Backfill ripreso e completato")
+
+
+if __name__ == "__main__":
+    test_schema_version()
+    test_chunked_backfill()
+    print("🎉 Test schema completato!")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Test della dimensione sito: più ripetitori nello stesso database
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from columns import columns_dir
+from directory_index import get_directory_index
+from conftest import daily_stats
+from database import DatabaseManager, CTCSSStats, DisconnectionPeriod, TGStats
+from log_processor import LogProcessor
+from migrations import MIGRATIONS, SCHEMA_VERSION, apply_schema_migrations, run_backfills
+from partitions import PARTITION_SCHEMA_VERSION, partitions_dir, refresh_catalog
+from sites import DEFAULT_SITE, discover_sites
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database_schema.sql')
+
+
+def _write_log(directory, day, seconds):
+    Path(directory).mkdir(exist_ok=True)
+    Path(directory, f"svxlink_log_2025-10-0{day}.txt").write_text(
+        f"Wed Oct  {day} 08:00:00 2025: Tx1: Turning the transmitter ON\n"
+        f"Wed Oct  {day} 08:00:{seconds:02d} 2025: Tx1: Turning the transmitter OFF\n")
+
+
+def _day(site_id, day, transmissions):
+    log_date = f"2025-10-{day:02d}"
+    daily = daily_stats(log_date, transmissions, site_id, total_transmission_time=transmissions * 10)
+    ctcss = [CTCSSStats(log_date, 85.4, transmissions, 100.0, site_id=site_id)]
+    tg = [TGStats(log_date, 222, transmissions, transmissions * 10, 1, 10.0, 100.0, site_id=site_id)]
+    disconnections = [DisconnectionPeriod(log_date, start_time=datetime(2025, 10, day, 3),
+                                          site_id=site_id, status='ongoing')]
+    return daily, ctcss, tg, disconnections
+
+
+def test_multi_site_ingest():
+    """Cartella data e sottocartelle dei siti importate insieme, senza mescolare i giorni"""
+    print("📡 Test ingest multi-sito...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, 'data')
+        _write_log(data_dir, 1, 10)
+        _write_log(data_dir, 2, 20)
+        _write_log(os.path.join(data_dir, 'monte-cavo'), 1, 30)
+        _write_log(os.path.join(data_dir, 'rocca'), 2, 40)
+        processor = LogProcessor(data_dir=data_dir, db_path=os.path.join(data_dir, 'stats.db'))
+        db = processor.db_manager
+
+        # Le cartelle del database non sono siti
+        assert list(processor.get_sites()) == [DEFAULT_SITE, 'monte-cavo', 'rocca']
+        result = processor.process_all_files()
+        assert result['processed'] == 4 and result['errors'] == 0
+        assert result['workers'] == min(3, os.cpu_count() or 1)
+        assert processor.get_sites() == {DEFAULT_SITE: Path(data_dir), 'monte-cavo': Path(data_dir, 'monte-cavo'),
+                                         'rocca': Path(data_dir, 'rocca')}
+        print(f"✅ 3 siti importati con {result['workers']} worker")
+
+        # Database in una sottocartella dei log, come nel container (data/db)
+        nested = LogProcessor(data_dir=data_dir, db_path=os.path.join(data_dir, 'db', 'stats.db'))
+        assert list(nested.get_sites()) == [DEFAULT_SITE, 'monte-cavo', 'rocca']
+
+        # Sottocartelle senza log non sono siti; con un elenco esplicito solo quelli elencati
+        for name in ('backup', 'logs', '__pycache__'):
+            os.makedirs(os.path.join(data_dir, name, 'old'), exist_ok=True)
+        assert list(discover_sites(data_dir)) == [DEFAULT_SITE, 'monte-cavo', 'rocca']
+        assert list(discover_sites(data_dir, ['rocca', 'backup'])) == [DEFAULT_SITE, 'backup', 'rocca']
+
+        # Il primo log in una cartella esistente la rende un sito, anche senza cambiare data/
+        first_log = Path(data_dir, 'backup', 'svxlink_log_2025-10-09.txt')
+        first_log.write_text("")
+        assert list(discover_sites(data_dir)) == [DEFAULT_SITE, 'backup', 'monte-cavo', 'rocca']
+        first_log.unlink()
+
+        # Cartelle invariate: nessuna nuova scansione, solo uno stat per cartella
+        past = time.time_ns() - 60 * 10**9
+        for directory in [data_dir] + [entry.path for entry in os.scandir(data_dir) if entry.is_dir()]:
+            os.utime(directory, ns=(past, past))
+        assert list(discover_sites(data_dir)) == [DEFAULT_SITE, 'monte-cavo', 'rocca']
+        indexes = [get_directory_index(directory) for directory in
+                   [data_dir] + [entry.path for entry in os.scandir(data_dir) if entry.is_dir()]]
+        scans = [index.scans for index in indexes]
+        listings = []
+        original_scandir, original_listdir = os.scandir, os.listdir
+        os.scandir = lambda *args: listings.append(args) or original_scandir(*args)
+        os.listdir = lambda *args: listings.append(args) or original_listdir(*args)
+        try:
+            for _ in range(3):
+                assert list(processor.get_sites()) == [DEFAULT_SITE, 'monte-cavo', 'rocca']
+        finally:
+            os.scandir, os.listdir = original_scandir, original_listdir
+        assert listings == []
+        assert [index.scans for index in indexes] == scans
+        print("✅ Siti dagli indici in cache")
+
+        rows = db.get_daily_stats('2025-10-01', '2025-10-31')
+        assert sorted((row['site_id'], row['date'], row['total_transmission_time']) for row in rows) == [
+            (DEFAULT_SITE, '2025-10-01', 10), (DEFAULT_SITE, '2025-10-02', 20),
+            ('monte-cavo', '2025-10-01', 30), ('rocca', '2025-10-02', 40)]
+        assert [row['total_transmission_time'] for row in db.get_daily_stats('2025-10-01', '2025-10-31', 'rocca')] == [40]
+        assert db.get_available_dates('monte-cavo') == ['2025-10-01']
+        assert db.get_available_dates() == ['2025-10-02', '2025-10-01']
+        assert db.get_date_range_stats()['total_days'] == 2
+        assert [site['site_id'] for site in db.get_sites()] == [DEFAULT_SITE, 'monte-cavo', 'rocca']
+        comparison = {row['site_id']: row for row in db.get_site_comparison('2025-10-01', '2025-10-31')}
+        assert comparison[DEFAULT_SITE]['total_days'] == 2 and comparison[DEFAULT_SITE]['total_time'] == 30
+        assert comparison['rocca']['total_time'] == 40
+        print("✅ Stesso giorno su siti diversi, filtri e confronto")
+
+        # Cache a colonne separata per sito; nessun file da rielaborare al giro successivo
+        assert os.listdir(os.path.join(columns_dir(db.db_path), 'rocca'))[0].startswith('2025-10-02.')
+        assert processor.get_unprocessed_files() == []
+        _write_log(os.path.join(data_dir, 'rocca'), 2, 45)
+        assert processor.get_unprocessed_files() == [Path(data_dir, 'rocca', 'svxlink_log_2025-10-02.txt')]
+        assert processor.process_all_files()['processed'] == 1
+        assert db.get_daily_stats('2025-10-02', '2025-10-02', DEFAULT_SITE)[0]['total_transmission_time'] == 20
+        assert db.get_daily_stats('2025-10-02', '2025-10-02', 'rocca')[0]['total_transmission_time'] == 45
+        assert processor.process_specific_date('2025-10-01', force=True, site_id='monte-cavo')
+        print("✅ Aggiornamento di un sito senza toccare gli altri")
+
+
+def test_site_migration():
+    """La migrazione 5 porta database principale e partizioni esistenti al sito di default"""
+    print("🔄 Test migrazione siti...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'stats.db')
+        with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
+            schema_sql = f.read()
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript(schema_sql)
+            conn.execute("PRAGMA user_version = 1")
+        apply_schema_migrations(db_path, MIGRATIONS[:4])
+
+        # Giorno non ancora spostato dal backfill della migrazione 3
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO daily_logs (date, filename, total_transmissions) VALUES ('2024-03-01', 'a.txt', 7)")
+
+        # Partizione v2 (chiavi univoche sulla sola data)
+        os.makedirs(partitions_dir(db_path))
+        part = sqlite3.connect(os.path.join(partitions_dir(db_path), '2025.db'))
+        part.executescript(schema_sql)
+        part.execute("ALTER TABLE daily_logs ADD COLUMN analyzer_version INTEGER DEFAULT 0")
+        part.execute("INSERT INTO daily_logs (date, filename, total_transmissions) VALUES ('2025-10-01', 'b.txt', 5)")
+        part.execute("INSERT INTO daily_ctcss_stats (log_date, ctcss_frequency, count, percentage) "
+                     "VALUES ('2025-10-01', 85.4, 5, 100)")
+        part.execute("PRAGMA user_version = 2")
+        part.commit()
+        with sqlite3.connect(db_path) as conn:
+            refresh_catalog(conn, '2025', part)
+        part.close()
+
+        db = DatabaseManager(db_path)
+        assert db.get_schema_version() == SCHEMA_VERSION
+        with sqlite3.connect(os.path.join(partitions_dir(db_path), '2025.db')) as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == PARTITION_SCHEMA_VERSION
+        assert db.get_daily_stats('2025-10-01', '2025-10-01', DEFAULT_SITE)[0]['total_transmissions'] == 5
+        assert db.get_ctcss_stats('2025-10-01', '2025-10-01', DEFAULT_SITE)[0]['total_count'] == 5
+        print("✅ Partizione v2 ricreata, righe assegnate al sito di default")
+
+        run_backfills(db_path, pause=0)
+        assert db.get_daily_stats('2024-03-01', '2024-03-01', DEFAULT_SITE)[0]['total_transmissions'] == 7
+
+        # Lo stesso giorno ora può esistere per un altro sito
+        assert db.save_log_batch([_day('monte-cavo', 1, 9)])
+        assert db.get_daily_stats('2025-10-01', '2025-10-01', DEFAULT_SITE)[0]['total_transmissions'] == 5
+        assert db.get_daily_stats('2025-10-01', '2025-10-01', 'monte-cavo')[0]['total_transmissions'] == 9
+        print("✅ Backfill e nuovi siti dopo la migrazione")
+
+
+def test_site_queries_and_api():
+    """Con decine di siti le query filtrate usano gli indici; API con ?site= e confronto"""
+    print("🔍 Test query e API per sito...")
+
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'stats.db'))
+        sites = [f"site-{index:02d}" for index in range(30)]
+        assert db.save_log_batch([_day(site_id, day, index + day)
+                                  for index, site_id in enumerate(sites) for day in range(1, 29)])
+
+        assert len(db.get_daily_stats('2025-10-01', '2025-10-31', 'site-07')) == 28
+        assert db.get_monthly_aggregated_stats(2025, 10, 'site-07')['total_transmissions'] == sum(7 + d for d in range(1, 29))
+        assert db.get_yearly_aggregated_stats(2025)['total_days'] == 30 * 28
+        assert db.get_tg_stats('2025-10-05', '2025-10-05', 'site-03')[0]['total_transmissions'] == 8
+        assert len(db.get_disconnections('2025-10-01', '2025-10-31', 'site-29')) == 28
+        assert len(db.get_site_comparison('2025-10-01', '2025-10-07')) == 30
+        assert db.get_partitions()[0]['days'] == 28
+
+        # Piani di esecuzione: ogni tabella (principale e partizione) letta tramite indice
+        site_params = ('site-07', '2025-10-01', '2025-10-07')
+        queries = [
+            ("SELECT * FROM daily_logs WHERE site_id = ? AND date BETWEEN ? AND ?", site_params),
+            ("SELECT * FROM daily_ctcss_stats WHERE site_id = ? AND log_date BETWEEN ? AND ?", site_params),
+            ("SELECT * FROM daily_tg_stats WHERE site_id = ? AND log_date BETWEEN ? AND ?", site_params),
+            ("SELECT * FROM daily_disconnections WHERE site_id = ? AND log_date BETWEEN ? AND ?", site_params),
+            ("SELECT site_id, COUNT(*) FROM daily_logs WHERE date BETWEEN ? AND ? GROUP BY site_id", site_params[1:]),
+        ]
+        with db._range_connection('2025-10-01', '2025-10-31') as conn:
+            for sql, params in queries:
+                plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+                table_steps = [step for step in plan if ' main.' in step or ' p0.' in step]
+                assert len(table_steps) == 2, plan
+                for step in table_steps:
+                    assert step.startswith('SEARCH') and 'INDEX' in step, (sql, plan)
+                    assert ('site_id=?' in step) == ('site_id = ?' in sql), (sql, plan)
+        print("✅ 30 siti: query filtrate per sito servite dagli indici")
+
+        original_db = app_module.db_manager
+        app_module.db_manager = db
+        try:
+            client = app_module.app.test_client()
+            data = client.get('/api/statistics/daily?start_date=2025-10-01&end_date=2025-10-31&site=site-02').get_json()
+            assert data['site'] == 'site-02' and data['total_days'] == 28
+            assert {row['site_id'] for row in data['data']} == {'site-02'}
+            data = client.get('/api/statistics/ctcss?start_date=2025-10-01&end_date=2025-10-01&site=site-02').get_json()
+            assert data['data'][0]['total_count'] == 3
+            data = client.get('/api/statistics/ctcss?start_date=2025-10-01&end_date=2025-10-01').get_json()
+            assert data['site'] is None and data['data'][0]['total_count'] == sum(index + 1 for index in range(30))
+            assert client.get('/api/statistics/daily?site=../etc').status_code == 400
+
+            data = client.get('/api/statistics/sites?start_date=2025-10-01&end_date=2025-10-31').get_json()
+            assert data['total_sites'] == 30 and len(data['sites']) == 30
+            assert data['data'][5]['site_id'] == 'site-05' and data['data'][5]['disconnection_periods'] == 28
+            print("✅ API con filtro sito e confronto tra siti")
+        finally:
+            app_module.db_manager = original_db
+
+
+if __name__ == "__main__":
+    test_multi_site_ingest()
+    test_site_migration()
+    test_site_queries_and_api()
+    print("🎉 Test siti completato!")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test delle risposte in streaming (JSON e NDJSON) delle API statistiche
+"""
+
+import os
+import sys
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseManager, DailyLogStats, DisconnectionPeriod
+
+
+def _populate(db, days):
+    """Inserisce `days` giorni di statistiche e disconnessioni a partire dal 2024-01-01"""
+    start = date(2024, 1, 1)
+    for i in range(days):
+        day = (start + timedelta(days=i)).isoformat()
+        db.save_daily_stats(DailyLogStats(
+            date=day, filename=f"svxlink_log_{day}.txt", file_size=1024,
+            total_transmissions=i, total_transmission_time=10 * i,
+            avg_transmission_time=10.0, max_transmission_time=20,
+            min_transmission_time=1, total_qso=i % 7, total_qso_time=5 * i
+        ))
+        db.save_disconnections([DisconnectionPeriod(
+            log_date=day,
+            start_time=datetime.fromisoformat(f"{day}T10:00:00"),
+            end_time=datetime.fromisoformat(f"{day}T10:05:00"),
+            duration=300, disconnection_count=2, status='resolved'
+        )])
+
+
+def test_streaming_endpoints():
+    """Confronta le risposte in streaming con i dati del database"""
+    print("🌊 Test streaming API statistiche...")
+
+    import app as app_module
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseManager(os.path.join(tmp_dir, 'stream_test.db'))
+        _populate(db, 1200)
+
+        original_db = app_module.db_manager
+        original_batch = app_module.STREAM_BATCH_SIZE
+        app_module.db_manager = db
+        app_module.STREAM_BATCH_SIZE = 100
+        try:
+            client = app_module.app.test_client()
+            params = 'start_date=2024-01-01&end_date=2027-12-31'
+
+            # JSON in streaming: stessa struttura della risposta non in streaming
+            response = client.get(f'/api/statistics/daily?{params}')
+            assert response.status_code == 200
+            assert response.is_streamed
+            payload = json.loads(response.get_data(as_text=True))
+            assert payload['success'] is True
+            assert payload['total_days'] == 1200
+            assert len(payload['data']) == 1200
+            assert payload['data'][0]['date'] > payload['data'][-1]['date']
+            print(f"✅ Daily JSON: {payload['total_days']} giorni")
+
+            # NDJSON: una riga per record
+            response = client.get(f'/api/statistics/daily?{params}&format=ndjson')
+            assert response.mimetype == 'application/x-ndjson'
+            lines = response.get_data(as_text=True).splitlines()
+            assert len(lines) == 1200
+            assert json.loads(lines[0])['date'] == payload['data'][0]['date']
+            print(f"✅ Daily NDJSON: {len(lines)} righe")
+
+            # Disconnessioni: il riepilogo è calcolato durante lo streaming
+            response = client.get(f'/api/statistics/disconnections?{params}')
+            payload = json.loads(response.get_data(as_text=True))
+            assert payload['summary']['total_periods'] == 1200
+            assert payload['summary']['total_disconnections'] == 2400
+            assert payload['summary']['total_duration_formatted'] == 'Vedi dettagli'
+            print(f"✅ Disconnessioni JSON: {payload['summary']}")
+
+            # Range vuoto: array vuoto e contatori a zero
+            response = client.get('/api/statistics/disconnections?start_date=2030-01-01&end_date=2030-01-02')
+            payload = json.loads(response.get_data(as_text=True))
+            assert payload['data'] == []
+            assert payload['summary']['total_periods'] == 0
+            assert payload['summary']['total_duration_formatted'] == 'In corso'
+            print("✅ Range vuoto gestito correttamente")
+
+            response = client.get('/api/statistics/daily?start_date=2024-13-01&end_date=2024-01-02')
+            assert response.status_code == 400
+        finally:
+            app_module.db_manager = original_db
+            app_module.STREAM_BATCH_SIZE = original_batch
+
+
+if __name__ == "__main__":
+    test_streaming_endpoints()
+    print("🎉 Test streaming completato!")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test del listener syslog (UDP/TCP) per le righe SVXLink
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingest import PushIngest
+from log_processor import LogProcessor
+from syslog_listener import MONTH_NAMES, SyslogListener, parse_listen, parse_syslog, svxlink_line
+
+NOW = datetime(2025, 10, 19, 12, 0, 0)
+# RFC 3164 non ha l'anno: le righe inviate al listener sono di ieri
+YESTERDAY = date.today() - timedelta(days=1)
+
+
+def test_parse_syslog():
+    """Messaggi RFC 3164 e RFC 5424 ricostruiti come righe del file log SVXLink"""
+    print("📻 Test decodifica syslog...")
+
+    message = parse_syslog("<30>Oct 19 08:02:33 monte-cavo svxlink[812]: Tx1: Turning the transmitter ON", NOW)
+    assert (message.host, message.program) == ('monte-cavo', 'svxlink')
+    assert svxlink_line(message) == "Sun Oct 19 08:02:33 2025: Tx1: Turning the transmitter ON"
+
+    # Senza hostname (socket locale) e con giorno a una cifra
+    message = parse_syslog("<30>Oct  5 08:02:33 svxlink: ReflectorLogic: Selecting TG #222", NOW)
+    assert message.host is None and message.program == 'svxlink'
+    assert svxlink_line(message) == "Sun Oct  5 08:02:33 2025: ReflectorLogic: Selecting TG #222"
+
+    # Senza anno: dicembre ricevuto a gennaio è dell'anno precedente
+    message = parse_syslog("<30>Dec 31 23:59:59 svxlink: Tx1: Turning the transmitter OFF", datetime(2026, 1, 1))
+    assert message.timestamp.year == 2025
+
+    message = parse_syslog('<30>1 2025-10-19T08:02:33.123456789 rpt1.example.org svxlink 812 - '
+                           '[meta sequenceId="1"] \ufeffTx1: Turning the transmitter OFF', NOW)
+    assert (message.host, message.program) == ('rpt1.example.org', 'svxlink')
+    assert svxlink_line(message) == "Sun Oct 19 08:02:33 2025: Tx1: Turning the transmitter OFF"
+
+    # Messaggio che contiene già il timestamp di SVXLink
+    message = parse_syslog("<30>1 - - svxlink - - - Sun Oct 19 08:02:33 2025: Tx1: Turning the transmitter ON", NOW)
+    assert svxlink_line(message) == "Sun Oct 19 08:02:33 2025: Tx1: Turning the transmitter ON"
+
+    assert parse_syslog("Tx1: Turning the transmitter ON", NOW) is None
+    assert parse_listen("udp://0.0.0.0:5514, tcp://[::1]:6514") == [('udp', '0.0.0.0', 5514), ('tcp', '::1', 6514)]
+    print("✅ RFC 3164 e RFC 5424 decodificati")
+
+
+def _line(index, state):
+    # Una riga al secondo dalle 08:00: trasmissioni di 1 secondo
+    minutes, second = divmod(index, 60)
+    return (f"<30>{MONTH_NAMES[YESTERDAY.month]} {YESTERDAY.day:2d} "
+            f"{8 + minutes // 60:02d}:{minutes % 60:02d}:{second:02d} rpt svxlink[1]: "
+            f"Tx1: Turning the transmitter {state}")
+
+
+def test_syslog_throughput():
+    """Un mittente locale invia migliaia di righe al secondo su UDP e TCP: nessuna riga persa"""
+    print("🚀 Test throughput listener syslog...")
+
+    udp_lines, tcp_lines, rate = 10000, 10000, 5000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        processor = LogProcessor(data_dir=tmp_dir, db_path=os.path.join(tmp_dir, 'stats.db'))
+        listener = SyslogListener(PushIngest(processor), listen='udp://127.0.0.1:0,tcp://127.0.0.1:0',
+                                  flush_interval=0.2)
+        listener.start()
+        try:
+            # UDP: righe distribuite a 5000 al secondo (a blocchi di 100 datagrammi)
+            udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            started = time.perf_counter()
+            for index in range(udp_lines):
+                udp.sendto(_line(index, 'ON' if index % 2 == 0 else 'OFF').encode(), listener.addresses['udp'])
+                if index % 100 == 99:
+                    delay = started + (index + 1) / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+            udp.close()
+
+            # TCP con framing a conteggio di ottetti, alla massima velocità
+            tcp = socket.create_connection(listener.addresses['tcp'])
+            frames = []
+            for index in range(udp_lines, udp_lines + tcp_lines):
+                payload = _line(index, 'ON' if index % 2 == 0 else 'OFF').encode()
+                frames.append(b"%d %s" % (len(payload), payload))
+            tcp.sendall(b''.join(frames))
+            tcp.sendall(b"<30>Oct 19 08:00:00 rpt cron[2]: non SVXLink\n")
+            tcp.close()
+
+            total = udp_lines + tcp_lines
+            deadline = time.time() + 30
+            while listener.get_stats()['committed'] < total and time.time() < deadline:
+                time.sleep(0.05)
+            elapsed = time.perf_counter() - started
+        finally:
+            listener.stop()
+
+        stats = listener.get_stats()
+        print(f"✅ {stats['committed']} righe confermate in {elapsed:.2f}s "
+              f"({stats['committed'] / elapsed:.0f} righe/s, {stats['flushes']} conferme)")
+        assert stats['committed'] == stats['lines'] == total
+        assert stats['ignored'] == 1 and stats['dropped'] == 0 and stats['errors'] == 0
+        assert stats['flushes'] < total / 100
+
+        content = Path(tmp_dir, f"svxlink_log_{YESTERDAY.isoformat()}.txt").read_text()
+        assert content.count('\n') == total
+        day = processor.db_manager.get_daily_stats(YESTERDAY.isoformat(), YESTERDAY.isoformat())[0]
+        assert day['total_transmissions'] == total // 2
+
+
+def test_syslog_slow_commit():
+    """Conferma lenta: le righe non vengono riproposte (e duplicate), solo quelle di un gruppo annullato"""
+    print("🐢 Test conferma lenta listener syslog...")
+
+    class SlowReceiver:
+        def __init__(self):
+            self.calls = []
+
+        def submit(self, batches, timeout):
+            self.calls.append(timeout)
+            time.sleep(0.2)
+            for batch in batches:
+                batch.status = 'failed' if batch.site_id == 'rocca' else 'committed'
+                batch.done.set()
+            return batches
+
+    receiver = SlowReceiver()
+    listener = SyslogListener(receiver, listen='udp://127.0.0.1:0')
+    listener._pending = {'default': ['a', 'b'], 'rocca': ['c']}
+    listener._pending_lines = 3
+    asyncio.run(listener._flush())
+    assert receiver.calls == [None]
+    assert listener.stats['committed'] == 2 and listener.stats['errors'] == 1
+    assert listener._pending == {'rocca': ['c']} and listener._pending_lines == 1
+    print("✅ Attesa della conferma senza timeout")
+
+
+if __name__ == "__main__":
+    test_parse_syslog()
+    test_syslog_throughput()
+    test_syslog_slow_commit()
+    print("🎉 Test listener syslog completato!")
@@ -3,8 +3,10 @@
 Test completo del sistema SVXLink Statistics
 """
 
+import glob
 import os
 import shutil
+import tempfile
 from datetime import datetime, date, timedelta
 from database import DatabaseManager, DailyLogStats, CTCSSStats, TGStats
 from log_processor import LogProcessor
@@ -99,15 +101,19 @@ def test_scheduler():
     print("\n⏰ Test Scheduler...")
     
     try:
-        scheduler = LogScheduler()
-        
-        # Test processamento avvio
-        result = scheduler.process_on_startup()
-        print(f"🚀 Processamento avvio: {result}")
-        
-        # Test job schedulati
-        jobs = scheduler.get_next_runs()
-        print(f"📅 Job schedulati: {len(jobs) if jobs else 0}")
+        # Copia dei log: lock e feed dell'ingest restano fuori dalla cartella data del repository
+        with tempfile.TemporaryDirectory() as data_dir:
+            for log_file in glob.glob('data/svxlink_log_*.txt'):
+                shutil.copy(log_file, data_dir)
+            scheduler = LogScheduler(lambda: LogProcessor(data_dir))
+            
+            # Test processamento avvio
+            result = scheduler.process_on_startup()
+            print(f"🚀 Processamento avvio: {result}")
+            
+            # Test job schedulati
+            jobs = scheduler.get_next_runs()
+            print(f"📅 Job schedulati: {len(jobs) if jobs else 0}")
         
         return True
         
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test del watcher della cartella dei log (inotify e fallback con stat)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from watcher import DirectoryWatcher
+
+
+def _check_backend(use_inotify):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        Path(tmp_dir, 'svxlink_log_2025-10-01.txt').write_text("vecchio\n")
+        batches = []
+        notified = threading.Event()
+
+        def on_change(paths):
+            batches.append([p.name for p in paths])
+            notified.set()
+
+        watcher = DirectoryWatcher(Path(tmp_dir), on_change, debounce=0.3,
+                                   poll_interval=0.1, use_inotify=use_inotify)
+        watcher.start()
+        try:
+            if use_inotify and watcher.backend != 'inotify':
+                print("⚠️ inotify non disponibile, test saltato")
+                return
+            time.sleep(0.3)
+            assert batches == []  # i file già presenti non generano eventi
+
+            # Più scritture ravvicinate producono una sola notifica dopo la quiete
+            log_file = Path(tmp_dir, 'svxlink_log_2025-10-02.txt')
+            for i in range(3):
+                with open(log_file, 'a') as f:
+                    f.write(f"riga {i}\n")
+                time.sleep(0.05)
+            Path(tmp_dir, 'note.md').write_text("ignorato\n")
+
+            assert notified.wait(5)
+            time.sleep(0.4)
+            assert batches == [['svxlink_log_2025-10-02.txt']]
+
+            watcher.record_latency(1.5)
+            stats = watcher.get_stats()
+            assert stats['backend'] == watcher.backend
+            assert stats['triggers'] == 1
+            assert stats['ingest_latency']['last_seconds'] == 1.5
+            print(f"✅ Backend {watcher.backend}: notifica unica dopo il debounce")
+        finally:
+            watcher.stop()
+        assert not watcher.running
+
+
+def test_watcher_directory_removed():
+    """Con la directory rimossa il thread termina e stop() chiude comunque la pipe"""
+    print("🗑️ Test watcher su directory rimossa...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        watched = Path(tmp_dir, 'logs')
+        watched.mkdir()
+        watcher = DirectoryWatcher(watched, lambda paths: None, debounce=0.1, poll_interval=0.1)
+        watcher.start()
+        if watcher.backend != 'inotify':
+            watcher.stop()
+            print("⚠️ inotify non disponibile, test saltato")
+            return
+        fds = (watcher._wake_r, watcher._wake_w)
+        watched.rmdir()
+        watcher._thread.join(5)
+        assert not watcher.running
+
+        watcher.stop()
+        for fd in fds:
+            try:
+                os.fstat(fd)
+            except OSError:
+                continue
+            raise AssertionError(f"fd {fd} non chiuso")
+        watcher.stop()  # una seconda chiamata non fa nulla
+        print("✅ Pipe chiusa anche dopo la fine spontanea del thread")
+
+
+def test_watcher_inotify():
+    """Rilevamento con inotify"""
+    print("👀 Test watcher inotify...")
+    _check_backend(True)
+
+
+def test_watcher_polling():
+    """Rilevamento con confronto degli stat"""
+    print("👀 Test watcher stat...")
+    _check_backend(False)
+
+
+if __name__ == "__main__":
+    test_watcher_inotify()
+    test_watcher_polling()
+    test_watcher_directory_removed()
+    print("🎉 Test watcher completati!")
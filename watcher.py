@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Watcher della cartella dei log per SVXLink Log Analyzer
+Rileva file nuovi o cresciuti nella cartella data e avvia l'ingest entro pochi
+secondi. Usa inotify quando disponibile (nessun risveglio finché non cambia
+nulla), altrimenti confronta periodicamente stat dei file.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from directory_index import LOG_FILE_PATTERNS, get_directory_index
+
+logger = logging.getLogger(__name__)
+
+# Costanti inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _open_inotify(directory: Path) -> Optional[int]:
+    """Apre un descrittore inotify sulla directory, None se non disponibile"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class DirectoryWatcher:
+    """Osserva una directory e segnala i file log modificati dopo un periodo di quiete"""
+
+    def __init__(self, directory: Path, on_change: Callable[[List[Path]], None],
+                 debounce: float = 2.0, poll_interval: float = 5.0,
+                 use_inotify: bool = True, patterns: Tuple[str, ...] = LOG_FILE_PATTERNS):
+        self.directory = Path(directory)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.patterns = patterns
+        self.backend: Optional[str] = None
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+        self._wake_r, self._wake_w = None, None
+        self._pending: Dict[str, float] = {}  # nome file -> monotonic dell'ultimo evento
+        self._lock = threading.Lock()
+
+        self.events = 0
+        self.triggers = 0
+        self.last_trigger_at: Optional[str] = None
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_last: Optional[float] = None
+
+    def start(self):
+        """Avvia il thread del watcher"""
+        if self.running:
+            return
+        self.running = True
+        self._wake_r, self._wake_w = os.pipe()
+        fd = _open_inotify(self.directory) if self.use_inotify else None
+        if fd is not None:
+            self.backend = 'inotify'
+            target, args = self._run_inotify, (fd,)
+        else:
+            self.backend = 'stat'
+            target, args = self._run_polling, ()
+        self._thread = threading.Thread(target=target, args=args, name='data-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f"👀 Watcher attivo su {self.directory} ({self.backend})")
+
+    def stop(self):
+        """Ferma il watcher e chiude la pipe di risveglio.
+
+        Anche se il thread è già terminato da solo (directory rimossa o spostata)
+        """
+        self.running = False
+        if self._wake_w is None:
+            return
+        os.write(self._wake_w, b'x')
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        for fd in (self._wake_r, self._wake_w):
+            os.close(fd)
+        self._wake_r, self._wake_w = None, None
+
+    def _matches(self, name: str) -> bool:
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def _mark(self, name: str):
+        with self._lock:
+            self.events += 1
+            self._pending[name] = time.monotonic()
+
+    def _next_timeout(self, idle: Optional[float]) -> Optional[float]:
+        # Senza file in attesa si dorme per `idle` (None = finché non arriva un evento)
+        with self._lock:
+            if not self._pending:
+                return idle
+            wait = min(self._pending.values()) + self.debounce - time.monotonic()
+        wait = max(wait, 0.0)
+        return wait if idle is None else min(wait, idle)
+
+    def _flush_ready(self):
+        """Notifica i file senza eventi da almeno `debounce` secondi"""
+        now = time.monotonic()
+        with self._lock:
+            ready = [name for name, last in self._pending.items() if now - last >= self.debounce]
+            for name in ready:
+                del self._pending[name]
+        if not ready:
+            return
+        self.triggers += 1
+        self.last_trigger_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        try:
+            self.on_change([self.directory / name for name in sorted(ready)])
+        except Exception as e:
+            logger.error(f"❌ Errore ingest da watcher: {e}")
+
+    def _run_inotify(self, fd: int):
+        try:
+            while self.running:
+                readable, _, _ = select.select([fd, self._wake_r], [], [], self._next_timeout(None))
+                if self._wake_r in readable:
+                    break
+                if fd in readable:
+                    self._read_events(fd)
+                self._flush_ready()
+        finally:
+            os.close(fd)
+
+    def _read_events(self, fd: int):
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode(errors='ignore')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Coda eventi piena: si considerano modificati tutti i file
+                get_directory_index(self.directory).invalidate()
+                for path in get_directory_index(self.directory).files():
+                    self._mark(path.name)
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                logger.warning(f"⚠️ Directory {self.directory} rimossa o spostata: watcher fermato")
+                self.running = False
+            elif name and self._matches(name):
+                self._mark(name)
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for path in get_directory_index(self.directory).files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _run_polling(self):
+        previous = self._snapshot()
+        while self.running:
+            readable, _, _ = select.select([self._wake_r], [], [], self._next_timeout(self.poll_interval))
+            if readable:
+                break
+            current = self._snapshot()
+            for name, signature in current.items():
+                if previous.get(name) != signature:
+                    self._mark(name)
+            previous = current
+            self._flush_ready()
+
+    def record_latency(self, seconds: float):
+        """Registra il tempo tra l'ultima scrittura di un file e il commit nel database"""
+        with self._lock:
+            self.latency_count += 1
+            self.latency_total += seconds
+            self.latency_max = max(self.latency_max, seconds)
+            self.latency_last = seconds
+
+    def get_stats(self) -> Dict:
+        """Stato del watcher per le API"""
+        with self._lock:
+            return {
+                'running': self.running,
+                'backend': self.backend,
+                'directory': str(self.directory),
+                'debounce_seconds': self.debounce,
+                'events': self.events,
+                'triggers': self.triggers,
+                'pending_files': len(self._pending),
+                'last_trigger_at': self.last_trigger_at,
+                'ingest_latency': {
+                    'count': self.latency_count,
+                    'last_seconds': round(self.latency_last, 3) if self.latency_last is not None else None,
+                    'avg_seconds': round(self.latency_total / self.latency_count, 3) if self.latency_count else None,
+                    'max_seconds': round(self.latency_max, 3) if self.latency_count else None
+                }
+            }